@@ -10,20 +10,22 @@ echo ""
 
 cd "$(dirname "$0")"
 
+# --profile: profilo cProfile e stack per flamegraph (oltre ai tempi per fase in tempi/)
+if [ "$1" == "--profile" ]; then
+    export ROTA_PROFILE=1
+    shift
+fi
+
 echo "🔧 Attivazione ambiente virtuale..."
 source venv/bin/activate
 
 echo ""
 echo "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
-echo "  PASSO 1: ESTRAZIONE DATI DA 54 PDF (52 SETTIMANE)"
-echo "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
-python3 extract_turni_completo.py
-
-echo ""
-echo "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
-echo "  PASSO 2: ANALISI HR EQUITÀ E COMPLIANCE - ANNO COMPLETO"
+echo "  ESTRAZIONE DATI DA 54 PDF (52 SETTIMANE) E ANALISI HR ANNO COMPLETO"
 echo "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
-python3 analisi_hr_anno_completo.py
+# Un solo processo: i turni estratti passano in memoria all'analisi, gli stadi
+# invariati (PDF e codice non modificati) vengono presi dalla cache .pipeline/
+python3 pipeline.py --solo report_hr "$@"
 
 echo ""
 echo "╔══════════════════════════════════════════════════════════════════════╗"
@@ -36,6 +38,7 @@ echo "📊 FILE GENERATI:"
 echo "   • REPORT_HR_ANNO_COMPLETO_2025.xlsx (10 fogli)"
 echo "   • turni_completi_52_settimane.csv (1381 turni)"
 echo "   • REPORT_FINALE_HR.txt (riepilogo)"
+echo "   • tempi/ (tempi, righe e memoria per fase, JSON)"
 echo ""
 echo "📋 DATI ANALIZZATI:"
 echo "   • 52 settimane"
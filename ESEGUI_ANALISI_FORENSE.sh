@@ -2,6 +2,12 @@
 
 cd "$(dirname "$0")"
 
+# --profile: profilo cProfile e stack per flamegraph (oltre ai tempi per fase in tempi/)
+if [ "$1" == "--profile" ]; then
+    export ROTA_PROFILE=1
+    shift
+fi
+
 echo "╔══════════════════════════════════════════════════════════════════════╗"
 echo "║                                                                      ║"
 echo "║      🔬 ANALISI STATISTICA FORENSE - MANIPOLAZIONE TURNI 🔬         ║"
@@ -31,8 +37,9 @@ echo ""
 echo "🚀 Avvio analisi forense..."
 echo ""
 
-# Esegui analisi
-python3 analisi_statistica_manipolazione.py
+# Esegui analisi (pipeline.py: salta gli stadi già aggiornati; altri argomenti passati alla pipeline,
+# es. --permutazioni 10000 --seed 1 per i p-value empirici del test di permutazione)
+python3 pipeline.py --solo report_forense "$@"
 
 echo ""
 echo "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
@@ -41,7 +48,9 @@ echo "✅ ANALISI COMPLETATA!"
 echo ""
 echo "📄 File generati:"
 echo "   • REPORT_FORENSE_MANIPOLAZIONE.xlsx (Excel completo)"
+echo "   • dati_arricchiti.csv (turni con data, giorno, weekend e festività)"
 echo "   • SINTESI_FORENSE.txt (Sintesi risultati)"
+echo "   • tempi/ (tempi per fase; con --profile anche .prof e .folded per flamegraph)"
 echo ""
 echo "📊 Apri i file per vedere:"
 echo "   • Test statistici formali"
@@ -9,30 +9,23 @@ echo ""
 # Vai nella directory corretta
 cd "$(dirname "$0")"
 
+# --profile: profilo cProfile e stack per flamegraph (oltre ai tempi per fase in tempi/)
+if [ "$1" == "--profile" ]; then
+    export ROTA_PROFILE=1
+    shift
+fi
+
 # Attiva virtual environment
 echo "🔧 Attivazione ambiente virtuale..."
 source venv/bin/activate
 
-# Esegui estrazione avanzata
-echo ""
-echo "================================================"
-echo "  PASSO 1: ESTRAZIONE TURNI DAI PDF"
-echo "================================================"
-python3 extract_turni_avanzato.py
-
-# Esegui analisi avanzata
-echo ""
-echo "================================================"
-echo "  PASSO 2: ANALISI AVANZATA DEI DATI"
-echo "================================================"
-python3 analisi_avanzata.py
-
-# Esegui analisi HR Equità e Compliance
+# Estrazione, analisi avanzata e analisi HR Equità e Compliance in un solo
+# processo (le due analisi in parallelo sugli stessi turni in memoria)
 echo ""
 echo "================================================"
-echo "  PASSO 3: ANALISI HR EQUITÀ E COMPLIANCE"
+echo "  ESTRAZIONE TURNI E ANALISI"
 echo "================================================"
-python3 analisi_equita_hr.py
+python3 pipeline.py --solo analisi_avanzata equita "$@"
 
 # Mostra file generati
 echo ""
@@ -47,6 +40,8 @@ echo "📊 File principali:"
 echo "   • turni_dettagliati.csv - Dati grezzi"
 echo "   • turni_dettagliati.xlsx - Dati organizzati"
 echo "   • REPORT_FINALE_COMPLETO.xlsx - Report con analisi"
+echo "   • tempi/ - Tempi, righe e memoria per fase di ogni passo (JSON)"
+echo "   • .pipeline/ - Cache degli stadi (python3 pipeline.py --no-cache per ricalcolare tutto)"
 echo ""
 echo "💡 Apri REPORT_FINALE_COMPLETO.xlsx per vedere tutte le statistiche!"
 echo ""
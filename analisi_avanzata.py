@@ -5,23 +5,28 @@ Analisi avanzata dei turni estratti
 
 import pandas as pd
 import numpy as np
-from pathlib import Path
 from datetime import datetime
 import warnings
+
+from archivio_turni import BASE_PATH, carica_turni, colonne_originali
+from report_excel import ReportExcel
+from strumentazione import esecuzione, fase
 warnings.filterwarnings('ignore')
 
+@fase()
 def load_data():
     """Carica i dati dettagliati"""
-    base_path = Path('/Users/radice/Downloads/ROTA Chicca')
+    base_path = BASE_PATH
     csv_file = base_path / 'turni_dettagliati.csv'
     
     if not csv_file.exists():
         print("❌ Errore: Esegui prima extract_turni_avanzato.py!")
         return None
     
-    df = pd.read_csv(csv_file)
+    df = carica_turni(csv_file, colonne_originali(csv_file))
     return df
 
+@fase()
 def analisi_ore_lavoro(df):
     """Analisi dettagliata delle ore lavorate"""
     print("\n" + "="*70)
@@ -64,6 +69,7 @@ def analisi_ore_lavoro(df):
     
     return ore_staff
 
+@fase()
 def analisi_tipologie_turno(df):
     """Analisi delle tipologie di turno"""
     print("\n" + "="*70)
@@ -84,6 +90,7 @@ def analisi_tipologie_turno(df):
     
     return tipi
 
+@fase()
 def analisi_orari(df):
     """Analisi degli orari di lavoro"""
     print("\n" + "="*70)
@@ -126,6 +133,7 @@ def analisi_orari(df):
         ])
         print(f"   {fascia}: {count} turni")
 
+@fase()
 def analisi_temporale(df):
     """Analisi temporale dei turni"""
     print("\n" + "="*70)
@@ -154,6 +162,7 @@ def analisi_temporale(df):
         print(f"   Settimana più intensa: Settimana {ore_sett.idxmax()} ({ore_sett.max():.1f} ore)")
         print(f"   Settimana meno intensa: Settimana {ore_sett.idxmin()} ({ore_sett.min():.1f} ore)")
 
+@fase()
 def analisi_settimane_modificate(df):
     """Analisi delle settimane con modifiche"""
     print("\n" + "="*70)
@@ -182,17 +191,18 @@ def analisi_settimane_modificate(df):
     else:
         print("\n✅ Nessuna modifica trovata")
 
+@fase()
 def crea_report_excel_completo(df, ore_staff):
     """Crea report Excel super dettagliato"""
     print("\n" + "="*70)
     print("📄 GENERAZIONE REPORT EXCEL COMPLETO")
     print("="*70)
     
-    base_path = Path('/Users/radice/Downloads/ROTA Chicca')
+    base_path = BASE_PATH
     output_file = base_path / 'REPORT_FINALE_COMPLETO.xlsx'
     
     try:
-        with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+        with ReportExcel(output_file) as report:
             # Foglio 1: Dashboard - Riepilogo generale
             summary_data = {
                 'Metrica': [
@@ -212,13 +222,13 @@ def crea_report_excel_completo(df, ore_staff):
                     len(df[df['modifiche'].notna() & (df['modifiche'] != '')])
                 ]
             }
-            pd.DataFrame(summary_data).to_excel(writer, sheet_name='Dashboard', index=False)
+            report.scrivi(pd.DataFrame(summary_data), sheet_name='Dashboard', index=False)
             
             # Foglio 2: Tutti i turni
-            df.to_excel(writer, sheet_name='Tutti i Turni', index=False)
+            report.scrivi(df, sheet_name='Tutti i Turni', index=False)
             
             # Foglio 3: Ore per Staff
-            ore_staff.to_excel(writer, sheet_name='Ore per Staff')
+            report.scrivi(ore_staff, sheet_name='Ore per Staff')
             
             # Foglio 4: Pivot Settimana-Staff (Ore)
             df_ore = df[df['ore_lavoro'].notna()].copy()
@@ -230,7 +240,7 @@ def crea_report_excel_completo(df, ore_staff):
                 aggfunc='sum',
                 fill_value=0
             ).round(1)
-            pivot_ore.to_excel(writer, sheet_name='Ore Settimana-Staff')
+            report.scrivi(pivot_ore, sheet_name='Ore Settimana-Staff')
             
             # Foglio 5: Pivot Settimana-Staff (N. Turni)
             pivot_turni = df.pivot_table(
@@ -240,29 +250,29 @@ def crea_report_excel_completo(df, ore_staff):
                 aggfunc='count',
                 fill_value=0
             )
-            pivot_turni.to_excel(writer, sheet_name='Turni Settimana-Staff')
+            report.scrivi(pivot_turni, sheet_name='Turni Settimana-Staff')
             
             # Foglio 6: Tipologie Turno
             tipi_df = df['tipo_turno'].value_counts().to_frame('Conteggio')
             tipi_df['Percentuale'] = (tipi_df['Conteggio'] / len(df) * 100).round(1)
-            tipi_df.to_excel(writer, sheet_name='Tipologie Turno')
+            report.scrivi(tipi_df, sheet_name='Tipologie Turno')
             
             # Foglio 7: Orari Entrata
             df_entrata = df[df['ora_entrata'].notna()]
             if len(df_entrata) > 0:
                 entrata_df = df_entrata['ora_entrata'].value_counts().to_frame('Frequenza')
-                entrata_df.to_excel(writer, sheet_name='Orari Entrata')
+                report.scrivi(entrata_df, sheet_name='Orari Entrata')
             
             # Foglio 8: Orari Uscita
             df_uscita = df[df['ora_uscita'].notna()]
             if len(df_uscita) > 0:
                 uscita_df = df_uscita['ora_uscita'].value_counts().to_frame('Frequenza')
-                uscita_df.to_excel(writer, sheet_name='Orari Uscita')
+                report.scrivi(uscita_df, sheet_name='Orari Uscita')
             
             # Foglio 9: Settimane Modificate
             df_mod = df[df['modifiche'].notna() & (df['modifiche'] != '')]
             if len(df_mod) > 0:
-                df_mod.to_excel(writer, sheet_name='Settimane Modificate', index=False)
+                report.scrivi(df_mod, sheet_name='Settimane Modificate', index=False)
             
             # Foglio 10: Statistiche per Staff
             stats_staff = df.groupby('staff').agg({
@@ -271,16 +281,28 @@ def crea_report_excel_completo(df, ore_staff):
                 'ore_lavoro': ['sum', 'mean']
             }).round(2)
             stats_staff.columns = ['N. Turni', 'Tipo Più Comune', 'Totale Ore', 'Media Ore']
-            stats_staff.to_excel(writer, sheet_name='Statistiche Staff')
+            report.scrivi(stats_staff, sheet_name='Statistiche Staff')
         
         print(f"✅ Report completo salvato: {output_file}")
         print(f"\n📊 Il file contiene 10 fogli con analisi dettagliate!")
         return output_file
-        
+    
     except Exception as e:
         print(f"❌ Errore nel salvataggio: {e}")
         return None
 
+def analizza(df):
+    """Tutte le analisi e il report Excel su turni già caricati; ritorna il file del report"""
+    ore_staff = analisi_ore_lavoro(df)
+    analisi_tipologie_turno(df)
+    analisi_orari(df)
+    analisi_temporale(df)
+    analisi_settimane_modificate(df)
+    
+    # Genera report finale
+    return crea_report_excel_completo(df, ore_staff)
+
+@esecuzione('analisi_avanzata')
 def main():
     print("="*70)
     print("🚀 ANALISI AVANZATA TURNI DI LAVORO")
@@ -295,15 +317,8 @@ def main():
     print(f"📅 Periodo: da settimana {df['settimana'].min()} a settimana {df['settimana'].max()}")
     print(f"👥 Staff: {', '.join(sorted(df['staff'].unique()))}")
     
-    # Esegui tutte le analisi
-    ore_staff = analisi_ore_lavoro(df)
-    analisi_tipologie_turno(df)
-    analisi_orari(df)
-    analisi_temporale(df)
-    analisi_settimane_modificate(df)
-    
-    # Genera report finale
-    report_file = crea_report_excel_completo(df, ore_staff)
+    # Analisi e report
+    report_file = analizza(df)
     
     print("\n" + "="*70)
     print("✅ ANALISI COMPLETATA!")
@@ -5,66 +5,46 @@ Analizza distribuzione turni, festivi, riposi consecutivi e identifica anomalie
 """
 
 import pandas as pd
-import numpy as np
-from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import timedelta
 from collections import Counter, defaultdict
 import calendar
 import warnings
+
+from sequenze import codifica_sequenze, riepilogo_sequenze
+from archivio_turni import BASE_PATH, carica_turni
+from arricchimento import date_settimane, festivi_calendario
+from dataset_turni import sede_da_file
+from confronti import MatriceConfronti, coppie_con_evidenza
+from strumentazione import esecuzione, fase
 warnings.filterwarnings('ignore')
 
-# Festività italiane 2025
-FESTIVITA_2025 = {
-    '01/01/2025': 'Capodanno',
-    '06/01/2025': 'Epifania',
-    '20/04/2025': 'Pasqua',
-    '21/04/2025': 'Lunedì dell\'Angelo',
-    '25/04/2025': 'Festa della Liberazione',
-    '01/05/2025': 'Festa del Lavoro',
-    '02/06/2025': 'Festa della Repubblica',
-    '15/08/2025': 'Ferragosto',
-    '01/11/2025': 'Ognissanti',
-    '08/12/2025': 'Immacolata Concezione',
-    '25/12/2025': 'Natale',
-    '26/12/2025': 'Santo Stefano'
-}
+# Coppie di colleghi mostrate nel dettaglio (le disparità sono calcolate su tutte)
+CONFRONTI_IN_EVIDENZA = [
+    ('VISSANI', 'PAGANO'),
+    ('PAGANO', 'PACINI'),
+    ('TAMBERI', 'MORALE'),
+    ('CIRCELLI', 'VISSANI')
+]
+
+# Colonne lette da turni_dettagliati (niente linea_completa), date già convertite
+COLONNE_USATE = ['file', 'settimana', 'modifiche', 'data_inizio', 'data_fine',
+                 'staff', 'tipo_turno', 'ore_lavoro', 'ora_entrata', 'ora_uscita',
+                 'data_inizio_dt', 'data_fine_dt']
 
+@fase()
 def load_data():
     """Carica i dati dettagliati"""
-    base_path = Path('/Users/radice/Downloads/ROTA Chicca')
+    base_path = BASE_PATH
     csv_file = base_path / 'turni_dettagliati.csv'
     
     if not csv_file.exists():
         print("❌ Errore: File turni_dettagliati.csv non trovato!")
         return None
     
-    df = pd.read_csv(csv_file)
+    df = carica_turni(csv_file, COLONNE_USATE)
     return df
 
-def parse_date_range(row):
-    """Estrae le date dal periodo della settimana"""
-    try:
-        data_inizio = row['data_inizio']
-        data_fine = row['data_fine']
-        
-        # Formato: DDMMYY
-        if pd.notna(data_inizio) and len(str(data_inizio)) >= 6:
-            d_start = str(data_inizio).zfill(6)
-            d_end = str(data_fine).zfill(6)
-            
-            # Parse: DDMMYY -> datetime
-            day_s, month_s, year_s = d_start[:2], d_start[2:4], d_start[4:6]
-            day_e, month_e, year_e = d_end[:2], d_end[2:4], d_end[4:6]
-            
-            start = datetime(2000 + int(year_s), int(month_s), int(day_s))
-            end = datetime(2000 + int(year_e), int(month_e), int(day_e))
-            
-            return start, end
-    except:
-        pass
-    
-    return None, None
-
+@fase()
 def genera_calendario_completo(df):
     """Genera calendario completo con tutti i giorni e turni"""
     print("\n" + "="*70)
@@ -72,6 +52,8 @@ def genera_calendario_completo(df):
     print("="*70)
     
     calendario = []
+    # Date delle settimane già convertite al caricamento (data_inizio_dt / data_fine_dt)
+    inizio, fine = date_settimane(df)
     
     # Processa ogni settimana
     for settimana in sorted(df['settimana'].dropna().unique()):
@@ -79,16 +61,14 @@ def genera_calendario_completo(df):
         
         # Prendi primo record per date
         row = df_sett.iloc[0]
-        start, end = parse_date_range(row)
+        start, end = inizio[row.name], fine[row.name]
         
-        if start and end:
+        if pd.notna(start) and pd.notna(end):
             # Genera tutti i giorni della settimana
             current = start
             while current <= end:
                 data_str = current.strftime('%d/%m/%Y')
                 giorno_settimana = calendar.day_name[current.weekday()]
-                is_festivo = data_str in FESTIVITA_2025
-                nome_festivo = FESTIVITA_2025.get(data_str, '')
                 is_weekend = current.weekday() >= 5  # Sabato=5, Domenica=6
                 
                 # Per ogni membro staff, identifica il turno
@@ -102,13 +82,12 @@ def genera_calendario_completo(df):
                         calendario.append({
                             'data': data_str,
                             'data_dt': current,
+                            'file': row.get('file', ''),
                             'giorno_settimana': giorno_settimana,
                             'settimana': settimana,
                             'staff': staff,
                             'tipo_turno': turno_info['tipo_turno'],
                             'ore_lavoro': turno_info['ore_lavoro'],
-                            'is_festivo': is_festivo,
-                            'nome_festivo': nome_festivo,
                             'is_weekend': is_weekend,
                             'is_lavorato': turno_info['tipo_turno'] == 'NORMALE',
                             'is_riposo': turno_info['tipo_turno'] in ['RIPO', 'RDOM'],
@@ -119,10 +98,18 @@ def genera_calendario_completo(df):
                 current += timedelta(days=1)
     
     df_cal = pd.DataFrame(calendario)
+    
+    # Festività (nazionali più il patrono della sede) come in dati_arricchiti.csv
+    if len(df_cal) > 0:
+        festivo = festivi_calendario(df_cal['data_dt'], sede_da_file(df_cal.pop('file')), df)
+        posizione = df_cal.columns.get_loc('ore_lavoro') + 1
+        df_cal.insert(posizione, 'is_festivo', festivo != '')
+        df_cal.insert(posizione + 1, 'nome_festivo', festivo)
     print(f"✅ Calendario generato: {len(df_cal)} giorni per {df_cal['staff'].nunique()} persone")
     
     return df_cal
 
+@fase()
 def analisi_festivi_lavorati(df_cal):
     """Analizza chi ha lavorato i festivi"""
     print("\n" + "="*70)
@@ -136,7 +123,7 @@ def analisi_festivi_lavorati(df_cal):
         print("\n⚠️  Nessun festivo trovato nel periodo analizzato")
         return None
     
-    print(f"\n📊 Festivi nel periodo: {len(FESTIVITA_2025)} giorni")
+    print(f"\n📊 Festivi nel periodo: {df_festivi['data'].nunique()} giorni")
     
     # Conta festivi lavorati per staff
     festivi_lavorati = df_festivi[df_festivi['is_lavorato'] == True].groupby('staff').agg({
@@ -171,50 +158,27 @@ def analisi_festivi_lavorati(df_cal):
     
     return festivi_lavorati
 
+@fase()
 def analisi_riposi_consecutivi(df_cal):
     """Analizza i riposi consecutivi per ogni staff"""
     print("\n" + "="*70)
     print("😴 ANALISI RIPOSI CONSECUTIVI")
     print("="*70)
     
-    risultati = {}
-    
-    for staff in sorted(df_cal['staff'].unique()):
-        df_staff = df_cal[df_cal['staff'] == staff].sort_values('data_dt')
-        
-        sequenze_riposo = []
-        giorni_consecutivi = 0
-        
-        for idx, row in df_staff.iterrows():
-            if row['is_riposo'] or row['is_off'] or row['is_ferie']:
-                giorni_consecutivi += 1
-            else:
-                if giorni_consecutivi > 0:
-                    sequenze_riposo.append(giorni_consecutivi)
-                giorni_consecutivi = 0
-        
-        # Ultima sequenza
-        if giorni_consecutivi > 0:
-            sequenze_riposo.append(giorni_consecutivi)
-        
-        # Conta sequenze per lunghezza
-        riposi_2 = sum(1 for x in sequenze_riposo if x == 2)
-        riposi_3 = sum(1 for x in sequenze_riposo if x == 3)
-        riposi_4plus = sum(1 for x in sequenze_riposo if x >= 4)
-        riposi_singoli = sum(1 for x in sequenze_riposo if x == 1)
-        
-        risultati[staff] = {
-            'Riposi 1 giorno': riposi_singoli,
-            'Riposi 2 giorni': riposi_2,
-            'Riposi 3 giorni': riposi_3,
-            'Riposi 4+ giorni': riposi_4plus,
-            'Totale Sequenze': len(sequenze_riposo),
-            'Giorni Riposo Totali': sum(sequenze_riposo),
-            'Media Giorni/Sequenza': np.mean(sequenze_riposo) if sequenze_riposo else 0,
-            'Max Consecutivi': max(sequenze_riposo) if sequenze_riposo else 0
-        }
-    
-    df_riposi = pd.DataFrame(risultati).T
+    is_riposo = df_cal['is_riposo'] | df_cal['is_off'] | df_cal['is_ferie']
+    seq = riepilogo_sequenze(codifica_sequenze(df_cal, is_riposo, 'data_dt'),
+                             sorted(df_cal['staff'].unique()))
+    
+    df_riposi = pd.DataFrame({
+        'Riposi 1 giorno': seq[1],
+        'Riposi 2 giorni': seq[2],
+        'Riposi 3 giorni': seq[3],
+        'Riposi 4+ giorni': seq['4+'],
+        'Totale Sequenze': seq['sequenze'],
+        'Giorni Riposo Totali': seq['giorni'],
+        'Media Giorni/Sequenza': seq['media'],
+        'Max Consecutivi': seq['max']
+    })
     df_riposi = df_riposi.sort_values('Totale Sequenze', ascending=False)
     
     print("\n📊 RIPOSI CONSECUTIVI PER STAFF:")
@@ -235,6 +199,7 @@ def analisi_riposi_consecutivi(df_cal):
     
     return df_riposi
 
+@fase()
 def analisi_equita_generale(df_cal):
     """Analisi completa dell'equità nella distribuzione"""
     print("\n" + "="*70)
@@ -277,40 +242,27 @@ def analisi_equita_generale(df_cal):
     
     return df_metriche
 
+@fase()
 def confronti_diretti(df_cal, df_metriche):
-    """Confronti diretti tra coppie di colleghi"""
+    """Confronti diretti tra colleghi: dettaglio delle coppie in evidenza, disparità di tutte le coppie"""
     print("\n" + "="*70)
     print("🔍 CONFRONTI DIRETTI TRA COLLEGHI")
     print("="*70)
     
     staff_list = sorted(df_cal['staff'].unique())
+    matrice = MatriceConfronti(df_metriche, list(df_metriche.columns))
     
-    # Esempi specifici richiesti
-    confronti = [
-        ('VISSANI', 'PAGANO'),
-        ('PAGANO', 'PACINI'),
-        ('TAMBERI', 'MORALE'),
-        ('CIRCELLI', 'VISSANI')
-    ]
-    
-    for staff1, staff2 in confronti:
+    for staff1, staff2 in CONFRONTI_IN_EVIDENZA:
         if staff1 in staff_list and staff2 in staff_list:
             print(f"\n{'='*70}")
             print(f"📊 CONFRONTO: {staff1} vs {staff2}")
             print('='*70)
             
-            # Prendi metriche
-            m1 = df_metriche.loc[staff1]
-            m2 = df_metriche.loc[staff2]
-            
-            # Confronto metrica per metrica
-            for metrica in df_metriche.columns:
-                val1 = m1[metrica]
-                val2 = m2[metrica]
-                diff = val1 - val2
+            # Confronto metrica per metrica (dalla matrice di tutte le coppie)
+            for metrica, row in matrice.coppia(staff1, staff2).iterrows():
+                val1, val2, diff, perc_diff = row[staff1], row[staff2], row['diff'], row['perc']
                 
                 if val2 != 0:
-                    perc_diff = (diff / val2) * 100
                     simbolo = ">" if diff > 0 else ("<" if diff < 0 else "=")
                     
                     # Alert se differenza > 20%
@@ -318,7 +270,19 @@ def confronti_diretti(df_cal, df_metriche):
                     
                     print(f"   {metrica:25}: {staff1}={val1:7.2f} {simbolo} {staff2}={val2:7.2f} " +
                           f"(diff: {diff:+7.2f}, {perc_diff:+6.1f}%){alert}")
+    
+    # Tutte le coppie: metriche con differenza > 20%
+    coppie = coppie_con_evidenza(matrice, CONFRONTI_IN_EVIDENZA)
+    squilibrate = coppie[coppie['Disparità'] > 0]
+    print(f"\n{'='*70}")
+    print(f"📊 TUTTE LE COPPIE: {len(squilibrate)} con differenze significative su {len(coppie)}")
+    print('='*70)
+    for _, row in squilibrate.sort_values('Disparità', ascending=False, kind='stable').head(10).iterrows():
+        print(f"   {row['Staff1']} vs {row['Staff2']}: {row['Disparità']} metriche oltre il 20%")
+    
+    return coppie
 
+@fase()
 def identifica_anomalie(df_cal, df_metriche):
     """Identifica anomalie e violazioni delle best practice HR"""
     print("\n" + "="*70)
@@ -329,19 +293,9 @@ def identifica_anomalie(df_cal, df_metriche):
     
     # 1. Troppi giorni consecutivi senza riposo
     print("\n1️⃣  Controllo giorni lavorativi consecutivi eccessivi (>6):")
-    for staff in sorted(df_cal['staff'].unique()):
-        df_staff = df_cal[df_cal['staff'] == staff].sort_values('data_dt')
-        
-        giorni_lavoro_consecutivi = 0
-        max_consecutivi = 0
-        
-        for idx, row in df_staff.iterrows():
-            if row['is_lavorato']:
-                giorni_lavoro_consecutivi += 1
-                max_consecutivi = max(max_consecutivi, giorni_lavoro_consecutivi)
-            else:
-                giorni_lavoro_consecutivi = 0
-        
+    seq_lavoro = riepilogo_sequenze(codifica_sequenze(df_cal, df_cal['is_lavorato'], 'data_dt'),
+                                    sorted(df_cal['staff'].unique()))
+    for staff, max_consecutivi in seq_lavoro['max'].items():
         if max_consecutivi > 6:
             print(f"   ⚠️  {staff}: {max_consecutivi} giorni lavorativi consecutivi")
             anomalie.append({
@@ -406,13 +360,14 @@ def identifica_anomalie(df_cal, df_metriche):
         print("\n✅ Nessuna anomalia significativa rilevata!")
         return None
 
+@fase()
 def genera_report_hr(df_cal, df_metriche, festivi_lavorati, riposi_consecutivi, anomalie):
     """Genera report Excel completo per HR"""
     print("\n" + "="*70)
     print("📄 GENERAZIONE REPORT HR COMPLETO")
     print("="*70)
     
-    base_path = Path('/Users/radice/Downloads/ROTA Chicca')
+    base_path = BASE_PATH
     output_file = base_path / 'REPORT_HR_EQUITA_COMPLIANCE.xlsx'
     
     try:
@@ -431,7 +386,7 @@ def genera_report_hr(df_cal, df_metriche, festivi_lavorati, riposi_consecutivi,
                     f"{df_cal['data_dt'].min().strftime('%d/%m/%Y')} - {df_cal['data_dt'].max().strftime('%d/%m/%Y')}",
                     df_cal['staff'].nunique(),
                     len(df_cal['data'].unique()),
-                    len(FESTIVITA_2025),
+                    df_cal.loc[df_cal['is_festivo'], 'data'].nunique(),
                     len(anomalie) if anomalie is not None else 0,
                     'Da valutare'
                 ]
@@ -466,14 +421,32 @@ def genera_report_hr(df_cal, df_metriche, festivi_lavorati, riposi_consecutivi,
                 confronti_matrix.loc[staff, 'Weekend'] = df_metriche.loc[staff, 'Weekend Lavorati']
                 confronti_matrix.loc[staff, 'Riposi'] = df_metriche.loc[staff, 'Giorni Riposo']
             confronti_matrix.to_excel(writer, sheet_name='Confronti Matrix')
+            
+            # Foglio 8: differenze % di tutte le coppie (staff x staff per metrica)
+            MatriceConfronti(df_metriche, list(df_metriche.columns)).foglio().to_excel(writer, sheet_name='Matrice Confronti %')
         
         print(f"✅ Report HR salvato: {output_file}")
         return output_file
-        
+    
     except Exception as e:
         print(f"❌ Errore nel salvataggio: {e}")
         return None
 
+def analizza(df):
+    """Calendario, analisi di equità e report HR su turni già caricati; ritorna il file del report"""
+    df_cal = genera_calendario_completo(df)
+    
+    # Esegui tutte le analisi
+    festivi_lavorati = analisi_festivi_lavorati(df_cal)
+    riposi_consecutivi = analisi_riposi_consecutivi(df_cal)
+    df_metriche = analisi_equita_generale(df_cal)
+    confronti_diretti(df_cal, df_metriche)
+    anomalie = identifica_anomalie(df_cal, df_metriche)
+    
+    # Genera report finale
+    return genera_report_hr(df_cal, df_metriche, festivi_lavorati, riposi_consecutivi, anomalie)
+
+@esecuzione('analisi_equita_hr')
 def main():
     print("="*70)
     print("⚖️  ANALISI EQUITÀ HR E COMPLIANCE")
@@ -487,18 +460,8 @@ def main():
     
     print(f"\n✅ Dati caricati: {len(df)} turni")
     
-    # Genera calendario completo
-    df_cal = genera_calendario_completo(df)
-    
-    # Esegui tutte le analisi
-    festivi_lavorati = analisi_festivi_lavorati(df_cal)
-    riposi_consecutivi = analisi_riposi_consecutivi(df_cal)
-    df_metriche = analisi_equita_generale(df_cal)
-    confronti_diretti(df_cal, df_metriche)
-    anomalie = identifica_anomalie(df_cal, df_metriche)
-    
-    # Genera report finale
-    report_file = genera_report_hr(df_cal, df_metriche, festivi_lavorati, riposi_consecutivi, anomalie)
+    # Analisi e report
+    report_file = analizza(df)
     
     print("\n" + "="*70)
     print("✅ ANALISI HR COMPLETATA!")
@@ -514,6 +477,7 @@ def main():
         print("   • Riposi Consecutivi")
         print("   • Anomalie Rilevate")
         print("   • Matrice Confronti")
+        print("   • Differenze % tra tutte le coppie")
 
 if __name__ == '__main__':
     main()
@@ -6,40 +6,64 @@ Analisi di equità, festivi, riposi consecutivi e anomalie
 
 import pandas as pd
 import numpy as np
-from pathlib import Path
-from datetime import datetime, timedelta
-from collections import defaultdict
+from datetime import datetime
 import calendar
 import warnings
+
+from sequenze import codifica_sequenze, riepilogo_sequenze
+from metriche import metriche_staff, tabella_metriche
+from archivio_turni import BASE_PATH
+from dataset_turni import carica_dataset, filtri_ambiente
+from arricchimento import date_settimane, festivi_calendario
+from dataset_turni import sede_da_file
+from report_excel import ReportExcel
+from confronti import MatriceConfronti, coppie_con_evidenza
+from strumentazione import esecuzione, fase
 warnings.filterwarnings('ignore')
 
-# Festività italiane 2025
-FESTIVITA_2025 = {
-    '2025-01-01': 'Capodanno',
-    '2025-01-06': 'Epifania',
-    '2025-04-20': 'Pasqua',
-    '2025-04-21': 'Lunedì dell\'Angelo',
-    '2025-04-25': 'Festa della Liberazione',
-    '2025-05-01': 'Festa del Lavoro',
-    '2025-06-02': 'Festa della Repubblica',
-    '2025-08-15': 'Ferragosto',
-    '2025-11-01': 'Ognissanti',
-    '2025-12-08': 'Immacolata Concezione',
-    '2025-12-25': 'Natale',
-    '2025-12-26': 'Santo Stefano'
-}
+# Coppie di colleghi mostrate nel dettaglio (la tabella confronti le contiene tutte)
+CONFRONTI_IN_EVIDENZA = [
+    ('VISSANI', 'PAGANO'),
+    ('PAGANO', 'PACINI'),
+    ('TAMBERI', 'MORALE'),
+    ('CIRCELLI', 'VISSANI'),
+    ('CIRCELLI', 'TAMBERI'),
+    ('MORALE', 'PACINI')
+]
+
+METRICHE_CONFRONTO = ['Ore Totali', 'Giorni Lavorati', 'Giorni Riposo',
+                      'Weekend Lavorati', 'Festivi Lavorati']
+
+# Colonne lette da turni_completi_52_settimane / dati_arricchiti (niente linea_completa):
+# date già convertite e, se i turni sono arricchiti, le loro festività
+COLONNE_USATE = ['file', 'settimana', 'modifiche', 'data_inizio', 'data_fine',
+                 'staff', 'tipo_turno', 'ore_lavoro', 'ora_entrata', 'ora_uscita',
+                 'data_inizio_dt', 'data_fine_dt', 'data_parsed', 'festivo']
 
+def file_turni(base_path):
+    """dati_arricchiti.csv se c'è ed è aggiornato rispetto all'estrazione, altrimenti turni_completi_52_settimane.csv"""
+    estratti = base_path / 'turni_completi_52_settimane.csv'
+    arricchiti = base_path / 'dati_arricchiti.csv'
+    if arricchiti.exists() and (not estratti.exists() or arricchiti.stat().st_mtime >= estratti.stat().st_mtime):
+        return arricchiti
+    return estratti
+
+@fase()
 def load_data():
     """Carica i dati completi con tutte le 52 settimane"""
-    base_path = Path('/Users/radice/Downloads/ROTA Chicca')
-    csv_file = base_path / 'turni_completi_52_settimane.csv'
+    base_path = BASE_PATH
+    csv_file = file_turni(base_path)
     
     if not csv_file.exists():
         print("❌ Errore: Esegui prima extract_turni_completo.py!")
         return None
     
-    df = pd.read_csv(csv_file)
-    print(f"✅ Dati caricati: {len(df)} turni da {df['settimana'].nunique()} settimane")
+    try:
+        df = carica_dataset(csv_file, COLONNE_USATE, unico=True, **filtri_ambiente())
+    except ValueError as e:
+        print(f"❌ Errore: {e}")
+        return None
+    print(f"✅ Dati caricati da {csv_file.name}: {len(df)} turni da {df['settimana'].nunique()} settimane")
     return df
 
 def parse_date_from_filename(data_inizio, data_fine):
@@ -63,68 +87,76 @@ def parse_date_from_filename(data_inizio, data_fine):
     
     return None, None
 
+@fase()
 def genera_calendario_anno_completo(df):
-    """Genera calendario completo per tutto l'anno"""
+    """Genera calendario completo per tutto l'anno.
+    
+    Per ogni settimana le date vanno da data_inizio a data_fine del primo record
+    (massimo 7 giorni) e ogni staff presente nella settimana riceve, per ogni
+    giorno, il suo primo turno della settimana. Tutto è calcolato con poche
+    operazioni pandas: espansione delle date per settimana + merge con il primo
+    turno di ogni coppia settimana/staff.
+    """
     print("\n" + "="*70)
     print("📅 GENERAZIONE CALENDARIO ANNO COMPLETO")
     print("="*70)
     
-    calendario = []
-    staff_set = set(df['staff'].unique())
-    
-    # Processa ogni settimana
-    for settimana in sorted(df['settimana'].dropna().unique()):
-        df_sett = df[df['settimana'] == settimana]
-        
-        # Prendi primo record per date
-        row = df_sett.iloc[0]
-        start, end = parse_date_from_filename(row['data_inizio'], row['data_fine'])
-        
-        if start and end:
-            current = start
-            day_num = 0
-            
-            while current <= end and day_num < 7:  # Max 7 giorni per settimana
-                data_str = current.strftime('%Y-%m-%d')
-                giorno_settimana = calendar.day_name[current.weekday()]
-                is_festivo = data_str in FESTIVITA_2025
-                nome_festivo = FESTIVITA_2025.get(data_str, '')
-                is_weekend = current.weekday() >= 5
-                
-                # Per ogni membro staff, cerca il turno per quel giorno
-                for staff in staff_set:
-                    df_staff_day = df_sett[df_sett['staff'] == staff]
-                    
-                    if len(df_staff_day) > 0:
-                        # Se ci sono più turni, prendi il primo
-                        turno_info = df_staff_day.iloc[0]
-                        
-                        calendario.append({
-                            'data': data_str,
-                            'data_formattata': current.strftime('%d/%m/%Y'),
-                            'anno': current.year,
-                            'mese': current.month,
-                            'giorno_mese': current.day,
-                            'giorno_settimana': giorno_settimana,
-                            'numero_settimana': int(settimana),
-                            'staff': staff,
-                            'tipo_turno': turno_info['tipo_turno'],
-                            'ore_lavoro': turno_info['ore_lavoro'],
-                            'ora_entrata': turno_info['ora_entrata'],
-                            'ora_uscita': turno_info['ora_uscita'],
-                            'is_festivo': is_festivo,
-                            'nome_festivo': nome_festivo,
-                            'is_weekend': is_weekend,
-                            'is_lavorato': turno_info['tipo_turno'] == 'NORMALE',
-                            'is_riposo': turno_info['tipo_turno'] in ['RIPO', 'RDOM'],
-                            'is_ferie': turno_info['tipo_turno'] == 'FERIOR',
-                            'is_off': turno_info['tipo_turno'] in ['OFF', 'CHIUSO']
-                        })
-                
-                current += timedelta(days=1)
-                day_num += 1
-    
-    df_cal = pd.DataFrame(calendario)
+    df_sett = df[df['settimana'].notna()]
+    
+    # Date di ogni settimana dal primo record della settimana (già convertite al caricamento)
+    settimane = df_sett.drop_duplicates('settimana', keep='first').sort_values('settimana')
+    start, end = date_settimane(settimane)
+    n_giorni = ((end - start).dt.days + 1).clip(lower=0, upper=7).fillna(0).astype(int)
+    
+    # Espansione: una riga per ogni giorno di ogni settimana
+    sede = sede_da_file(settimane['file']) if 'file' in settimane else pd.Series('', index=settimane.index)
+    giorni = pd.DataFrame({
+        'settimana': np.repeat(settimane['settimana'].to_numpy(), n_giorni.to_numpy()),
+        'data_dt': np.repeat(start.to_numpy(), n_giorni.to_numpy()),
+        'sede': np.repeat(sede.to_numpy(), n_giorni.to_numpy())
+    })
+    offset = giorni.groupby('settimana', sort=False).cumcount()
+    giorni['data_dt'] = giorni['data_dt'] + pd.to_timedelta(offset, unit='D')
+    giorni['ordine_giorno'] = np.arange(len(giorni))
+    
+    # Primo turno di ogni staff in ogni settimana
+    primi_turni = df_sett[df_sett['staff'].notna()].drop_duplicates(['settimana', 'staff'], keep='first')
+    ordine_staff = {staff: i for i, staff in enumerate(df['staff'].dropna().unique())}
+    primi_turni = primi_turni.assign(ordine_staff=primi_turni['staff'].map(ordine_staff))
+    primi_turni = primi_turni[['settimana', 'staff', 'ordine_staff', 'tipo_turno',
+                               'ore_lavoro', 'ora_entrata', 'ora_uscita']]
+    
+    cal = giorni.merge(primi_turni, on='settimana', how='inner')
+    cal = cal.sort_values(['ordine_giorno', 'ordine_staff'], kind='stable').reset_index(drop=True)
+    
+    data_dt = cal['data_dt']
+    data_str = data_dt.dt.strftime('%Y-%m-%d')
+    weekday = data_dt.dt.weekday
+    tipo = cal['tipo_turno']
+    # Festivi con il patrono della sede: quelli di dati_arricchiti.csv se i turni sono arricchiti
+    festivo = festivi_calendario(data_dt, cal['sede'], df)
+    
+    df_cal = pd.DataFrame({
+        'data': data_str,
+        'data_formattata': data_dt.dt.strftime('%d/%m/%Y'),
+        'anno': data_dt.dt.year,
+        'mese': data_dt.dt.month,
+        'giorno_mese': data_dt.dt.day,
+        'giorno_settimana': weekday.map(dict(enumerate(calendar.day_name))),
+        'numero_settimana': cal['settimana'].astype(int),
+        'staff': cal['staff'],
+        'tipo_turno': tipo,
+        'ore_lavoro': cal['ore_lavoro'],
+        'ora_entrata': cal['ora_entrata'],
+        'ora_uscita': cal['ora_uscita'],
+        'is_festivo': festivo != '',
+        'nome_festivo': festivo,
+        'is_weekend': weekday >= 5,
+        'is_lavorato': tipo == 'NORMALE',
+        'is_riposo': tipo.isin(['RIPO', 'RDOM']),
+        'is_ferie': tipo == 'FERIOR',
+        'is_off': tipo.isin(['OFF', 'CHIUSO'])
+    })
     df_cal['data_dt'] = pd.to_datetime(df_cal['data'])
     
     print(f"✅ Calendario generato:")
@@ -136,6 +168,7 @@ def genera_calendario_anno_completo(df):
     
     return df_cal
 
+@fase()
 def analisi_festivi_anno_completo(df_cal):
     """Analizza festivi lavorati su tutto l'anno"""
     print("\n" + "="*70)
@@ -206,61 +239,34 @@ def analisi_festivi_anno_completo(df_cal):
     
     return festivi_lavorati
 
+@fase()
 def analisi_riposi_anno_completo(df_cal):
     """Analisi riposi consecutivi su tutto l'anno"""
     print("\n" + "="*70)
     print("😴 ANALISI RIPOSI CONSECUTIVI - ANNO COMPLETO")
     print("="*70)
     
-    risultati = {}
-    
-    for staff in sorted(df_cal['staff'].unique()):
-        df_staff = df_cal[df_cal['staff'] == staff].sort_values('data_dt')
-        
-        sequenze_riposo = []
-        giorni_consecutivi = 0
-        sequenze_lavoro = []
-        giorni_lavoro_consecutivi = 0
-        
-        for idx, row in df_staff.iterrows():
-            # Conta riposi
-            if row['is_riposo'] or row['is_off'] or row['is_ferie']:
-                giorni_consecutivi += 1
-                if giorni_lavoro_consecutivi > 0:
-                    sequenze_lavoro.append(giorni_lavoro_consecutivi)
-                giorni_lavoro_consecutivi = 0
-            else:
-                if giorni_consecutivi > 0:
-                    sequenze_riposo.append(giorni_consecutivi)
-                giorni_consecutivi = 0
-                if row['is_lavorato']:
-                    giorni_lavoro_consecutivi += 1
-        
-        # Ultime sequenze
-        if giorni_consecutivi > 0:
-            sequenze_riposo.append(giorni_consecutivi)
-        if giorni_lavoro_consecutivi > 0:
-            sequenze_lavoro.append(giorni_lavoro_consecutivi)
-        
-        # Conta sequenze per lunghezza
-        riposi_1 = sum(1 for x in sequenze_riposo if x == 1)
-        riposi_2 = sum(1 for x in sequenze_riposo if x == 2)
-        riposi_3 = sum(1 for x in sequenze_riposo if x == 3)
-        riposi_4plus = sum(1 for x in sequenze_riposo if x >= 4)
-        
-        risultati[staff] = {
-            'Riposi 1 giorno': riposi_1,
-            'Riposi 2 giorni': riposi_2,
-            'Riposi 3 giorni': riposi_3,
-            'Riposi 4+ giorni': riposi_4plus,
-            'Totale Sequenze Riposo': len(sequenze_riposo),
-            'Giorni Riposo Totali': sum(sequenze_riposo) if sequenze_riposo else 0,
-            'Media Giorni/Sequenza': round(np.mean(sequenze_riposo), 2) if sequenze_riposo else 0,
-            'Max Riposo Consecutivo': max(sequenze_riposo) if sequenze_riposo else 0,
-            'Max Lavoro Consecutivo': max(sequenze_lavoro) if sequenze_lavoro else 0
-        }
-    
-    df_riposi = pd.DataFrame(risultati).T
+    staff = sorted(df_cal['staff'].unique())
+    is_riposo = df_cal['is_riposo'] | df_cal['is_off'] | df_cal['is_ferie']
+    
+    # Riposi: qualsiasi giorno non di riposo interrompe la sequenza.
+    # Lavoro: si interrompe solo con un riposo; i giorni né lavorati né di
+    # riposo (altri codici turno) non allungano né interrompono.
+    seq_riposo = riepilogo_sequenze(codifica_sequenze(df_cal, is_riposo, 'data_dt'), staff)
+    seq_lavoro = riepilogo_sequenze(
+        codifica_sequenze(df_cal, df_cal['is_lavorato'], 'data_dt', neutro=~is_riposo), staff)
+    
+    df_riposi = pd.DataFrame({
+        'Riposi 1 giorno': seq_riposo[1],
+        'Riposi 2 giorni': seq_riposo[2],
+        'Riposi 3 giorni': seq_riposo[3],
+        'Riposi 4+ giorni': seq_riposo['4+'],
+        'Totale Sequenze Riposo': seq_riposo['sequenze'],
+        'Giorni Riposo Totali': seq_riposo['giorni'],
+        'Media Giorni/Sequenza': seq_riposo['media'].round(2),
+        'Max Riposo Consecutivo': seq_riposo['max'],
+        'Max Lavoro Consecutivo': seq_lavoro['max']
+    })
     df_riposi = df_riposi.astype(int, errors='ignore')
     
     print("\n📊 RIPOSI CONSECUTIVI - STATISTICHE COMPLETE:")
@@ -286,44 +292,29 @@ def analisi_riposi_anno_completo(df_cal):
     
     return df_riposi
 
+@fase()
 def analisi_equita_anno_completo(df_cal):
     """Analisi equità completa anno"""
     print("\n" + "="*70)
     print("⚖️  ANALISI EQUITÀ - ANNO COMPLETO")
     print("="*70)
     
-    metriche = {}
-    
-    for staff in sorted(df_cal['staff'].unique()):
-        df_staff = df_cal[df_cal['staff'] == staff]
-        
-        # Conta giorni per categoria
-        giorni_lavorati = df_staff['is_lavorato'].sum()
-        giorni_riposo = df_staff['is_riposo'].sum()
-        giorni_ferie = df_staff['is_ferie'].sum()
-        giorni_off = df_staff['is_off'].sum()
-        
-        # Weekend e festivi lavorati
-        weekend_lavorati = df_staff[df_staff['is_weekend'] & df_staff['is_lavorato']].shape[0]
-        festivi_lavorati = df_staff[df_staff['is_festivo'] & df_staff['is_lavorato']].shape[0]
-        
-        # Ore
-        ore_totali = df_staff[df_staff['ore_lavoro'].notna()]['ore_lavoro'].sum()
-        media_ore_giorno = df_staff[df_staff['is_lavorato'] & df_staff['ore_lavoro'].notna()]['ore_lavoro'].mean()
-        
-        metriche[staff] = {
-            'Giorni Calendario': len(df_staff),
-            'Giorni Lavorati': int(giorni_lavorati),
-            'Giorni Riposo': int(giorni_riposo),
-            'Giorni Ferie': int(giorni_ferie),
-            'Giorni OFF/Chiuso': int(giorni_off),
-            'Weekend Lavorati': int(weekend_lavorati),
-            'Festivi Lavorati': int(festivi_lavorati),
-            'Ore Totali': round(ore_totali, 1),
-            'Media Ore/Giorno Lav': round(media_ore_giorno, 2) if pd.notna(media_ore_giorno) else 0
-        }
-    
-    df_metriche = pd.DataFrame(metriche).T
+    # Tutti i KPI per staff in un solo groupby (giorni lavorati = turni NORMALE)
+    metriche = metriche_staff(df_cal)
+    metriche['ore_totali'] = metriche['ore_totali'].round(1)
+    metriche['ore_media_normali'] = metriche['ore_media_normali'].round(2).fillna(0)
+    
+    df_metriche = tabella_metriche(metriche, {
+        'turni_totali': 'Giorni Calendario',
+        'turni_normali': 'Giorni Lavorati',
+        'riposi': 'Giorni Riposo',
+        'ferie': 'Giorni Ferie',
+        'off': 'Giorni OFF/Chiuso',
+        'weekend_lavorati': 'Weekend Lavorati',
+        'festivi_lavorati': 'Festivi Lavorati',
+        'ore_totali': 'Ore Totali',
+        'ore_media_normali': 'Media Ore/Giorno Lav'
+    })
     
     print("\n📊 METRICHE COMPLETE PER STAFF:")
     print(df_metriche.to_string())
@@ -347,24 +338,17 @@ def analisi_equita_anno_completo(df_cal):
     
     return df_metriche, cv_results
 
+@fase()
 def confronti_dettagliati_anno(df_cal, df_metriche):
-    """Confronti dettagliati tra tutti i colleghi"""
+    """Confronti dettagliati tra tutti i colleghi (matrice di tutte le coppie)"""
     print("\n" + "="*70)
     print("🔍 CONFRONTI DIRETTI - ANNO COMPLETO")
     print("="*70)
     
-    confronti_richiesti = [
-        ('VISSANI', 'PAGANO'),
-        ('PAGANO', 'PACINI'),
-        ('TAMBERI', 'MORALE'),
-        ('CIRCELLI', 'VISSANI'),
-        ('CIRCELLI', 'TAMBERI'),
-        ('MORALE', 'PACINI')
-    ]
-    
-    risultati_confronti = []
+    matrice = MatriceConfronti(df_metriche, METRICHE_CONFRONTO)
     
-    for staff1, staff2 in confronti_richiesti:
+    # Dettaglio a video delle coppie in evidenza
+    for staff1, staff2 in CONFRONTI_IN_EVIDENZA:
         if staff1 not in df_metriche.index or staff2 not in df_metriche.index:
             continue
         
@@ -372,19 +356,13 @@ def confronti_dettagliati_anno(df_cal, df_metriche):
         print(f"📊 CONFRONTO: {staff1} vs {staff2}")
         print('='*70)
         
-        m1 = df_metriche.loc[staff1]
-        m2 = df_metriche.loc[staff2]
-        
+        coppia = matrice.coppia(staff1, staff2)
         disparita_count = 0
         
-        for metrica in ['Ore Totali', 'Giorni Lavorati', 'Giorni Riposo', 
-                        'Weekend Lavorati', 'Festivi Lavorati']:
-            val1 = m1[metrica]
-            val2 = m2[metrica]
-            diff = val1 - val2
+        for metrica, row in coppia.iterrows():
+            val1, val2, diff, perc_diff = row[staff1], row[staff2], row['diff'], row['perc']
             
             if val2 != 0:
-                perc_diff = (diff / val2) * 100
                 simbolo = ">" if diff > 0 else ("<" if diff < 0 else "=")
                 
                 # Determina gravità
@@ -407,16 +385,21 @@ def confronti_dettagliati_anno(df_cal, df_metriche):
             print(f"⚠️  {disparita_count} disparità riscontrate")
         else:
             print(f"❌ SQUILIBRIO SIGNIFICATIVO ({disparita_count} metriche sbilanciate)")
-        
-        risultati_confronti.append({
-            'Staff1': staff1,
-            'Staff2': staff2,
-            'Disparità': disparita_count,
-            'Status': 'EQUO' if disparita_count == 0 else 'SQUILIBRATO'
-        })
-    
-    return pd.DataFrame(risultati_confronti)
+    
+    # Tutte le coppie: prima quelle in evidenza, poi le altre
+    risultati_confronti = coppie_con_evidenza(matrice, CONFRONTI_IN_EVIDENZA)
+    risultati_confronti['Status'] = np.where(risultati_confronti['Disparità'] == 0, 'EQUO', 'SQUILIBRATO')
+    
+    squilibrate = risultati_confronti[risultati_confronti['Disparità'] > 0]
+    print(f"\n{'='*70}")
+    print(f"📊 TUTTE LE COPPIE: {len(squilibrate)} squilibrate su {len(risultati_confronti)}")
+    print('='*70)
+    for _, row in squilibrate.sort_values('Disparità', ascending=False, kind='stable').head(10).iterrows():
+        print(f"   {row['Staff1']} vs {row['Staff2']}: {row['Disparità']} metriche sbilanciate")
+    
+    return risultati_confronti
 
+@fase()
 def identifica_anomalie_anno(df_cal, df_metriche, df_riposi):
     """Identifica tutte le anomalie sull'anno completo"""
     print("\n" + "="*70)
@@ -499,17 +482,18 @@ def identifica_anomalie_anno(df_cal, df_metriche, df_riposi):
         print("\n✅ Nessuna anomalia rilevata")
         return None
 
+@fase()
 def genera_report_hr_completo(df, df_cal, df_metriche, festivi, riposi, anomalie, confronti, cv_results):
     """Genera report Excel super completo"""
     print("\n" + "="*70)
     print("📄 GENERAZIONE REPORT EXCEL - ANNO COMPLETO")
     print("="*70)
     
-    base_path = Path('/Users/radice/Downloads/ROTA Chicca')
+    base_path = BASE_PATH
     output_file = base_path / 'REPORT_HR_ANNO_COMPLETO_2025.xlsx'
     
     try:
-        with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+        with ReportExcel(output_file) as report:
             # Foglio 1: Executive Summary
             periodo_min = df_cal['data_dt'].min().strftime('%d/%m/%Y')
             periodo_max = df_cal['data_dt'].max().strftime('%d/%m/%Y')
@@ -533,23 +517,24 @@ def genera_report_hr_completo(df, df_cal, df_metriche, festivi, riposi, anomalie
                     len(df_cal['data'].unique()),
                     df_cal['staff'].nunique(),
                     len(df),
-                    len(FESTIVITA_2025),
+                    df_cal.loc[df_cal['is_festivo'], 'data'].nunique(),
                     len(anomalie[anomalie['Gravità'] == 'CRITICA']) if anomalie is not None else 0,
                     len(anomalie[anomalie['Gravità'] == 'ALTA']) if anomalie is not None else 0,
                     len(anomalie[anomalie['Gravità'] == 'MEDIA']) if anomalie is not None else 0,
                     'VEDERE FOGLI DETTAGLIO'
                 ]
             })
-            summary.to_excel(writer, sheet_name='Executive Summary', index=False)
+            report.scrivi(summary, sheet_name='Executive Summary', index=False)
             
-            # Foglio 2: Calendario Anno Completo
-            df_cal_export = df_cal.copy()
-            df_cal_export = df_cal_export.sort_values(['staff', 'data_dt'])
-            df_cal_export['data_dt'] = df_cal_export['data_dt'].dt.strftime('%d/%m/%Y')
-            df_cal_export.to_excel(writer, sheet_name='Calendario Anno', index=False)
+            # Foglio 2: Calendario Anno Completo (copia ordinata preparata solo mentre si scrive)
+            def calendario_export():
+                df_cal_export = df_cal.sort_values(['staff', 'data_dt'])
+                df_cal_export['data_dt'] = df_cal_export['data_dt'].dt.strftime('%d/%m/%Y')
+                return df_cal_export
+            report.scrivi(calendario_export, sheet_name='Calendario Anno', index=False)
             
             # Foglio 3: Metriche Equità
-            df_metriche.to_excel(writer, sheet_name='Metriche Equità')
+            report.scrivi(df_metriche, sheet_name='Metriche Equità')
             
             # Foglio 4: Indici CV
             df_cv = pd.DataFrame(list(cv_results.items()), columns=['Metrica', 'Coefficiente Variazione'])
@@ -557,24 +542,29 @@ def genera_report_hr_completo(df, df_cal, df_metriche, festivi, riposi, anomalie
                 lambda x: 'OTTIMO' if x < 10 else ('ACCETTABILE' if x < 20 else 'SQUILIBRATO')
             )
             df_cv = df_cv.sort_values('Coefficiente Variazione', ascending=False)
-            df_cv.to_excel(writer, sheet_name='Indici Equità (CV)', index=False)
+            report.scrivi(df_cv, sheet_name='Indici Equità (CV)', index=False)
             
             # Foglio 5: Festivi Anno
             if festivi is not None:
-                festivi.to_excel(writer, sheet_name='Festivi Anno')
+                report.scrivi(festivi, sheet_name='Festivi Anno')
             
             # Foglio 6: Riposi Consecutivi
             if riposi is not None:
-                riposi.to_excel(writer, sheet_name='Riposi Consecutivi')
+                report.scrivi(riposi, sheet_name='Riposi Consecutivi')
             
             # Foglio 7: Anomalie
             if anomalie is not None:
                 anomalie_sorted = anomalie.sort_values(['Gravità', 'Staff'])
-                anomalie_sorted.to_excel(writer, sheet_name='Anomalie Rilevate', index=False)
+                report.scrivi(anomalie_sorted, sheet_name='Anomalie Rilevate', index=False)
             
             # Foglio 8: Confronti Diretti
             if confronti is not None:
-                confronti.to_excel(writer, sheet_name='Confronti Diretti', index=False)
+                report.scrivi(confronti, sheet_name='Confronti Diretti', index=False)
+            
+            # Foglio 8b: Matrici staff x staff (differenze % per metrica, punti di disparità)
+            matrice = MatriceConfronti(df_metriche, METRICHE_CONFRONTO)
+            report.scrivi(matrice.foglio, sheet_name='Matrice Confronti %')
+            report.scrivi(matrice.disparita, sheet_name='Matrice Disparità')
             
             # Foglio 9: Riepilogo per Mese
             df_cal_mese = df_cal.copy()
@@ -588,25 +578,26 @@ def genera_report_hr_completo(df, df_cal, df_metriche, festivi, riposi, anomalie
                 pivot_mese = pivot_mese.reset_index()
                 pivot_wide = pivot_mese.pivot(index='staff', columns='mese', values='Ore')
                 pivot_wide.columns = [f'Mese_{int(c)}' for c in pivot_wide.columns]
-                pivot_wide.to_excel(writer, sheet_name='Ore per Mese')
+                report.scrivi(pivot_wide, sheet_name='Ore per Mese')
             
             # Foglio 10: Turni per Settimana-Staff
             pivot_sett = df_cal[df_cal['is_lavorato']].groupby(['staff', 'numero_settimana']).size().reset_index(name='N_Turni')
             pivot_sett_wide = pivot_sett.pivot(index='staff', columns='numero_settimana', values='N_Turni')
             pivot_sett_wide = pivot_sett_wide.fillna(0).astype(int)
             pivot_sett_wide.columns = [f'Sett_{int(c)}' for c in pivot_sett_wide.columns]
-            pivot_sett_wide.to_excel(writer, sheet_name='Turni per Settimana')
+            report.scrivi(pivot_sett_wide, sheet_name='Turni per Settimana')
         
         print(f"✅ Report salvato: {output_file}")
-        print(f"\n📊 Contiene 10 fogli con analisi anno completo!")
+        print(f"\n📊 Contiene 12 fogli con analisi anno completo!")
         return output_file
-        
+    
     except Exception as e:
         print(f"❌ Errore: {e}")
         import traceback
         traceback.print_exc()
         return None
 
+@esecuzione('analisi_hr_anno_completo')
 def main():
     print("="*70)
     print("⚖️  ANALISI HR - ANNO COMPLETO 2025")
@@ -1,66 +1,66 @@
 #!/usr/bin/env python3
 """
-Analisi HR Periodo 2: MAGGIO-AGOSTO 2025 (Settimane 18-35)
+Analisi HR Periodo 2: MAGGIO-AGOSTO (Settimane 18-35)
 """
 
 import pandas as pd
 import numpy as np
-from pathlib import Path
 import warnings
+
+from archivio_turni import BASE_PATH, colonne_originali
+from dataset_turni import carica_dataset, filtri_ambiente, verifica_perimetro
+from festivita import SANTI_PATRONI, festivita_tra
+from finestre import PERIODI_2025, FinestreSettimane
+from metriche import tabella_metriche
+from strumentazione import esecuzione, fase
 warnings.filterwarnings('ignore')
 
-# Festività MAGGIO-AGOSTO 2025
-FESTIVITA_PERIODO2 = {
-    '2025-05-01': 'Festa del Lavoro',
-    '2025-06-02': 'Festa della Repubblica',
-    '2025-08-15': 'Ferragosto'
-}
+SETTIMANE_PERIODO2 = PERIODI_2025['Periodo 2 (Mag-Ago)']
 
+@fase()
 def load_data_periodo2():
-    """Carica dati per settimane 18-35"""
-    base_path = Path('/Users/radice/Downloads/ROTA Chicca')
-    df = pd.read_csv(base_path / 'turni_completi_52_settimane.csv')
-    
-    # Filtra settimane 18-35
-    df = df[(df['settimana'] >= 18) & (df['settimana'] <= 35)]
+    """Carica i turni del periodo: solo le partizioni delle settimane 18-35 (sedi e anni da ROTA_SEDI / ROTA_ANNI)"""
+    base_path = BASE_PATH
+    csv_file = base_path / 'turni_completi_52_settimane.csv'
+    try:
+        df = carica_dataset(csv_file, colonne_originali(csv_file), unico=True,
+                            settimane=range(SETTIMANE_PERIODO2[0], SETTIMANE_PERIODO2[1] + 1), **filtri_ambiente())
+    except ValueError as e:
+        print(f"❌ Errore: {e}")
+        return None
     
-    print(f"✅ Dati Periodo 2 caricati: {len(df)} turni")
-    print(f"   Settimane: {sorted(df['settimana'].unique())}")
+    nel_periodo = df['settimana'].between(*SETTIMANE_PERIODO2)
+    print(f"✅ Dati Periodo 2 caricati: {nel_periodo.sum()} turni")
+    print(f"   Settimane: {sorted(df.loc[nel_periodo, 'settimana'].unique())}")
     
     return df
 
-def analisi_statistiche_periodo2(df):
-    """Statistiche per il periodo maggio-agosto"""
+def festivita_periodo2(df):
+    """Anno dei turni caricati e sue festività maggio-agosto (patrono della sede compreso, come dati_arricchiti.csv)"""
+    sede, anno = verifica_perimetro(df)
+    patroni = [sede] if sede in SANTI_PATRONI else ()
+    return anno, festivita_tra(f'{anno}-05-01', f'{anno}-08-31', patroni)
+
+@fase()
+def analisi_statistiche_periodo2(finestre):
+    """Statistiche per il periodo maggio-agosto (finestra sulle cumulate dell'anno)"""
     print("\n" + "="*70)
     print("📊 STATISTICHE PERIODO 2 (MAGGIO-AGOSTO)")
     print("="*70)
     
-    metriche = {}
+    metriche = finestre.metriche(*SETTIMANE_PERIODO2, solo_presenti=True)
+    metriche['ore_totali'] = metriche['ore_totali'].round(1)
+    metriche['ore_media'] = metriche['ore_media'].round(2)
     
-    for staff in sorted(df['staff'].unique()):
-        df_staff = df[df['staff'] == staff]
-        
-        # Conta turni per tipo
-        turni_normali = len(df_staff[df_staff['tipo_turno'] == 'NORMALE'])
-        turni_riposo = len(df_staff[df_staff['tipo_turno'].isin(['RIPO', 'RDOM'])])
-        turni_ferie = len(df_staff[df_staff['tipo_turno'] == 'FERIOR'])
-        turni_off = len(df_staff[df_staff['tipo_turno'].isin(['OFF', 'CHIUSO'])])
-        
-        # Ore
-        ore_totali = df_staff[df_staff['ore_lavoro'].notna()]['ore_lavoro'].sum()
-        ore_medie = df_staff[df_staff['ore_lavoro'].notna()]['ore_lavoro'].mean()
-        
-        metriche[staff] = {
-            'Turni Totali': len(df_staff),
-            'Turni Normali': turni_normali,
-            'Riposi': turni_riposo,
-            'Ferie': turni_ferie,
-            'OFF/Chiuso': turni_off,
-            'Ore Totali': round(ore_totali, 1),
-            'Media Ore/Turno': round(ore_medie, 2)
-        }
-    
-    df_stats = pd.DataFrame(metriche).T
+    df_stats = tabella_metriche(metriche, {
+        'turni_totali': 'Turni Totali',
+        'turni_normali': 'Turni Normali',
+        'riposi': 'Riposi',
+        'ferie': 'Ferie',
+        'off': 'OFF/Chiuso',
+        'ore_totali': 'Ore Totali',
+        'ore_media': 'Media Ore/Turno'
+    })
     
     print("\n📋 STATISTICHE PER STAFF (Settimane 18-35):")
     print(df_stats.to_string())
@@ -75,6 +75,7 @@ def analisi_statistiche_periodo2(df):
     
     return df_stats
 
+@fase()
 def confronti_periodo2(df_stats):
     """Confronti diretti per periodo 2"""
     print("\n" + "="*70)
@@ -104,21 +105,23 @@ def confronti_periodo2(df_stats):
                     
                     print(f"   {metrica:15}: {val1:6.1f} {simbolo} {val2:6.1f} ({perc:+6.1f}%){alert}")
 
-def genera_report_periodo2(df, df_stats):
+@fase()
+def genera_report_periodo2(df, df_stats, anno, festivi):
     """Genera report Excel per periodo 2"""
     print("\n" + "="*70)
     print("📄 GENERAZIONE REPORT PERIODO 2")
     print("="*70)
     
-    base_path = Path('/Users/radice/Downloads/ROTA Chicca')
+    base_path = BASE_PATH
     output_file = base_path / 'REPORT_HR_PERIODO2_MAG_AGO.xlsx'
     
     try:
         with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
             # Foglio 1: Summary
             summary = pd.DataFrame({
-                'Metrica': ['Periodo', 'Settimane', 'Turni', 'Staff'],
-                'Valore': ['Maggio-Agosto 2025', '18-35', len(df), df['staff'].nunique()]
+                'Metrica': ['Periodo', 'Settimane', 'Turni', 'Staff', 'Festività'],
+                'Valore': [f'Maggio-Agosto {anno}', '18-35', len(df), df['staff'].nunique(),
+                           ', '.join(festivi.values())]
             })
             summary.to_excel(writer, sheet_name='Summary', index=False)
             
@@ -144,21 +147,30 @@ def genera_report_periodo2(df, df_stats):
         print(f"❌ Errore: {e}")
         return None
 
+@esecuzione('analisi_hr_periodo2_mag_ago')
 def main():
     print("="*70)
-    print("📊 ANALISI HR - PERIODO 2: MAGGIO-AGOSTO 2025")
+    print("📊 ANALISI HR - PERIODO 2: MAGGIO-AGOSTO")
     print("   Settimane 18-35 (4 mesi)")
     print("="*70)
     
-    # Carica dati
+    # Carica dati (una volta sola) e cumulate per settimana
     df = load_data_periodo2()
+    if df is None:
+        return
+    anno, festivi = festivita_periodo2(df)
+    print(f"📅 Anno {anno} - festività del periodo: {len(festivi)}")
+    for giorno, nome in festivi.items():
+        print(f"   {giorno}  {nome}")
+    finestre = FinestreSettimane(df, anno=anno)
     
     # Analisi
-    df_stats = analisi_statistiche_periodo2(df)
+    df_stats = analisi_statistiche_periodo2(finestre)
     confronti_periodo2(df_stats)
     
     # Report
-    report_file = genera_report_periodo2(df, df_stats)
+    df_periodo = df[df['settimana'].between(*SETTIMANE_PERIODO2)]
+    report_file = genera_report_periodo2(df_periodo, df_stats, anno, festivi)
     
     print("\n" + "="*70)
     print("✅ ANALISI PERIODO 2 COMPLETATA!")
@@ -1,69 +1,70 @@
 #!/usr/bin/env python3
 """
-Analisi HR Periodo 3: SETTEMBRE-DICEMBRE 2025 (Settimane 36-52)
+Analisi HR Periodo 3: SETTEMBRE-DICEMBRE (Settimane 36-52, 36-53 negli anni ISO di 53 settimane)
 """
 
 import pandas as pd
 import numpy as np
-from pathlib import Path
 import warnings
+
+from archivio_turni import BASE_PATH, colonne_originali
+from dataset_turni import carica_dataset, filtri_ambiente, verifica_perimetro
+from festivita import SANTI_PATRONI, festivita_tra
+from finestre import PERIODI_2025, FinestreSettimane, periodi
+from metriche import tabella_metriche
+from strumentazione import esecuzione, fase
 warnings.filterwarnings('ignore')
 
-# Festività SETTEMBRE-DICEMBRE 2025
-FESTIVITA_PERIODO3 = {
-    '2025-11-01': 'Ognissanti',
-    '2025-12-08': 'Immacolata Concezione',
-    '2025-12-25': 'Natale',
-    '2025-12-26': 'Santo Stefano'
-}
+# Si caricano fino alla 53: l'ultima settimana del periodo dipende dall'anno (periodi)
+SETTIMANE_PERIODO3 = (PERIODI_2025['Periodo 3 (Set-Dic)'][0], 53)
 
+@fase()
 def load_data_periodo3():
-    """Carica dati per settimane 36-52"""
-    base_path = Path('/Users/radice/Downloads/ROTA Chicca')
-    df = pd.read_csv(base_path / 'turni_completi_52_settimane.csv')
-    
-    # Filtra settimane 36-52
-    df = df[(df['settimana'] >= 36) & (df['settimana'] <= 52)]
+    """Carica i turni del periodo: solo le partizioni delle settimane dalla 36 (sedi e anni da ROTA_SEDI / ROTA_ANNI)"""
+    base_path = BASE_PATH
+    csv_file = base_path / 'turni_completi_52_settimane.csv'
+    try:
+        df = carica_dataset(csv_file, colonne_originali(csv_file), unico=True,
+                            settimane=range(SETTIMANE_PERIODO3[0], SETTIMANE_PERIODO3[1] + 1), **filtri_ambiente())
+    except ValueError as e:
+        print(f"❌ Errore: {e}")
+        return None
     
-    print(f"✅ Dati Periodo 3 caricati: {len(df)} turni")
-    print(f"   Settimane: {sorted(df['settimana'].unique())}")
+    nel_periodo = df['settimana'].between(*SETTIMANE_PERIODO3)
+    print(f"✅ Dati Periodo 3 caricati: {nel_periodo.sum()} turni")
+    print(f"   Settimane: {sorted(df.loc[nel_periodo, 'settimana'].unique())}")
     
     return df
 
-def analisi_statistiche_periodo3(df):
-    """Statistiche per il periodo settembre-dicembre"""
+def festivita_periodo3(df):
+    """Anno dei turni caricati e sue festività settembre-dicembre (patrono della sede compreso, come dati_arricchiti.csv)"""
+    sede, anno = verifica_perimetro(df)
+    patroni = [sede] if sede in SANTI_PATRONI else ()
+    return anno, festivita_tra(f'{anno}-09-01', f'{anno}-12-31', patroni)
+
+@fase()
+def analisi_statistiche_periodo3(finestre):
+    """Statistiche per il periodo settembre-dicembre (finestra sulle cumulate dell'anno)"""
     print("\n" + "="*70)
     print("📊 STATISTICHE PERIODO 3 (SETTEMBRE-DICEMBRE)")
     print("="*70)
     
-    metriche = {}
-    
-    for staff in sorted(df['staff'].unique()):
-        df_staff = df[df['staff'] == staff]
-        
-        # Conta turni per tipo
-        turni_normali = len(df_staff[df_staff['tipo_turno'] == 'NORMALE'])
-        turni_riposo = len(df_staff[df_staff['tipo_turno'].isin(['RIPO', 'RDOM'])])
-        turni_ferie = len(df_staff[df_staff['tipo_turno'] == 'FERIOR'])
-        turni_off = len(df_staff[df_staff['tipo_turno'].isin(['OFF', 'CHIUSO'])])
-        
-        # Ore
-        ore_totali = df_staff[df_staff['ore_lavoro'].notna()]['ore_lavoro'].sum()
-        ore_medie = df_staff[df_staff['ore_lavoro'].notna()]['ore_lavoro'].mean()
-        
-        metriche[staff] = {
-            'Turni Totali': len(df_staff),
-            'Turni Normali': turni_normali,
-            'Riposi': turni_riposo,
-            'Ferie': turni_ferie,
-            'OFF/Chiuso': turni_off,
-            'Ore Totali': round(ore_totali, 1),
-            'Media Ore/Turno': round(ore_medie, 2)
-        }
-    
-    df_stats = pd.DataFrame(metriche).T
-    
-    print("\n📋 STATISTICHE PER STAFF (Settimane 36-52):")
+    da, a = periodi(finestre.anno)['Periodo 3 (Set-Dic)']
+    metriche = finestre.metriche(da, a, solo_presenti=True)
+    metriche['ore_totali'] = metriche['ore_totali'].round(1)
+    metriche['ore_media'] = metriche['ore_media'].round(2)
+    
+    df_stats = tabella_metriche(metriche, {
+        'turni_totali': 'Turni Totali',
+        'turni_normali': 'Turni Normali',
+        'riposi': 'Riposi',
+        'ferie': 'Ferie',
+        'off': 'OFF/Chiuso',
+        'ore_totali': 'Ore Totali',
+        'ore_media': 'Media Ore/Turno'
+    })
+    
+    print(f"\n📋 STATISTICHE PER STAFF (Settimane {da}-{a}):")
     print(df_stats.to_string())
     
     # Calcola CV per equità
@@ -76,6 +77,7 @@ def analisi_statistiche_periodo3(df):
     
     return df_stats
 
+@fase()
 def confronti_periodo3(df_stats):
     """Confronti diretti per periodo 3"""
     print("\n" + "="*70)
@@ -105,21 +107,24 @@ def confronti_periodo3(df_stats):
                     
                     print(f"   {metrica:15}: {val1:6.1f} {simbolo} {val2:6.1f} ({perc:+6.1f}%){alert}")
 
-def genera_report_periodo3(df, df_stats):
+@fase()
+def genera_report_periodo3(df, df_stats, anno, festivi):
     """Genera report Excel per periodo 3"""
     print("\n" + "="*70)
     print("📄 GENERAZIONE REPORT PERIODO 3")
     print("="*70)
     
-    base_path = Path('/Users/radice/Downloads/ROTA Chicca')
+    base_path = BASE_PATH
     output_file = base_path / 'REPORT_HR_PERIODO3_SET_DIC.xlsx'
+    da, a = periodi(anno)['Periodo 3 (Set-Dic)']
     
     try:
         with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
             # Foglio 1: Summary
             summary = pd.DataFrame({
-                'Metrica': ['Periodo', 'Settimane', 'Turni', 'Staff'],
-                'Valore': ['Settembre-Dicembre 2025', '36-52', len(df), df['staff'].nunique()]
+                'Metrica': ['Periodo', 'Settimane', 'Turni', 'Staff', 'Festività'],
+                'Valore': [f'Settembre-Dicembre {anno}', f'{da}-{a}', len(df), df['staff'].nunique(),
+                           ', '.join(festivi.values())]
             })
             summary.to_excel(writer, sheet_name='Summary', index=False)
             
@@ -145,21 +150,30 @@ def genera_report_periodo3(df, df_stats):
         print(f"❌ Errore: {e}")
         return None
 
+@esecuzione('analisi_hr_periodo3_set_dic')
 def main():
     print("="*70)
-    print("📊 ANALISI HR - PERIODO 3: SETTEMBRE-DICEMBRE 2025")
-    print("   Settimane 36-52 (4 mesi)")
+    print("📊 ANALISI HR - PERIODO 3: SETTEMBRE-DICEMBRE")
+    print("   Settimane dalla 36 a fine anno (4 mesi)")
     print("="*70)
     
-    # Carica dati
+    # Carica dati (una volta sola) e cumulate per settimana
     df = load_data_periodo3()
+    if df is None:
+        return
+    anno, festivi = festivita_periodo3(df)
+    print(f"📅 Anno {anno} - festività del periodo: {len(festivi)}")
+    for giorno, nome in festivi.items():
+        print(f"   {giorno}  {nome}")
+    finestre = FinestreSettimane(df, anno=anno)
     
     # Analisi
-    df_stats = analisi_statistiche_periodo3(df)
+    df_stats = analisi_statistiche_periodo3(finestre)
     confronti_periodo3(df_stats)
     
     # Report
-    report_file = genera_report_periodo3(df, df_stats)
+    df_periodo = df[df['settimana'].between(*SETTIMANE_PERIODO3)]
+    report_file = genera_report_periodo3(df_periodo, df_stats, anno, festivi)
     
     print("\n" + "="*70)
     print("✅ ANALISI PERIODO 3 COMPLETATA!")
@@ -6,14 +6,39 @@ Unisce i 3 periodi e genera report finale integrato
 
 import pandas as pd
 import numpy as np
-from pathlib import Path
 import warnings
+
+from archivio_turni import BASE_PATH, colonne_originali
+from dataset_turni import carica_dataset, filtri_ambiente, verifica_perimetro
+from finestre import FinestreSettimane, periodi, settimane_anno
+from metriche import metriche_staff, tabella_metriche
+from confronti import MatriceConfronti, coppie_con_evidenza
+from strumentazione import esecuzione, fase
 warnings.filterwarnings('ignore')
 
+# Coppie di colleghi mostrate nel dettaglio (i confronti coprono tutte le coppie)
+CONFRONTI_IN_EVIDENZA = [
+    ('VISSANI', 'PAGANO'),
+    ('PAGANO', 'PACINI'),
+    ('TAMBERI', 'MORALE'),
+    ('CIRCELLI', 'VISSANI')
+]
+
+METRICHE_CONFRONTO = ['Ore Totali', 'Turni Normali', 'Riposi', 'Ferie']
+
+# Alert per metrica: > 25% disparità grave (2), > 15% disparità (1)
+SOGLIE_ALERT = {25: 2, 15: 1}
+
+@fase()
 def load_all_data():
     """Carica tutti i dati dell'anno"""
-    base_path = Path('/Users/radice/Downloads/ROTA Chicca')
-    df = pd.read_csv(base_path / 'turni_completi_52_settimane.csv')
+    base_path = BASE_PATH
+    csv_file = base_path / 'turni_completi_52_settimane.csv'
+    try:
+        df = carica_dataset(csv_file, colonne_originali(csv_file), unico=True, **filtri_ambiente())
+    except ValueError as e:
+        print(f"❌ Errore: {e}")
+        return None
     
     # Classifica per periodo
     df['periodo'] = df['settimana'].apply(lambda x: 
@@ -24,37 +49,32 @@ def load_all_data():
     
     return df
 
-def analisi_per_periodo(df):
-    """Analisi separata per ogni periodo"""
+@fase()
+def analisi_per_periodo(df, anno):
+    """Analisi separata per ogni periodo (quadrimestri dell'anno dei turni)"""
     print("\n" + "="*70)
     print("📊 ANALISI PER PERIODO - CONFRONTO 3 QUADRIMESTRI")
     print("="*70)
     
     risultati = {}
     
-    for periodo in ['Periodo 1 (Gen-Apr)', 'Periodo 2 (Mag-Ago)', 'Periodo 3 (Set-Dic)']:
-        df_periodo = df[df['periodo'] == periodo]
-        
+    # Un solo passaggio sui turni: ogni periodo è una finestra sulle cumulate
+    # (tutti gli staff dell'anno, zero per chi non ha turni nel periodo)
+    finestre = FinestreSettimane(df, anno=anno)
+    
+    for periodo, (da, a) in periodi(anno).items():
         print(f"\n{'='*70}")
         print(f"📅 {periodo}")
         print('='*70)
         
-        stats_periodo = {}
-        for staff in sorted(df['staff'].unique()):
-            df_staff = df_periodo[df_periodo['staff'] == staff]
-            
-            ore = df_staff[df_staff['ore_lavoro'].notna()]['ore_lavoro'].sum()
-            turni_norm = len(df_staff[df_staff['tipo_turno'] == 'NORMALE'])
-            riposi = len(df_staff[df_staff['tipo_turno'].isin(['RIPO', 'RDOM'])])
-            
-            stats_periodo[staff] = {
-                'Turni': len(df_staff),
-                'Ore': round(ore, 1),
-                'Turni Normali': turni_norm,
-                'Riposi': riposi
-            }
-        
-        df_stats = pd.DataFrame(stats_periodo).T
+        metriche = finestre.metriche(da, a)
+        metriche['ore_totali'] = metriche['ore_totali'].round(1)
+        df_stats = tabella_metriche(metriche, {
+            'turni_totali': 'Turni',
+            'ore_totali': 'Ore',
+            'turni_normali': 'Turni Normali',
+            'riposi': 'Riposi'
+        })
         print(df_stats.to_string())
         
         # Calcola CV
@@ -72,38 +92,30 @@ def analisi_per_periodo(df):
     
     return risultati
 
-def analisi_anno_totale(df):
+@fase()
+def analisi_anno_totale(df, anno):
     """Analisi sull'anno completo"""
     print("\n" + "="*70)
-    print("📊 ANALISI ANNO TOTALE 2025 (TUTTE LE 52 SETTIMANE)")
+    print(f"📊 ANALISI ANNO TOTALE {anno} (TUTTE LE {settimane_anno(anno)} SETTIMANE)")
     print("="*70)
     
-    metriche_totali = {}
+    metriche = metriche_staff(df)
+    # Media ore per turno NORMALE (ore di tutti i turni / turni NORMALE)
+    normali = metriche['turni_normali']
+    metriche['ore_per_normale'] = (metriche['ore_totali'] / normali.where(normali > 0)).round(2).fillna(0)
+    metriche['ore_totali'] = metriche['ore_totali'].round(1)
     
-    for staff in sorted(df['staff'].unique()):
-        df_staff = df[df['staff'] == staff]
-        
-        # Conta tutto
-        turni_norm = len(df_staff[df_staff['tipo_turno'] == 'NORMALE'])
-        riposi = len(df_staff[df_staff['tipo_turno'].isin(['RIPO', 'RDOM'])])
-        ferie = len(df_staff[df_staff['tipo_turno'] == 'FERIOR'])
-        off = len(df_staff[df_staff['tipo_turno'].isin(['OFF', 'CHIUSO'])])
-        
-        ore_totali = df_staff[df_staff['ore_lavoro'].notna()]['ore_lavoro'].sum()
-        
-        metriche_totali[staff] = {
-            'Turni Totali': len(df_staff),
-            'Turni Normali': turni_norm,
-            'Riposi': riposi,
-            'Ferie': ferie,
-            'OFF': off,
-            'Ore Totali': round(ore_totali, 1),
-            'Media Ore/Turno': round(ore_totali / turni_norm, 2) if turni_norm > 0 else 0
-        }
+    df_totale = tabella_metriche(metriche, {
+        'turni_totali': 'Turni Totali',
+        'turni_normali': 'Turni Normali',
+        'riposi': 'Riposi',
+        'ferie': 'Ferie',
+        'off': 'OFF',
+        'ore_totali': 'Ore Totali',
+        'ore_per_normale': 'Media Ore/Turno'
+    })
     
-    df_totale = pd.DataFrame(metriche_totali).T
-    
-    print("\n📋 METRICHE TOTALI ANNO 2025:")
+    print(f"\n📋 METRICHE TOTALI ANNO {anno}:")
     print(df_totale.to_string())
     
     # CV per ogni metrica
@@ -118,44 +130,31 @@ def analisi_anno_totale(df):
     
     return df_totale, cv_results
 
+@fase()
 def confronti_anno_completo(df_totale):
-    """Confronti finali sull'anno completo"""
+    """Confronti finali sull'anno completo (tutte le coppie, dettaglio di quelle in evidenza)"""
     print("\n" + "="*70)
     print("🔍 CONFRONTI FINALI - ANNO COMPLETO 2025")
     print("="*70)
     
-    confronti = [
-        ('VISSANI', 'PAGANO'),
-        ('PAGANO', 'PACINI'),
-        ('TAMBERI', 'MORALE'),
-        ('CIRCELLI', 'VISSANI')
-    ]
-    
-    risultati = []
+    matrice = MatriceConfronti(df_totale, METRICHE_CONFRONTO)
     
-    for staff1, staff2 in confronti:
+    for staff1, staff2 in CONFRONTI_IN_EVIDENZA:
         if staff1 in df_totale.index and staff2 in df_totale.index:
             print(f"\n{'='*70}")
             print(f"📊 {staff1} vs {staff2} - ANNO COMPLETO")
             print('='*70)
             
-            disparita = 0
-            
-            for metrica in ['Ore Totali', 'Turni Normali', 'Riposi', 'Ferie']:
-                val1 = df_totale.loc[staff1, metrica]
-                val2 = df_totale.loc[staff2, metrica]
-                diff = val1 - val2
+            for metrica, row in matrice.coppia(staff1, staff2).iterrows():
+                val1, val2, diff, perc = row[staff1], row[staff2], row['diff'], row['perc']
                 
                 if val2 != 0:
-                    perc = (diff / val2) * 100
                     simbolo = ">" if diff > 0 else ("<" if diff < 0 else "=")
                     
                     if abs(perc) > 25:
                         alert = " 🚨 DISPARITÀ GRAVE!"
-                        disparita += 2
                     elif abs(perc) > 15:
                         alert = " ❌ DISPARITÀ"
-                        disparita += 1
                     elif abs(perc) > 10:
                         alert = " ⚠️  Attenzione"
                     else:
@@ -165,32 +164,39 @@ def confronti_anno_completo(df_totale):
                           f"(diff: {diff:+7.1f}, {perc:+6.1f}%){alert}")
             
             # Conclusione
+            disparita = int(matrice.coppie(SOGLIE_ALERT, coppie=[(staff1, staff2)])['Disparità'].iloc[0])
             print(f"\n   📊 GIUDIZIO: ", end="")
             if disparita == 0:
                 print("✅ DISTRIBUZIONE EQUA")
-                status = "EQUO"
             elif disparita <= 2:
                 print(f"⚠️  LEGGERO SQUILIBRIO ({disparita} alert)")
-                status = "ATTENZIONE"
             else:
                 print(f"❌ SQUILIBRIO SIGNIFICATIVO ({disparita} alert)")
-                status = "SQUILIBRATO"
-            
-            risultati.append({
-                'Confronto': f'{staff1} vs {staff2}',
-                'Alert': disparita,
-                'Status': status
-            })
     
-    return pd.DataFrame(risultati)
+    # Tutte le coppie, prima quelle in evidenza
+    coppie = coppie_con_evidenza(matrice, CONFRONTI_IN_EVIDENZA, SOGLIE_ALERT)
+    risultati = pd.DataFrame({
+        'Confronto': coppie['Staff1'] + ' vs ' + coppie['Staff2'],
+        'Alert': coppie['Disparità'],
+        'Status': np.select([coppie['Disparità'] == 0, coppie['Disparità'] <= 2],
+                            ['EQUO', 'ATTENZIONE'], 'SQUILIBRATO')
+    })
+    
+    print(f"\n{'='*70}")
+    print(f"📊 TUTTE LE COPPIE: {(risultati['Status'] == 'SQUILIBRATO').sum()} squilibrate, " +
+          f"{(risultati['Status'] == 'ATTENZIONE').sum()} da attenzionare su {len(risultati)}")
+    print('='*70)
+    
+    return risultati
 
-def genera_report_unificato(df, df_totale, cv_results, confronti):
+@fase()
+def genera_report_unificato(df, df_totale, cv_results, confronti, anno):
     """Genera report Excel unificato finale"""
     print("\n" + "="*70)
     print("📄 GENERAZIONE REPORT UNIFICATO FINALE")
     print("="*70)
     
-    base_path = Path('/Users/radice/Downloads/ROTA Chicca')
+    base_path = BASE_PATH
     output_file = base_path / 'REPORT_HR_UNIFICATO_2025_COMPLETO.xlsx'
     
     try:
@@ -202,11 +208,11 @@ def genera_report_unificato(df, df_totale, cv_results, confronti):
                     'Periodo Analizzato', 'Anomalie Critiche'
                 ],
                 'Valore': [
-                    2025,
+                    anno,
                     df['settimana'].nunique(),
                     len(df),
                     df['staff'].nunique(),
-                    'Gen-Dic 2025 (52 settimane)',
+                    f'Gen-Dic {anno} ({settimane_anno(anno)} settimane)',
                     'Vedere fogli dettaglio'
                 ]
             })
@@ -226,6 +232,9 @@ def genera_report_unificato(df, df_totale, cv_results, confronti):
             # Foglio 4: Confronti Anno
             confronti.to_excel(writer, sheet_name='Confronti Diretti', index=False)
             
+            # Foglio 4b: Matrice delle differenze % tra tutte le coppie
+            MatriceConfronti(df_totale, METRICHE_CONFRONTO).foglio().to_excel(writer, sheet_name='Matrice Confronti %')
+            
             # Foglio 5: Tutti i turni
             df.to_excel(writer, sheet_name='Tutti Turni Anno', index=False)
             
@@ -260,13 +269,14 @@ def genera_report_unificato(df, df_totale, cv_results, confronti):
         print(f"✅ Report unificato salvato: {output_file}")
         print(f"\n📊 Contiene 8 fogli con analisi anno completo!")
         return output_file
-        
+    
     except Exception as e:
         print(f"❌ Errore: {e}")
         import traceback
         traceback.print_exc()
         return None
 
+@esecuzione('analisi_hr_unificata_anno_2025')
 def main():
     print("="*70)
     print("⚖️  ANALISI HR UNIFICATA - ANNO COMPLETO 2025")
@@ -275,29 +285,31 @@ def main():
     
     # Carica tutti i dati
     df = load_all_data()
+    if df is None:
+        return
+    _, anno = verifica_perimetro(df)
     print(f"\n✅ Dati caricati: {len(df)} turni, {df['settimana'].nunique()} settimane")
     
     # Analisi per periodo
-    risultati_periodi = analisi_per_periodo(df)
+    risultati_periodi = analisi_per_periodo(df, anno)
     
     # Analisi anno totale
-    df_totale, cv_results = analisi_anno_totale(df)
+    df_totale, cv_results = analisi_anno_totale(df, anno)
     
     # Confronti finali
     confronti = confronti_anno_completo(df_totale)
     
     # Report unificato
-    report_file = genera_report_unificato(df, df_totale, cv_results, confronti)
+    report_file = genera_report_unificato(df, df_totale, cv_results, confronti, anno)
     
     print("\n" + "="*70)
     print("✅ ANALISI UNIFICATA COMPLETATA!")
     print("="*70)
     
     print(f"\n📊 RIEPILOGO:")
-    print(f"   Periodo 1 (Gen-Apr): Settimane 1-17")
-    print(f"   Periodo 2 (Mag-Ago): Settimane 18-35")
-    print(f"   Periodo 3 (Set-Dic): Settimane 36-52")
-    print(f"   TOTALE: 52 settimane, {len(df)} turni")
+    for periodo, (da, a) in periodi(anno).items():
+        print(f"   {periodo}: Settimane {da}-{a}")
+    print(f"   TOTALE: {settimane_anno(anno)} settimane, {len(df)} turni")
     
     if report_file:
         print(f"\n📄 Report finale: {report_file.name}")
@@ -4,22 +4,106 @@ Analisi Statistica Forense - Identificazione Manipolazioni nei Turni
 Usa metodi matematici rigorosi (scipy, numpy) per dimostrare non-casualità
 """
 
+import argparse
 import pandas as pd
 import numpy as np
 from scipy import stats
 from scipy.stats import chi2_contingency, ks_2samp
-from pathlib import Path
 from collections import Counter, defaultdict
 import warnings
+
+from sequenze import codifica_sequenze, riepilogo_sequenze
+from permutazioni import matrice_turni, test_permutazioni
+from archivio_turni import BASE_PATH, carica_turni, colonne_originali
+from report_excel import ReportExcel
+from strumentazione import esecuzione, fase
 warnings.filterwarnings('ignore')
 
+TIPI_RIPOSO = ['RIPO', 'RDOM', 'FERIOR', 'OFF', 'CHIUSO']
+
+@fase()
 def load_data():
     """Carica dati"""
-    base_path = Path('/Users/radice/Downloads/ROTA Chicca')
-    df = pd.read_csv(base_path / 'dati_arricchiti.csv')
+    base_path = BASE_PATH
+    csv_file = base_path / 'dati_arricchiti.csv'
+    df = carica_turni(csv_file, colonne_originali(csv_file))
     df = df[df['staff'].notna()].copy()
     return df
 
+def orario_in_minuti(orari):
+    """Orari 'HH:MM' -> minuti dalla mezzanotte (Int32, <NA> se mancanti o non validi).
+    
+    Come il vecchio controllo per riga conta solo che la parte prima dei ':'
+    sia numerica; minuti assenti valgono 0.
+    """
+    parti = orari.astype(str).str.extract(r'^(\d+)(?::(\d*)|$)')
+    ore = pd.to_numeric(parti[0], errors='coerce')
+    minuti = pd.to_numeric(parti[1], errors='coerce').fillna(0)
+    return (ore * 60 + minuti).where(orari.notna()).astype('Int32')
+
+def ore_lavorate(ore_lavoro):
+    """ore_lavoro ('7,5', '8', 7.5 ...) -> float; i valori non numerici valgono 0"""
+    ore = pd.to_numeric(ore_lavoro.astype(str).str.replace(',', '.', regex=False), errors='coerce')
+    return ore.fillna(0).where(ore_lavoro.notna())
+
+def _flag(df, colonna):
+    if colonna not in df:
+        return np.zeros(len(df), dtype=bool)
+    return df[colonna].astype(bool).to_numpy()
+
+def punteggi_comodita(df):
+    """Punteggi di comodità di tutti i turni in un'unica passata vettoriale.
+    
+    Gli orari vengono convertiti una sola volta in minuti interi; ritorna un
+    DataFrame con lo stesso indice di df e le colonne:
+      entrata_min, uscita_min, ore   orari e durata già parsati
+      comfort_score, discomfort_score
+      classe          comodo/scomodo/neutro secondo i punteggi
+      classe_oraria   comodo/scomodo/neutro secondo la sola ora di entrata,
+                      con festivi e weekend sempre scomodi (test chi-quadrato)
+    """
+    entrata = orario_in_minuti(df['ora_entrata'])
+    uscita = orario_in_minuti(df['ora_uscita'])
+    ore = ore_lavorate(df['ore_lavoro'])
+    
+    # NaN nei confronti dà sempre False: i valori mancanti non danno punti
+    h_in = entrata.to_numpy(dtype=float, na_value=np.nan) // 60
+    h_out = uscita.to_numpy(dtype=float, na_value=np.nan) // 60
+    durata = ore.to_numpy(dtype=float)
+    festivo = _flag(df, 'is_festivo')
+    weekend = _flag(df, 'is_weekend')
+    
+    comfort = (2 * ((h_in >= 7) & (h_in <= 9))     # orario comodo
+               + (h_in >= 13)                      # pomeriggio
+               + (h_out <= 17)
+               + (durata <= 7))
+    discomfort = (3 * (h_in < 5)                   # turno notte
+                  + 2 * (h_out >= 20)
+                  + 2 * (durata > 8)
+                  + 5 * festivo
+                  + 2 * weekend)
+    
+    festivo_weekend = festivo | weekend
+    
+    return pd.DataFrame({
+        'entrata_min': entrata,
+        'uscita_min': uscita,
+        'ore': ore,
+        'comfort_score': comfort,
+        'discomfort_score': discomfort,
+        'classe': np.select([comfort > discomfort, discomfort > comfort],
+                            ['comodo', 'scomodo'], 'neutro'),
+        'classe_oraria': np.select([(h_in >= 7) & ~festivo_weekend, (h_in < 5) | festivo_weekend],
+                                   ['comodo', 'scomodo'], 'neutro')
+    }, index=df.index)
+
+def conta_classi(staff, classi, staff_tutti):
+    """Tabella staff x (comodo, scomodo, neutro), con zeri per gli staff senza turni"""
+    return (pd.crosstab(staff, classi)
+              .reindex(index=staff_tutti, columns=['comodo', 'scomodo', 'neutro'], fill_value=0)
+              .rename_axis(index=None, columns=None))
+
+@fase()
 def classifica_turni_comodita(df):
     """Classifica turni per 'comodità' - Python puro"""
     print("\n" + "="*70)
@@ -41,78 +125,22 @@ def classifica_turni_comodita(df):
     print("   • Festivi lavorati")
     print("   • Weekend lavorati")
     
-    risultati = {}
-    
-    for staff in sorted(df['staff'].unique()):
-        df_staff = df[(df['staff'] == staff) & (df['tipo_turno'] == 'NORMALE')]
-        
-        # Conta turni per comodità
-        turni_comodi = 0
-        turni_scomodi = 0
-        score_comodita = 0
-        
-        for idx, row in df_staff.iterrows():
-            comfort_score = 0
-            discomfort_score = 0
-            
-            # Analizza orario entrata
-            if pd.notna(row['ora_entrata']):
-                ora = str(row['ora_entrata']).split(':')[0]
-                if ora.isdigit():
-                    ora_int = int(ora)
-                    if ora_int >= 7 and ora_int <= 9:
-                        comfort_score += 2  # Orario comodo
-                    elif ora_int < 5:
-                        discomfort_score += 3  # Turno notte
-                    elif ora_int >= 13:
-                        comfort_score += 1  # Pomeriggio
-            
-            # Analizza orario uscita
-            if pd.notna(row['ora_uscita']):
-                ora = str(row['ora_uscita']).split(':')[0]
-                if ora.isdigit():
-                    ora_int = int(ora)
-                    if ora_int <= 17:
-                        comfort_score += 1
-                    elif ora_int >= 20:
-                        discomfort_score += 2
-            
-            # Analizza durata
-            if pd.notna(row['ore_lavoro']):
-                ore_str = str(row['ore_lavoro']).replace(',', '.')
-                try:
-                    ore = float(ore_str)
-                except:
-                    ore = 0
-                if ore <= 7:
-                    comfort_score += 1
-                elif ore > 8:
-                    discomfort_score += 2
-            
-            # Penalità festivi e weekend
-            if row.get('is_festivo', False):
-                discomfort_score += 5
-            if row.get('is_weekend', False):
-                discomfort_score += 2
-            
-            # Classifica turno
-            if comfort_score > discomfort_score:
-                turni_comodi += 1
-            elif discomfort_score > comfort_score:
-                turni_scomodi += 1
-            
-            score_comodita += (comfort_score - discomfort_score)
-        
-        risultati[staff] = {
-            'turni_totali': len(df_staff),
-            'turni_comodi': turni_comodi,
-            'turni_scomodi': turni_scomodi,
-            'turni_neutri': len(df_staff) - turni_comodi - turni_scomodi,
-            'score_comodita': score_comodita,
-            'ratio_comodi': (turni_comodi / len(df_staff) * 100) if len(df_staff) > 0 else 0
-        }
-    
-    df_comfort = pd.DataFrame(risultati).T
+    staff = sorted(df['staff'].unique())
+    normali = df[df['tipo_turno'] == 'NORMALE']
+    punteggi = punteggi_comodita(normali)
+    
+    classi = conta_classi(normali['staff'], punteggi['classe'], staff)
+    score = (punteggi['comfort_score'] - punteggi['discomfort_score']).groupby(normali['staff']).sum()
+    totali = classi.sum(axis=1)
+    
+    df_comfort = pd.DataFrame({
+        'turni_totali': totali,
+        'turni_comodi': classi['comodo'],
+        'turni_scomodi': classi['scomodo'],
+        'turni_neutri': classi['neutro'],
+        'score_comodita': score.reindex(staff, fill_value=0),
+        'ratio_comodi': (classi['comodo'] / totali.where(totali > 0) * 100).fillna(0)
+    })
     df_comfort = df_comfort.sort_values('score_comodita', ascending=False)
     
     print("\n📊 RISULTATI CLASSIFICAZIONE:")
@@ -120,52 +148,27 @@ def classifica_turni_comodita(df):
     
     return df_comfort
 
+@fase()
 def analisi_riposi_consecutivi_pattern(df):
     """Analizza pattern riposi consecutivi - Matematica pura"""
     print("\n" + "="*70)
     print("😴 ANALISI PATTERN RIPOSI CONSECUTIVI")
     print("="*70)
     
-    risultati = {}
-    
-    for staff in sorted(df['staff'].unique()):
-        df_staff = df[df['staff'] == staff].sort_values(['settimana', 'file'])
-        
-        sequenze = []
-        giorni_consec = 0
-        tipo_precedente = None
-        
-        for idx, row in df_staff.iterrows():
-            is_riposo = row['tipo_turno'] in ['RIPO', 'RDOM', 'FERIOR', 'OFF', 'CHIUSO']
-            
-            if is_riposo:
-                giorni_consec += 1
-            else:
-                if giorni_consec > 0:
-                    sequenze.append(giorni_consec)
-                giorni_consec = 0
-        
-        if giorni_consec > 0:
-            sequenze.append(giorni_consec)
-        
-        # Statistiche sequenze
-        n_seq_2 = sum(1 for s in sequenze if s == 2)
-        n_seq_3 = sum(1 for s in sequenze if s == 3)
-        n_seq_4plus = sum(1 for s in sequenze if s >= 4)
-        n_seq_lunghe = sum(1 for s in sequenze if s >= 3)
-        
-        risultati[staff] = {
-            'tot_sequenze': len(sequenze),
-            'seq_2_giorni': n_seq_2,
-            'seq_3_giorni': n_seq_3,
-            'seq_4plus_giorni': n_seq_4plus,
-            'seq_lunghe': n_seq_lunghe,
-            'max_consecutivi': max(sequenze) if sequenze else 0,
-            'media_lunghezza': np.mean(sequenze) if sequenze else 0,
-            'tot_giorni_riposo': sum(sequenze)
-        }
-    
-    df_riposi = pd.DataFrame(risultati).T
+    is_riposo = df['tipo_turno'].isin(TIPI_RIPOSO)
+    seq = riepilogo_sequenze(codifica_sequenze(df, is_riposo, ['settimana', 'file']),
+                             sorted(df['staff'].unique()))
+    
+    df_riposi = pd.DataFrame({
+        'tot_sequenze': seq['sequenze'],
+        'seq_2_giorni': seq[2],
+        'seq_3_giorni': seq[3],
+        'seq_4plus_giorni': seq['4+'],
+        'seq_lunghe': seq[3] + seq['4+'],
+        'max_consecutivi': seq['max'],
+        'media_lunghezza': seq['media'],
+        'tot_giorni_riposo': seq['giorni']
+    })
     df_riposi = df_riposi.sort_values('seq_lunghe', ascending=False)
     
     print("\n📊 PATTERN RIPOSI CONSECUTIVI:")
@@ -186,6 +189,7 @@ def analisi_riposi_consecutivi_pattern(df):
     
     return df_riposi
 
+@fase()
 def test_chi_quadrato_distribuzione(df):
     """Test chi-quadrato per verificare casualità - scipy.stats"""
     print("\n" + "="*70)
@@ -196,40 +200,13 @@ def test_chi_quadrato_distribuzione(df):
     print("📐 Ipotesi Alternativa (H1): Distribuzione non casuale (manipolata)")
     
     # Test 1: Distribuzione turni comodi
-    turni_comodi = []
-    turni_scomodi = []
-    staff_names = []
+    staff_names = sorted(df['staff'].unique())
+    normali = df[df['tipo_turno'] == 'NORMALE']
+    classi = conta_classi(normali['staff'], punteggi_comodita(normali)['classe_oraria'], staff_names)
     
-    for staff in sorted(df['staff'].unique()):
-        df_staff = df[(df['staff'] == staff) & (df['tipo_turno'] == 'NORMALE')]
-        
-        comodi = 0
-        scomodi = 0
-        
-        for idx, row in df_staff.iterrows():
-            # Turno comodo se: entrata >= 07:00, uscita <= 17:00, non festivo, non weekend
-            is_comodo = False
-            is_scomodo = False
-            
-            if pd.notna(row['ora_entrata']):
-                ora_ent = str(row['ora_entrata']).split(':')[0]
-                if ora_ent.isdigit() and int(ora_ent) >= 7:
-                    is_comodo = True
-                elif ora_ent.isdigit() and int(ora_ent) < 5:
-                    is_scomodo = True
-            
-            if row.get('is_festivo', False) or row.get('is_weekend', False):
-                is_scomodo = True
-                is_comodo = False
-            
-            if is_comodo:
-                comodi += 1
-            elif is_scomodo:
-                scomodi += 1
-        
-        turni_comodi.append(comodi)
-        turni_scomodi.append(scomodi)
-        staff_names.append(staff)
+    # Turno comodo se: entrata >= 07:00, non festivo, non weekend
+    turni_comodi = classi['comodo'].tolist()
+    turni_scomodi = classi['scomodo'].tolist()
     
     # Crea tabella contingenza
     contingency_table = np.array([turni_comodi, turni_scomodi])
@@ -271,8 +248,13 @@ def test_chi_quadrato_distribuzione(df):
         'staff_names': staff_names
     }
 
-def calcola_score_favoritismo(df, df_comfort, df_riposi):
-    """Calcola score matematico di favoritismo - Python/numpy"""
+@fase()
+def calcola_score_favoritismo(df, df_comfort, df_riposi, df_perm=None):
+    """Calcola score matematico di favoritismo - Python/numpy
+    
+    Con df_perm (test_permutazioni_favoritismo) la probabilità casuale è il
+    p-value empirico delle permutazioni invece della coda della normale.
+    """
     print("\n" + "="*70)
     print("⚖️  SCORE DI FAVORITISMO (Matematica Pura)")
     print("="*70)
@@ -335,8 +317,11 @@ def calcola_score_favoritismo(df, df_comfort, df_riposi):
         z = (row['score_favoritismo'] - media) / std if std > 0 else 0
         
         if z > 1.5:
-            # Calcola probabilità (scipy.stats)
-            prob_casuale = (1 - stats.norm.cdf(z)) * 100
+            # Calcola probabilità (permutazioni se disponibili, altrimenti scipy.stats)
+            if df_perm is not None and staff in df_perm.index:
+                prob_casuale = df_perm.loc[staff, 'p_score'] * 100
+            else:
+                prob_casuale = (1 - stats.norm.cdf(z)) * 100
             
             print(f"\n   🚨 {staff}:")
             print(f"      Score: {row['score_favoritismo']:.2f}")
@@ -352,6 +337,7 @@ def calcola_score_favoritismo(df, df_comfort, df_riposi):
     
     return df_scores
 
+@fase()
 def test_distribuzione_uniforme(df):
     """Test se i turni sono distribuiti uniformemente - scipy"""
     print("\n" + "="*70)
@@ -399,8 +385,13 @@ def test_distribuzione_uniforme(df):
     
     return df_test
 
-def analisi_probabilita_pattern(df_riposi):
-    """Calcola probabilità di ottenere tali pattern per caso - numpy/scipy"""
+@fase()
+def analisi_probabilita_pattern(df_riposi, df_perm=None):
+    """Calcola probabilità di ottenere tali pattern per caso - numpy/scipy
+    
+    Con df_perm la probabilità è il p-value empirico delle permutazioni
+    (coda nella direzione dello scostamento) invece della normale.
+    """
     print("\n" + "="*70)
     print("🎲 ANALISI PROBABILISTICA - Pattern Riposi")
     print("="*70)
@@ -421,8 +412,11 @@ def analisi_probabilita_pattern(df_riposi):
         n_seq = row['seq_lunghe']
         z_score = (n_seq - media_seq) / std_seq if std_seq > 0 else 0
         
-        # Probabilità usando distribuzione normale (scipy.stats)
-        if z_score > 0:
+        # Probabilità: permutazioni se disponibili, altrimenti distribuzione normale (scipy.stats)
+        if df_perm is not None and staff in df_perm.index:
+            coda = 'p_seq_alto' if z_score > 0 else 'p_seq_basso'
+            prob = df_perm.loc[staff, coda] * 100
+        elif z_score > 0:
             prob = (1 - stats.norm.cdf(z_score)) * 100
         else:
             prob = stats.norm.cdf(z_score) * 100
@@ -439,17 +433,56 @@ def analisi_probabilita_pattern(df_riposi):
             print(f"      ⚠️  ANOMALIA SIGNIFICATIVA (|Z| > 1.5)")
             print(f"      ⚠️  Probabile manipolazione")
 
-def genera_report_forense(df, df_comfort, df_riposi, test_chi, df_scores):
+@fase()
+def test_permutazioni_favoritismo(df, n_permutazioni, seed=0, workers=None):
+    """Test di permutazione Monte Carlo su score favoritismo e sequenze riposo lunghe"""
+    print("\n" + "="*70)
+    print("🎲 TEST DI PERMUTAZIONE - Favoritismo")
+    print("="*70)
+    
+    print(f"\n📐 {n_permutazioni} riassegnazioni casuali dei turni tra gli staff,")
+    print("   giorno per giorno (stessa settimana, stesso giorno)")
+    print(f"   Seed: {seed} | Worker: {workers or 'tutti i core'}")
+    
+    punteggi = punteggi_comodita(df)
+    normale = df['tipo_turno'] == 'NORMALE'
+    attributi = pd.DataFrame({
+        'normale': normale,
+        'comodo': normale & (punteggi['classe'] == 'comodo'),
+        'scomodo': normale & (punteggi['classe'] == 'scomodo'),
+        'riposo': df['tipo_turno'].isin(TIPI_RIPOSO)
+    })
+    
+    df_perm = test_permutazioni(matrice_turni(df, attributi), n_permutazioni, seed, workers)
+    df_perm = df_perm.sort_values('p_score')
+    
+    print("\n📊 P-VALUE EMPIRICI PER STAFF:")
+    print(df_perm.to_string())
+    
+    print("\n🚨 STAFF CON SCORE NON SPIEGABILE DAL CASO:")
+    trovati = False
+    for staff, row in df_perm.iterrows():
+        if row['p_score'] < 0.05:
+            trovati = True
+            print(f"   🚨 {staff}: score {row['score_osservato']:.2f} "
+                  f"(medio per caso {row['score_medio_perm']:.2f}, p = {row['p_score']:.5f})")
+    if not trovati:
+        print("   ✅ Nessuno staff con p < 0.05")
+    
+    return df_perm
+
+@fase()
+def genera_report_forense(df, df_comfort, df_riposi, test_chi, df_scores, df_perm=None):
     """Genera report Excel forense"""
     print("\n" + "="*70)
     print("📄 GENERAZIONE REPORT STATISTICO FORENSE")
     print("="*70)
     
-    base_path = Path('/Users/radice/Downloads/ROTA Chicca')
+    base_path = BASE_PATH
     output = base_path / 'REPORT_FORENSE_MANIPOLAZIONE.xlsx'
     
     try:
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        with ReportExcel(output) as report:
             # Foglio 1: Executive Summary
             summary = pd.DataFrame({
                 'Test': [
@@ -467,28 +500,45 @@ def genera_report_forense(df, df_comfort, df_riposi, test_chi, df_scores):
                     df_riposi.head(1).index[0]
                 ]
             })
-            summary.to_excel(writer, sheet_name='Summary Forense', index=False)
+            report.scrivi(summary, sheet_name='Summary Forense', index=False)
             
             # Foglio 2: Score Favoritismo
-            df_scores.to_excel(writer, sheet_name='Score Favoritismo')
+            report.scrivi(df_scores, sheet_name='Score Favoritismo')
             
             # Foglio 3: Classificazione Turni
-            df_comfort.to_excel(writer, sheet_name='Turni Comodi vs Scomodi')
+            report.scrivi(df_comfort, sheet_name='Turni Comodi vs Scomodi')
             
             # Foglio 4: Pattern Riposi
-            df_riposi.to_excel(writer, sheet_name='Pattern Riposi')
+            report.scrivi(df_riposi, sheet_name='Pattern Riposi')
+            
+            # Foglio opzionale: Test Permutazioni
+            if df_perm is not None:
+                report.scrivi(df_perm, sheet_name='Test Permutazioni')
             
             # Foglio 5: Dati Grezzi
-            df.to_excel(writer, sheet_name='Dati Completi', index=False)
+            report.scrivi(df, sheet_name='Dati Completi', index=False)
         
         print(f"✅ Report forense salvato: {output}")
         return output
-        
+    
     except Exception as e:
         print(f"❌ Errore: {e}")
         return None
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Analisi statistica forense dei turni")
+    parser.add_argument('--permutazioni', type=int, default=0,
+                        help="Numero di permutazioni Monte Carlo per i p-value empirici (0 = disattivato)")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="Seed del generatore casuale (risultati riproducibili)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Processi paralleli per le permutazioni (default: tutti i core)")
+    return parser.parse_args(argv)
+
+@esecuzione('analisi_statistica_manipolazione')
+def main(argv=None):
+    args = parse_args(argv)
+    
     print("="*70)
     print("🔬 ANALISI STATISTICA FORENSE")
     print("   Identificazione Manipolazioni nei Turni")
@@ -508,17 +558,22 @@ def main():
     # Analisi 3: Test chi-quadrato
     test_chi = test_chi_quadrato_distribuzione(df)
     
+    # Analisi opzionale: Test di permutazione
+    df_perm = None
+    if args.permutazioni > 0:
+        df_perm = test_permutazioni_favoritismo(df, args.permutazioni, args.seed, args.workers)
+    
     # Analisi 4: Score favoritismo
-    df_scores = calcola_score_favoritismo(df, df_comfort, df_riposi)
+    df_scores = calcola_score_favoritismo(df, df_comfort, df_riposi, df_perm)
     
     # Analisi 5: Probabilità pattern
-    analisi_probabilita_pattern(df_riposi)
+    analisi_probabilita_pattern(df_riposi, df_perm)
     
     # Analisi 6: Test uniformità
     test_distribuzione_uniforme(df)
     
     # Report finale
-    report = genera_report_forense(df, df_comfort, df_riposi, test_chi, df_scores)
+    report = genera_report_forense(df, df_comfort, df_riposi, test_chi, df_scores, df_perm)
     
     print("\n" + "="*70)
     print("✅ ANALISI FORENSE COMPLETATA")
@@ -5,22 +5,26 @@ Script per analizzare i turni estratti dai PDF ROTA
 
 import pandas as pd
 import numpy as np
-from pathlib import Path
 from datetime import datetime, timedelta
 import re
 
+from archivio_turni import BASE_PATH, carica_turni, colonne_originali
+from strumentazione import esecuzione, fase
+
+@fase()
 def load_data():
     """Carica i dati dal CSV"""
-    base_path = Path('/Users/radice/Downloads/ROTA Chicca')
+    base_path = BASE_PATH
     csv_file = base_path / 'turni_estratti.csv'
     
     if not csv_file.exists():
         print("Errore: Prima esegui extract_turni.py per estrarre i dati!")
         return None
     
-    df = pd.read_csv(csv_file)
+    df = carica_turni(csv_file, colonne_originali(csv_file))
     return df
 
+@fase()
 def analisi_base(df):
     """Statistiche base"""
     print("\n" + "="*60)
@@ -35,6 +39,7 @@ def analisi_base(df):
     if 'giorno' in df.columns:
         print(df['giorno'].value_counts())
 
+@fase()
 def analisi_orari(df):
     """Analizza gli orari di lavoro"""
     print("\n" + "="*60)
@@ -95,6 +100,7 @@ def analisi_orari(df):
         print("\nNessun orario strutturato trovato nei dati")
         return None
 
+@fase()
 def analisi_modifiche(df):
     """Analizza le modifiche ai turni"""
     print("\n" + "="*60)
@@ -112,6 +118,7 @@ def analisi_modifiche(df):
     else:
         print("\nNessuna modifica trovata")
 
+@fase()
 def analisi_temporale(df):
     """Analisi temporale dei turni"""
     print("\n" + "="*60)
@@ -128,13 +135,14 @@ def analisi_temporale(df):
     print(f"\nSettimana con più turni: {turni_per_settimana.idxmax()} ({turni_per_settimana.max()} turni)")
     print(f"Settimana con meno turni: {turni_per_settimana.idxmin()} ({turni_per_settimana.min()} turni)")
 
+@fase()
 def genera_report_excel(df, df_orari=None):
     """Genera un report Excel completo"""
     print("\n" + "="*60)
     print("GENERAZIONE REPORT EXCEL")
     print("="*60)
     
-    base_path = Path('/Users/radice/Downloads/ROTA Chicca')
+    base_path = BASE_PATH
     output_file = base_path / 'report_analisi_turni.xlsx'
     
     try:
@@ -180,11 +188,12 @@ def genera_report_excel(df, df_orari=None):
         
         print(f"✓ Report salvato in: {output_file}")
         return output_file
-        
+    
     except Exception as e:
         print(f"Errore nella generazione del report: {e}")
         return None
 
+@esecuzione('analisi_turni')
 def main():
     print("="*60)
     print("ANALISI TURNI DI LAVORO")
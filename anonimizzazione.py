@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Motore di anonimizzazione dei nomi nei dataset turni
+Tutti i nomi della mappa nome -> codice diventano una sola regex compilata
+(alternativa fattorizzata per prefissi comuni, come un trie), applicata in un
+solo passaggio per cella. Ogni colonna di testo viene sostituita sui soli
+valori distinti (pd.factorize) e ricostruita per indice, così le righe
+ripetute (staff, tipo turno...) costano una volta sola anche su milioni di righe.
+I CSV si anonimizzano in streaming a blocchi (anonimizza_csv), scrivendo più
+file identici con una sola lettura
+"""
+
+import filecmp
+import os
+import re
+from contextlib import ExitStack
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+RIGHE_BLOCCO = 100000
+
+# Cognomi dello staff -> codice censurato (prime 3 lettere)
+MAPPA_COGNOMI = {
+    'VISSANI': 'VIS',
+    'PAGANO': 'PAG',
+    'PACINI': 'PAC',
+    'TAMBERI': 'TAM',
+    'CIRCELLI': 'CIR',
+    'MORALE': 'MOR'
+}
+
+def _pattern_trie(nodo):
+    fine = '' in nodo
+    rami = [re.escape(c) + _pattern_trie(figlio) for c, figlio in sorted(nodo.items()) if c != '']
+    if not rami:
+        return ''
+    if len(rami) == 1 and not fine:
+        return rami[0]
+    # Quantificatore greedy sul gruppo: vince sempre il nome più lungo (PACINI prima di PAC)
+    alternativa = '(?:' + '|'.join(rami) + ')'
+    return alternativa + '?' if fine else alternativa
+
+def regex_alternativa(parole):
+    """Regex compilata che riconosce una qualsiasi delle parole.
+    
+    I prefissi comuni sono fattorizzati ((?:PA(?:CINI|GANO)|...)): a ogni
+    posizione del testo il motore prova un carattere per ramo invece di
+    tutte le parole, anche con decine di migliaia di nomi.
+    """
+    trie = {}
+    for parola in parole:
+        if not parola:
+            continue
+        nodo = trie
+        for carattere in parola:
+            nodo = nodo.setdefault(carattere, {})
+        nodo[''] = True
+    return re.compile(_pattern_trie(trie) if trie else r'(?!)')
+
+def colonne_testo(df):
+    """Colonne di testo (object o str): le uniche che possono contenere nomi"""
+    return [col for col in df.columns
+            if pd.api.types.is_object_dtype(df[col]) or pd.api.types.is_string_dtype(df[col])]
+
+class Anonimizzatore:
+    """Sostituisce i nomi della mappa con i loro codici in testi, Series e DataFrame"""
+
+    def __init__(self, mappa=MAPPA_COGNOMI):
+        self.mappa = dict(mappa)
+        self.regex = regex_alternativa(self.mappa)
+
+    def _codice(self, match):
+        return self.mappa[match.group(0)]
+
+    def testo(self, testo):
+        """Un singolo valore (NaN resta NaN, il resto diventa stringa)"""
+        if pd.isna(testo):
+            return testo
+        return self.regex.sub(self._codice, str(testo))
+
+    def serie(self, serie):
+        """Series anonimizzata: sostituzione sui valori distinti, poi ricostruzione per indice"""
+        codici, valori = pd.factorize(serie)
+        testi = pd.Series(valori, dtype=object).astype(str)
+        sostituiti = testi.str.replace(self.regex, self._codice, regex=True).to_numpy(dtype=object)
+        # codice -1 (valore mancante) -> ultimo elemento, NaN
+        return pd.Series(np.append(sostituiti, np.nan)[codici], index=serie.index, name=serie.name)
+
+    def dataframe(self, df, colonne=None):
+        """Anonimizza le colonne di testo (o quelle indicate); ritorna un nuovo DataFrame"""
+        df = df.copy()
+        for col in colonne if colonne is not None else colonne_testo(df):
+            df[col] = self.serie(df[col])
+        return df
+
+    def residui(self, df):
+        """Nomi della mappa ancora presenti nelle colonne di testo (verifica vettoriale)"""
+        trovati = set()
+        for col in colonne_testo(df):
+            valori = pd.Series(df[col].dropna().unique(), dtype=object).astype(str)
+            sospetti = valori[valori.str.contains(self.regex, regex=True)]
+            for testo in sospetti:
+                trovati.update(self.regex.findall(testo))
+        return sorted(trovati)
+
+def raggruppa_identici(percorsi):
+    """Raggruppa i file con contenuto identico (confronto byte a byte): [[a, b], [c]]"""
+    gruppi = []
+    for percorso in percorsi:
+        for gruppo in gruppi:
+            if filecmp.cmp(gruppo[0], percorso, shallow=False):
+                gruppo.append(percorso)
+                break
+        else:
+            gruppi.append([percorso])
+    return gruppi
+
+def anonimizza_csv(sorgente, destinazioni, trasforma, verifica=None, righe_blocco=RIGHE_BLOCCO):
+    """Anonimizza un CSV a blocchi di righe, scrivendo una o più destinazioni in una sola lettura.
+    
+    trasforma: funzione blocco -> blocco anonimizzato (DataFrame di sole stringhe:
+               i valori non toccati tornano nel CSV esattamente come erano)
+    verifica:  Anonimizzatore con cui controllare i blocchi scritti (niente rilettura)
+    
+    Ogni destinazione è scritta in un file temporaneo accanto e rinominata
+    atomicamente alla fine; la sorgente può essere anche una destinazione.
+    La memoria è quella di un blocco, qualunque sia la dimensione del file.
+    Ritorna righe, colonne e nomi residui trovati dalla verifica.
+    """
+    destinazioni = [Path(d) for d in destinazioni]
+    temporanei = [d.with_name(f'.{d.name}.tmp') for d in destinazioni]
+    righe, colonne, residui = 0, [], set()
+    
+    try:
+        with ExitStack() as stack:
+            uscite = [stack.enter_context(open(t, 'w', encoding='utf-8', newline='')) for t in temporanei]
+            blocchi = pd.read_csv(sorgente, dtype=str, keep_default_na=False, chunksize=righe_blocco)
+            for blocco in blocchi:
+                blocco = trasforma(blocco)
+                testo = blocco.to_csv(index=False, header=righe == 0)
+                for uscita in uscite:
+                    uscita.write(testo)
+                if verifica is not None:
+                    residui.update(verifica.residui(blocco))
+                righe += len(blocco)
+                colonne = list(blocco.columns)
+        for tmp, destinazione in zip(temporanei, destinazioni):
+            os.replace(tmp, destinazione)
+    finally:
+        for tmp in temporanei:
+            if tmp.exists():
+                tmp.unlink()
+    
+    return {'righe': righe, 'colonne': colonne, 'residui': sorted(residui)}
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Archivio colonnare (Parquet) dei dataset turni
+Accanto a ogni CSV (turni_completi_52_settimane, turni_dettagliati,
+dati_arricchiti...) viene mantenuta una copia Parquet già tipizzata:
+staff, tipo_turno e periodo categoriali, orari anche in minuti interi,
+date già convertite. I load_data() leggono solo le colonne che usano
+(niente linea_completa se non serve). Senza pyarrow si ricade sul CSV.
+"""
+
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (motore Parquet di pandas)
+    PARQUET_DISPONIBILE = True
+except ImportError:
+    PARQUET_DISPONIBILE = False
+
+# Cartella dei PDF ROTA e dei dataset estratti (ROTA_BASE_PATH per un'altra sede o macchina)
+BASE_PATH = Path(os.environ.get('ROTA_BASE_PATH', '/Users/radice/Downloads/ROTA Chicca'))
+
+# Colonne a bassa cardinalità: in Parquet diventano dizionari (un intero per riga)
+COLONNE_CATEGORIALI = ['staff', 'tipo_turno', 'periodo', 'modifiche', 'file',
+                       'data_rota', 'ora_entrata', 'ora_uscita', 'giorno_settimana', 'festivo']
+
+# Colonne derivate: nome -> colonna CSV da cui si calcolano
+COLONNE_DERIVATE = {
+    'entrata_min': 'ora_entrata',
+    'uscita_min': 'ora_uscita',
+    'data_rota_dt': 'data_rota',
+    'data_inizio_dt': 'data_inizio',
+    'data_fine_dt': 'data_fine',
+}
+
+def percorso_parquet(csv_path):
+    return Path(csv_path).with_suffix('.parquet')
+
+def orario_minuti(orari):
+    """'HH:MM' -> minuti dalla mezzanotte (Int16, <NA> se mancante o non valido)"""
+    parti = orari.astype('string').str.extract(r'^(\d{1,2})[:.](\d{2})')
+    minuti = pd.to_numeric(parti[0], errors='coerce') * 60 + pd.to_numeric(parti[1], errors='coerce')
+    return minuti.astype('Int16')
+
+def data_ddmmyy(valori):
+    """Date DDMMYY (anche numeriche senza zero iniziale, es. 50125) -> datetime"""
+    testo = valori.astype('string').str.replace(r'\.0$', '', regex=True).str.zfill(6)
+    return pd.to_datetime(testo, format='%d%m%y', errors='coerce')
+
+MESI = {'gennaio': 1, 'febbraio': 2, 'marzo': 3, 'aprile': 4, 'maggio': 5, 'giugno': 6,
+        'luglio': 7, 'agosto': 8, 'settembre': 9, 'ottobre': 10, 'novembre': 11, 'dicembre': 12}
+
+def data_rota(valori):
+    """data_rota 'DD/MM/YY', 'DD/MM/YYYY' o 'lunedì 30 dicembre 2024' -> datetime"""
+    testo = valori.astype('string')
+    date = pd.to_datetime(testo, format='%d/%m/%y', errors='coerce')
+    date = date.fillna(pd.to_datetime(testo, format='%d/%m/%Y', errors='coerce'))
+    
+    esteso = testo.str.lower().str.extract(r'(\d{1,2})\s+([a-z]+)\s+(\d{4})')
+    mese = esteso[1].map(MESI)
+    estese = pd.to_datetime(pd.DataFrame({
+        'year': pd.to_numeric(esteso[2], errors='coerce'),
+        'month': mese,
+        'day': pd.to_numeric(esteso[0], errors='coerce')
+    }), errors='coerce')
+    return date.fillna(estese)
+
+def tipizza(df):
+    """Tipi colonnari: categorie, orari in minuti, date convertite.
+    
+    Le colonne originali restano (stessi nomi e valori): le derivate si
+    aggiungono accanto, così gli script esistenti continuano a funzionare.
+    Unica eccezione data_parsed (dati arricchiti), convertita sul posto in
+    datetime: è già la data del turno e le analisi la usano come tale.
+    """
+    df = df.copy()
+    for col in COLONNE_CATEGORIALI:
+        if col in df:
+            df[col] = df[col].astype('category')
+    if 'ora_entrata' in df:
+        df['entrata_min'] = orario_minuti(df['ora_entrata'])
+    if 'ora_uscita' in df:
+        df['uscita_min'] = orario_minuti(df['ora_uscita'])
+    if 'data_rota' in df:
+        df['data_rota_dt'] = data_rota(df['data_rota'])
+    if 'data_parsed' in df:
+        # Data del turno dei dati arricchiti: datetime anche quando arriva dal CSV
+        df['data_parsed'] = pd.to_datetime(df['data_parsed'], errors='coerce')
+    for col in ['data_inizio', 'data_fine']:
+        if col in df:
+            df[f'{col}_dt'] = data_ddmmyy(df[col])
+    return df
+
+def _senza_categorie(df):
+    # Categorie -> valori semplici: value_counts/groupby non mostrano categorie vuote
+    # (take sui codici: molto più veloce di astype sulle colonne lunghe)
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            cat = df[col].cat
+            valori = cat.categories.take(cat.codes.to_numpy(), allow_fill=True, fill_value=np.nan)
+            df[col] = pd.Series(valori, index=df.index)
+    return df
+
+def salva_turni(df, csv_path, encoding='utf-8-sig'):
+    """Salva il CSV come prima e, se pyarrow c'è, la copia Parquet tipizzata"""
+    df.to_csv(csv_path, index=False, encoding=encoding)
+    if PARQUET_DISPONIBILE:
+        salva_parquet(tipizza(df), csv_path)
+
+def salva_parquet(df_tipizzato, csv_path):
+    """Scrive la copia Parquet di un DataFrame già passato da tipizza() (rename atomico)"""
+    parquet = percorso_parquet(csv_path)
+    tmp = parquet.with_name(f'.{parquet.name}.tmp')
+    df_tipizzato.to_parquet(tmp, index=False)
+    os.replace(tmp, parquet)
+    return parquet
+
+def _parquet_aggiornato(csv_path):
+    parquet = percorso_parquet(csv_path)
+    if not PARQUET_DISPONIBILE or not parquet.exists():
+        return False
+    return not csv_path.exists() or parquet.stat().st_mtime_ns >= csv_path.stat().st_mtime_ns
+
+def come_caricato(df, colonne=None):
+    """Un DataFrame appena estratto come lo restituirebbe carica_turni dopo salva_turni, senza passare dal disco"""
+    df = tipizza(df)
+    if colonne is not None:
+        df = df[[c for c in colonne if c in df.columns]]
+    return _senza_categorie(df)
+
+def carica_turni(csv_path, colonne=None, categorie=False):
+    """Carica un dataset turni dalla copia Parquet (o dal CSV se manca o è vecchia).
+    
+    colonne:   proiezione; anche le derivate (entrata_min, data_rota_dt...).
+               Quelle che il dataset non ha vengono saltate (Parquet e CSV)
+    categorie: True per tenere staff/tipo_turno/... come categorical
+               (memoria minima); False per valori semplici come read_csv
+    
+    Se il Parquet manca o è più vecchio del CSV si legge il CSV, senza
+    riscrivere la copia: la lettura non scrive mai su disco (e un CSV che
+    pandas legge ma Arrow non sa convertire non blocca le analisi). La copia
+    la rigenera salva_turni al prossimo salvataggio.
+    """
+    csv_path = Path(csv_path)
+    
+    if _parquet_aggiornato(csv_path):
+        parquet = percorso_parquet(csv_path)
+        if colonne is not None:
+            # Come dal CSV: le colonne che il file non ha vengono saltate, non sono un errore
+            import pyarrow.parquet as pq
+            presenti = set(pq.read_schema(parquet).names)
+            colonne = [c for c in colonne if c in presenti]
+        df = pd.read_parquet(parquet, columns=colonne)
+    else:
+        df = tipizza(pd.read_csv(csv_path))
+        if colonne is not None:
+            df = df[[c for c in colonne if c in df.columns]]
+    
+    return df if categorie else _senza_categorie(df)
+
+def colonne_disponibili(csv_path):
+    """Nomi delle colonne del dataset (Parquet se aggiornato, altrimenti CSV + derivate)"""
+    csv_path = Path(csv_path)
+    if _parquet_aggiornato(csv_path):
+        import pyarrow.parquet as pq
+        return pq.read_schema(percorso_parquet(csv_path)).names
+    header = list(pd.read_csv(csv_path, nrows=0).columns)
+    return header + [d for d, origine in COLONNE_DERIVATE.items() if origine in header]
+
+def colonne_originali(csv_path, escluse=()):
+    """Colonne del CSV originale (senza le derivate), meno quelle indicate (es. ['linea_completa'])"""
+    escluse = set(escluse) | set(COLONNE_DERIVATE)
+    return [c for c in colonne_disponibili(csv_path) if c not in escluse]
+
+def memoria_mb(df):
+    return df.memory_usage(deep=True).sum() / 1e6
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Arricchimento dei turni estratti: data esatta, giorno, weekend e festività
+Ogni turno ha come data_rota l'intestazione di giorno sotto cui compare nel
+PDF ('lunedì 30 dicembre 2024' o DD/MM/YYYY): qui diventa una data vera
+(data_parsed) con giorno della settimana, weekend, festività (nazionali e
+patrono della sede) e periodo del report HR, tutto in colonne e una sola volta
+dopo l'estrazione. Il risultato è dati_arricchiti.csv (con copia Parquet
+tipizzata): le analisi leggono le colonne invece di ricalcolare le date.
+
+Uso:
+    python3 arricchimento.py        # da turni_completi_52_settimane.csv
+"""
+
+import numpy as np
+import pandas as pd
+
+from archivio_turni import BASE_PATH, carica_turni, colonne_originali, data_ddmmyy, data_rota, salva_turni
+from dataset_turni import salva_partizioni, sede_da_file
+from festivita import SANTI_PATRONI, nomi_festivi
+from strumentazione import esecuzione, fase
+
+# Come li mostrano server.py e le dashboard HTML
+GIORNI_SETTIMANA = ['Lunedì', 'Martedì', 'Mercoledì', 'Giovedì', 'Venerdì', 'Sabato', 'Domenica']
+
+# Periodi dei report HR (mese iniziale -> etichetta)
+PERIODI = {1: 'Periodo 1 (Gen-Apr)', 5: 'Periodo 2 (Mag-Ago)', 9: 'Periodo 3 (Set-Dic)'}
+
+# Colonne aggiunte dall'arricchimento
+COLONNE_ARRICCHITE = ['periodo', 'data_parsed', 'giorno_settimana', 'is_weekend', 'festivo', 'is_festivo']
+
+def data_turni(df):
+    """Data di ogni turno: dalla sua data_rota, altrimenti dal primo giorno della settimana (data_inizio)"""
+    data = pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+    if 'data_rota' in df:
+        data = data.fillna(data_rota(df['data_rota']))
+    if 'data_inizio' in df:
+        data = data.fillna(data_ddmmyy(df['data_inizio']))
+    return data
+
+def _giorni_incoerenti(df, data):
+    """Turni la cui intestazione estesa ('lunedì ...') non corrisponde al giorno della data"""
+    if 'data_rota' not in df:
+        return 0
+    nome = df['data_rota'].astype('string').str.extract(r'^\s*([^\W\d_]+)\s+\d', expand=False).str.lower()
+    atteso = pd.Series(np.asarray(GIORNI_SETTIMANA, dtype=object), dtype='string').str.lower()
+    confronto = nome.notna() & data.notna()
+    giorno = data.dt.weekday.where(confronto, 0).astype(int)
+    return int((confronto & (nome != atteso.to_numpy()[giorno])).sum())
+
+def festivi_sede(data, sede):
+    """Nome della festività di ogni data ('' se feriale): nazionali più il patrono della sede della riga.
+    
+    È la regola di dati_arricchiti.csv; i calendari delle analisi HR la usano
+    così com'è, perché festivi e report contino gli stessi giorni.
+    """
+    data = pd.Series(data).reset_index(drop=True)
+    sede = np.asarray(sede, dtype=object)
+    festivo = np.full(len(data), '', dtype=object)
+    for s in pd.unique(sede):
+        righe = sede == s
+        festivo[righe] = nomi_festivi(data[righe], patroni=[s] if s in SANTI_PATRONI else ())
+    return festivo
+
+def date_settimane(df):
+    """Primo e ultimo giorno della settimana di ogni turno: le colonne tipizzate
+    data_inizio_dt / data_fine_dt (carica_turni, carica_dataset), altrimenti da data_inizio / data_fine"""
+    return tuple(df[f'{col}_dt'] if f'{col}_dt' in df else data_ddmmyy(df[col])
+                 for col in ['data_inizio', 'data_fine'])
+
+def festivi_calendario(data, sede, turni):
+    """Come festivi_sede per i giorni di un calendario costruito dai turni.
+    
+    Se i turni sono arricchiti (data_parsed, festivo) i giorni che hanno
+    turni nella stessa sede prendono il festivo già calcolato; si ricalcolano
+    solo gli altri (o tutti, se i turni non sono arricchiti).
+    """
+    data = pd.Series(data).reset_index(drop=True)
+    sede = np.asarray(sede, dtype=object)
+    if 'data_parsed' not in turni or 'festivo' not in turni:
+        return festivi_sede(data, sede)
+    
+    # Nel CSV il festivo vuoto torna NaN: per i turni datati vuol dire feriale
+    noti = pd.DataFrame({
+        'sede': sede_da_file(turni['file']).to_numpy() if 'file' in turni else '',
+        'data': turni['data_parsed'].dt.normalize().to_numpy(),
+        'festivo': turni['festivo'].fillna('').astype(object).to_numpy()
+    }).dropna(subset=['data']).drop_duplicates(['sede', 'data'])
+    festivo = (noti.set_index(['sede', 'data'])['festivo']
+               .reindex(pd.MultiIndex.from_arrays([sede, data.dt.normalize()]))
+               .to_numpy(dtype=object))
+    mancanti = pd.isna(festivo)
+    if mancanti.any():
+        festivo[mancanti] = festivi_sede(data[mancanti], sede[mancanti])
+    return festivo
+
+@fase()
+def arricchisci_turni(df):
+    """Turni con le colonne di dati_arricchiti.csv (periodo, data, giorno, weekend, festività).
+    
+    Le colonne già presenti vengono ricalcolate. data_parsed è datetime (NaT
+    se il turno non ha date), festivo il nome della festività ('' se feriale).
+    """
+    df = df.drop(columns=[c for c in COLONNE_ARRICCHITE if c in df])
+    data = data_turni(df)
+    valida = data.notna().to_numpy()
+    weekday = data.dt.weekday.fillna(0).astype(int).to_numpy()
+    
+    mesi = sorted(PERIODI)
+    etichette = np.asarray([PERIODI[m] for m in mesi], dtype=object)
+    periodo = etichette[np.searchsorted(mesi, data.dt.month.fillna(mesi[0]).to_numpy(), side='right') - 1]
+    df['periodo'] = np.where(valida, periodo, None)
+    df['data_parsed'] = data
+    df['giorno_settimana'] = np.where(valida, np.asarray(GIORNI_SETTIMANA, dtype=object)[weekday], None)
+    df['is_weekend'] = valida & (weekday >= 5)
+    
+    # Festività nazionali più il patrono della sede di ogni riga
+    sede = sede_da_file(df['file']).to_numpy() if 'file' in df else np.full(len(df), '', dtype=object)
+    festivo = festivi_sede(data, sede)
+    df['festivo'] = festivo
+    df['is_festivo'] = festivo != ''
+    return df
+
+def salva_turni_arricchiti(df, base_path):
+    """Arricchisce i turni estratti e salva dati_arricchiti.csv (con copia Parquet); ritorna i turni arricchiti"""
+    df_arricchito = arricchisci_turni(df)
+    
+    senza_data = int(df_arricchito['data_parsed'].isna().sum())
+    incoerenti = _giorni_incoerenti(df_arricchito, df_arricchito['data_parsed'])
+    print(f"\n📅 Turni datati: {len(df_arricchito) - senza_data}/{len(df_arricchito)}"
+          f" | Weekend: {int(df_arricchito['is_weekend'].sum())}"
+          f" | Festivi: {int(df_arricchito['is_festivo'].sum())}")
+    if senza_data:
+        print(f"   ⚠️  {senza_data} turni senza data (né intestazione di giorno né data_inizio)")
+    if incoerenti:
+        print(f"   ⚠️  {incoerenti} turni con giorno dell'intestazione diverso dalla data")
+    
+    output_csv = base_path / 'dati_arricchiti.csv'
+    with fase('salva_arricchiti', len(df_arricchito)):
+        salva_turni(df_arricchito, output_csv)
+        # Partizioni come per l'estrazione: l'analisi HR legge da qui le sole sedi / anni richiesti
+        salva_partizioni(df_arricchito, output_csv)
+    print(f"✅ Dati arricchiti salvati: {output_csv}")
+    return df_arricchito
+
+@esecuzione('arricchimento')
+def main():
+    print("="*70)
+    print("📅 ARRICCHIMENTO TURNI - DATE, GIORNI E FESTIVITÀ")
+    print("="*70)
+    
+    base_path = BASE_PATH
+    csv_file = base_path / 'turni_completi_52_settimane.csv'
+    if not csv_file.exists():
+        print("❌ Errore: Esegui prima extract_turni_completo.py!")
+        return
+    
+    df = carica_turni(csv_file, colonne_originali(csv_file))
+    print(f"\n✅ Dati caricati: {len(df)} turni")
+    salva_turni_arricchiti(df, base_path)
+
+if __name__ == '__main__':
+    main()
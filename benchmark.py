@@ -0,0 +1,1309 @@
+#!/usr/bin/env python3
+"""
+Benchmark delle parti critiche della pipeline turni
+Ogni misura gira in un processo separato, così tempo e memoria di picco
+non sono falsati dalle misure precedenti
+
+Uso:
+    python3 benchmark.py pdf [--pagine 200]
+    python3 benchmark.py calendario [--anni 1 5 20]
+    python3 benchmark.py permutazioni [--permutazioni 100000 --workers 1 4]
+    python3 benchmark.py archivio [--righe 500000]
+    python3 benchmark.py server [--client 8 --richieste 200]
+    python3 benchmark.py metriche [--righe 1000000 --staff 6 60]
+    python3 benchmark.py nomi [--file 100 10000 --scansioni 20]
+    python3 benchmark.py scala [--fattori 10 100 1000 --salta-report]
+"""
+
+import argparse
+import calendar
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+from genera_dati_sintetici import ANNO_INIZIO, genera_pdf_rota_sintetico, genera_turni_sintetici
+from strumentazione import rss_picco_mb
+
+# ============================================================
+# MISURE
+# ============================================================
+
+def _esegui_misura(funzione, args, traccia_python, importa=()):
+    # I moduli pesanti (pandas, pyarrow...) si importano fuori dalla misura
+    for modulo in importa:
+        __import__(modulo)
+    if traccia_python:
+        tracemalloc.start()
+    inizio = time.perf_counter()
+    risultato = funzione(*args)
+    durata = time.perf_counter() - inizio
+    picco_python = None
+    if traccia_python:
+        picco_python = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+    return {
+        'tempo_s': durata,
+        'rss_picco_mb': rss_picco_mb(),
+        'picco_python_mb': picco_python,
+        'risultato': risultato
+    }
+
+def misura(funzione, *args, traccia_python=False, importa=()):
+    """Esegue funzione(*args) in un processo nuovo (spawn) e ne misura tempo e memoria.
+    
+    Con traccia_python=True misura anche il picco di memoria allocata da Python
+    (tracemalloc), che però rallenta l'esecuzione: il tempo va letto dalla
+    misura senza tracciamento. I moduli in importa vengono caricati prima di
+    far partire il cronometro.
+    """
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as ex:
+        return ex.submit(_esegui_misura, funzione, args, traccia_python, importa).result()
+
+def stampa_tabella(righe, colonne):
+    larghezze = [max(len(str(c)), *(len(str(r.get(c, ''))) for r in righe)) for c in colonne]
+    print("   " + "  ".join(f"{c:>{w}}" for c, w in zip(colonne, larghezze)))
+    for r in righe:
+        print("   " + "  ".join(f"{str(r.get(c, '')):>{w}}" for c, w in zip(colonne, larghezze)))
+
+# ============================================================
+# BENCHMARK: ESTRAZIONE PDF
+# ============================================================
+
+def _righe_pdf_concatenando(pdf_path):
+    """Solo lettura testo, vecchio metodo: testo intero + lista di tutte le righe"""
+    import PyPDF2
+    text = ""
+    with open(pdf_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        for page in reader.pages:
+            text += page.extract_text()
+    return len(text.split('\n'))
+
+def _righe_pdf_streaming(pdf_path):
+    """Solo lettura testo, nuovo metodo: una riga alla volta"""
+    from lettura_pdf import iter_righe_pdf
+    return sum(1 for _ in iter_righe_pdf(pdf_path))
+
+def _estrai_pdf_concatenando(pdf_path):
+    """Vecchio metodo: text += page.extract_text(), poi split dell'intero testo"""
+    import PyPDF2
+    from extract_turni_completo import extract_turni_dettagliati
+    text = ""
+    with open(pdf_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        for page in reader.pages:
+            text += page.extract_text()
+    turni = extract_turni_dettagliati(text, {'file': Path(pdf_path).name})
+    return len(turni)
+
+def _estrai_pdf_streaming(pdf_path):
+    """Nuovo metodo: righe prodotte pagina per pagina e consumate subito"""
+    from lettura_pdf import iter_righe_pdf
+    from extract_turni_completo import extract_turni_dettagliati
+    turni = extract_turni_dettagliati(iter_righe_pdf(pdf_path), {'file': Path(pdf_path).name})
+    return len(turni)
+
+def benchmark_pdf(args):
+    print("="*70)
+    print(f"📄 BENCHMARK ESTRAZIONE PDF - {args.pagine} pagine sintetiche")
+    print("="*70)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = Path(tmp) / 'ROTA 1 mod1_010125-070125 - SINTETICO.pdf'
+        genera_pdf_rota_sintetico(pdf_path, pagine=args.pagine, righe_per_pagina=args.righe)
+        print(f"\nPDF generato: {pdf_path.stat().st_size / 1024:.0f} KB, "
+              f"{args.pagine} pagine x {args.righe} righe")
+        
+        risultati = []
+        for fase, metodo, funzione in [
+                ('solo testo', 'concatenazione', _righe_pdf_concatenando),
+                ('solo testo', 'streaming', _righe_pdf_streaming),
+                ('testo+turni', 'concatenazione', _estrai_pdf_concatenando),
+                ('testo+turni', 'streaming', _estrai_pdf_streaming)]:
+            tempi = [misura(funzione, pdf_path) for _ in range(args.ripetizioni)]
+            tracciata = misura(funzione, pdf_path, traccia_python=True)
+            risultati.append({
+                'fase': fase,
+                'metodo': metodo,
+                'righe/turni': tempi[0]['risultato'],
+                'tempo_s': f"{min(t['tempo_s'] for t in tempi):.3f}",
+                'rss_picco_mb': f"{max(t['rss_picco_mb'] for t in tempi):.1f}",
+                'picco_python_mb': f"{tracciata['picco_python_mb']:.2f}",
+            })
+    
+    print()
+    stampa_tabella(risultati, ['fase', 'metodo', 'righe/turni', 'tempo_s',
+                               'rss_picco_mb', 'picco_python_mb'])
+    if any(risultati[i]['righe/turni'] != risultati[i + 1]['righe/turni'] for i in (0, 2)):
+        print("\n❌ I due metodi hanno prodotto un output diverso!")
+    else:
+        print("\n✅ Stesso output con entrambi i metodi")
+    print("   tempo_s: migliore di", args.ripetizioni, "ripetizioni | "
+          "picco_python_mb: memoria allocata da Python (tracemalloc)")
+
+# ============================================================
+# BENCHMARK: CALENDARIO ANNO
+# ============================================================
+
+def calendario_loop_riferimento(df, festivita):
+    """Vecchio genera_calendario_anno_completo (loop settimana x giorno x staff), per confronto"""
+    import pandas as pd
+    from datetime import timedelta
+    from analisi_hr_anno_completo import parse_date_from_filename
+    
+    calendario = []
+    staff_set = set(df['staff'].unique())
+    for settimana in sorted(df['settimana'].dropna().unique()):
+        df_sett = df[df['settimana'] == settimana]
+        row = df_sett.iloc[0]
+        start, end = parse_date_from_filename(row['data_inizio'], row['data_fine'])
+        if start and end:
+            current = start
+            day_num = 0
+            while current <= end and day_num < 7:
+                data_str = current.strftime('%Y-%m-%d')
+                for staff in staff_set:
+                    df_staff_day = df_sett[df_sett['staff'] == staff]
+                    if len(df_staff_day) > 0:
+                        turno_info = df_staff_day.iloc[0]
+                        calendario.append({
+                            'data': data_str,
+                            'data_formattata': current.strftime('%d/%m/%Y'),
+                            'anno': current.year,
+                            'mese': current.month,
+                            'giorno_mese': current.day,
+                            'giorno_settimana': calendar.day_name[current.weekday()],
+                            'numero_settimana': int(settimana),
+                            'staff': staff,
+                            'tipo_turno': turno_info['tipo_turno'],
+                            'ore_lavoro': turno_info['ore_lavoro'],
+                            'ora_entrata': turno_info['ora_entrata'],
+                            'ora_uscita': turno_info['ora_uscita'],
+                            'is_festivo': data_str in festivita,
+                            'nome_festivo': festivita.get(data_str, ''),
+                            'is_weekend': current.weekday() >= 5,
+                            'is_lavorato': turno_info['tipo_turno'] == 'NORMALE',
+                            'is_riposo': turno_info['tipo_turno'] in ['RIPO', 'RDOM'],
+                            'is_ferie': turno_info['tipo_turno'] == 'FERIOR',
+                            'is_off': turno_info['tipo_turno'] in ['OFF', 'CHIUSO']
+                        })
+                current += timedelta(days=1)
+                day_num += 1
+    df_cal = pd.DataFrame(calendario)
+    df_cal['data_dt'] = pd.to_datetime(df_cal['data'])
+    return df_cal
+
+def _settimane_di_seguito(df):
+    """Settimane numerate di seguito sugli anni (1..52*anni) invece di ripartire da 1 ogni anno.
+    
+    Per misurare le routine di un anno solo (calendario, finestre) sul volume
+    di più anni: con i numeri ISO le settimane di anni diversi si fonderebbero.
+    """
+    import pandas as pd
+    inizio = pd.to_datetime(df['data_inizio'].astype(str).str.zfill(6), format='%d%m%y')
+    return df.assign(settimana=(inizio - inizio.min()).dt.days // 7 + 1)
+
+def _cronometra(funzione, *args):
+    """Tempo di esecuzione in processo, zittendo le stampe della funzione"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        inizio = time.perf_counter()
+        risultato = funzione(*args)
+        return time.perf_counter() - inizio, risultato
+
+def benchmark_calendario(args):
+    import pandas as pd
+    from analisi_hr_anno_completo import genera_calendario_anno_completo
+    from festivita import festivita
+    
+    print("="*70)
+    print("📅 BENCHMARK CALENDARIO - loop vs vettoriale")
+    print("="*70)
+    
+    risultati = []
+    for anni in args.anni:
+        df = _settimane_di_seguito(genera_turni_sintetici(anni=anni, n_staff=args.staff))
+        t_vett, cal_vett = _cronometra(genera_calendario_anno_completo, df)
+        riga = {'anni': anni, 'turni': len(df), 'righe_calendario': len(cal_vett),
+                'vettoriale_s': f"{t_vett:.3f}"}
+        if anni <= args.max_anni_loop:
+            # Il vecchio loop con un dict 'YYYY-MM-DD' -> nome esteso a tutti gli anni sintetici
+            festivi = festivita(range(2025, 2026 + anni))
+            t_loop, cal_loop = _cronometra(calendario_loop_riferimento, df, festivi)
+            chiave = ['data', 'staff']
+            pd.testing.assert_frame_equal(
+                cal_loop.sort_values(chiave).reset_index(drop=True),
+                cal_vett.sort_values(chiave).reset_index(drop=True),
+                check_dtype=False)
+            riga['loop_s'] = f"{t_loop:.3f}"
+            riga['speedup'] = f"{t_loop / t_vett:.0f}x"
+        else:
+            riga['loop_s'] = riga['speedup'] = 'saltato'
+        risultati.append(riga)
+    
+    print()
+    stampa_tabella(risultati, ['anni', 'turni', 'righe_calendario', 'loop_s', 'vettoriale_s', 'speedup'])
+    print("\n✅ Stesso calendario (stesse righe e colonne) con entrambi i metodi")
+
+def _festivi_dict_riferimento(date, festivita):
+    """Vecchio is_festivo: data formattata come stringa e cercata nelle chiavi del dict"""
+    return date.dt.strftime('%Y-%m-%d').isin(festivita.keys()).to_numpy()
+
+def benchmark_festivita(args):
+    import numpy as np
+    import pandas as pd
+    from festivita import festivita, is_festivo
+    
+    print("="*70)
+    print("🎄 BENCHMARK FESTIVITÀ - dict di stringhe vs np.isin su datetime64")
+    print("="*70)
+    
+    rng = np.random.default_rng(0)
+    risultati = []
+    for righe in args.righe:
+        giorni = rng.integers(0, 365 * args.anni, righe)
+        date = pd.Series(pd.Timestamp('2025-01-01') + pd.to_timedelta(giorni, unit='D'))
+        festivi = festivita(range(2025, 2026 + args.anni))
+        
+        t_dict, atteso = _cronometra(_festivi_dict_riferimento, date, festivi)
+        t_isin, calcolato = _cronometra(is_festivo, date)
+        assert (atteso == calcolato).all()
+        risultati.append({
+            'righe': f"{righe:,}",
+            'anni': args.anni,
+            'dict_s': f"{t_dict:.3f}",
+            'isin_s': f"{t_isin:.3f}",
+            'speedup': f"{t_dict / t_isin:.0f}x"
+        })
+    
+    print()
+    stampa_tabella(risultati, ['righe', 'anni', 'dict_s', 'isin_s', 'speedup'])
+    print("\n✅ Stessi giorni festivi con entrambi i metodi")
+
+# ============================================================
+# BENCHMARK: TEST DI PERMUTAZIONE
+# ============================================================
+
+def benchmark_permutazioni(args):
+    import pandas as pd
+    from analisi_statistica_manipolazione import test_permutazioni_favoritismo
+    
+    print("="*70)
+    print("🎲 BENCHMARK TEST DI PERMUTAZIONE - un anno sintetico")
+    print("="*70)
+    
+    df = genera_turni_sintetici(anni=1, n_staff=args.staff)
+    print(f"\n📄 Turni: {len(df)} | Staff: {args.staff} | Permutazioni: {args.permutazioni}")
+    
+    risultati = []
+    precedente = None
+    for workers in args.workers:
+        t, df_perm = _cronometra(test_permutazioni_favoritismo, df, args.permutazioni, args.seed, workers)
+        # Stesso seed -> stessi p-value qualunque sia il numero di worker
+        if precedente is not None:
+            pd.testing.assert_frame_equal(precedente, df_perm)
+        precedente = df_perm
+        risultati.append({
+            'worker': workers,
+            'tempo_s': f"{t:.2f}",
+            'permutazioni_s': f"{args.permutazioni / t:,.0f}"
+        })
+    
+    print()
+    stampa_tabella(risultati, ['worker', 'tempo_s', 'permutazioni_s'])
+    print("\n✅ P-value identici con qualsiasi numero di worker (stesso seed)")
+
+# ============================================================
+# BENCHMARK: ARCHIVIO CSV vs PARQUET
+# ============================================================
+
+def _carica_csv(csv_path):
+    import pandas as pd
+    from archivio_turni import memoria_mb
+    df = pd.read_csv(csv_path)
+    return len(df.columns), memoria_mb(df)
+
+def _carica_archivio(csv_path, colonne, categorie):
+    from archivio_turni import carica_turni, memoria_mb
+    df = carica_turni(csv_path, colonne, categorie=categorie)
+    return len(df.columns), memoria_mb(df)
+
+def benchmark_archivio(args):
+    import math
+    from archivio_turni import PARQUET_DISPONIBILE, salva_turni, colonne_originali, percorso_parquet
+    
+    print("="*70)
+    print("🗄️  BENCHMARK ARCHIVIO - CSV vs Parquet")
+    print("="*70)
+    
+    if not PARQUET_DISPONIBILE:
+        print("❌ pyarrow non installato: il benchmark Parquet non è eseguibile")
+        return
+    
+    anni = math.ceil(args.righe / (364 * args.staff))
+    df = genera_turni_sintetici(anni=anni, n_staff=args.staff).head(args.righe)
+    # Formato come turni_completi_52_settimane: data DD/MM/YY e riga PDF completa
+    df['data_rota'] = df['data_rota'].str[:6] + df['data_rota'].str[8:]
+    df['linea_completa'] = (df['staff'] + ' ' + df['ora_entrata'].fillna('') + '-'
+                            + df['ora_uscita'].fillna('') + ' ' + df['tipo_turno']
+                            + ' REPARTO ACCETTAZIONE TURNO ASSEGNATO DA ROTA SETTIMANALE')
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(tmp) / 'turni_completi_52_settimane.csv'
+        salva_turni(df, csv_path)
+        print(f"\n📄 Righe: {len(df):,} | CSV: {csv_path.stat().st_size / 1e6:.1f} MB"
+              f" | Parquet: {percorso_parquet(csv_path).stat().st_size / 1e6:.1f} MB")
+        
+        tutte = colonne_originali(csv_path)
+        analisi = ['settimana', 'data_inizio', 'data_fine', 'staff', 'tipo_turno',
+                   'ore_lavoro', 'entrata_min', 'uscita_min', 'data_rota_dt']
+        casi = [
+            ('CSV (read_csv)', _carica_csv, (csv_path,)),
+            ('Parquet, tutte le colonne', _carica_archivio, (csv_path, tutte, False)),
+            ('Parquet, tutte, categorie', _carica_archivio, (csv_path, tutte, True)),
+            ('Parquet, colonne analisi', _carica_archivio, (csv_path, analisi, True)),
+        ]
+        
+        risultati = []
+        for nome, funzione, argomenti in casi:
+            m = min((misura(funzione, *argomenti, importa=('pandas', 'pyarrow.parquet', 'archivio_turni'))
+                     for _ in range(args.ripetizioni)),
+                    key=lambda r: r['tempo_s'])
+            n_colonne, memoria = m['risultato']
+            risultati.append({
+                'caricamento': nome,
+                'colonne': n_colonne,
+                'tempo_s': f"{m['tempo_s']:.3f}",
+                'dataframe_mb': f"{memoria:.1f}",
+                'rss_picco_mb': f"{m['rss_picco_mb']:.0f}"
+            })
+    
+    print()
+    stampa_tabella(risultati, ['caricamento', 'colonne', 'tempo_s', 'dataframe_mb', 'rss_picco_mb'])
+
+# ============================================================
+# BENCHMARK: SERVER HTTP (LOAD TEST)
+# ============================================================
+
+def _porta_libera():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def _avvia_server(porta, originale):
+    """Avvia server.py in un processo separato e attende che accetti connessioni"""
+    comando = [sys.executable, str(Path(__file__).parent / 'server.py'), '--porta', str(porta)]
+    if originale:
+        comando.append('--originale')
+    processo = subprocess.Popen(comando, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    scadenza = time.monotonic() + 30
+    while time.monotonic() < scadenza:
+        try:
+            socket.create_connection(('127.0.0.1', porta), timeout=0.2).close()
+            return processo
+        except OSError:
+            time.sleep(0.05)
+    processo.kill()
+    raise RuntimeError("server.py non risponde")
+
+def _client_http(porta, percorsi, richieste, intestazioni, revalida, latenze, byte_ricevuti):
+    """Un client con connessione persistente (riaperta se il server la chiude)"""
+    import http.client
+    conn = http.client.HTTPConnection('127.0.0.1', porta, timeout=30)
+    etag = {}
+    for i in range(richieste):
+        percorso = percorsi[i % len(percorsi)]
+        header = dict(intestazioni)
+        if revalida and percorso in etag:
+            header['If-None-Match'] = etag[percorso]
+        inizio = time.perf_counter()
+        conn.request('GET', percorso, headers=header)
+        risposta = conn.getresponse()
+        corpo = risposta.read()
+        latenze.append(time.perf_counter() - inizio)
+        byte_ricevuti.append(len(corpo))
+        if risposta.getheader('ETag'):
+            etag[percorso] = risposta.getheader('ETag')
+    conn.close()
+
+def _carico_http(porta, percorsi, n_client, richieste, intestazioni, revalida):
+    latenze, byte_ricevuti = [], []
+    thread = [threading.Thread(target=_client_http,
+                               args=(porta, percorsi, richieste, intestazioni, revalida, latenze, byte_ricevuti))
+              for _ in range(n_client)]
+    inizio = time.perf_counter()
+    for t in thread:
+        t.start()
+    for t in thread:
+        t.join()
+    durata = time.perf_counter() - inizio
+    
+    latenze.sort()
+    percentile = lambda p: latenze[min(len(latenze) - 1, int(p * len(latenze)))] * 1000
+    return {
+        'richieste_s': f"{len(latenze) / durata:,.0f}",
+        'p50_ms': f"{percentile(0.50):.1f}",
+        'p99_ms': f"{percentile(0.99):.1f}",
+        'mb_trasferiti': f"{sum(byte_ricevuti) / 1e6:.1f}"
+    }
+
+def benchmark_server(args):
+    print("="*70)
+    print("🌐 BENCHMARK SERVER HTTP - dashboard + dati_web.csv")
+    print("="*70)
+    
+    percorsi = ['/dati_web.csv', '/dashboard_completa.html']
+    compressione = {'Accept-Encoding': 'gzip, deflate, br'}
+    casi = [
+        ('originale (1 thread, HTTP/1.0)', True, compressione, False),
+        ('threaded keep-alive + compressi', False, compressione, False),
+        ('keep-alive + rivalidazione 304', False, compressione, True),
+    ]
+    print(f"\n📄 File: {', '.join(percorsi)} | Client: {args.client} | Richieste per client: {args.richieste}")
+    
+    risultati = []
+    for nome, originale, intestazioni, revalida in casi:
+        porta = _porta_libera()
+        processo = _avvia_server(porta, originale)
+        try:
+            # Riscaldamento: varianti compresse e cache ETag già pronte
+            _carico_http(porta, percorsi, 1, len(percorsi), intestazioni, False)
+            risultato = _carico_http(porta, percorsi, args.client, args.richieste, intestazioni, revalida)
+        finally:
+            processo.terminate()
+            processo.wait()
+        risultati.append({'server': nome, **risultato})
+    
+    print()
+    stampa_tabella(risultati, ['server', 'richieste_s', 'p50_ms', 'p99_ms', 'mb_trasferiti'])
+
+# ============================================================
+# BENCHMARK: METRICHE PER STAFF
+# ============================================================
+
+def metriche_loop_riferimento(df):
+    """Vecchio calcolo delle metriche (un filtro per staff e per tipo turno), per confronto"""
+    import pandas as pd
+    
+    metriche = {}
+    for staff in sorted(df['staff'].unique()):
+        df_staff = df[df['staff'] == staff]
+        lavorato = df_staff['tipo_turno'] == 'NORMALE'
+        ore = df_staff[df_staff['ore_lavoro'].notna()]['ore_lavoro']
+        metriche[staff] = {
+            'turni_totali': len(df_staff),
+            'turni_normali': len(df_staff[lavorato]),
+            'riposi': len(df_staff[df_staff['tipo_turno'].isin(['RIPO', 'RDOM'])]),
+            'ferie': len(df_staff[df_staff['tipo_turno'] == 'FERIOR']),
+            'off': len(df_staff[df_staff['tipo_turno'].isin(['OFF', 'CHIUSO'])]),
+            'weekend_lavorati': df_staff[df_staff['is_weekend'] & lavorato].shape[0],
+            'festivi_lavorati': df_staff[df_staff['is_festivo'] & lavorato].shape[0],
+            'ore_totali': ore.sum(),
+            'ore_media': ore.mean()
+        }
+    return pd.DataFrame(metriche).T
+
+def benchmark_metriche(args):
+    import pandas as pd
+    from metriche import metriche_staff
+    from festivita import is_festivo
+    
+    print("="*70)
+    print("📊 BENCHMARK METRICHE PER STAFF - filtri per staff vs groupby unico")
+    print("="*70)
+    
+    risultati = []
+    for n_staff in args.staff:
+        anni = -(-args.righe // (364 * n_staff))
+        df = genera_turni_sintetici(anni=anni, n_staff=n_staff).head(args.righe)
+        data = pd.to_datetime(df['data_rota'], format='%d/%m/%Y')
+        df['is_weekend'] = data.dt.weekday >= 5
+        df['is_festivo'] = is_festivo(data)
+        
+        t_loop, m_loop = _cronometra(metriche_loop_riferimento, df)
+        t_motore, m_motore = _cronometra(metriche_staff, df)
+        df_cat = df.astype({'staff': 'category', 'tipo_turno': 'category'})
+        t_cat, _ = _cronometra(metriche_staff, df_cat)
+        
+        pd.testing.assert_frame_equal(m_loop.astype(float), m_motore[m_loop.columns].astype(float),
+                                      check_names=False)
+        risultati.append({
+            'righe': f"{len(df):,}",
+            'staff': n_staff,
+            'loop_s': f"{t_loop:.3f}",
+            'groupby_s': f"{t_motore:.3f}",
+            'groupby_categorie_s': f"{t_cat:.3f}",
+            'speedup': f"{t_loop / t_motore:.0f}x"
+        })
+    
+    print()
+    stampa_tabella(risultati, ['righe', 'staff', 'loop_s', 'groupby_s', 'groupby_categorie_s', 'speedup'])
+    print("\n✅ Stesse metriche con entrambi i metodi")
+
+# ============================================================
+# BENCHMARK: FINESTRE DI SETTIMANE
+# ============================================================
+
+def finestre_filtro_riferimento(df, finestre):
+    """Metriche per finestra rifiltrando i turni ogni volta (come gli script per periodo)"""
+    from metriche import metriche_staff
+    
+    return {nome: metriche_staff(df[df['settimana'].between(da, a)])
+            for nome, (da, a) in finestre.items()}
+
+def finestre_cumulate(motore, finestre):
+    return {nome: motore.metriche(da, a, solo_presenti=True) for nome, (da, a) in finestre.items()}
+
+def benchmark_finestre(args):
+    import pandas as pd
+    from finestre import FinestreSettimane
+    
+    print("="*70)
+    print("📊 BENCHMARK FINESTRE - filtro per finestra vs somme cumulate staff x settimana")
+    print("="*70)
+    
+    risultati = []
+    for anni in args.anni:
+        df = _settimane_di_seguito(genera_turni_sintetici(anni=anni, n_staff=args.staff))
+        t_pre, motore = _cronometra(FinestreSettimane, df)
+        
+        for ampiezza in args.ampiezze:
+            finestre = motore.mobili(ampiezza)
+            t_filtro, m_filtro = _cronometra(finestre_filtro_riferimento, df, finestre)
+            t_cum, m_cum = _cronometra(finestre_cumulate, motore, finestre)
+            t_cv, _ = _cronometra(motore.equita, finestre)
+            
+            for nome in finestre:
+                pd.testing.assert_frame_equal(m_filtro[nome], m_cum[nome], check_dtype=False)
+            risultati.append({
+                'righe': f"{len(df):,}",
+                'ampiezza': ampiezza,
+                'finestre': len(finestre),
+                'filtro_s': f"{t_filtro:.3f}",
+                'precalcolo_s': f"{t_pre:.3f}",
+                'cumulate_s': f"{t_cum:.3f}",
+                'cv_tutte_s': f"{t_cv:.4f}",
+                'speedup': f"{t_filtro / (t_pre + t_cum):.0f}x"
+            })
+    
+    print()
+    stampa_tabella(risultati, ['righe', 'ampiezza', 'finestre', 'filtro_s', 'precalcolo_s',
+                               'cumulate_s', 'cv_tutte_s', 'speedup'])
+    print("\n✅ Stesse metriche per ogni finestra con entrambi i metodi")
+
+# ============================================================
+# BENCHMARK: REPORT EXCEL
+# ============================================================
+
+def _fogli_report(df):
+    """Fogli del benchmark report: (nome, funzione che prepara il DataFrame, index)"""
+    def calendario():
+        export = df.sort_values(['staff', 'data_dt'])
+        export['data_dt'] = export['data_dt'].dt.strftime('%d/%m/%Y')
+        return export
+
+    def ore_settimana():
+        return df.pivot_table(values='ore_lavoro', index='staff', columns='settimana',
+                              aggfunc='sum', fill_value=0).round(1)
+
+    def tipi():
+        return df['tipo_turno'].value_counts().to_frame('Conteggio')
+    
+    return [('Calendario Anno', calendario, False), ('Ore per Settimana', ore_settimana, True),
+            ('Tipologie Turno', tipi, True), ('Dati Completi', lambda: df, False)]
+
+def _report_excelwriter(pickle_path, output):
+    import pandas as pd
+    df = pd.read_pickle(pickle_path)
+    rss_dati = rss_picco_mb()
+    inizio = time.perf_counter()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        for nome, prepara, index in _fogli_report(df):
+            prepara().to_excel(writer, sheet_name=nome, index=index)
+    return time.perf_counter() - inizio, rss_dati, Path(output).stat().st_size
+
+def _report_streaming(pickle_path, output, workers):
+    import pandas as pd
+    from report_excel import ReportExcel
+    df = pd.read_pickle(pickle_path)
+    rss_dati = rss_picco_mb()
+    inizio = time.perf_counter()
+    with ReportExcel(output, workers=workers) as report:
+        for nome, prepara, index in _fogli_report(df):
+            report.scrivi(prepara, sheet_name=nome, index=index)
+    return time.perf_counter() - inizio, rss_dati, Path(output).stat().st_size
+
+def benchmark_report(args):
+    import math
+    import pandas as pd
+    
+    print("="*70)
+    print("📄 BENCHMARK REPORT EXCEL - pd.ExcelWriter vs scrittura in streaming")
+    print("="*70)
+    
+    anni = math.ceil(args.righe / (364 * args.staff))
+    df = genera_turni_sintetici(anni=anni, n_staff=args.staff).head(args.righe)
+    df['data_dt'] = pd.to_datetime(df['data_rota'], format='%d/%m/%Y')
+    df['linea_completa'] = (df['staff'] + ' ' + df['ora_entrata'].fillna('') + '-'
+                            + df['ora_uscita'].fillna('') + ' ' + df['tipo_turno']
+                            + ' REPARTO ACCETTAZIONE TURNO ASSEGNATO DA ROTA SETTIMANALE')
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        pickle_path = Path(tmp) / 'calendario.pkl'
+        df.to_pickle(pickle_path)
+        print(f"\n📋 Calendario: {len(df):,} righe x {df.shape[1]} colonne")
+        
+        casi = [('streaming, sequenziale', _report_streaming, (1,))]
+        casi += [(f'streaming, {w} thread', _report_streaming, (w,)) for w in args.workers if w > 1]
+        if not args.salta_excelwriter:
+            casi.insert(0, ('pd.ExcelWriter (openpyxl)', _report_excelwriter, ()))
+        
+        risultati = []
+        for nome, funzione, extra in casi:
+            output = Path(tmp) / 'report.xlsx'
+            m = misura(funzione, pickle_path, output, *extra, importa=('pandas', 'openpyxl'))
+            tempo, rss_dati, dimensione = m['risultato']
+            risultati.append({
+                'writer': nome,
+                'tempo_s': f"{tempo:.1f}",
+                'rss_picco_mb': f"{m['rss_picco_mb']:.0f}",
+                'rss_report_mb': f"{m['rss_picco_mb'] - rss_dati:.0f}",
+                'xlsx_mb': f"{dimensione / 1e6:.1f}"
+            })
+    
+    print()
+    stampa_tabella(risultati, ['writer', 'tempo_s', 'rss_picco_mb', 'rss_report_mb', 'xlsx_mb'])
+    print("\n   rss_report_mb: memoria di picco oltre quella dei dati caricati")
+
+# ============================================================
+# BENCHMARK: ANONIMIZZAZIONE
+# ============================================================
+
+def censura_loop_riferimento(serie, mappa):
+    """Vecchia censura: apply cella per cella con un str.replace per nome"""
+    import pandas as pd
+
+    def censura(testo):
+        if pd.isna(testo):
+            return testo
+        testo = str(testo)
+        for nome, codice in mappa.items():
+            testo = testo.replace(nome, codice)
+        return testo
+    return serie.apply(censura)
+
+def _nomi_sintetici(n, seed=0):
+    rng = random.Random(seed)
+    nomi = set()
+    while len(nomi) < n:
+        nomi.add(''.join(rng.choice('ABCDEFGILMNOPRSTUVZ') for _ in range(rng.randint(5, 10))))
+    return sorted(nomi)
+
+def benchmark_censura(args):
+    import re
+    import numpy as np
+    import pandas as pd
+    from anonimizzazione import MAPPA_COGNOMI, Anonimizzatore
+    
+    print("="*70)
+    print("🔒 BENCHMARK ANONIMIZZAZIONE - apply + str.replace vs regex unica")
+    print("="*70)
+    
+    rng = np.random.default_rng(0)
+    risultati = []
+    for n_nomi in args.nomi:
+        mappa = dict(MAPPA_COGNOMI) if n_nomi <= len(MAPPA_COGNOMI) else {
+            nome: nome[:3] + str(i) for i, nome in enumerate(_nomi_sintetici(n_nomi))}
+        nomi = np.array(list(mappa))
+        staff = nomi[rng.integers(0, len(nomi), args.righe)]
+        # Righe PDF quasi tutte diverse (orari e giorno), con il nome dentro
+        serie = pd.Series(staff.astype(object) + ' ' + rng.integers(4, 14, args.righe).astype(str)
+                          + ':30 NORMALE GIORNO ' + rng.integers(0, 5000, args.righe).astype(str))
+        
+        trie = Anonimizzatore(mappa)
+        semplice = Anonimizzatore(mappa)
+        semplice.regex = re.compile('|'.join(re.escape(n) for n in sorted(mappa, key=len, reverse=True)))
+        
+        t_trie, censurata = _cronometra(trie.serie, serie)
+        t_semplice = t_loop = None
+        if n_nomi <= args.max_nomi_lenti:
+            t_semplice, _ = _cronometra(semplice.serie, serie)
+            t_loop, riferimento = _cronometra(censura_loop_riferimento, serie, mappa)
+            assert riferimento.tolist() == censurata.tolist()
+        t_verifica, residui = _cronometra(trie.residui, censurata.to_frame('linea_completa'))
+        assert not residui
+        
+        risultati.append({
+            'righe': f"{len(serie):,}",
+            'nomi': len(mappa),
+            'apply_s': f"{t_loop:.2f}" if t_loop is not None else '-',
+            'alternativa_s': f"{t_semplice:.2f}" if t_semplice is not None else '-',
+            'trie_s': f"{t_trie:.2f}",
+            'verifica_s': f"{t_verifica:.2f}"
+        })
+    
+    print()
+    stampa_tabella(risultati, ['righe', 'nomi', 'apply_s', 'alternativa_s', 'trie_s', 'verifica_s'])
+    print("\n✅ Stesso risultato del vecchio apply dove eseguito; nessun nome residuo")
+
+def _censura_csv_in_memoria(sorgente, destinazioni):
+    """Vecchio flusso: ogni file caricato intero, censurato, riscritto e riletto per la verifica"""
+    import pandas as pd
+    from anonimizzazione import Anonimizzatore, colonne_testo
+    anonimizzatore = Anonimizzatore()
+    for destinazione in destinazioni:
+        df = pd.read_csv(sorgente if destinazione == destinazioni[0] else destinazione)
+        for col in colonne_testo(df):
+            df[col] = anonimizzatore.serie(df[col])
+        df.to_csv(destinazione, index=False)
+    return anonimizzatore.residui(pd.read_csv(destinazioni[0]))
+
+def _censura_csv_streaming(sorgente, destinazioni):
+    from anonimizzazione import Anonimizzatore, anonimizza_csv
+    anonimizzatore = Anonimizzatore()
+    return anonimizza_csv(sorgente, destinazioni, anonimizzatore.dataframe, verifica=anonimizzatore)['residui']
+
+def benchmark_censura_csv(args):
+    import math
+    import shutil
+    
+    print("="*70)
+    print("🔒 BENCHMARK CENSURA CSV - file interi in memoria vs streaming a blocchi")
+    print("="*70)
+    
+    anni = math.ceil(args.righe / (364 * args.staff))
+    df = genera_turni_sintetici(anni=anni, n_staff=args.staff).head(args.righe)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        sorgente = Path(tmp) / 'dati_arricchiti.csv'
+        df.to_csv(sorgente, index=False)
+        print(f"\n📄 CSV: {len(df):,} righe, {sorgente.stat().st_size / 1e6:.1f} MB, due file in uscita")
+        destinazioni = [Path(tmp) / 'dati_web.csv', Path(tmp) / 'dati_arricchiti_censurati.csv']
+        for destinazione in destinazioni:
+            shutil.copy(sorgente, destinazione)
+        
+        risultati = []
+        for nome, funzione in [('in memoria (3 letture)', _censura_csv_in_memoria),
+                               ('streaming (1 lettura)', _censura_csv_streaming)]:
+            m = misura(funzione, sorgente, destinazioni, importa=('pandas', 'anonimizzazione'))
+            assert not m['risultato']
+            risultati.append({
+                'modalità': nome,
+                'tempo_s': f"{m['tempo_s']:.2f}",
+                'rss_picco_mb': f"{m['rss_picco_mb']:.0f}"
+            })
+    
+    print()
+    stampa_tabella(risultati, ['modalità', 'tempo_s', 'rss_picco_mb'])
+
+# ============================================================
+# BENCHMARK: CONFRONTI TRA TUTTE LE COPPIE
+# ============================================================
+
+def confronti_loop_riferimento(df_metriche, metriche, soglia=20):
+    """Vecchio schema esteso a tutte le coppie: doppio ciclo con .loc per staff e metrica"""
+    disparita = {}
+    for staff1 in df_metriche.index:
+        for staff2 in df_metriche.index:
+            conteggio = 0
+            for metrica in metriche:
+                val1 = df_metriche.loc[staff1, metrica]
+                val2 = df_metriche.loc[staff2, metrica]
+                if val2 != 0 and abs((val1 - val2) / val2 * 100) > soglia:
+                    conteggio += 1
+            disparita[(staff1, staff2)] = conteggio
+    return disparita
+
+def benchmark_confronti(args):
+    import numpy as np
+    import pandas as pd
+    from confronti import MatriceConfronti
+    
+    print("="*70)
+    print("🔍 BENCHMARK CONFRONTI - doppio ciclo sulle coppie vs broadcasting N x N x metriche")
+    print("="*70)
+    
+    rng = np.random.default_rng(0)
+    metriche = ['Ore Totali', 'Giorni Lavorati', 'Giorni Riposo', 'Weekend Lavorati', 'Festivi Lavorati']
+    risultati = []
+    for n_staff in args.staff:
+        df_metriche = pd.DataFrame(rng.integers(0, 300, (n_staff, len(metriche))).astype(float),
+                                   index=[f'STAFF{i:04d}' for i in range(n_staff)], columns=metriche)
+
+        def motore():
+            return MatriceConfronti(df_metriche, metriche).disparita()
+        t_matrice, disparita = _cronometra(motore)
+        t_loop = None
+        if n_staff <= args.max_staff_loop:
+            t_loop, riferimento = _cronometra(confronti_loop_riferimento, df_metriche, metriche)
+            assert all(disparita.at[s1, s2] == n for (s1, s2), n in riferimento.items())
+        
+        risultati.append({
+            'staff': n_staff,
+            'coppie': f"{n_staff * (n_staff - 1) // 2:,}",
+            'loop_s': f"{t_loop:.3f}" if t_loop is not None else '-',
+            'matrice_s': f"{t_matrice:.4f}",
+            'speedup': f"{t_loop / t_matrice:.0f}x" if t_loop is not None else '-'
+        })
+    
+    print()
+    stampa_tabella(risultati, ['staff', 'coppie', 'loop_s', 'matrice_s', 'speedup'])
+    print("\n✅ Stessi conteggi di disparità dove eseguito il ciclo")
+
+# ============================================================
+# BENCHMARK: DATASET PARTIZIONATO
+# ============================================================
+
+def _carica_tutto_e_filtra(csv_path, colonne, filtri):
+    """Vecchio schema: tutto lo storico in memoria, poi filtro su sede / anno / settimana"""
+    import numpy as np
+    import pandas as pd
+    from archivio_turni import carica_turni, memoria_mb
+    from dataset_turni import anno_turni, sede_da_file
+    df = carica_turni(csv_path, colonne + [c for c in ['file', 'data_inizio_dt', 'data_rota_dt'] if c not in colonne])
+    maschera = (np.isin(sede_da_file(df['file']), filtri['sedi'])
+                & np.isin(anno_turni(df), filtri['anni'])
+                & pd.to_numeric(df['settimana']).isin(filtri['settimane']).to_numpy())
+    df = df.loc[maschera, colonne].reset_index(drop=True)
+    return len(df), int(pd.util.hash_pandas_object(df).sum()), memoria_mb(df)
+
+def _carica_partizioni(csv_path, colonne, filtri):
+    import pandas as pd
+    from archivio_turni import memoria_mb
+    from dataset_turni import carica_dataset
+    df = carica_dataset(csv_path, colonne, **filtri)
+    return len(df), int(pd.util.hash_pandas_object(df).sum()), memoria_mb(df)
+
+def benchmark_partizioni(args):
+    from archivio_turni import PARQUET_DISPONIBILE, colonne_originali, salva_turni
+    from dataset_turni import salva_partizioni
+    
+    print("="*70)
+    print("🗂️  BENCHMARK DATASET PARTIZIONATO - storico intero + filtro vs partizioni sede/anno/settimana")
+    print("="*70)
+    
+    if not PARQUET_DISPONIBILE:
+        print("❌ pyarrow non installato: il benchmark delle partizioni non è eseguibile")
+        return
+    
+    sedi = ['PISA', 'FIRENZE', 'ROMA', 'MILANO', 'TORINO', 'NAPOLI', 'BOLOGNA', 'VENEZIA'][:args.sedi]
+    df = genera_turni_sintetici(anni=args.anni, n_staff=args.staff, sedi=sedi)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(tmp) / 'turni_completi_52_settimane.csv'
+        salva_turni(df, csv_path)
+        t_scrittura, catalogo = _cronometra(salva_partizioni, df, csv_path)
+        print(f"\n📄 Righe: {len(df):,} | {len(sedi)} sedi x {args.anni} anni | "
+              f"{len(catalogo['partizioni'])} partizioni scritte in {t_scrittura:.2f}s")
+        
+        colonne = colonne_originali(csv_path, escluse=['linea_completa'])
+        query = [
+            ('1 sede, 1 trimestre', {'sedi': [sedi[0]], 'anni': [2025], 'settimane': list(range(1, 14))}),
+            ('1 sede, 1 anno', {'sedi': [sedi[0]], 'anni': [2025], 'settimane': list(range(1, 54))}),
+            ('tutte le sedi, 1 anno', {'sedi': sedi, 'anni': [2025], 'settimane': list(range(1, 54))}),
+        ]
+        
+        risultati = []
+        for nome, filtri in query:
+            importa = ('pandas', 'pyarrow.dataset', 'archivio_turni', 'dataset_turni')
+            m_tutto = misura(_carica_tutto_e_filtra, csv_path, colonne, filtri, importa=importa)
+            m_part = misura(_carica_partizioni, csv_path, colonne, filtri, importa=importa)
+            assert m_tutto['risultato'][:2] == m_part['risultato'][:2]
+            risultati.append({
+                'query': nome,
+                'righe': f"{m_part['risultato'][0]:,}",
+                'storico_s': f"{m_tutto['tempo_s']:.3f}",
+                'storico_rss_mb': f"{m_tutto['rss_picco_mb']:.0f}",
+                'partizioni_s': f"{m_part['tempo_s']:.3f}",
+                'partizioni_rss_mb': f"{m_part['rss_picco_mb']:.0f}",
+                'speedup': f"{m_tutto['tempo_s'] / m_part['tempo_s']:.1f}x"
+            })
+    
+    print()
+    stampa_tabella(risultati, ['query', 'righe', 'storico_s', 'storico_rss_mb',
+                               'partizioni_s', 'partizioni_rss_mb', 'speedup'])
+    print("\n✅ Stesse righe (stesso hash del DataFrame) con entrambi i metodi")
+
+# ============================================================
+# BENCHMARK: NOMI DEI FILE ROTA
+# ============================================================
+
+def parse_filename_riferimento(filename):
+    """Vecchio parse_filename_improved: quattro re.search non compilate a ogni chiamata"""
+    import re
+    patterns = [
+        r'ROTA\s*(\d+)\s*[_\s]*(mod\d+|MOD\d+)?[_\s]*(\d{6})-(\d{6})',
+        r'ROTA\s*(\d+)\s*[_\s]*(mod\d+|MOD\d+)?_(\d+)[-.](\d+)',
+        r'ROTA\s*(\d+)\s*(MOD\d+|mod\d+)?_(\d+)-(\d+)',
+        r'ROTA\s*(\d+)[_\s]+(\d+)',
+    ]
+    week_num = None
+    mod = ""
+    date_start = None
+    date_end = None
+    for pattern in patterns:
+        match = re.search(pattern, filename, re.IGNORECASE)
+        if match:
+            week_num = match.group(1)
+            if len(match.groups()) >= 2 and match.group(2):
+                if 'mod' in match.group(2).lower():
+                    mod = match.group(2).lower()
+            if len(match.groups()) >= 4:
+                date_start = match.group(3)
+                date_end = match.group(4)
+            break
+    if not week_num:
+        simple_match = re.search(r'ROTA\s*(\d+)', filename, re.IGNORECASE)
+        if simple_match:
+            week_num = simple_match.group(1)
+    return {'settimana': week_num, 'modifiche': mod, 'data_inizio': date_start, 'data_fine': date_end}
+
+def nomi_rota_sintetici(n, seed=0):
+    """Nomi di PDF ROTA in tutti i formati dell'archivio, con revisioni modN ripetute per settimana"""
+    rng = random.Random(seed)
+    sedi = ['PISA', 'FIRENZE', 'LIVORNO', 'LUCCA', 'SIENA']
+    nomi = set()
+    while len(nomi) < n:
+        settimana = rng.randint(1, 52)
+        anno = rng.randint(15, 30)
+        mod = rng.choice(['', '', ' mod1', ' mod2', ' MOD3'])
+        giorno, mese = rng.randint(1, 28), rng.randint(1, 12)
+        formato = rng.randrange(4)
+        if formato == 0:
+            corpo = f"ROTA {settimana}{mod}_{giorno:02d}{mese:02d}{anno}-{giorno:02d}{mese:02d}{anno}"
+        elif formato == 1:
+            corpo = f"ROTA {settimana}{mod} _{giorno:02d}.{mese:02d}-{giorno:02d}.{mese:02d}.{anno}"
+        elif formato == 2:
+            corpo = f"ROTA {settimana}_{giorno:02d}{mese:02d}{anno}"
+        else:
+            corpo = f"ROTA {settimana}{mod} {anno}"
+        nomi.add(f"{corpo} - {rng.choice(sedi)}.pdf")
+    return sorted(nomi)
+
+def _scansioni_riferimento(nomi, scansioni):
+    for _ in range(scansioni):
+        risultati = [parse_filename_riferimento(nome) for nome in nomi]
+    return risultati
+
+def _scansioni_memoizzate(nomi, scansioni):
+    from nomi_rota import analizza_nome_file
+    for _ in range(scansioni):
+        risultati = [analizza_nome_file(nome) for nome in nomi]
+    return risultati
+
+def benchmark_nomi(args):
+    from nomi_rota import _analizza, seleziona_revisioni
+    
+    print("="*70)
+    print("📂 BENCHMARK NOMI FILE - re.search a ogni chiamata vs pattern compilati + cache")
+    print("="*70)
+    
+    risultati = []
+    for n in args.file:
+        nomi = nomi_rota_sintetici(n)
+        t_rif, atteso = _cronometra(_scansioni_riferimento, nomi, args.scansioni)
+        _analizza.cache_clear()
+        t_fredda, calcolato = _cronometra(_scansioni_memoizzate, nomi, 1)
+        t_calda, calcolato = _cronometra(_scansioni_memoizzate, nomi, args.scansioni)
+        assert atteso == calcolato
+        t_sel, (scelti, superati) = _cronometra(seleziona_revisioni, nomi)
+        risultati.append({
+            'file': f"{n:,}",
+            'scansioni': args.scansioni,
+            'riferimento_s': f"{t_rif:.3f}",
+            'prima_s': f"{t_fredda:.3f}",
+            'in_cache_s': f"{t_calda:.3f}",
+            'speedup': f"{t_rif / t_calda:.0f}x",
+            'superati': f"{len(superati):,}",
+            'selezione_s': f"{t_sel:.3f}"
+        })
+    
+    print()
+    stampa_tabella(risultati, ['file', 'scansioni', 'riferimento_s', 'prima_s', 'in_cache_s',
+                               'speedup', 'superati', 'selezione_s'])
+    print("\n✅ Stessi settimana, modifiche e date del vecchio parser per ogni nome")
+
+# ============================================================
+# BENCHMARK: SCALABILITÀ DELLA PIPELINE
+# ============================================================
+
+# Volume di oggi: una sede, 6 staff, un anno di turni
+STAFF_ATTUALE = 6
+
+STORICO_SCALA = Path(__file__).resolve().parent / 'benchmark_storico.jsonl'
+
+# Fasi delle pipeline: (nome, funzione(modulo, stato) -> nuove voci dello stato).
+# Ogni fase lavora sui risultati delle precedenti, come nel main() dello script
+PIPELINE_SCALA = {
+    'estrazione': ('extract_turni_completo', [
+        ('estrai_pdf', lambda m, s: m.main(['--no-cache']) or {}),
+    ]),
+    'anno_completo': ('analisi_hr_anno_completo', [
+        ('carica', lambda m, s: {'df': m.load_data()}),
+        ('calendario', lambda m, s: {'cal': m.genera_calendario_anno_completo(s['df'])}),
+        ('festivi', lambda m, s: {'festivi': m.analisi_festivi_anno_completo(s['cal'])}),
+        ('riposi', lambda m, s: {'riposi': m.analisi_riposi_anno_completo(s['cal'])}),
+        ('equita', lambda m, s: dict(zip(['metriche', 'cv'], m.analisi_equita_anno_completo(s['cal'])))),
+        ('confronti', lambda m, s: {'confronti': m.confronti_dettagliati_anno(s['cal'], s['metriche'])}),
+        ('anomalie', lambda m, s: {'anomalie': m.identifica_anomalie_anno(s['cal'], s['metriche'], s['riposi'])}),
+        ('report', lambda m, s: {'report': m.genera_report_hr_completo(
+            s['df'], s['cal'], s['metriche'], s['festivi'], s['riposi'], s['anomalie'], s['confronti'], s['cv'])}),
+    ]),
+    'manipolazione': ('analisi_statistica_manipolazione', [
+        ('carica', lambda m, s: {'df': m.load_data()}),
+        ('comodita', lambda m, s: {'comfort': m.classifica_turni_comodita(s['df'])}),
+        ('riposi', lambda m, s: {'riposi': m.analisi_riposi_consecutivi_pattern(s['df'])}),
+        ('chi_quadrato', lambda m, s: {'chi': m.test_chi_quadrato_distribuzione(s['df'])}),
+        ('favoritismo', lambda m, s: {'scores': m.calcola_score_favoritismo(s['df'], s['comfort'], s['riposi'])}),
+        ('uniformita', lambda m, s: {'uniformita': m.test_distribuzione_uniforme(s['df'])}),
+        ('report', lambda m, s: {'report': m.genera_report_forense(
+            s['df'], s['comfort'], s['riposi'], s['chi'], s['scores'])}),
+    ]),
+}
+
+def dimensioni_scala(fattore):
+    """Staff e anni per fattore volte il volume di oggi: più staff fino a 10x, poi anche 10 anni di storico"""
+    if fattore < 100:
+        return STAFF_ATTUALE * fattore, 1
+    return max(1, STAFF_ATTUALE * fattore // 10), 10
+
+def _esegui_pipeline(nome, escluse):
+    """Esegue le fasi di una pipeline in questo processo: [(fase, tempo_s, rss_picco_mb)]"""
+    import importlib
+    nome_modulo, fasi = PIPELINE_SCALA[nome]
+    modulo = importlib.import_module(nome_modulo)
+    stato = {}
+    tempi = []
+    for fase, funzione in fasi:
+        if fase in escluse:
+            continue
+        durata, nuovo = _cronometra(funzione, modulo, stato)
+        stato.update(nuovo)
+        # VmHWM è il picco dall'avvio del processo: fino alla fine di questa fase
+        tempi.append((fase, durata, rss_picco_mb()))
+    return tempi
+
+def _commit_corrente():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=Path(__file__).resolve().parent,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def leggi_storico(percorso):
+    """Record del file storico (uno JSON per riga); lista vuota se il file non esiste"""
+    if not percorso.exists():
+        return []
+    with open(percorso, encoding='utf-8') as f:
+        return [json.loads(riga) for riga in f if riga.strip()]
+
+def _precedente(storico, record):
+    """Ultima misura della stessa pipeline, fase e fattore sullo stesso host"""
+    chiave = ('host', 'pipeline', 'fase', 'fattore')
+    for vecchio in reversed(storico):
+        if all(vecchio.get(k) == record[k] for k in chiave):
+            return vecchio
+    return None
+
+def benchmark_scala(args):
+    from archivio_turni import salva_turni
+    from dataset_turni import salva_partizioni
+    from arricchimento import arricchisci_turni
+    from genera_dati_sintetici import genera_pdf_settimane
+    
+    print("="*70)
+    print(f"📈 BENCHMARK SCALABILITÀ - pipeline a {', '.join(f'{f}x' for f in args.fattori)} il volume di oggi")
+    print("="*70)
+    
+    storico = leggi_storico(args.storico)
+    base = {
+        'data': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': _commit_corrente(),
+        'host': socket.gethostname(),
+        'python': platform.python_version(),
+    }
+    escluse = {'report'} if args.salta_report else set()
+    base_path_originale = os.environ.get('ROTA_BASE_PATH')
+    anni_originali = os.environ.get('ROTA_ANNI')
+    
+    risultati = []
+    nuovi = []
+    try:
+        for fattore in args.fattori:
+            n_staff, anni = dimensioni_scala(fattore)
+            df = genera_turni_sintetici(anni=anni, n_staff=n_staff)
+            print(f"\n📊 {fattore}x: {len(df):,} turni ({n_staff} staff x {anni} anni)")
+            
+            for pipeline in args.pipeline:
+                if pipeline == 'estrazione' and fattore > args.max_fattore_pdf:
+                    print(f"   ⏭️  estrazione saltata (oltre --max-fattore-pdf {args.max_fattore_pdf})")
+                    continue
+                with tempfile.TemporaryDirectory() as tmp:
+                    if pipeline == 'estrazione':
+                        genera_pdf_settimane(df, tmp)
+                    else:
+                        csv_path = Path(tmp) / 'turni_completi_52_settimane.csv'
+                        salva_turni(df, csv_path)
+                        salva_partizioni(df, csv_path)
+                        salva_turni(arricchisci_turni(df), Path(tmp) / 'dati_arricchiti.csv')
+                    # Il processo della misura eredita l'ambiente: gli script leggono i dati sintetici.
+                    # Con lo storico di più anni il report HR analizza l'ultimo, come in esercizio
+                    os.environ['ROTA_BASE_PATH'] = tmp
+                    if anni > 1:
+                        os.environ['ROTA_ANNI'] = str(ANNO_INIZIO + anni - 1)
+                    else:
+                        os.environ.pop('ROTA_ANNI', None)
+                    tempi = misura(_esegui_pipeline, pipeline, escluse)['risultato']
+                
+                for fase, tempo_s, rss_mb in tempi:
+                    record = {**base, 'fattore': fattore, 'righe': len(df), 'pipeline': pipeline,
+                              'fase': fase, 'tempo_s': round(tempo_s, 4), 'rss_picco_mb': round(rss_mb, 1)}
+                    precedente = _precedente(storico, record)
+                    riga = {'fattore': f'{fattore}x', 'pipeline': pipeline, 'fase': fase,
+                            'tempo_s': f"{tempo_s:.3f}", 'rss_picco_mb': f"{rss_mb:.0f}"}
+                    if precedente and precedente['tempo_s'] > 0:
+                        delta = (tempo_s / precedente['tempo_s'] - 1) * 100
+                        riga['precedente_s'] = f"{precedente['tempo_s']:.3f}"
+                        riga['delta'] = f"{delta:+.0f}%" + (" ⚠️" if delta > args.soglia_regressione else "")
+                    risultati.append(riga)
+                    nuovi.append(record)
+    finally:
+        for nome, valore in [('ROTA_BASE_PATH', base_path_originale), ('ROTA_ANNI', anni_originali)]:
+            if valore is None:
+                os.environ.pop(nome, None)
+            else:
+                os.environ[nome] = valore
+    
+    print()
+    stampa_tabella(risultati, ['fattore', 'pipeline', 'fase', 'tempo_s', 'rss_picco_mb', 'precedente_s', 'delta'])
+    
+    if nuovi and not args.non_salvare:
+        with open(args.storico, 'a', encoding='utf-8') as f:
+            for record in nuovi:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        print(f"\n💾 {len(nuovi)} misure aggiunte a {args.storico}")
+    
+    regressioni = [r for r in risultati if r.get('delta', '').endswith('⚠️')]
+    if regressioni:
+        print(f"\n⚠️  {len(regressioni)} fasi più lente di oltre il {args.soglia_regressione:.0f}% "
+              f"rispetto all'ultima misura")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pipeline turni")
+    sub = parser.add_subparsers(dest='benchmark', required=True)
+    
+    p_pdf = sub.add_parser('pdf', help="Estrazione testo/turni da un PDF sintetico grande")
+    p_pdf.add_argument('--pagine', type=int, default=200)
+    p_pdf.add_argument('--righe', type=int, default=60, help="Righe per pagina")
+    p_pdf.add_argument('--ripetizioni', type=int, default=3)
+    p_pdf.set_defaults(funzione=benchmark_pdf)
+    
+    p_cal = sub.add_parser('calendario', help="Calendario anno: loop originale vs versione vettoriale")
+    p_cal.add_argument('--anni', type=int, nargs='+', default=[1, 5, 20])
+    p_cal.add_argument('--staff', type=int, default=6)
+    p_cal.add_argument('--max-anni-loop', type=int, default=20,
+                       help="Oltre questo numero di anni il loop originale non viene eseguito")
+    p_cal.set_defaults(funzione=benchmark_calendario)
+    
+    p_fest = sub.add_parser('festivita', help="is_festivo: dict di stringhe vs np.isin su datetime64")
+    p_fest.add_argument('--righe', type=int, nargs='+', default=[100000, 1000000, 5000000])
+    p_fest.add_argument('--anni', type=int, default=20)
+    p_fest.set_defaults(funzione=benchmark_festivita)
+    
+    p_perm = sub.add_parser('permutazioni', help="Test di permutazione su un anno di turni")
+    p_perm.add_argument('--permutazioni', type=int, default=100000)
+    p_perm.add_argument('--workers', type=int, nargs='+', default=[1, 4])
+    p_perm.add_argument('--staff', type=int, default=6)
+    p_perm.add_argument('--seed', type=int, default=0)
+    p_perm.set_defaults(funzione=benchmark_permutazioni)
+    
+    p_arch = sub.add_parser('archivio', help="Caricamento turni: CSV vs Parquet con proiezione colonne")
+    p_arch.add_argument('--righe', type=int, default=500000)
+    p_arch.add_argument('--staff', type=int, default=6)
+    p_arch.add_argument('--ripetizioni', type=int, default=3)
+    p_arch.set_defaults(funzione=benchmark_archivio)
+    
+    p_srv = sub.add_parser('server', help="Load test di server.py: originale vs threaded keep-alive")
+    p_srv.add_argument('--client', type=int, default=8, help="Client concorrenti")
+    p_srv.add_argument('--richieste', type=int, default=200, help="Richieste per client")
+    p_srv.set_defaults(funzione=benchmark_server)
+    
+    p_met = sub.add_parser('metriche', help="Metriche per staff: filtri per staff vs groupby unico")
+    p_met.add_argument('--righe', type=int, default=1000000)
+    p_met.add_argument('--staff', type=int, nargs='+', default=[6, 60])
+    p_met.set_defaults(funzione=benchmark_metriche)
+    
+    p_fin = sub.add_parser('finestre', help="Finestre mobili di settimane: filtro per finestra vs cumulate")
+    p_fin.add_argument('--anni', type=int, nargs='+', default=[1, 5])
+    p_fin.add_argument('--staff', type=int, default=6)
+    p_fin.add_argument('--ampiezze', type=int, nargs='+', default=[4, 8, 13])
+    p_fin.set_defaults(funzione=benchmark_finestre)
+    
+    p_rep = sub.add_parser('report', help="Report Excel: pd.ExcelWriter vs openpyxl write-only in streaming")
+    p_rep.add_argument('--righe', type=int, default=500000)
+    p_rep.add_argument('--staff', type=int, default=6)
+    p_rep.add_argument('--workers', type=int, nargs='+', default=[2])
+    p_rep.add_argument('--salta-excelwriter', action='store_true',
+                       help="Non esegue pd.ExcelWriter (lento e pesante oltre qualche centinaio di migliaia di righe)")
+    p_rep.set_defaults(funzione=benchmark_report)
+    
+    p_cen = sub.add_parser('censura', help="Anonimizzazione: apply cella per cella vs regex unica compilata")
+    p_cen.add_argument('--righe', type=int, default=1000000)
+    p_cen.add_argument('--nomi', type=int, nargs='+', default=[6, 1000, 20000])
+    p_cen.add_argument('--max-nomi-lenti', type=int, default=1000,
+                       help="Oltre questo numero di nomi apply e alternativa semplice non vengono eseguiti")
+    p_cen.set_defaults(funzione=benchmark_censura)
+    
+    p_ccsv = sub.add_parser('censura-csv', help="Censura dei CSV: file interi in memoria vs streaming a blocchi")
+    p_ccsv.add_argument('--righe', type=int, default=2000000)
+    p_ccsv.add_argument('--staff', type=int, default=6)
+    p_ccsv.set_defaults(funzione=benchmark_censura_csv)
+    
+    p_conf = sub.add_parser('confronti', help="Confronti tra tutte le coppie di staff: cicli vs broadcasting")
+    p_conf.add_argument('--staff', type=int, nargs='+', default=[6, 60, 600])
+    p_conf.add_argument('--max-staff-loop', type=int, default=60,
+                        help="Oltre questo numero di staff il doppio ciclo non viene eseguito")
+    p_conf.set_defaults(funzione=benchmark_confronti)
+    
+    p_part = sub.add_parser('partizioni', help="Query sede/trimestre: storico intero + filtro vs partizioni")
+    p_part.add_argument('--sedi', type=int, default=4)
+    p_part.add_argument('--anni', type=int, default=5)
+    p_part.add_argument('--staff', type=int, default=30)
+    p_part.set_defaults(funzione=benchmark_partizioni)
+    
+    p_nomi = sub.add_parser('nomi', help="Nomi dei PDF ROTA: vecchio parser vs pattern compilati con cache")
+    p_nomi.add_argument('--file', type=int, nargs='+', default=[100, 10000])
+    p_nomi.add_argument('--scansioni', type=int, default=20, help="Scansioni ripetute della stessa cartella")
+    p_nomi.set_defaults(funzione=benchmark_nomi)
+    
+    p_scala = sub.add_parser('scala', help="Pipeline a 10x, 100x, 1000x il volume di oggi, con storico JSONL")
+    p_scala.add_argument('--fattori', type=int, nargs='+', default=[10, 100, 1000])
+    p_scala.add_argument('--pipeline', nargs='+', choices=list(PIPELINE_SCALA),
+                         default=list(PIPELINE_SCALA))
+    p_scala.add_argument('--max-fattore-pdf', type=int, default=100,
+                         help="Oltre questo fattore l'estrazione dai PDF non viene eseguita")
+    p_scala.add_argument('--salta-report', action='store_true', help="Non misura la scrittura dei report Excel")
+    p_scala.add_argument('--storico', type=Path, default=STORICO_SCALA,
+                         help="File JSONL delle misure, una riga per fase")
+    p_scala.add_argument('--non-salvare', action='store_true', help="Confronta con lo storico senza aggiornarlo")
+    p_scala.add_argument('--soglia-regressione', type=float, default=20,
+                         help="Delta %% oltre cui una fase è segnalata come regressione")
+    p_scala.set_defaults(funzione=benchmark_scala)
+    
+    args = parser.parse_args(argv)
+    args.funzione(args)
+
+if __name__ == '__main__':
+    main()
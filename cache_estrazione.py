@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Cache incrementale su disco per l'estrazione dei PDF ROTA
+Ogni PDF è identificato dall'hash del suo contenuto: un file già visto non
+viene più riletto con PyPDF2 né ri-parsato, finché non cambia il file o la
+versione del parser
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+from pathlib import Path
+
+CACHE_DIR_NAME = '.cache_estrazione'
+
+class TestoCorrotto(Exception):
+    """Testo in cache illeggibile (gzip troncato o danneggiato): già rimosso dalla cache"""
+
+def hash_file(path, blocco=1 << 20):
+    """SHA-256 del contenuto di un file, letto a blocchi"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(blocco), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _scrivi_atomico(path, dati):
+    """Scrive bytes su file passando da un temporaneo + rename (mai file a metà)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(dati)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+class CacheEstrazione:
+    """Cache dei testi estratti e dei turni parsati, indicizzata per hash del PDF.
+    
+    Struttura su disco:
+        testi/<sha256>.txt.gz   testo grezzo del PDF (indipendente dal parser)
+        turni/<chiave>.json     righe turni (dipendono da parser, versione e nome file)
+        indice.json             nome file -> (dimensione, mtime, sha256)
+    
+    L'indice evita di ricalcolare l'hash dei file non toccati: se dimensione e
+    mtime coincidono si riusa lo sha256 salvato.
+    """
+
+    def __init__(self, cartella, parser, versione):
+        self.cartella = Path(cartella)
+        self.parser = parser
+        self.versione = versione
+        self.indice_path = self.cartella / 'indice.json'
+        self.indice = {}
+        self._indice_modificato = False
+        
+        if self.indice_path.exists():
+            try:
+                self.indice = json.loads(self.indice_path.read_text(encoding='utf-8'))
+            except (OSError, ValueError):
+                self.indice = {}
+
+    def sha(self, pdf_path):
+        """Hash del PDF, riusando l'indice se dimensione e mtime non sono cambiati"""
+        pdf_path = Path(pdf_path)
+        st = pdf_path.stat()
+        voce = self.indice.get(str(pdf_path))
+        if voce and voce['size'] == st.st_size and voce['mtime_ns'] == st.st_mtime_ns:
+            return voce['sha256']
+        
+        sha = hash_file(pdf_path)
+        self.indice[str(pdf_path)] = {
+            'size': st.st_size,
+            'mtime_ns': st.st_mtime_ns,
+            'sha256': sha
+        }
+        self._indice_modificato = True
+        return sha
+
+    def chiave_turni(self, sha, nome_file):
+        """Chiave dei turni: le righe contengono i campi ricavati dal nome file"""
+        base = f"{sha}|{self.parser}|v{self.versione}|{nome_file}"
+        return hashlib.sha256(base.encode('utf-8')).hexdigest()
+
+    def iter_righe_testo(self, sha):
+        """Righe del testo in cache (None se assente), lette in streaming dal gzip"""
+        path = self.cartella / 'testi' / f'{sha}.txt.gz'
+        if not path.exists():
+            return None
+        return self._leggi_righe(path)
+
+    @staticmethod
+    def _leggi_righe(path):
+        # newline='\n': solo '\n' separa le righe, come str.split('\n')
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8', newline='\n') as f:
+                for riga in f:
+                    yield riga[:-1] if riga.endswith('\n') else riga
+        except (OSError, EOFError, zlib.error, UnicodeDecodeError) as e:
+            # Un testo rotto non deve restare in cache: al prossimo giro si rilegge il PDF
+            path.unlink(missing_ok=True)
+            raise TestoCorrotto(f"{path.name}: {e}") from e
+
+    def analizza_testo(self, sha, righe_pdf, analizza):
+        """analizza(righe) sul testo in cache; se manca o è corrotto, sulle righe del PDF.
+        
+        righe_pdf() apre il PDF solo se serve; il testo letto dal PDF viene
+        registrato in cache mentre analizza lo consuma.
+        """
+        righe = self.iter_righe_testo(sha)
+        if righe is not None:
+            try:
+                return analizza(righe)
+            except TestoCorrotto as e:
+                print(f"  ⚠️  Testo in cache illeggibile ({e}): rilettura dal PDF")
+        return analizza(self.registra_testo(sha, righe_pdf()))
+
+    def registra_testo(self, sha, righe):
+        """Inoltra le righe al chiamante scrivendole intanto nella cache.
+        
+        Il file viene pubblicato (rename atomico) solo quando il flusso è stato
+        consumato per intero, quindi un'estrazione interrotta non lascia testi
+        troncati in cache.
+        """
+        path = self.cartella / 'testi' / f'{sha}.txt.gz'
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+        os.close(fd)
+        completato = False
+        try:
+            with gzip.open(tmp, 'wt', encoding='utf-8', newline='\n') as f:
+                for i, riga in enumerate(righe):
+                    f.write(riga if i == 0 else '\n' + riga)
+                    yield riga
+            os.replace(tmp, path)
+            completato = True
+        finally:
+            if not completato and os.path.exists(tmp):
+                os.unlink(tmp)
+
+    def leggi_turni(self, chiave):
+        path = self.cartella / 'turni' / f'{chiave}.json'
+        try:
+            return json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+
+    def salva_turni(self, chiave, turni):
+        dati = json.dumps(turni, ensure_ascii=False).encode('utf-8')
+        _scrivi_atomico(self.cartella / 'turni' / f'{chiave}.json', dati)
+
+    def salva_indice(self):
+        if self._indice_modificato:
+            dati = json.dumps(self.indice, ensure_ascii=False, indent=1).encode('utf-8')
+            _scrivi_atomico(self.indice_path, dati)
+            self._indice_modificato = False
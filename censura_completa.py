@@ -3,34 +3,21 @@
 Script per censurare TUTTI i nomi (anche in linea_completa)
 """
 
-import pandas as pd
-from pathlib import Path
+
+from anonimizzazione import MAPPA_COGNOMI, Anonimizzatore, anonimizza_csv, raggruppa_identici
+from archivio_turni import BASE_PATH
+from strumentazione import esecuzione, fase
+
+# Mapping cognomi → censurati, in una sola regex compilata
+ANONIMIZZATORE = Anonimizzatore(MAPPA_COGNOMI)
 
 def censura_completa(testo):
     """Sostituisce tutti i cognomi con 3 lettere in qualsiasi testo"""
-    if pd.isna(testo):
-        return testo
-    
-    testo = str(testo)
-    
-    # Mapping cognomi → censurati
-    mappings = {
-        'VISSANI': 'VIS',
-        'PAGANO': 'PAG',
-        'PACINI': 'PAC',
-        'TAMBERI': 'TAM',
-        'CIRCELLI': 'CIR',
-        'MORALE': 'MOR'
-    }
-    
-    # Sostituisci tutti i cognomi
-    for cognome, censurato in mappings.items():
-        testo = testo.replace(cognome, censurato)
-    
-    return testo
+    return ANONIMIZZATORE.testo(testo)
 
+@esecuzione('censura_completa')
 def main():
-    base_path = Path('/Users/radice/Downloads/ROTA Chicca')
+    base_path = BASE_PATH
     
     print("🔒 CENSURA COMPLETA - TUTTI I NOMI")
     print("=" * 70)
@@ -38,54 +25,42 @@ def main():
     # File da processare
     files = ['dati_web.csv', 'dati_arricchiti_censurati.csv']
     
+    percorsi = []
     for filename in files:
         filepath = base_path / filename
-        
         if not filepath.exists():
             print(f"\n⚠️  File non trovato: {filename}")
             continue
+        percorsi.append(filepath)
+    
+    # File identici (oggi dati_web = dati_arricchiti_censurati): una sola lettura, più scritture
+    found = set()
+    for gruppo in raggruppa_identici(percorsi):
+        print(f"\n📄 Processando: {', '.join(p.name for p in gruppo)}")
         
-        print(f"\n📄 Processando: {filename}")
-        
-        # Carica CSV
-        df = pd.read_csv(filepath)
-        
-        print(f"   Righe: {len(df)}")
-        print(f"   Colonne: {len(df.columns)}")
-        
-        # Censura tutte le colonne di testo
-        for col in df.columns:
-            if df[col].dtype == 'object':  # Colonne di testo
-                print(f"   🔒 Censurando colonna: {col}")
-                df[col] = df[col].apply(censura_completa)
+        # Censura a blocchi di tutte le colonne, verifica sui blocchi scritti
+        with fase(f'anonimizza_csv {gruppo[0].name}') as f:
+            esito = anonimizza_csv(gruppo[0], gruppo, ANONIMIZZATORE.dataframe, verifica=ANONIMIZZATORE)
+            f.righe = esito['righe']
+        found.update(esito['residui'])
         
-        # Salva file censurato
-        df.to_csv(filepath, index=False)
-        print(f"   ✅ Salvato: {filename}")
+        print(f"   Righe: {esito['righe']}")
+        print(f"   Colonne: {len(esito['colonne'])}")
+        for filepath in gruppo:
+            print(f"   ✅ Salvato: {filepath.name}")
     
     print("\n" + "=" * 70)
     print("✅ CENSURA COMPLETA TERMINATA")
     print("=" * 70)
     
-    # Verifica
+    # Verifica (fatta durante la scrittura, senza rileggere i file)
     print("\n🔍 VERIFICA FINALE:")
-    df_test = pd.read_csv(base_path / 'dati_web.csv')
-    
-    # Controlla se ci sono ancora cognomi completi
-    test_text = ' '.join(df_test.astype(str).values.flatten())
-    
-    cognomi = ['VISSANI', 'PAGANO', 'PACINI', 'TAMBERI', 'CIRCELLI', 'MORALE']
-    found = []
-    
-    for cognome in cognomi:
-        if cognome in test_text:
-            found.append(cognome)
     
     if found:
-        print(f"   ❌ ATTENZIONE: Trovati ancora: {', '.join(found)}")
+        print(f"   ❌ ATTENZIONE: Trovati ancora: {', '.join(sorted(found))}")
     else:
         print(f"   ✅ PERFETTO: Nessun cognome completo trovato!")
-        print(f"   ✅ Solo 3 lettere: VIS, PAG, PAC, TAM, CIR, MOR")
+        print(f"   ✅ Solo 3 lettere: {', '.join(MAPPA_COGNOMI.values())}")
 
 if __name__ == '__main__':
     main()
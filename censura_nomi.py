@@ -4,7 +4,11 @@ Script per censurare i nomi dello staff (prime 3 lettere)
 """
 
 import pandas as pd
-from pathlib import Path
+from collections import Counter
+
+from anonimizzazione import MAPPA_COGNOMI, anonimizza_csv
+from archivio_turni import BASE_PATH
+from strumentazione import esecuzione, fase
 
 def censura_nomi(nome):
     """Prendi solo prime 3 lettere del nome"""
@@ -12,39 +16,46 @@ def censura_nomi(nome):
         return nome
     return str(nome)[:3].upper()
 
+def censura_nomi_serie(serie):
+    """censura_nomi vettoriale su una colonna di stringhe"""
+    return serie.str[:3].str.upper()
+
+@esecuzione('censura_nomi')
 def main():
-    base_path = Path('/Users/radice/Downloads/ROTA Chicca')
+    base_path = BASE_PATH
     
     print("🔒 CENSURA NOMI STAFF")
     print("=" * 60)
     
-    # Carica dati
-    df = pd.read_csv(base_path / 'dati_arricchiti.csv')
+    # Censura a blocchi: una lettura, file censurato e versione web scritti insieme
+    staff_originali = set()
+    turni_censurati = Counter()
+
+    def censura_blocco(blocco):
+        staff = blocco['staff']
+        staff_originali.update(staff[staff != ''].unique())
+        blocco['staff'] = censura_nomi_serie(staff)
+        turni_censurati.update(blocco['staff'][blocco['staff'] != ''].value_counts().to_dict())
+        return blocco
+    
+    output_file = base_path / 'dati_arricchiti_censurati.csv'
+    output_web = base_path / 'dati_web.csv'
+    with fase('anonimizza_csv') as f:
+        esito = anonimizza_csv(base_path / 'dati_arricchiti.csv', [output_file, output_web], censura_blocco)
+        f.righe = esito['righe']
     
-    print(f"\n📊 Dati caricati: {len(df)} righe")
+    print(f"\n📊 Dati caricati: {esito['righe']} righe")
     print(f"\n👥 Staff originali:")
-    staff_originali = df['staff'].dropna().unique()
     for staff in sorted(staff_originali):
         print(f"   • {staff}")
     
-    # Censura nomi
-    df['staff'] = df['staff'].apply(censura_nomi)
-    
     print(f"\n🔒 Staff censurati (prime 3 lettere):")
-    staff_censurati = df['staff'].dropna().unique()
-    for staff in sorted(staff_censurati):
+    staff_censurati = sorted(turni_censurati)
+    for staff in staff_censurati:
         print(f"   • {staff}")
     
-    # Salva file censurato
-    output_file = base_path / 'dati_arricchiti_censurati.csv'
-    df.to_csv(output_file, index=False)
-    
     print(f"\n✅ File salvato: {output_file.name}")
-    print(f"   {len(df)} righe processate")
-    
-    # Crea anche versione per web
-    output_web = base_path / 'dati_web.csv'
-    df.to_csv(output_web, index=False)
+    print(f"   {esito['righe']} righe processate")
     print(f"✅ File web salvato: {output_web.name}")
     
     # Statistiche
@@ -52,18 +63,8 @@ def main():
     print(f"   Staff unici: {len(staff_censurati)}")
     print(f"   Mapping:")
     
-    # Ricrea mapping per info
-    mappings = {
-        'VISSANI': 'VIS',
-        'PAGANO': 'PAG',
-        'PACINI': 'PAC',
-        'TAMBERI': 'TAM',
-        'CIRCELLI': 'CIR',
-        'MORALE': 'MOR'
-    }
-    
-    for orig, cens in mappings.items():
-        count = len(df[df['staff'] == cens])
+    for orig, cens in MAPPA_COGNOMI.items():
+        count = turni_censurati.get(cens, 0)
         if count > 0:
             print(f"      {orig} → {cens} ({count} turni)")
     
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Confronti tra tutte le coppie di staff
+Le metriche per staff (una riga per staff, una colonna per metrica) diventano
+una matrice N x M; con il broadcasting di NumPy se ne ricavano in un colpo
+il tensore N x N x M delle differenze assolute e percentuali e i conteggi
+di disparità per ogni coppia, invece di un ciclo su coppie scritte a mano.
+Convenzione dei report: la differenza % di "A vs B" è (A - B) / B x 100,
+non definita (NaN) quando B vale zero
+"""
+
+import numpy as np
+import pandas as pd
+
+# Soglie di disparità: |diff %| > soglia -> punti (vale la soglia più alta superata)
+SOGLIE_DISPARITA = {20: 1}
+
+def _punti(perc, soglie):
+    """Punti di disparità per cella: quelli della soglia più alta superata (0 se nessuna o NaN)"""
+    punti = np.zeros(perc.shape, dtype=int)
+    assoluta = np.abs(perc)
+    for soglia, valore in sorted(soglie.items()):
+        punti[assoluta > soglia] = valore
+    return punti
+
+class MatriceConfronti:
+    """Differenze tra tutte le coppie di staff su più metriche.
+
+    df_metriche: DataFrame indicizzato per staff (come metriche_staff o le
+                 tabelle 'Ore Totali', 'Giorni Riposo'... dei report)
+    metriche:    colonne da confrontare; di default tutte quelle numeriche
+
+    diff[i, j, k] = valore di staff i - valore di staff j sulla metrica k
+    perc[i, j, k] = diff[i, j, k] / valore di staff j x 100 (NaN se zero)
+    """
+
+    def __init__(self, df_metriche, metriche=None):
+        if metriche is None:
+            metriche = list(df_metriche.select_dtypes('number').columns)
+        self.staff = pd.Index(df_metriche.index, name=df_metriche.index.name or 'staff')
+        self.metriche = list(metriche)
+        self.valori = df_metriche[self.metriche].to_numpy(dtype=float)
+
+        # (N, 1, M) - (1, N, M) -> (N, N, M)
+        riga, colonna = self.valori[:, None, :], self.valori[None, :, :]
+        self.diff = riga - colonna
+        base = np.broadcast_to(colonna, self.diff.shape)
+        self.perc = np.full(self.diff.shape, np.nan)
+        np.divide(self.diff, base, out=self.perc, where=base != 0)
+        self.perc *= 100
+
+    def _indice(self, staff):
+        return self.staff.get_indexer(list(staff) if not np.isscalar(staff) else [staff])
+
+    def disparita(self, soglie=SOGLIE_DISPARITA):
+        """Matrice N x N (DataFrame staff x staff) dei punti di disparità sommati sulle metriche"""
+        punti = _punti(self.perc, soglie).sum(axis=2)
+        return pd.DataFrame(punti, index=self.staff, columns=self.staff)
+
+    def matrice(self, metrica, valore='perc'):
+        """Matrice N x N (staff x staff) di una metrica: valore 'perc' o 'diff'"""
+        tensore = self.perc if valore == 'perc' else self.diff
+        k = self.metriche.index(metrica)
+        return pd.DataFrame(tensore[:, :, k], index=self.staff, columns=self.staff)
+
+    def foglio(self, valore='perc', decimali=1):
+        """Tutte le matrici N x N in un foglio: righe (metrica, staff), colonne staff"""
+        tensore = self.perc if valore == 'perc' else self.diff
+        blocchi = np.moveaxis(tensore, 2, 0).reshape(-1, len(self.staff))
+        indice = pd.MultiIndex.from_product([self.metriche, self.staff], names=['metrica', 'staff'])
+        return pd.DataFrame(blocchi, index=indice, columns=self.staff).round(decimali)
+
+    def coppia(self, staff1, staff2):
+        """Confronto di una coppia: una riga per metrica con valori, diff e diff %"""
+        i, j = self._indice([staff1, staff2])
+        if i < 0 or j < 0:
+            raise KeyError(staff1 if i < 0 else staff2)
+        return pd.DataFrame({
+            staff1: self.valori[i],
+            staff2: self.valori[j],
+            'diff': self.diff[i, j],
+            'perc': self.perc[i, j],
+        }, index=pd.Index(self.metriche, name='metrica'))
+
+    def coppie(self, soglie=SOGLIE_DISPARITA, coppie=None):
+        """Tabella lunga delle coppie con i punti di disparità (Staff1, Staff2, Disparità).
+
+        coppie: lista di (staff1, staff2) nell'orientamento voluto; le coppie
+        con staff assenti sono saltate. Di default tutte le coppie non
+        ordinate (staff1 prima di staff2 nell'indice).
+        """
+        if coppie is None:
+            i, j = np.triu_indices(len(self.staff), k=1)
+        else:
+            coppie = list(coppie)
+            i = self._indice([s1 for s1, _ in coppie])
+            j = self._indice([s2 for _, s2 in coppie])
+            presenti = (i >= 0) & (j >= 0)
+            i, j = i[presenti], j[presenti]
+        punti = _punti(self.perc[i, j], soglie).sum(axis=1)
+        return pd.DataFrame({
+            'Staff1': self.staff[i],
+            'Staff2': self.staff[j],
+            'Disparità': punti,
+        })
+
+def coppie_con_evidenza(matrice, in_evidenza, soglie=SOGLIE_DISPARITA):
+    """Tutte le coppie: prima quelle in evidenza (nel loro orientamento), poi le altre.
+
+    Le coppie in evidenza già coperte non si ripetono nell'elenco generale,
+    in nessuno dei due orientamenti.
+    """
+    evidenza = matrice.coppie(soglie, coppie=in_evidenza)
+    tutte = matrice.coppie(soglie)
+    viste = set(zip(evidenza['Staff1'], evidenza['Staff2']))
+    viste |= {(s2, s1) for s1, s2 in viste}
+    altre = tutte[[coppia not in viste for coppia in zip(tutte['Staff1'], tutte['Staff2'])]]
+    return pd.concat([evidenza, altre], ignore_index=True)
@@ -9,9 +9,12 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from pathlib import Path
 from datetime import datetime
 import warnings
+
+from archivio_turni import BASE_PATH, carica_turni, colonne_originali
+from metriche import metriche_staff, tabella_metriche
+from confronti import MatriceConfronti
 warnings.filterwarnings('ignore')
 
 # Configurazione pagina
@@ -38,7 +41,7 @@ st.markdown("""
 @st.cache_data
 def load_data():
     """Carica dati - Con cache per performance"""
-    base_path = Path('/Users/radice/Downloads/ROTA Chicca')
+    base_path = BASE_PATH
     
     # Prova a caricare il file Excel dell'utente
     excel_file = base_path / 'Tutti Turni Anno-completi.xlsx'
@@ -49,7 +52,7 @@ def load_data():
         df = pd.read_excel(excel_file)
     elif csv_file.exists():
         st.info(f"📊 Usando dati estratti: {csv_file.name}")
-        df = pd.read_csv(csv_file)
+        df = carica_turni(csv_file, colonne_originali(csv_file))
     else:
         st.error("❌ Nessun file dati trovato!")
         return None
@@ -60,30 +63,24 @@ def load_data():
     
     return df
 
-def calcola_metriche_staff(df, staff_name):
-    """Calcola metriche per un singolo staff - PYTHON PURO"""
-    df_staff = df[df['staff'] == staff_name]
-    
-    # Calcoli matematici Python (non AI)
-    turni_totali = len(df_staff)
-    turni_normali = len(df_staff[df_staff['tipo_turno'] == 'NORMALE'])
-    riposi = len(df_staff[df_staff['tipo_turno'].isin(['RIPO', 'RDOM'])])
-    ferie = len(df_staff[df_staff['tipo_turno'] == 'FERIOR'])
-    off = len(df_staff[df_staff['tipo_turno'].isin(['OFF', 'CHIUSO'])])
+def calcola_metriche(df, staff_list):
+    """Calcola metriche per gli staff indicati (una riga per staff) - PYTHON PURO
     
-    # Somma ore (pandas.sum() - matematica pura)
-    ore_totali = df_staff[df_staff['ore_lavoro'].notna()]['ore_lavoro'].sum()
-    ore_medie = df_staff[df_staff['ore_lavoro'].notna()]['ore_lavoro'].mean()
+    Un solo groupby per tutti gli staff (motore metriche), non un filtro per staff e tipo turno
+    """
+    metriche = metriche_staff(df, staff=staff_list)
+    metriche['ore_totali'] = metriche['ore_totali'].round(1)
+    metriche['ore_media'] = metriche['ore_media'].round(2).fillna(0)
     
-    return {
-        'Turni Totali': turni_totali,
-        'Turni Normali': turni_normali,
-        'Riposi': riposi,
-        'Ferie': ferie,
-        'OFF/Chiuso': off,
-        'Ore Totali': round(ore_totali, 1),
-        'Media Ore/Turno': round(ore_medie, 2) if pd.notna(ore_medie) else 0
-    }
+    return tabella_metriche(metriche, {
+        'turni_totali': 'Turni Totali',
+        'turni_normali': 'Turni Normali',
+        'riposi': 'Riposi',
+        'ferie': 'Ferie',
+        'off': 'OFF/Chiuso',
+        'ore_totali': 'Ore Totali',
+        'ore_media': 'Media Ore/Turno'
+    })
 
 def calcola_cv(valori):
     """Calcola Coefficiente di Variazione - PYTHON numpy"""
@@ -187,11 +184,7 @@ def main():
         # Tabella riepilogo per staff
         st.subheader("📋 Metriche per Staff (Calcoli Python)")
         
-        metriche_all = {}
-        for staff in selected_staff:
-            metriche_all[staff] = calcola_metriche_staff(df_filtered, staff)
-        
-        df_metriche = pd.DataFrame(metriche_all).T
+        df_metriche = calcola_metriche(df_filtered, selected_staff)
         df_metriche = df_metriche.sort_values('Ore Totali', ascending=False)
         
         # Colora celle
@@ -230,8 +223,9 @@ def main():
             st.markdown("---")
             
             # Calcola metriche (Python puro)
-            m1 = calcola_metriche_staff(df_filtered, staff1)
-            m2 = calcola_metriche_staff(df_filtered, staff2)
+            metriche_coppia = calcola_metriche(df_filtered, [staff1, staff2]).to_dict('index')
+            m1 = metriche_coppia[staff1]
+            m2 = metriche_coppia[staff2]
             
             st.subheader(f"📊 {staff1} vs {staff2}")
             
@@ -308,6 +302,23 @@ def main():
                 st.warning(f"⚠️ {alert_count} metriche con squilibrio")
             else:
                 st.error(f"❌ {alert_count} metriche significativamente sbilanciate!")
+        
+        # Matrice di tutte le coppie (staff selezionati nella sidebar)
+        st.markdown("---")
+        st.subheader("🧮 Matrice Disparità - Tutte le Coppie")
+        
+        if len(selected_staff) > 1:
+            matrice = MatriceConfronti(calcola_metriche(df_filtered, selected_staff),
+                                       ['Turni Totali', 'Turni Normali', 'Riposi', 'Ferie', 'Ore Totali'])
+            disparita = matrice.disparita()
+            
+            fig = px.imshow(disparita, text_auto=True, color_continuous_scale='Reds',
+                            labels=dict(x="Staff 2", y="Staff 1", color="Metriche > 20%"),
+                            title="Metriche con differenza > 20% (Staff 1 rispetto a Staff 2)")
+            st.plotly_chart(fig, use_container_width=True)
+            
+            metrica_matrice = st.selectbox("Differenza % per metrica", options=matrice.metriche)
+            st.dataframe(matrice.matrice(metrica_matrice).round(1), use_container_width=True)
     
     # ========== TAB 3: GRAFICI ==========
     with tab3:
@@ -383,11 +394,7 @@ def main():
         """, unsafe_allow_html=True)
         
         # Calcola CV per tutte le metriche (Python numpy)
-        metriche_all = {}
-        for staff in selected_staff:
-            metriche_all[staff] = calcola_metriche_staff(df_filtered, staff)
-        
-        df_metriche = pd.DataFrame(metriche_all).T
+        df_metriche = calcola_metriche(df_filtered, selected_staff)
         
         st.subheader("📊 Coefficienti di Variazione")
         
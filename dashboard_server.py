@@ -7,67 +7,186 @@ Tutti i calcoli in Python puro (matematica deterministica)
 from flask import Flask, render_template_string, jsonify, request, send_file
 import pandas as pd
 import numpy as np
-from pathlib import Path
 import json
+import threading
+
+from archivio_turni import BASE_PATH, carica_turni, colonne_originali
+from metriche import cubo_turni, metriche_da_cubo, metriche_staff
+from confronti import MatriceConfronti
 
 app = Flask(__name__)
 
+# Metriche della matrice di confronto tra tutte le coppie (/api/confronti)
+METRICHE_CONFRONTO = ['ore_totali', 'turni_totali', 'turni_normali', 'riposi', 'ferie']
+
 # Carica dati globali
-BASE_PATH = Path('/Users/radice/Downloads/ROTA Chicca')
 DATA = None
 
-def load_data_global():
-    """Carica dati all'avvio"""
-    global DATA
-    
-    # Prova file Excel utente
+# Cubo aggregato staff x settimana x tipo_turno x weekend x festivo e risposte
+# API già calcolate da esso; ricostruiti solo se il file sorgente cambia
+CUBO = None
+RISPOSTE = {}
+SORGENTE = None          # (percorso, mtime_ns) del file caricato
+_LOCK_CUBO = threading.Lock()
+
+def _file_sorgente():
+    """File dati da usare: Excel utente se presente, altrimenti CSV estratto"""
     excel_file = BASE_PATH / 'Tutti Turni Anno-completi.xlsx'
     csv_file = BASE_PATH / 'turni_completi_52_settimane.csv'
-    
     if excel_file.exists():
-        print(f"✅ Caricato: {excel_file}")
-        DATA = pd.read_excel(excel_file)
-    elif csv_file.exists():
-        print(f"✅ Caricato: {csv_file}")
-        DATA = pd.read_csv(csv_file)
-    else:
+        return excel_file
+    if csv_file.exists():
+        return csv_file
+    return None
+
+def load_data_global():
+    """Carica dati all'avvio (e quando il file sorgente cambia) e ricostruisce il cubo"""
+    global DATA, CUBO, RISPOSTE, SORGENTE
+    
+    sorgente = _file_sorgente()
+    
+    if sorgente is None:
         print("❌ Nessun file dati trovato")
-        DATA = None
+        DATA, CUBO, RISPOSTE, SORGENTE = None, None, {}, None
+        return
     
-    if DATA is not None:
-        if 'settimana' in DATA.columns:
-            DATA['settimana'] = pd.to_numeric(DATA['settimana'], errors='coerce')
-        print(f"📊 Dati caricati: {len(DATA)} turni, {DATA['staff'].nunique()} staff")
-
-# Funzioni calcolo (PYTHON PURO - MATEMATICA)
-def calc_metriche_staff(staff_name, df=None):
-    """Calcola metriche per uno staff - PYTHON pandas (non AI)"""
-    if df is None:
-        df = DATA
+    mtime = sorgente.stat().st_mtime_ns
+    print(f"✅ Caricato: {sorgente}")
+    if sorgente.suffix == '.xlsx':
+        data = pd.read_excel(sorgente)
+    else:
+        data = carica_turni(sorgente, colonne_originali(sorgente))
     
-    df_staff = df[df['staff'] == staff_name]
+    if 'settimana' in data.columns:
+        data['settimana'] = pd.to_numeric(data['settimana'], errors='coerce')
     
-    # Conta turni per tipo (Python len())
-    turni_normali = len(df_staff[df_staff['tipo_turno'] == 'NORMALE'])
-    riposi = len(df_staff[df_staff['tipo_turno'].isin(['RIPO', 'RDOM'])])
-    ferie = len(df_staff[df_staff['tipo_turno'] == 'FERIOR'])
-    off = len(df_staff[df_staff['tipo_turno'].isin(['OFF', 'CHIUSO'])])
+    cubo = costruisci_cubo(data)
+    risposte = risposte_da_cubo(cubo)
     
-    # Somma ore (pandas.sum() - matematica)
-    ore_totali = df_staff[df_staff['ore_lavoro'].notna()]['ore_lavoro'].sum()
-    ore_media = df_staff[df_staff['ore_lavoro'].notna()]['ore_lavoro'].mean()
+    # Scambio unico dei riferimenti: le richieste in corso vedono dati coerenti
+    DATA, CUBO, RISPOSTE, SORGENTE = data, cubo, risposte, (sorgente, mtime)
+    print(f"📊 Dati caricati: {len(DATA)} turni, {DATA['staff'].nunique()} staff")
+    print(f"🧊 Cubo aggregato: {len(CUBO)} celle")
+
+def aggiorna_se_modificato():
+    """Ricarica dati e cubo solo se il file sorgente è cambiato (una stat per richiesta)"""
+    sorgente = _file_sorgente()
+    try:
+        firma = (sorgente, sorgente.stat().st_mtime_ns) if sorgente else None
+    except OSError:
+        firma = None
+    if firma == SORGENTE:
+        return
+    with _LOCK_CUBO:
+        if firma != SORGENTE:
+            load_data_global()
+
+def costruisci_cubo(df):
+    """Aggrega i turni per staff x tipo_turno x weekend x festivo x settimana (motore metriche).
     
+    Ogni cella contiene n (turni), ore (somma ore_lavoro) e n_ore (turni con
+    ore_lavoro valorizzato, per la media).
+    """
+    if 'settimana' not in df.columns:
+        df = df.assign(settimana=np.nan)
+    return cubo_turni(df, per=['settimana'])
+
+def _metriche_vuote(staff_name):
     return {
         'staff': staff_name,
-        'turni_totali': int(len(df_staff)),
-        'turni_normali': int(turni_normali),
-        'riposi': int(riposi),
-        'ferie': int(ferie),
-        'off': int(off),
-        'ore_totali': round(float(ore_totali), 1),
-        'ore_media': round(float(ore_media), 2) if pd.notna(ore_media) else 0
+        'turni_totali': 0,
+        'turni_normali': 0,
+        'riposi': 0,
+        'ferie': 0,
+        'off': 0,
+        'ore_totali': 0.0,
+        'ore_media': 0
+    }
+
+def _metriche_dict(per_staff):
+    """Righe del motore metriche -> dict per staff nel formato delle risposte API"""
+    metriche = {}
+    for staff, row in per_staff.iterrows():
+        metriche[staff] = {
+            'staff': staff,
+            'turni_totali': int(row['turni_totali']),
+            'turni_normali': int(row['turni_normali']),
+            'riposi': int(row['riposi']),
+            'ferie': int(row['ferie']),
+            'off': int(row['off']),
+            'ore_totali': round(float(row['ore_totali']), 1),
+            'ore_media': round(float(row['ore_media']), 2) if row['turni_con_ore'] > 0 else 0
+        }
+    return metriche
+
+def _lista_json(valori, decimali=2):
+    """Array NumPy -> liste annidate per JSON (None al posto di NaN)"""
+    valori = np.round(valori, decimali).astype(object)
+    valori[pd.isna(valori)] = None
+    return valori.tolist()
+
+def _confronti_json(matrice, staff=None):
+    """Matrice di tutte le coppie (o le righe degli staff richiesti) nel formato di /api/confronti"""
+    righe = slice(None) if staff is None else matrice.staff.get_indexer(staff)
+    return {
+        'staff': list(matrice.staff[righe]),
+        'colonne': list(matrice.staff),
+        'metriche': matrice.metriche,
+        'diff': _lista_json(matrice.diff[righe]),
+        'perc': _lista_json(matrice.perc[righe]),
+        'disparita': matrice.disparita().to_numpy()[righe].tolist()
+    }
+
+def risposte_da_cubo(cubo):
+    """Risposte di /api/overview, /api/cv e /api/confronti (già serializzate) e metriche per /api/compare"""
+    per_staff = metriche_da_cubo(cubo)
+    metriche = _metriche_dict(per_staff)
+    matrice = MatriceConfronti(per_staff.sort_index(), METRICHE_CONFRONTO)
+    staff_list = sorted(metriche)
+    settimane = cubo.index.get_level_values('settimana')
+    
+    overview = {
+        'total_turni': int(cubo['n'].sum()),
+        'total_ore': round(float(cubo['ore'].sum()), 1),
+        'settimane': int(settimane.dropna().nunique()),
+        'staff_count': len(staff_list),
+        'staff_list': staff_list,
+        'metriche_staff': [metriche[staff] for staff in staff_list]
+    }
+    
+    cv_results = {}
+    for metrica in ['ore_totali', 'turni_totali', 'riposi', 'ferie']:
+        values = [metriche[staff][metrica] for staff in staff_list]
+        cv = calc_cv(values)
+        mean_val = np.mean(values)
+        std_val = np.std(values)
+        
+        cv_results[metrica] = {
+            'cv': round(cv, 2),
+            'mean': round(float(mean_val), 2),
+            'std': round(float(std_val), 2),
+            'status': 'OTTIMO' if cv < 10 else ('ACCETTABILE' if cv < 20 else 'SQUILIBRATO')
+        }
+    
+    return {
+        'metriche': metriche,
+        'matrice': matrice,
+        'overview': app.json.dumps(overview),
+        'cv': app.json.dumps(cv_results),
+        'confronti': app.json.dumps(_confronti_json(matrice))
     }
 
+def _risposta_json(payload):
+    return app.response_class(payload, mimetype='application/json')
+
+# Funzioni calcolo (PYTHON PURO - MATEMATICA)
+def calc_metriche_staff(staff_name, df=None):
+    """Calcola metriche per uno staff - PYTHON pandas (non AI), dal motore metriche"""
+    if df is None:
+        df = DATA
+    
+    return _metriche_dict(metriche_staff(df, staff=[staff_name]))[staff_name]
+
 def calc_cv(values):
     """Calcola CV - numpy (matematica IEEE)"""
     if len(values) == 0 or np.mean(values) == 0:
@@ -84,64 +203,73 @@ def index():
 
 @app.route('/api/overview')
 def api_overview():
-    """API: Dati overview"""
+    """API: Dati overview (dal cubo aggregato)"""
+    aggiorna_se_modificato()
     if DATA is None:
         return jsonify({'error': 'No data'}), 404
     
-    # Calcoli Python puri
-    staff_list = sorted(DATA['staff'].unique())
-    metriche_all = [calc_metriche_staff(staff) for staff in staff_list]
-    
-    return jsonify({
-        'total_turni': int(len(DATA)),
-        'total_ore': round(float(DATA['ore_lavoro'].sum()), 1),
-        'settimane': int(DATA['settimana'].nunique()),
-        'staff_count': len(staff_list),
-        'staff_list': staff_list,
-        'metriche_staff': metriche_all
-    })
+    return _risposta_json(RISPOSTE['overview'])
 
 @app.route('/api/compare/<staff1>/<staff2>')
 def api_compare(staff1, staff2):
-    """API: Confronto tra due staff"""
-    m1 = calc_metriche_staff(staff1)
-    m2 = calc_metriche_staff(staff2)
+    """API: Confronto tra due staff (dal cubo aggregato)"""
+    aggiorna_se_modificato()
+    if DATA is None:
+        return jsonify({'error': 'No data'}), 404
+    
+    metriche = RISPOSTE['metriche']
+    m1 = metriche.get(staff1) or _metriche_vuote(staff1)
+    m2 = metriche.get(staff2) or _metriche_vuote(staff2)
+    
+    # Differenze dalla matrice di tutte le coppie (perc = diff / staff2 x 100, null se zero)
+    differenze = {}
+    if staff1 in metriche and staff2 in metriche:
+        coppia = RISPOSTE['matrice'].coppia(staff1, staff2)
+        differenze = {metrica: {'diff': round(float(row['diff']), 2),
+                                'perc': None if pd.isna(row['perc']) else round(float(row['perc']), 2)}
+                      for metrica, row in coppia.iterrows()}
     
     return jsonify({
         'staff1': staff1,
         'staff2': staff2,
         'metriche1': m1,
-        'metriche2': m2
+        'metriche2': m2,
+        'differenze': differenze
     })
 
+@app.route('/api/confronti')
+def api_confronti():
+    """API: Matrice staff x staff x metrica di differenze e disparità (tutte le coppie).
+    
+    ?staff=A&staff=B limita le righe agli staff indicati (colonne sempre tutte).
+    """
+    aggiorna_se_modificato()
+    if DATA is None:
+        return jsonify({'error': 'No data'}), 404
+    
+    staff = request.args.getlist('staff')
+    if not staff:
+        return _risposta_json(RISPOSTE['confronti'])
+    
+    matrice = RISPOSTE['matrice']
+    mancanti = [s for s in staff if s not in matrice.staff]
+    if mancanti:
+        return jsonify({'error': f"Staff non trovati: {', '.join(mancanti)}"}), 404
+    return jsonify(_confronti_json(matrice, staff))
+
 @app.route('/api/cv')
 def api_cv():
-    """API: Calcola CV per tutte le metriche"""
-    staff_list = sorted(DATA['staff'].unique())
-    
-    cv_results = {}
-    for metrica in ['ore_totali', 'turni_totali', 'riposi', 'ferie']:
-        values = []
-        for staff in staff_list:
-            m = calc_metriche_staff(staff)
-            values.append(m[metrica])
-        
-        cv = calc_cv(values)
-        mean_val = np.mean(values)
-        std_val = np.std(values)
-        
-        cv_results[metrica] = {
-            'cv': round(cv, 2),
-            'mean': round(float(mean_val), 2),
-            'std': round(float(std_val), 2),
-            'status': 'OTTIMO' if cv < 10 else ('ACCETTABILE' if cv < 20 else 'SQUILIBRATO')
-        }
+    """API: CV per tutte le metriche (dal cubo aggregato)"""
+    aggiorna_se_modificato()
+    if DATA is None:
+        return jsonify({'error': 'No data'}), 404
     
-    return jsonify(cv_results)
+    return _risposta_json(RISPOSTE['cv'])
 
 @app.route('/api/data')
 def api_data():
     """API: Tutti i dati (limitato a 1000 righe per performance)"""
+    aggiorna_se_modificato()
     df_json = DATA.head(1000).to_dict('records')
     return jsonify(df_json)
 
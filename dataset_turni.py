@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Dataset turni partizionato per sede / anno / settimana
+Accanto al CSV (e alla sua copia Parquet, vedi archivio_turni) l'estrazione
+scrive un file Parquet per ogni partizione:
+
+    partizioni/<nome csv>/<SEDE>/<anno>/settimana_<n>.parquet
+
+più un catalogo.json con sede, anno, settimana e righe di ogni partizione.
+carica_dataset() sceglie i file dal catalogo e legge solo le partizioni
+richieste: l'analisi di una sede in un trimestre non apre lo storico di
+tutte le sedi e di tutti gli anni. La sede viene dal nome del PDF
+("ROTA 1 mod1_301224-050125 - PISA.pdf"), l'anno è l'anno ISO della
+settimana. Senza pyarrow (o con catalogo più vecchio del CSV) si ricade
+sul CSV con gli stessi filtri sulle righe.
+
+Filtri da ambiente per gli script di analisi:
+    ROTA_SEDI=PISA,FIRENZE   ROTA_ANNI=2024,2025
+
+Le analisi HR sommano per staff e settimana: con unico=True carica_dataset
+rifiuta (ValueError) un caricamento che copre più sedi o più anni, invece
+di fondere staff omonimi di sedi diverse e settimane di anni diversi.
+"""
+
+import json
+import os
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from archivio_turni import PARQUET_DISPONIBILE, _senza_categorie, carica_turni, tipizza
+
+if PARQUET_DISPONIBILE:
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+# Sede dei PDF senza suffisso " - SEDE.pdf" e anno dei turni senza date
+SEDE_PREDEFINITA = 'PISA'
+ANNO_PREDEFINITO = 2025
+
+CARTELLA_PARTIZIONI = 'partizioni'
+CATALOGO = 'catalogo.json'
+
+# Colonna tecnica con la posizione della riga nel CSV: il dataset riletto ha l'ordine originale
+COLONNA_ORDINE = '_ordine'
+
+def sede_da_file(file):
+    """Nomi file PDF -> sede in maiuscolo ("... - PISA.pdf" -> 'PISA'); SEDE_PREDEFINITA se manca"""
+    sede = pd.Series(file, dtype='string').str.extract(r"-\s*([A-Za-zÀ-ÿ' ]+?)\s*\.pdf$", flags=re.IGNORECASE)[0]
+    return sede.str.strip().str.upper().fillna(SEDE_PREDEFINITA).astype(object)
+
+def anno_turni(df):
+    """Anno ISO della settimana di ogni turno (da data_inizio, altrimenti data_rota)"""
+    date = pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+    for col in ['data_inizio_dt', 'data_rota_dt']:
+        if col in df:
+            date = date.fillna(pd.to_datetime(df[col], errors='coerce'))
+    anno = date.dt.isocalendar().year.astype('float')
+    return anno.fillna(ANNO_PREDEFINITO).astype(int)
+
+def percorso_partizioni(csv_path):
+    csv_path = Path(csv_path)
+    return csv_path.parent / CARTELLA_PARTIZIONI / csv_path.stem
+
+def _nome_partizione(sede, anno, settimana):
+    settimana = 'na' if pd.isna(settimana) else int(settimana)
+    return f'{sede}/{anno}/settimana_{settimana}.parquet'
+
+def _chiavi(df):
+    """Sede e anno per riga (da file e date); tipizza() se le date non sono ancora convertite"""
+    file = df['file'] if 'file' in df else pd.Series(pd.NA, index=df.index)
+    if 'data_inizio_dt' not in df and 'data_rota_dt' not in df:
+        df = tipizza(df[[c for c in ['data_inizio', 'data_rota'] if c in df]])
+    return sede_da_file(file).to_numpy(), anno_turni(df).to_numpy()
+
+def salva_partizioni(df, csv_path):
+    """Scrive il dataset partizionato di un CSV appena salvato (Parquet tipizzato per partizione).
+    
+    Ogni file è scritto con rename atomico, il catalogo per ultimo; le
+    partizioni che non esistono più vengono rimosse. Senza pyarrow non fa
+    nulla (carica_dataset userà il CSV). Ritorna il catalogo.
+    """
+    if not PARQUET_DISPONIBILE:
+        return None
+    csv_path = Path(csv_path)
+    radice = percorso_partizioni(csv_path)
+    
+    df = tipizza(df).reset_index(drop=True)
+    df[COLONNA_ORDINE] = np.arange(len(df), dtype='int64')
+    sede, anno = _chiavi(df)
+    settimana = pd.to_numeric(df['settimana'], errors='coerce') if 'settimana' in df else np.nan
+    chiavi = pd.DataFrame({'sede': sede, 'anno': anno, 'settimana': settimana}, index=df.index)
+    
+    partizioni = []
+    for (s, a, w), righe in chiavi.groupby(['sede', 'anno', 'settimana'], dropna=False, sort=True).groups.items():
+        nome = _nome_partizione(s, a, w)
+        file = radice / nome
+        file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = file.with_name(f'.{file.name}.tmp')
+        df.loc[righe].to_parquet(tmp, index=False)
+        os.replace(tmp, file)
+        partizioni.append({'sede': s, 'anno': int(a), 'settimana': None if pd.isna(w) else int(w),
+                           'file': nome, 'righe': len(righe)})
+    
+    catalogo = {
+        'sorgente_mtime_ns': csv_path.stat().st_mtime_ns if csv_path.exists() else None,
+        'partizioni': partizioni
+    }
+    tmp = radice / f'.{CATALOGO}.tmp'
+    tmp.write_text(json.dumps(catalogo, indent=1), encoding='utf-8')
+    os.replace(tmp, radice / CATALOGO)
+    
+    attuali = {radice / p['file'] for p in partizioni}
+    for vecchio in radice.glob('*/*/settimana_*.parquet'):
+        if vecchio not in attuali:
+            vecchio.unlink()
+    return catalogo
+
+def catalogo_partizioni(csv_path):
+    """Catalogo delle partizioni come DataFrame (sede, anno, settimana, file, righe).
+    
+    None se il dataset partizionato manca, pyarrow non c'è o il CSV è
+    stato riscritto dopo le partizioni.
+    """
+    csv_path = Path(csv_path)
+    file = percorso_partizioni(csv_path) / CATALOGO
+    if not PARQUET_DISPONIBILE or not file.exists():
+        return None
+    catalogo = json.loads(file.read_text(encoding='utf-8'))
+    if csv_path.exists() and catalogo['sorgente_mtime_ns'] != csv_path.stat().st_mtime_ns:
+        return None
+    partizioni = pd.DataFrame(catalogo['partizioni'], columns=['sede', 'anno', 'settimana', 'file', 'righe'])
+    partizioni['settimana'] = pd.to_numeric(partizioni['settimana'], errors='coerce')
+    return partizioni
+
+def _seleziona(sede, anno, settimana, sedi, anni, settimane):
+    """Maschera delle righe (o partizioni) che rispettano i filtri; None = nessun filtro"""
+    maschera = np.ones(len(sede), dtype=bool)
+    if sedi is not None:
+        maschera &= np.isin(sede, [s.upper() for s in sedi])
+    if anni is not None:
+        maschera &= np.isin(anno, [int(a) for a in anni])
+    if settimane is not None:
+        maschera &= np.isin(settimana, [int(w) for w in settimane])
+    return maschera
+
+def _verifica_unico(sede, anno):
+    coppie = sorted(set(zip(sede, (int(a) for a in anno))))
+    if len(coppie) > 1:
+        elenco = ', '.join(f'{s} {a}' for s, a in coppie)
+        raise ValueError(
+            f"I turni coprono {len(coppie)} combinazioni sede/anno ({elenco}): staff e settimane "
+            f"verrebbero sommati tra sedi e anni diversi. Sceglierne una con ROTA_SEDI e ROTA_ANNI")
+    return coppie
+
+def verifica_perimetro(df):
+    """ValueError se i turni (con file e date) coprono più di una sede o di un anno;
+    altrimenti (sede, anno) dei turni (i predefiniti se non ce ne sono)"""
+    sede, anno = _chiavi(df)
+    coppie = _verifica_unico(sede, anno)
+    return coppie[0] if coppie else (SEDE_PREDEFINITA, ANNO_PREDEFINITO)
+
+def carica_dataset(csv_path, colonne=None, sedi=None, anni=None, settimane=None, categorie=False,
+                   unico=False):
+    """Carica i turni delle sole sedi / anni / settimane richieste.
+    
+    Con il dataset partizionato legge solo i file delle partizioni
+    selezionate (i turni senza settimana restano fuori se si filtra per
+    settimana); altrimenti carica il CSV (carica_turni) e filtra le righe.
+    Le righe escono nell'ordine del CSV. Colonne e categorie come carica_turni.
+    
+    unico: ValueError se i turni selezionati coprono più sedi o più anni
+    (per le analisi che aggregano solo per staff e settimana).
+    """
+    csv_path = Path(csv_path)
+    filtri = sedi is not None or anni is not None or settimane is not None
+    # Senza filtri serve tutto: la copia Parquet unica del CSV è la lettura più rapida
+    catalogo = catalogo_partizioni(csv_path) if filtri else None
+    
+    if catalogo is None:
+        extra = [] if colonne is None or not (filtri or unico) else [
+            c for c in ['file', 'settimana', 'data_inizio_dt', 'data_rota_dt'] if c not in colonne]
+        df = carica_turni(csv_path, None if colonne is None else list(colonne) + extra, categorie=True)
+        if filtri or unico:
+            sede, anno = _chiavi(df)
+            settimana = pd.to_numeric(df['settimana'], errors='coerce').to_numpy()
+            scelte = _seleziona(sede, anno, settimana, sedi, anni, settimane)
+            if unico:
+                _verifica_unico(sede[scelte], anno[scelte])
+            df = df[scelte]
+            df = df.drop(columns=[c for c in extra if c in df]).reset_index(drop=True)
+        return df if categorie else _senza_categorie(df)
+    
+    scelte = catalogo[_seleziona(catalogo['sede'].to_numpy(), catalogo['anno'].to_numpy(),
+                                 catalogo['settimana'].to_numpy(), sedi, anni, settimane)]
+    if unico:
+        _verifica_unico(scelte['sede'], scelte['anno'])
+    radice = percorso_partizioni(csv_path)
+    if not len(scelte):
+        primo = radice / catalogo['file'].iloc[0] if len(catalogo) else None
+        schema = pq.read_schema(primo).names if primo else []
+        nomi = schema if colonne is None else [c for c in colonne if c in schema]
+        return pd.DataFrame(columns=[c for c in nomi if c != COLONNA_ORDINE])
+    
+    # Un solo dataset Arrow sui file scelti: letture in parallelo, dizionari unificati
+    dataset = ds.dataset([str(radice / file) for file in scelte['file']], format='parquet')
+    # Come carica_turni: le colonne che il dataset non ha vengono saltate, non sono un errore
+    lette = None if colonne is None else [c for c in list(colonne) + [COLONNA_ORDINE] if c in dataset.schema.names]
+    tabella = dataset.to_table(columns=lette)
+    df = tabella.to_pandas().sort_values(COLONNA_ORDINE, kind='stable')
+    df = df.drop(columns=COLONNA_ORDINE).reset_index(drop=True)
+    return df if categorie else _senza_categorie(df)
+
+def _lista_ambiente(nome):
+    valore = os.environ.get(nome, '').strip()
+    return [v.strip() for v in valore.split(',') if v.strip()] or None
+
+def filtri_ambiente():
+    """Filtri sedi / anni da ROTA_SEDI e ROTA_ANNI (liste separate da virgola), None se non impostati"""
+    anni = _lista_ambiente('ROTA_ANNI')
+    return {'sedi': _lista_ambiente('ROTA_SEDI'), 'anni': [int(a) for a in anni] if anni else None}
@@ -4,49 +4,27 @@ Script per estrarre e analizzare i turni dai file PDF ROTA
 """
 
 import re
-import os
-from pathlib import Path
 from datetime import datetime, timedelta
 import pandas as pd
 
-try:
-    import PyPDF2
-except ImportError:
-    print("Installazione di PyPDF2...")
-    os.system("pip3 install PyPDF2")
-    import PyPDF2
+from lettura_pdf import iter_pagine_pdf, iter_righe_pdf
+from archivio_turni import BASE_PATH, salva_turni
+from nomi_rota import analizza_nome_file, seleziona_revisioni
+from strumentazione import esecuzione, fase
 
 def extract_text_from_pdf(pdf_path):
-    """Estrae il testo da un file PDF"""
-    text = ""
+    """Estrae il testo da un file PDF (intero, per usi non in streaming); '' se la lettura fallisce"""
     try:
-        with open(pdf_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            for page in reader.pages:
-                text += page.extract_text()
+        return ''.join(iter_pagine_pdf(pdf_path))
     except Exception as e:
-        print(f"Errore nell'estrazione di {pdf_path}: {e}")
-    return text
+        print(f"  ⚠️  Errore nell'estrazione di {pdf_path}: {e}")
+        return ''
 
-def parse_filename(filename):
-    """Estrae informazioni dal nome del file"""
-    # Esempio: ROTA 1 mod1_301224-050125 - PISA.pdf
-    match = re.search(r'ROTA\s+(\d+)\s*(mod\d+)?_?(\d+)-(\d+)', filename)
-    if match:
-        week_num = match.group(1)
-        mod = match.group(2) if match.group(2) else ""
-        date_start = match.group(3)
-        date_end = match.group(4)
-        return {
-            'settimana': week_num,
-            'modifiche': mod,
-            'data_inizio': date_start,
-            'data_fine': date_end
-        }
-    return None
-
-def parse_turni_from_text(text):
-    """Estrae i turni dal testo"""
+def parse_turni_from_text(righe):
+    """Estrae i turni dal testo (stringa intera o iterabile di righe)"""
+    if isinstance(righe, str):
+        righe = righe.split('\n')
+    
     turni = []
     
     # Pattern comuni per turni (da adattare in base al formato reale)
@@ -54,10 +32,9 @@ def parse_turni_from_text(text):
     giorni = ['lunedì', 'martedì', 'mercoledì', 'giovedì', 'venerdì', 'sabato', 'domenica',
               'lun', 'mar', 'mer', 'gio', 'ven', 'sab', 'dom']
     
-    lines = text.split('\n')
     current_day = None
     
-    for line in lines:
+    for line in righe:
         line_lower = line.lower().strip()
         
         # Cerca giorni
@@ -77,55 +54,75 @@ def parse_turni_from_text(text):
     
     return turni
 
+def righe_con_statistiche(righe, stats, max_anteprima=500):
+    """Inoltra le righe aggiornando conteggio caratteri e anteprima del testo"""
+    for n, riga in enumerate(righe):
+        testo_riga = riga if n == 0 else '\n' + riga
+        stats['caratteri'] += len(testo_riga)
+        if len(stats['anteprima']) < max_anteprima:
+            stats['anteprima'] = (stats['anteprima'] + testo_riga)[:max_anteprima]
+        yield riga
+
+@esecuzione('extract_turni')
 def main():
     # Trova tutti i file PDF
-    base_path = Path('/Users/radice/Downloads/ROTA Chicca')
-    pdf_files = sorted(base_path.glob('ROTA*.pdf'))
+    base_path = BASE_PATH
+    pdf_files, superati = seleziona_revisioni(sorted(base_path.glob('ROTA*.pdf')))
     
     print(f"Trovati {len(pdf_files)} file PDF")
+    if superati:
+        print(f"Saltate {len(superati)} revisioni superate (modN più vecchi della stessa settimana)")
     print("-" * 60)
     
     all_data = []
     
-    for pdf_file in pdf_files:
-        print(f"\nProcessando: {pdf_file.name}")
-        
-        # Estrai informazioni dal nome file
-        file_info = parse_filename(pdf_file.name)
-        
-        # Estrai testo dal PDF
-        text = extract_text_from_pdf(pdf_file)
-        
-        # Parse turni
-        turni = parse_turni_from_text(text)
-        
-        # Salva dati
-        for turno in turni:
-            row = {
-                'file': pdf_file.name,
-                'settimana': file_info['settimana'] if file_info else '',
-                'modifiche': file_info['modifiche'] if file_info else '',
-                'data_inizio': file_info['data_inizio'] if file_info else '',
-                'data_fine': file_info['data_fine'] if file_info else '',
-                'giorno': turno.get('giorno', ''),
-                'testo_turno': turno.get('testo', ''),
-            }
-            all_data.append(row)
-        
-        # Mostra anteprima del testo estratto
-        print(f"Caratteri estratti: {len(text)}")
-        print(f"Turni trovati: {len(turni)}")
-        
-        # Mostra prime righe del testo per debug
-        preview = text[:500] if text else "Nessun testo estratto"
-        print(f"Anteprima testo:\n{preview}\n")
+    with fase('estrazione_pdf') as f:
+        for pdf_file in pdf_files:
+            print(f"\nProcessando: {pdf_file.name}")
+            
+            # Estrai informazioni dal nome file
+            file_info = analizza_nome_file(pdf_file.name)
+            
+            # Estrai testo dal PDF in streaming, tenendo solo conteggio e anteprima
+            stats_testo = {'caratteri': 0, 'anteprima': ''}
+            righe = righe_con_statistiche(iter_righe_pdf(pdf_file), stats_testo)
+            
+            # Parse turni (nessuno se la lettura del PDF si interrompe)
+            try:
+                turni = parse_turni_from_text(righe)
+            except Exception as e:
+                print(f"  ⚠️  Errore nell'estrazione di {pdf_file}: {e}")
+                turni = []
+            
+            # Salva dati
+            for turno in turni:
+                row = {
+                    'file': pdf_file.name,
+                    'settimana': file_info['settimana'] or '',
+                    'modifiche': file_info['modifiche'] or '',
+                    'data_inizio': file_info['data_inizio'] or '',
+                    'data_fine': file_info['data_fine'] or '',
+                    'giorno': turno.get('giorno', ''),
+                    'testo_turno': turno.get('testo', ''),
+                }
+                all_data.append(row)
+            
+            # Mostra anteprima del testo estratto
+            print(f"Caratteri estratti: {stats_testo['caratteri']}")
+            print(f"Turni trovati: {len(turni)}")
+            
+            # Mostra prime righe del testo per debug
+            preview = stats_testo['anteprima'] or "Nessun testo estratto"
+            print(f"Anteprima testo:\n{preview}\n")
+        f.righe = len(all_data)
     
     # Crea DataFrame
     df = pd.DataFrame(all_data)
     
     # Salva in CSV
     output_csv = base_path / 'turni_estratti.csv'
-    df.to_csv(output_csv, index=False, encoding='utf-8-sig')
+    with fase('salva_csv', len(df)):
+        salva_turni(df, output_csv)
     print(f"\n{'='*60}")
     print(f"✓ Dati salvati in: {output_csv}")
     print(f"✓ Totale righe: {len(df)}")
@@ -135,12 +132,13 @@ def main():
     # Crea anche un Excel con formattazione
     try:
         output_excel = base_path / 'turni_estratti.xlsx'
-        with pd.ExcelWriter(output_excel, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Turni', index=False)
-            
-            # Crea anche un foglio di riepilogo
-            summary = df.groupby('settimana').size().reset_index(name='n_turni')
-            summary.to_excel(writer, sheet_name='Riepilogo', index=False)
+        with fase('salva_excel', len(df)):
+            with pd.ExcelWriter(output_excel, engine='openpyxl') as writer:
+                df.to_excel(writer, sheet_name='Turni', index=False)
+                
+                # Crea anche un foglio di riepilogo
+                summary = df.groupby('settimana').size().reset_index(name='n_turni')
+                summary.to_excel(writer, sheet_name='Riepilogo', index=False)
         
         print(f"✓ Excel salvato in: {output_excel}")
     except Exception as e:
@@ -3,12 +3,17 @@
 Script avanzato per estrarre turni dai PDF ROTA con parsing dettagliato
 """
 
-import re
 import os
-from pathlib import Path
+import argparse
 from datetime import datetime
 import pandas as pd
-import PyPDF2
+
+from cache_estrazione import CacheEstrazione, CACHE_DIR_NAME
+from parser_turni import compila_tokenizer, analizza_riga, intestazione_giorno
+from lettura_pdf import iter_pagine_pdf, iter_righe_pdf
+from archivio_turni import BASE_PATH, salva_turni
+from nomi_rota import analizza_nome_file, seleziona_revisioni
+from strumentazione import esecuzione, fase
 
 # Nomi del personale (da aggiornare se necessario)
 STAFF_NAMES = ['VISSANI', 'PACINI', 'CIRCELLI', 'PAGANO', 'TAMBERI', 'MORALE']
@@ -16,101 +21,76 @@ STAFF_NAMES = ['VISSANI', 'PACINI', 'CIRCELLI', 'PAGANO', 'TAMBERI', 'MORALE']
 # Tipi di turno
 TURNO_TYPES = ['RIPO', 'FEST', 'ROL', 'FERIOR', 'RDOM', 'OFF', 'CHIUSO']
 
+# Regex unica per staff, codici turno, orari e ore (una scansione per riga)
+TOKENIZER = compila_tokenizer(STAFF_NAMES, TURNO_TYPES)
+
+# Da incrementare ad ogni modifica del parsing: invalida i turni in cache
+PARSER_VERSION = 4
+
 def extract_text_from_pdf(pdf_path):
-    """Estrae il testo da un file PDF"""
-    text = ""
+    """Estrae il testo da un file PDF (intero, per usi non in streaming); '' se la lettura fallisce"""
     try:
-        with open(pdf_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            for page in reader.pages:
-                text += page.extract_text()
+        return ''.join(iter_pagine_pdf(pdf_path))
     except Exception as e:
-        print(f"Errore nell'estrazione di {pdf_path}: {e}")
-    return text
-
-def parse_filename(filename):
-    """Estrae informazioni dal nome del file"""
-    match = re.search(r'ROTA\s+(\d+)\s*(mod\d+|MOD\d+)?[_\s]?(\d+)-(\d+)', filename, re.IGNORECASE)
-    if match:
-        week_num = match.group(1)
-        mod = match.group(2).lower() if match.group(2) else ""
-        date_start = match.group(3)
-        date_fine = match.group(4)
-        return {
-            'settimana': week_num,
-            'modifiche': mod,
-            'data_inizio': date_start,
-            'data_fine': date_fine
-        }
-    return None
+        print(f"  ⚠️  Errore nell'estrazione di {pdf_path}: {e}")
+        return ''
 
-def parse_date_from_text(text):
-    """Estrae la data dall'inizio del testo (formato DD/MM/YY)"""
-    match = re.search(r'(\d{2})/(\d{2})/(\d{2})', text)
-    if match:
-        return f"{match.group(1)}/{match.group(2)}/20{match.group(3)}"
-    return None
-
-def extract_turni_dettagliati(text, file_info):
-    """Estrae i turni in modo dettagliato dal testo"""
-    turni = []
+def extract_turni_dettagliati(righe, file_info):
+    """Estrae i turni in modo dettagliato dal testo.
     
-    # Cerca la data all'inizio
-    data_rota = parse_date_from_text(text)
+    righe può essere il testo completo oppure un iterabile di righe (ad es.
+    iter_righe_pdf), consumato una riga alla volta.
+    """
+    if isinstance(righe, str):
+        righe = righe.split('\n')
     
-    # Split per linee
-    lines = text.split('\n')
+    turni = []
     
-    for line in lines:
+    # La data della rota di un turno è l'intestazione di giorno che lo precede
+    # (nella riga, prima del nome, o nelle righe precedenti): i turni trovati
+    # prima della prima intestazione vengono completati appena compare
+    data_rota = None
+    
+    for line in righe:
+        intestazione = intestazione_giorno(line)
+        if intestazione is not None and data_rota is None:
+            for turno in turni:
+                turno['data_rota'] = intestazione[1]
+        
         # Salta linee vuote o troppo corte
         if len(line.strip()) < 10:
+            data_rota = intestazione[1] if intestazione is not None else data_rota
             continue
         
-        # Cerca pattern di turno con nome staff
-        for staff_name in STAFF_NAMES:
-            if staff_name in line:
-                # Estrai orari nel formato HH:MM
-                orari = re.findall(r'(\d{1,2})[:\.,](\d{2})', line)
-                
-                # Estrai numero di ore (formato X,Y o X.Y)
-                ore_match = re.search(r'(\d+)[,\.](\d+)\s+\d{1,2}[:\.]\d{2}', line)
-                ore_lavoro = None
-                if ore_match:
-                    ore_lavoro = float(f"{ore_match.group(1)}.{ore_match.group(2)}")
-                
-                # Identifica tipo di turno
-                tipo_turno = "NORMALE"
-                for turno_type in TURNO_TYPES:
-                    if turno_type in line:
-                        tipo_turno = turno_type
-                        break
-                
-                # Estrai orari di entrata/uscita se presenti
-                entrata = None
-                uscita = None
-                if len(orari) >= 2:
-                    entrata = f"{orari[0][0].zfill(2)}:{orari[0][1]}"
-                    uscita = f"{orari[1][0].zfill(2)}:{orari[1][1]}"
-                
-                # Crea record turno
-                turno = {
-                    'file': file_info.get('file', ''),
-                    'settimana': file_info.get('settimana', ''),
-                    'modifiche': file_info.get('modifiche', ''),
-                    'data_inizio': file_info.get('data_inizio', ''),
-                    'data_fine': file_info.get('data_fine', ''),
-                    'data_rota': data_rota,
-                    'staff': staff_name,
-                    'tipo_turno': tipo_turno,
-                    'ore_lavoro': ore_lavoro,
-                    'ora_entrata': entrata,
-                    'ora_uscita': uscita,
-                    'linea_completa': line.strip()
-                }
-                turni.append(turno)
+        # Una sola scansione della riga: ogni staff riceve il proprio segmento
+        for turno_riga in analizza_riga(line, TOKENIZER, TURNO_TYPES):
+            data_turno = data_rota
+            if intestazione is not None and (data_rota is None or intestazione[0] < turno_riga['posizione']):
+                data_turno = intestazione[1]
+            
+            # Crea record turno
+            turno = {
+                'file': file_info.get('file', ''),
+                'settimana': file_info.get('settimana', ''),
+                'modifiche': file_info.get('modifiche', ''),
+                'data_inizio': file_info.get('data_inizio', ''),
+                'data_fine': file_info.get('data_fine', ''),
+                'data_rota': data_turno,
+                'staff': turno_riga['staff'],
+                'tipo_turno': turno_riga['tipo_turno'],
+                'ore_lavoro': turno_riga['ore_lavoro'],
+                'ora_entrata': turno_riga['ora_entrata'],
+                'ora_uscita': turno_riga['ora_uscita'],
+                'linea_completa': line.strip()
+            }
+            turni.append(turno)
+        
+        if intestazione is not None:
+            data_rota = intestazione[1]
     
     return turni
 
+@fase()
 def calcola_ore_per_staff(df):
     """Calcola le ore lavorate per ogni membro dello staff"""
     if 'ore_lavoro' in df.columns and 'staff' in df.columns:
@@ -125,6 +105,7 @@ def calcola_ore_per_staff(df):
         return ore_per_staff
     return None
 
+@fase()
 def analizza_distribuzione_turni(df):
     """Analizza la distribuzione dei turni"""
     stats = {}
@@ -142,56 +123,88 @@ def analizza_distribuzione_turni(df):
     
     return stats
 
-def main():
-    print("="*70)
-    print("ESTRAZIONE AVANZATA TURNI DA PDF")
-    print("="*70)
-    
-    # Trova tutti i file PDF
-    base_path = Path('/Users/radice/Downloads/ROTA Chicca')
-    pdf_files = sorted(base_path.glob('ROTA*.pdf'))
-    
-    print(f"\nTrovati {len(pdf_files)} file PDF\n")
-    print("-" * 70)
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Estrazione avanzata turni dai PDF ROTA")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Ignora la cache incrementale e riestrae tutti i PDF")
+    parser.add_argument('--tutte-le-revisioni', action='store_true',
+                        help="Estrae anche le revisioni superate (modN più vecchi della stessa settimana)")
+    return parser.parse_args(argv)
+
+def estrai_turni_file(pdf_file, file_info, cache=None):
+    """Turni di un PDF, dalla cache se il contenuto non è cambiato.
     
+    Restituisce (turni, da_cache). Se la lettura del PDF si interrompe il
+    file resta senza turni e in cache non viene salvato nulla.
+    """
+    try:
+        if cache is None:
+            return extract_turni_dettagliati(iter_righe_pdf(pdf_file), file_info), False
+        
+        sha = cache.sha(pdf_file)
+        chiave = cache.chiave_turni(sha, pdf_file.name)
+        turni = cache.leggi_turni(chiave)
+        if turni is not None:
+            return turni, True
+        
+        turni = cache.analizza_testo(sha, lambda: iter_righe_pdf(pdf_file),
+                                     lambda righe: extract_turni_dettagliati(righe, file_info))
+    except Exception as e:
+        print(f"  ⚠️  Errore nell'estrazione di {pdf_file}: {e}")
+        return [], False
+    cache.salva_turni(chiave, turni)
+    return turni, False
+
+def estrai_turni(pdf_files, cache=None):
+    """Estrae i turni di tutti i PDF (con esempi e riepilogo a video) in un DataFrame"""
     all_turni = []
+    n_cache = 0
     
-    for i, pdf_file in enumerate(pdf_files, 1):
-        print(f"\n[{i}/{len(pdf_files)}] Processando: {pdf_file.name}")
-        
-        # Estrai informazioni dal nome file
-        file_info = parse_filename(pdf_file.name)
-        if file_info:
+    with fase('estrazione_pdf') as f:
+        for i, pdf_file in enumerate(pdf_files, 1):
+            print(f"\n[{i}/{len(pdf_files)}] Processando: {pdf_file.name}")
+            
+            # Estrai informazioni dal nome file
+            file_info = analizza_nome_file(pdf_file.name)
             file_info['file'] = pdf_file.name
-        else:
-            file_info = {'file': pdf_file.name}
-        
-        # Estrai testo dal PDF
-        text = extract_text_from_pdf(pdf_file)
-        
-        # Parse turni
-        turni = extract_turni_dettagliati(text, file_info)
-        all_turni.extend(turni)
-        
-        print(f"  ✓ Estratti {len(turni)} turni")
-        
-        # Mostra alcuni turni di esempio
-        if turni and i <= 3:  # Solo per i primi 3 file
-            print(f"  📋 Esempi:")
-            for turno in turni[:3]:
-                print(f"     - {turno['staff']}: {turno['tipo_turno']} " +
-                      f"({turno['ora_entrata']}-{turno['ora_uscita']}, {turno['ore_lavoro']}h)")
+            
+            # Estrai testo e turni (riusando la cache per i PDF non modificati)
+            turni, da_cache = estrai_turni_file(pdf_file, file_info, cache)
+            all_turni.extend(turni)
+            
+            if da_cache:
+                n_cache += 1
+                print(f"  ♻️  {len(turni)} turni dalla cache")
+            else:
+                print(f"  ✓ Estratti {len(turni)} turni")
+            
+            # Mostra alcuni turni di esempio
+            if turni and i <= 3:  # Solo per i primi 3 file
+                print(f"  📋 Esempi:")
+                for turno in turni[:3]:
+                    print(f"     - {turno['staff']}: {turno['tipo_turno']} " +
+                          f"({turno['ora_entrata']}-{turno['ora_uscita']}, {turno['ore_lavoro']}h)")
+        f.righe = len(all_turni)
     
     print(f"\n{'='*70}")
     print(f"TOTALE TURNI ESTRATTI: {len(all_turni)}")
+    print(f"File dalla cache: {n_cache}/{len(pdf_files)}")
     print("="*70)
     
+    if cache:
+        cache.salva_indice()
+    
     # Crea DataFrame
     df = pd.DataFrame(all_turni)
     
+    return df
+
+def salva_turni_dettagliati(df, base_path):
+    """Salva CSV (con copia Parquet), statistiche rapide ed Excel dettagliato; ritorna il CSV"""
     # Salva CSV
     output_csv = base_path / 'turni_dettagliati.csv'
-    df.to_csv(output_csv, index=False, encoding='utf-8-sig')
+    with fase('salva_csv', len(df)):
+        salva_turni(df, output_csv)
     print(f"\n✓ CSV salvato: {output_csv}")
     
     # Calcola statistiche
@@ -219,48 +232,79 @@ def main():
     try:
         output_excel = base_path / 'turni_dettagliati.xlsx'
         
-        with pd.ExcelWriter(output_excel, engine='openpyxl') as writer:
-            # Foglio 1: Tutti i turni
-            df.to_excel(writer, sheet_name='Tutti i Turni', index=False)
-            
-            # Foglio 2: Ore per staff
-            if ore_staff is not None:
-                ore_staff.to_excel(writer, sheet_name='Ore per Staff')
-            
-            # Foglio 3: Riepilogo per settimana e staff
-            if 'settimana' in df.columns and 'staff' in df.columns and 'ore_lavoro' in df.columns:
-                pivot = df[df['ore_lavoro'].notna()].pivot_table(
-                    values='ore_lavoro',
-                    index='staff',
-                    columns='settimana',
-                    aggfunc='sum',
-                    fill_value=0
-                ).round(2)
-                pivot.to_excel(writer, sheet_name='Ore per Settimana-Staff')
-            
-            # Foglio 4: Turni per tipo
-            if 'tipo_turno' in df.columns:
-                tipo_counts = df['tipo_turno'].value_counts().to_frame('Conteggio')
-                tipo_counts.to_excel(writer, sheet_name='Tipi di Turno')
-            
-            # Foglio 5: Orari più comuni
-            if 'ora_entrata' in df.columns:
-                df_clean = df[df['ora_entrata'].notna()]
-                if len(df_clean) > 0:
-                    orari_counts = df_clean['ora_entrata'].value_counts().to_frame('Frequenza')
-                    orari_counts.to_excel(writer, sheet_name='Orari Entrata')
+        with fase('salva_excel', len(df)):
+            with pd.ExcelWriter(output_excel, engine='openpyxl') as writer:
+                # Foglio 1: Tutti i turni
+                df.to_excel(writer, sheet_name='Tutti i Turni', index=False)
+                
+                # Foglio 2: Ore per staff
+                if ore_staff is not None:
+                    ore_staff.to_excel(writer, sheet_name='Ore per Staff')
+                
+                # Foglio 3: Riepilogo per settimana e staff
+                if 'settimana' in df.columns and 'staff' in df.columns and 'ore_lavoro' in df.columns:
+                    pivot = df[df['ore_lavoro'].notna()].pivot_table(
+                        values='ore_lavoro',
+                        index='staff',
+                        columns='settimana',
+                        aggfunc='sum',
+                        fill_value=0
+                    ).round(2)
+                    pivot.to_excel(writer, sheet_name='Ore per Settimana-Staff')
+                
+                # Foglio 4: Turni per tipo
+                if 'tipo_turno' in df.columns:
+                    tipo_counts = df['tipo_turno'].value_counts().to_frame('Conteggio')
+                    tipo_counts.to_excel(writer, sheet_name='Tipi di Turno')
+                
+                # Foglio 5: Orari più comuni
+                if 'ora_entrata' in df.columns:
+                    df_clean = df[df['ora_entrata'].notna()]
+                    if len(df_clean) > 0:
+                        orari_counts = df_clean['ora_entrata'].value_counts().to_frame('Frequenza')
+                        orari_counts.to_excel(writer, sheet_name='Orari Entrata')
         
         print(f"✓ Excel dettagliato salvato: {output_excel}")
-        
+    
     except Exception as e:
         print(f"⚠️  Errore nel salvataggio Excel: {e}")
     
+    return output_csv
+
+@esecuzione('extract_turni_avanzato')
+def main(argv=None):
+    args = parse_args(argv)
+    
+    print("="*70)
+    print("ESTRAZIONE AVANZATA TURNI DA PDF")
+    print("="*70)
+    
+    # Trova tutti i file PDF
+    base_path = BASE_PATH
+    pdf_files = sorted(base_path.glob('ROTA*.pdf'))
+    superati = []
+    if not args.tutte_le_revisioni:
+        pdf_files, superati = seleziona_revisioni(pdf_files)
+    
+    cache = None
+    if not args.no_cache:
+        cache = CacheEstrazione(base_path / CACHE_DIR_NAME, 'avanzato', PARSER_VERSION)
+    
+    print(f"\nTrovati {len(pdf_files)} file PDF")
+    if superati:
+        print(f"⏭️  {len(superati)} revisioni superate saltate (--tutte-le-revisioni per includerle)")
+    print()
+    print("-" * 70)
+    
+    df = estrai_turni(pdf_files, cache)
+    salva_turni_dettagliati(df, base_path)
+    
     print("\n" + "="*70)
     print("✅ ESTRAZIONE COMPLETATA CON SUCCESSO!")
     print("="*70)
     print(f"\n📁 File generati:")
     print(f"   • turni_dettagliati.csv")
-    print(f"   • turni_dettagliati.xlsx (con {len(all_turni)} turni)")
+    print(f"   • turni_dettagliati.xlsx (con {len(df)} turni)")
     print(f"\n📊 Anteprima dati:")
     print(df.head(10)[['staff', 'tipo_turno', 'ore_lavoro', 'ora_entrata', 'ora_uscita']])
 
@@ -4,178 +4,209 @@ Script completo per estrarre TUTTE le 52 settimane dai PDF ROTA
 Con parsing migliorato per gestire tutti i formati di nome file
 """
 
-import re
 import os
-from pathlib import Path
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 import pandas as pd
-import PyPDF2
+
+from cache_estrazione import CacheEstrazione, CACHE_DIR_NAME
+from parser_turni import compila_tokenizer, analizza_riga, intestazione_giorno
+from lettura_pdf import iter_pagine_pdf, iter_righe_pdf
+from archivio_turni import BASE_PATH, salva_turni
+from arricchimento import salva_turni_arricchiti
+from dataset_turni import percorso_partizioni, salva_partizioni
+from nomi_rota import analizza_nome_file, seleziona_revisioni
+from strumentazione import esecuzione, fase
 
 # Nomi del personale
 STAFF_NAMES = ['VISSANI', 'PACINI', 'CIRCELLI', 'PAGANO', 'TAMBERI', 'MORALE']
 TURNO_TYPES = ['RIPO', 'FEST', 'ROL', 'FERIOR', 'RDOM', 'OFF', 'CHIUSO']
 
+# Regex unica per staff, codici turno, orari e ore (una scansione per riga)
+TOKENIZER = compila_tokenizer(STAFF_NAMES, TURNO_TYPES)
+
+# Da incrementare ad ogni modifica del parsing: invalida i turni in cache
+PARSER_VERSION = 3
+
 def extract_text_from_pdf(pdf_path):
-    """Estrae il testo da un file PDF"""
-    text = ""
+    """Estrae il testo da un file PDF (intero, per usi non in streaming); '' se la lettura fallisce"""
     try:
-        with open(pdf_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            for page in reader.pages:
-                text += page.extract_text()
+        return ''.join(iter_pagine_pdf(pdf_path))
     except Exception as e:
         print(f"  ⚠️  Errore nell'estrazione di {pdf_path}: {e}")
-    return text
-
-def parse_filename_improved(filename):
-    """Parsing migliorato per estrarre il numero di settimana da TUTTI i formati"""
-    
-    # Prova diversi pattern per catturare il numero di settimana
-    patterns = [
-        r'ROTA\s*(\d+)\s*[_\s]*(mod\d+|MOD\d+)?[_\s]*(\d{6})-(\d{6})',  # ROTA 1 mod1_301224-050125
-        r'ROTA\s*(\d+)\s*[_\s]*(mod\d+|MOD\d+)?_(\d+)[-.](\d+)',        # ROTA 10 _03.03-09.03
-        r'ROTA\s*(\d+)\s*(MOD\d+|mod\d+)?_(\d+)-(\d+)',                 # ROTA 15 MOD1_07.04
-        r'ROTA\s*(\d+)[_\s]+(\d+)',                                      # ROTA 17_210425
-    ]
-    
-    week_num = None
-    mod = ""
-    date_start = None
-    date_end = None
-    
-    for pattern in patterns:
-        match = re.search(pattern, filename, re.IGNORECASE)
-        if match:
-            week_num = match.group(1)
-            
-            # Estrai mod se presente
-            if len(match.groups()) >= 2 and match.group(2):
-                if 'mod' in match.group(2).lower():
-                    mod = match.group(2).lower()
-            
-            # Estrai date se presenti
-            if len(match.groups()) >= 4:
-                date_start = match.group(3) if match.group(3) else match.group(3)
-                date_end = match.group(4) if match.group(4) else match.group(4)
-            
-            break
-    
-    # Se non troviamo il numero, provalo a estrarre direttamente
-    if not week_num:
-        simple_match = re.search(r'ROTA\s*(\d+)', filename, re.IGNORECASE)
-        if simple_match:
-            week_num = simple_match.group(1)
-    
-    return {
-        'settimana': week_num,
-        'modifiche': mod,
-        'data_inizio': date_start,
-        'data_fine': date_end
-    }
-
-def parse_date_from_text(text):
-    """Estrae la data dall'inizio del testo (formato DD/MM/YY)"""
-    match = re.search(r'(\d{2})/(\d{2})/(\d{2})', text)
-    if match:
-        return f"{match.group(1)}/{match.group(2)}/20{match.group(3)}"
-    return None
-
-def extract_turni_dettagliati(text, file_info):
-    """Estrae i turni in modo dettagliato dal testo"""
-    turni = []
+        return ''
+
+def extract_turni_dettagliati(righe, file_info):
+    """Estrae i turni in modo dettagliato dal testo.
     
-    # Cerca la data all'inizio
-    data_rota = parse_date_from_text(text)
+    righe può essere il testo completo oppure un iterabile di righe (ad es.
+    iter_righe_pdf), consumato una riga alla volta.
+    """
+    if isinstance(righe, str):
+        righe = righe.split('\n')
     
-    # Split per linee
-    lines = text.split('\n')
+    turni = []
+    
+    # La data della rota di un turno è l'intestazione di giorno che lo precede
+    # (nella riga, prima del nome, o nelle righe precedenti): i turni trovati
+    # prima della prima intestazione vengono completati appena compare
+    data_rota = None
     
-    for line in lines:
+    for line in righe:
+        intestazione = intestazione_giorno(line)
+        if intestazione is not None and data_rota is None:
+            for turno in turni:
+                turno['data_rota'] = intestazione[1]
+        
         # Salta linee vuote o troppo corte
         if len(line.strip()) < 10:
+            data_rota = intestazione[1] if intestazione is not None else data_rota
             continue
         
-        # Cerca pattern di turno con nome staff
-        for staff_name in STAFF_NAMES:
-            if staff_name in line:
-                # Estrai orari nel formato HH:MM o HH.MM
-                orari = re.findall(r'(\d{1,2})[:\.,](\d{2})', line)
-                
-                # Estrai numero di ore (formato X,Y o X.Y)
-                ore_match = re.search(r'(\d+)[,\.](\d+)\s+\d{1,2}[:\.]\d{2}', line)
-                ore_lavoro = None
-                if ore_match:
-                    ore_lavoro = float(f"{ore_match.group(1)}.{ore_match.group(2)}")
-                
-                # Identifica tipo di turno
-                tipo_turno = "NORMALE"
-                for turno_type in TURNO_TYPES:
-                    if turno_type in line:
-                        tipo_turno = turno_type
-                        break
-                
-                # Estrai orari di entrata/uscita se presenti
-                entrata = None
-                uscita = None
-                if len(orari) >= 2:
-                    entrata = f"{orari[0][0].zfill(2)}:{orari[0][1]}"
-                    uscita = f"{orari[1][0].zfill(2)}:{orari[1][1]}"
-                
-                # Crea record turno
-                turno = {
-                    'file': file_info.get('file', ''),
-                    'settimana': file_info.get('settimana', ''),
-                    'modifiche': file_info.get('modifiche', ''),
-                    'data_inizio': file_info.get('data_inizio', ''),
-                    'data_fine': file_info.get('data_fine', ''),
-                    'data_rota': data_rota,
-                    'staff': staff_name,
-                    'tipo_turno': tipo_turno,
-                    'ore_lavoro': ore_lavoro,
-                    'ora_entrata': entrata,
-                    'ora_uscita': uscita,
-                    'linea_completa': line.strip()
-                }
-                turni.append(turno)
+        # Una sola scansione della riga: ogni staff riceve il proprio segmento
+        for turno_riga in analizza_riga(line, TOKENIZER, TURNO_TYPES):
+            data_turno = data_rota
+            if intestazione is not None and (data_rota is None or intestazione[0] < turno_riga['posizione']):
+                data_turno = intestazione[1]
+            
+            # Crea record turno
+            turno = {
+                'file': file_info.get('file', ''),
+                'settimana': file_info.get('settimana', ''),
+                'modifiche': file_info.get('modifiche', ''),
+                'data_inizio': file_info.get('data_inizio', ''),
+                'data_fine': file_info.get('data_fine', ''),
+                'data_rota': data_turno,
+                'staff': turno_riga['staff'],
+                'tipo_turno': turno_riga['tipo_turno'],
+                'ore_lavoro': turno_riga['ore_lavoro'],
+                'ora_entrata': turno_riga['ora_entrata'],
+                'ora_uscita': turno_riga['ora_uscita'],
+                'linea_completa': line.strip()
+            }
+            turni.append(turno)
+        
+        if intestazione is not None:
+            data_rota = intestazione[1]
     
     return turni
 
-def main():
-    print("="*70)
-    print("🔧 ESTRAZIONE COMPLETA - TUTTE LE 52 SETTIMANE")
-    print("="*70)
+def processa_pdf(pdf_file, cache=None, sha=None):
+    """Estrae i turni da un singolo PDF (eseguibile anche in un processo worker)"""
+    inizio = time.perf_counter()
     
-    # Trova tutti i file PDF
-    base_path = Path('/Users/radice/Downloads/ROTA Chicca')
-    pdf_files = sorted(base_path.glob('ROTA*.pdf'))
+    # Estrai informazioni dal nome file (pattern compilati, risultato in cache)
+    file_info = analizza_nome_file(pdf_file.name)
+    file_info['file'] = pdf_file.name
     
-    print(f"\nTrovati {len(pdf_files)} file PDF\n")
-    print("-" * 70)
+    # Parse turni sulle righe del PDF in streaming (o dal testo in cache se il
+    # contenuto non è cambiato): se la lettura si interrompe il file resta senza
+    # turni e fuori dalla cache (niente testo né turni parziali), come nel
+    # vecchio extract_text_from_pdf che restituiva ''
+    try:
+        if cache:
+            turni = cache.analizza_testo(sha, lambda: iter_righe_pdf(pdf_file),
+                                         lambda righe: extract_turni_dettagliati(righe, file_info))
+        else:
+            turni = extract_turni_dettagliati(iter_righe_pdf(pdf_file), file_info)
+    except Exception as e:
+        print(f"  ⚠️  Errore nell'estrazione di {pdf_file}: {e}")
+        return file_info, [], time.perf_counter() - inizio
+    if cache:
+        cache.salva_turni(cache.chiave_turni(sha, pdf_file.name), turni)
     
+    return file_info, turni, time.perf_counter() - inizio
+
+def _processa_da_estrarre(args):
+    return processa_pdf(*args)
+
+def estrai_tutti_pdf(pdf_files, workers=1, cache=None):
+    """Estrae i turni da tutti i PDF, in serie o con un pool di processi.
+    
+    I file già in cache vengono ricostruiti dai frammenti salvati, gli altri
+    vengono estratti. I risultati sono restituiti sempre nell'ordine di
+    pdf_files, così il CSV finale è identico a quello dell'esecuzione seriale.
+    Ogni elemento è (file_info, turni, durata_secondi, da_cache).
+    """
+    hashes = {}
+    dal_cache = {}
+    da_estrarre = []
+    
+    for pdf_file in pdf_files:
+        turni = None
+        if cache:
+            hashes[pdf_file] = cache.sha(pdf_file)
+            turni = cache.leggi_turni(cache.chiave_turni(hashes[pdf_file], pdf_file.name))
+        if turni is not None:
+            dal_cache[pdf_file] = turni
+        else:
+            da_estrarre.append((pdf_file, cache, hashes.get(pdf_file)))
+    
+    if cache:
+        cache.salva_indice()
+    
+    if workers > 1 and len(da_estrarre) > 1:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        # map() conserva l'ordine di input indipendentemente da chi finisce prima
+        estratti = executor.map(_processa_da_estrarre, da_estrarre, chunksize=1)
+    else:
+        executor = None
+        estratti = map(_processa_da_estrarre, da_estrarre)
+    
+    try:
+        for pdf_file in pdf_files:
+            if pdf_file in dal_cache:
+                file_info = analizza_nome_file(pdf_file.name)
+                file_info['file'] = pdf_file.name
+                yield file_info, dal_cache[pdf_file], 0.0, True
+            else:
+                yield (*next(estratti), False)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Estrazione completa turni dai PDF ROTA")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Numero di processi paralleli per l'estrazione (default: 1, seriale)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Ignora la cache incrementale e riestrae tutti i PDF")
+    parser.add_argument('--tutte-le-revisioni', action='store_true',
+                        help="Estrae anche le revisioni superate (modN più vecchi della stessa settimana)")
+    return parser.parse_args(argv)
+
+def estrai_turni(pdf_files, workers=1, cache=None):
+    """Estrae i turni di tutti i PDF con il riepilogo a video: DataFrame con settimana numerica"""
     all_turni = []
     settimane_processate = set()
+    tempi = []
+    n_cache = 0
+    inizio_totale = time.perf_counter()
     
-    for i, pdf_file in enumerate(pdf_files, 1):
-        print(f"\n[{i}/{len(pdf_files)}] {pdf_file.name}")
-        
-        # Estrai informazioni dal nome file con parsing migliorato
-        file_info = parse_filename_improved(pdf_file.name)
-        file_info['file'] = pdf_file.name
-        
-        settimana = file_info.get('settimana', 'N/A')
-        print(f"  📅 Settimana: {settimana} | Mod: {file_info.get('modifiche', '-')}")
-        
-        if settimana and settimana != 'N/A':
-            settimane_processate.add(settimana)
-        
-        # Estrai testo dal PDF
-        text = extract_text_from_pdf(pdf_file)
-        
-        # Parse turni
-        turni = extract_turni_dettagliati(text, file_info)
-        all_turni.extend(turni)
-        
-        print(f"  ✓ Estratti {len(turni)} turni")
+    with fase('estrazione_pdf') as f:
+        risultati = estrai_tutti_pdf(pdf_files, workers, cache)
+        for i, (file_info, turni, durata, da_cache) in enumerate(risultati, 1):
+            print(f"\n[{i}/{len(pdf_files)}] {file_info['file']}")
+            
+            settimana = file_info.get('settimana', 'N/A')
+            print(f"  📅 Settimana: {settimana} | Mod: {file_info.get('modifiche', '-')}")
+            
+            if settimana and settimana != 'N/A':
+                settimane_processate.add(settimana)
+            
+            all_turni.extend(turni)
+            
+            if da_cache:
+                n_cache += 1
+                print(f"  ♻️  {len(turni)} turni dalla cache")
+            else:
+                tempi.append((file_info['file'], durata))
+                print(f"  ✓ Estratti {len(turni)} turni in {durata:.2f}s")
+        f.righe = len(all_turni)
+    
+    durata_totale = time.perf_counter() - inizio_totale
     
     print(f"\n{'='*70}")
     print(f"RIEPILOGO ESTRAZIONE")
@@ -184,6 +215,16 @@ def main():
     print(f"Settimane identificate: {len(settimane_processate)}")
     print(f"Settimane presenti: {sorted(settimane_processate)}")
     
+    print(f"\n⏱️  Tempo totale: {durata_totale:.2f}s (worker: {workers})")
+    print(f"   File dalla cache: {n_cache} | File estratti: {len(tempi)}")
+    
+    if tempi:
+        somma_tempi = sum(d for _, d in tempi)
+        file_lento, durata_max = max(tempi, key=lambda t: t[1])
+        print(f"   Somma tempi per file: {somma_tempi:.2f}s")
+        print(f"   Media per file: {somma_tempi / len(tempi):.2f}s")
+        print(f"   File più lento: {file_lento} ({durata_max:.2f}s)")
+    
     # Crea DataFrame
     df = pd.DataFrame(all_turni)
     
@@ -198,19 +239,66 @@ def main():
     
     print(f"\n⚠️  Turni senza settimana identificata: {df['settimana'].isna().sum()}")
     
+    return df
+
+def salva_turni_completi(df, base_path):
+    """Salva CSV (con copia Parquet), dataset partizionato ed Excel dei turni estratti; ritorna il CSV"""
     # Salva CSV
     output_csv = base_path / 'turni_completi_52_settimane.csv'
-    df.to_csv(output_csv, index=False, encoding='utf-8-sig')
+    with fase('salva_csv', len(df)):
+        salva_turni(df, output_csv)
     print(f"\n✅ CSV salvato: {output_csv}")
     
+    # Dataset partizionato per sede / anno / settimana (letture mirate delle analisi)
+    with fase('salva_partizioni', len(df)):
+        catalogo = salva_partizioni(df, output_csv)
+    if catalogo is not None:
+        sedi = sorted({p['sede'] for p in catalogo['partizioni']})
+        print(f"✅ Partizioni salvate: {len(catalogo['partizioni'])} ({', '.join(sedi)}) in {percorso_partizioni(output_csv)}")
+    
     # Salva Excel
     try:
         output_excel = base_path / 'turni_completi_52_settimane.xlsx'
-        df.to_excel(output_excel, index=False)
+        with fase('salva_excel', len(df)):
+            df.to_excel(output_excel, index=False)
         print(f"✅ Excel salvato: {output_excel}")
     except:
         print(f"⚠️  Excel non salvato (possibile problema con la dimensione)")
     
+    return output_csv
+
+@esecuzione('extract_turni_completo')
+def main(argv=None):
+    args = parse_args(argv)
+    workers = max(1, args.workers)
+    
+    print("="*70)
+    print("🔧 ESTRAZIONE COMPLETA - TUTTE LE 52 SETTIMANE")
+    print("="*70)
+    
+    # Trova tutti i file PDF
+    base_path = BASE_PATH
+    pdf_files = sorted(base_path.glob('ROTA*.pdf'))
+    superati = []
+    if not args.tutte_le_revisioni:
+        pdf_files, superati = seleziona_revisioni(pdf_files)
+    
+    cache = None
+    if not args.no_cache:
+        cache = CacheEstrazione(base_path / CACHE_DIR_NAME, 'completo', PARSER_VERSION)
+    
+    print(f"\nTrovati {len(pdf_files)} file PDF")
+    if superati:
+        print(f"⏭️  {len(superati)} revisioni superate saltate (--tutte-le-revisioni per includerle)")
+    print(f"⚙️  Worker: {workers} | Cache: {'attiva' if cache else 'disattivata'}\n")
+    print("-" * 70)
+    
+    df = estrai_turni(pdf_files, workers, cache)
+    salva_turni_completi(df, base_path)
+    
+    # Date, giorni e festività calcolati una volta qui: dati_arricchiti.csv per le analisi
+    salva_turni_arricchiti(df, base_path)
+    
     print("\n" + "="*70)
     print("✅ ESTRAZIONE COMPLETATA!")
     print("="*70)
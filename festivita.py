@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Calendario delle festività italiane per qualsiasi anno
+Festività nazionali fisse, Pasqua e Lunedì dell'Angelo (calcolo di Meeus/Jones/
+Butcher per il calendario gregoriano) e santi patroni configurabili. Le date
+di un intervallo di anni sono calcolate una volta (lru_cache) e restituite come
+array NumPy datetime64[D] ordinato: is_festivo su milioni di righe è un solo
+np.isin, il nome della festività un searchsorted
+"""
+
+from datetime import date, timedelta
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Festività nazionali a data fissa: (mese, giorno) -> nome
+FESTIVITA_FISSE = {
+    (1, 1): 'Capodanno',
+    (1, 6): 'Epifania',
+    (4, 25): 'Festa della Liberazione',
+    (5, 1): 'Festa del Lavoro',
+    (6, 2): 'Festa della Repubblica',
+    (8, 15): 'Ferragosto',
+    (11, 1): 'Ognissanti',
+    (12, 8): 'Immacolata Concezione',
+    (12, 25): 'Natale',
+    (12, 26): 'Santo Stefano',
+}
+
+# Santi patroni per sede (la sede è nel nome dei PDF: "ROTA 1 mod1_... - PISA.pdf")
+SANTI_PATRONI = {
+    'PISA': ((6, 17), 'San Ranieri'),
+    'FIRENZE': ((6, 24), 'San Giovanni Battista'),
+    'ROMA': ((6, 29), 'Santi Pietro e Paolo'),
+    'MILANO': ((12, 7), "Sant'Ambrogio"),
+    'TORINO': ((6, 24), 'San Giovanni Battista'),
+    'NAPOLI': ((9, 19), 'San Gennaro'),
+    'BOLOGNA': ((10, 4), 'San Petronio'),
+    'VENEZIA': ((4, 25), 'San Marco'),
+}
+
+def pasqua(anno):
+    """Domenica di Pasqua (calendario gregoriano, algoritmo di Meeus/Jones/Butcher)"""
+    a = anno % 19
+    b, c = divmod(anno, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mese, giorno = divmod(h + l - 7 * m + 114, 31)
+    return date(anno, mese, giorno + 1)
+
+def _patroni(sedi):
+    """Sedi ('PISA') o coppie ((mese, giorno), nome) -> tupla ordinata, utilizzabile come chiave di cache"""
+    voci = set()
+    for sede in sedi:
+        voci.add(SANTI_PATRONI[sede.upper()] if isinstance(sede, str) else tuple(sede))
+    return tuple(sorted(voci))
+
+@lru_cache(maxsize=None)
+def _festivita_anno(anno, patroni):
+    giorni = {date(anno, mese, giorno): nome for (mese, giorno), nome in FESTIVITA_FISSE.items()}
+    domenica = pasqua(anno)
+    giorni[domenica] = 'Pasqua'
+    giorni[domenica + timedelta(days=1)] = "Lunedì dell'Angelo"
+    for (mese, giorno), nome in patroni:
+        # Se il patrono cade in una festività nazionale resta il nome nazionale
+        giorni.setdefault(date(anno, mese, giorno), nome)
+    return tuple(sorted(giorni.items()))
+
+def festivita_anno(anno, patroni=()):
+    """Festività di un anno: tupla ordinata di (date, nome)"""
+    return _festivita_anno(int(anno), _patroni(patroni))
+
+def festivita(anni, patroni=()):
+    """Festività di uno o più anni come dict 'YYYY-MM-DD' -> nome (ordinato per data)"""
+    anni = [anni] if np.isscalar(anni) else anni
+    return {giorno.isoformat(): nome
+            for anno in sorted(set(int(a) for a in anni))
+            for giorno, nome in festivita_anno(anno, patroni)}
+
+def festivita_tra(inizio, fine, patroni=()):
+    """Festività tra due date (incluse) come dict 'YYYY-MM-DD' -> nome"""
+    inizio, fine = pd.Timestamp(inizio), pd.Timestamp(fine)
+    tutte = festivita(range(inizio.year, fine.year + 1), patroni)
+    return {giorno: nome for giorno, nome in tutte.items()
+            if inizio.strftime('%Y-%m-%d') <= giorno <= fine.strftime('%Y-%m-%d')}
+
+@lru_cache(maxsize=None)
+def _array_festivita(anno_da, anno_a, patroni):
+    voci = [voce for anno in range(anno_da, anno_a + 1) for voce in _festivita_anno(anno, patroni)]
+    giorni = np.array([giorno for giorno, _ in voci], dtype='datetime64[D]')
+    nomi = np.array([nome for _, nome in voci], dtype=object)
+    giorni.flags.writeable = False
+    nomi.flags.writeable = False
+    return giorni, nomi
+
+def date_festive(anno_da, anno_a=None, patroni=()):
+    """Date festive degli anni anno_da..anno_a come array datetime64[D] ordinato (sola lettura)"""
+    anno_a = anno_da if anno_a is None else anno_a
+    return _array_festivita(int(anno_da), int(anno_a), _patroni(patroni))[0]
+
+def _giorni(date_):
+    giorni = pd.to_datetime(pd.Series(date_) if np.ndim(date_) else pd.Series([date_]), errors='coerce')
+    return giorni.to_numpy(dtype='datetime64[D]')
+
+def _intervallo_anni(giorni):
+    # Min e max sugli interi (NaT è il minimo int64): gli anni si ricavano solo dai due estremi
+    interi = giorni.view('i8')
+    nat = np.iinfo(np.int64).min
+    ultimo = interi.max() if len(interi) else nat
+    if ultimo == nat:
+        return None
+    primo = np.where(interi == nat, ultimo, interi).min()
+    estremi = np.array([primo, ultimo], dtype='datetime64[D]').astype('datetime64[Y]').astype(int) + 1970
+    return int(estremi[0]), int(estremi[1])
+
+def is_festivo(date_, patroni=()):
+    """Array booleano: True per le date festive (un solo np.isin su tutte le date).
+    
+    I giorni sono confrontati come interi (giorni dal 1970) con la variante a
+    tabella di np.isin: lineare nel numero di righe, i NaT restano fuori.
+    """
+    giorni = _giorni(date_)
+    anni = _intervallo_anni(giorni)
+    if anni is None:
+        return np.zeros(len(giorni), dtype=bool)
+    festive = date_festive(*anni, patroni=patroni)
+    return np.isin(giorni.view('i8'), festive.view('i8'), kind='table')
+
+def nomi_festivi(date_, patroni=()):
+    """Array dei nomi delle festività ('' per i giorni non festivi)"""
+    giorni = _giorni(date_)
+    nomi = np.full(len(giorni), '', dtype=object)
+    anni = _intervallo_anni(giorni)
+    if anni is None:
+        return nomi
+    festive, nomi_festive = _array_festivita(*anni, _patroni(patroni))
+    pos = np.searchsorted(festive, giorni).clip(max=len(festive) - 1)
+    trovati = festive[pos] == giorni
+    nomi[trovati] = nomi_festive[pos[trovati]]
+    return nomi
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Analisi per finestre di settimane (periodi, mesi, trimestri, finestre mobili)
+Le metriche del motore (metriche.py) vengono sommate una volta per staff x
+settimana e accumulate lungo le settimane: la somma su qualsiasi intervallo
+di settimane è una differenza di due colonne delle cumulate, quindi ogni
+finestra costa O(staff) invece di un nuovo filtro + groupby sui turni
+"""
+
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from metriche import COLONNE_SOMMABILI, completa_medie, cubo_turni, metriche_da_cubo
+
+def settimane_anno(anno):
+    """Settimane ISO dell'anno (52 o 53): quella del 28 dicembre è sempre l'ultima"""
+    return date(anno, 12, 28).isocalendar()[1]
+
+def periodi(anno):
+    """Quadrimestri dell'anno turni: il Periodo 3 arriva all'ultima settimana ISO dell'anno"""
+    return {
+        'Periodo 1 (Gen-Apr)': (1, 17),
+        'Periodo 2 (Mag-Ago)': (18, 35),
+        'Periodo 3 (Set-Dic)': (36, settimane_anno(anno)),
+    }
+
+# Quadrimestri dell'anno turni (settimane ISO 2025)
+PERIODI_2025 = periodi(2025)
+
+# Metriche su cui si misura l'equità (CV% tra gli staff)
+COLONNE_EQUITA = ['turni_normali', 'riposi', 'ore_totali']
+
+# Colonne in ore: le altre sommabili sono conteggi interi
+COLONNE_ORE = ['ore_totali', 'ore_normali']
+
+def cv(valori, axis=0):
+    """CV% (std campionaria / media x 100) lungo axis; NaN se la media non è positiva"""
+    valori = np.asarray(valori, dtype=float)
+    media = valori.mean(axis=axis)
+    std = valori.std(axis=axis, ddof=1) if valori.shape[axis] > 1 else np.full(media.shape, np.nan)
+    return np.divide(std * 100, media, out=np.full(media.shape, np.nan), where=media > 0)
+
+class FinestreSettimane:
+    """Somme cumulative staff x settimana delle metriche sommabili.
+    
+    df:    turni (schema turni_completi_52_settimane)
+    staff: staff da includere, nell'ordine voluto; di default tutti, in ordine alfabetico
+    anno:  anno ISO della settimana 1 (per mesi e trimestri)
+    
+    Le settimane senza turni contano zero; i turni senza settimana restano fuori.
+    """
+
+    def __init__(self, df, staff=None, anno=2025):
+        per_settimana = metriche_da_cubo(cubo_turni(df, per=['settimana']), per=['settimana'])
+        settimane = pd.to_numeric(per_settimana.index.get_level_values('settimana'), errors='coerce')
+        per_settimana = per_settimana[settimane.notna()]
+        settimane = settimane[settimane.notna()].astype(int)
+        nomi = per_settimana.index.get_level_values('staff')
+        
+        self.staff = list(staff) if staff is not None else sorted(nomi.unique())
+        self.anno = anno
+        self.prima = int(settimane.min()) if len(settimane) else 1
+        self.ultima = int(settimane.max()) if len(settimane) else 0
+        
+        # (metrica, staff, settimana + 1): la colonna 0 è lo zero iniziale delle cumulate
+        matrice = np.zeros((len(COLONNE_SOMMABILI), len(self.staff), self.ultima - self.prima + 2))
+        riga = pd.Index(self.staff).get_indexer(nomi)
+        valide = riga >= 0
+        colonna = np.asarray(settimane)[valide] - self.prima + 1
+        matrice[:, riga[valide], colonna] = per_settimana[COLONNE_SOMMABILI].to_numpy(dtype=float)[valide].T
+        self.cumulate = matrice.cumsum(axis=2)
+
+    @property
+    def settimane(self):
+        return range(self.prima, self.ultima + 1)
+
+    def _limiti(self, da, a):
+        """Settimane da..a (incluse) -> indici nelle cumulate, tagliati ai dati"""
+        n = self.cumulate.shape[2] - 1
+        inizio = np.clip(np.asarray(da) - self.prima, 0, n)
+        fine = np.clip(np.asarray(a) - self.prima + 1, 0, n)
+        return inizio, np.maximum(fine, inizio)
+
+    def somme(self, da, a, colonne=COLONNE_SOMMABILI):
+        """Somme per staff sulle settimane da..a: array (colonne, staff[, finestre]).
+        
+        da e a possono essere array (una finestra per elemento): tutte le
+        finestre escono da un'unica differenza di cumulate.
+        """
+        indici = [COLONNE_SOMMABILI.index(c) for c in colonne]
+        inizio, fine = self._limiti(da, a)
+        cumulate = self.cumulate[indici]
+        return cumulate[:, :, fine] - cumulate[:, :, inizio]
+
+    def metriche(self, da, a, solo_presenti=False):
+        """KPI per staff sulle settimane da..a, come metriche_da_cubo (colonne COLONNE).
+        
+        solo_presenti: tiene solo gli staff con almeno un turno nella finestra
+        (come metriche_staff sui turni filtrati); altrimenti tutti, a zero.
+        """
+        colonne = {col: valori if col in COLONNE_ORE else valori.round().astype(int)
+                   for col, valori in zip(COLONNE_SOMMABILI, self.somme(da, a))}
+        metriche = pd.DataFrame(colonne, index=pd.Index(self.staff, name='staff'))
+        if solo_presenti:
+            metriche = metriche[metriche['turni_totali'] > 0]
+        return completa_medie(metriche)
+
+    def equita(self, finestre, colonne=COLONNE_EQUITA):
+        """CV% tra gli staff per ogni finestra ({nome: (da, a)}).
+        
+        Ritorna un DataFrame (una riga per finestra) con da, a e cv_<colonna>.
+        Il CV è calcolato su tutti gli staff (zero per chi non ha turni).
+        """
+        nomi = list(finestre)
+        da = np.array([finestre[n][0] for n in nomi], dtype=int)
+        a = np.array([finestre[n][1] for n in nomi], dtype=int)
+        valori = cv(self.somme(da, a, colonne), axis=1) if nomi else np.empty((len(colonne), 0))
+        
+        risultato = pd.DataFrame({'da': da, 'a': a}, index=pd.Index(nomi, name='finestra'))
+        for i, col in enumerate(colonne):
+            risultato[f'cv_{col}'] = valori[i]
+        return risultato
+
+    def mobili(self, ampiezza, passo=1):
+        """Finestre mobili di ampiezza settimane: {'Sett. 1-4': (1, 4), ...}"""
+        return {f'Sett. {s}-{s + ampiezza - 1}': (s, s + ampiezza - 1)
+                for s in range(self.prima, self.ultima - ampiezza + 2, passo)}
+
+    def calendario(self, freq='M'):
+        """Finestre di calendario: freq 'M' (mesi) o 'Q' (trimestri).
+        
+        Ogni settimana va nel mese del suo giovedì (regola ISO), così i
+        quadrimestri di periodi() coincidono con Gen-Apr, Mag-Ago, Set-Dic.
+        """
+        giovedi_1 = date.fromisocalendar(self.anno, 1, 4)
+        finestre = {}
+        for s in self.settimane:
+            periodo = str(pd.Period(giovedi_1 + timedelta(weeks=s - 1), freq=freq))
+            da, _ = finestre.get(periodo, (s, s))
+            finestre[periodo] = (da, s)
+        return finestre
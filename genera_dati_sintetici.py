@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Generatore di dati turni sintetici (e PDF in stile ROTA)
+Produce turni con lo schema di turni_completi_52_settimane.csv per un numero
+qualsiasi di staff, sedi e anni, con un mix di tipi turno configurabile, e
+opzionalmente i PDF settimanali da cui extract_turni_completo.py li
+riestrae, più la versione con le colonne di dati_arricchiti.csv. Serve a provare pipeline e analisi oltre il dataset reale
+(una sede, sei persone, un anno)
+
+Uso:
+    python3 genera_dati_sintetici.py --output /tmp/rota --staff 60 --anni 3 --sedi PISA FIRENZE
+    python3 genera_dati_sintetici.py --output /tmp/rota --mix NORMALE=0.8 RIPO=0.15 FERIOR=0.05 --pdf
+    ROTA_BASE_PATH=/tmp/rota python3 analisi_hr_anno_completo.py
+"""
+
+import argparse
+import random
+from datetime import date
+from pathlib import Path
+
+from strumentazione import esecuzione, fase
+
+STAFF_SINTETICO = ['VISSANI', 'PACINI', 'CIRCELLI', 'PAGANO', 'TAMBERI', 'MORALE']
+
+# Mix dei tipi turno: tipo -> peso (proporzioni del dataset reale)
+MIX_TURNI = {
+    'NORMALE': 0.70,
+    'RIPO': 0.15,
+    'RDOM': 0.05,
+    'FERIOR': 0.05,
+    'OFF': 0.03,
+    'FEST': 0.02,
+}
+
+# Orari di entrata (ore, sempre ai :30) e durate dei turni normali
+ORE_ENTRATA = [4, 5, 7, 11, 13, 14]
+DURATE = [6, 7, 8]
+
+# Primo anno dei dati sintetici: come nelle rota reali le settimane ripartono
+# da 1 ogni anno ISO e la settimana 1 inizia il lunedì ISO (30/12/2024 per il 2025)
+ANNO_INIZIO = 2025
+
+# Staff per riga nei PDF (come nelle rota reali)
+STAFF_PER_RIGA = 4
+
+# ============================================================
+# TURNI
+# ============================================================
+
+def nomi_staff(n_staff):
+    """I sei nomi reali (riconosciuti dall'estrazione PDF), poi STAFF000, STAFF001..."""
+    return (STAFF_SINTETICO + [f'STAFF{i:03d}' for i in range(n_staff)])[:n_staff]
+
+def _pesi(mix):
+    import numpy as np
+    
+    pesi = np.array(list(mix.values()), dtype=float)
+    if (pesi < 0).any() or pesi.sum() <= 0:
+        raise ValueError(f"Mix turni non valido: {mix}")
+    # Normalizzati solo se serve: con il mix di default le estrazioni restano quelle storiche
+    return pesi if abs(pesi.sum() - 1) < 1e-9 else pesi / pesi.sum()
+
+def settimane_iso(anni):
+    """(numero settimana, lunedì) di tutte le settimane ISO degli anni dati (52 o 53 per anno)"""
+    return [(s, date.fromisocalendar(anno, s, 1))
+            for anno in anni
+            for s in range(1, date(anno, 12, 28).isocalendar()[1] + 1)]
+
+def _turni_sede(sede, anni, n_staff, seed, mix):
+    import numpy as np
+    import pandas as pd
+    
+    rng = np.random.default_rng(seed)
+    numeri, lunedi = zip(*settimane_iso(range(ANNO_INIZIO, ANNO_INIZIO + anni)))
+    n_settimane = len(numeri)
+    staff = nomi_staff(n_staff)
+    
+    settimana = np.repeat(np.asarray(numeri), 7 * n_staff)
+    giorno = np.tile(np.repeat(np.arange(7), n_staff), n_settimane)
+    inizio_sett = pd.DatetimeIndex(lunedi)
+    inizio = pd.DatetimeIndex(np.repeat(inizio_sett.to_numpy(), 7 * n_staff))
+    fine = inizio + pd.Timedelta(days=6)
+    data = inizio + pd.to_timedelta(giorno, unit='D')
+    
+    n = len(settimana)
+    tipo = rng.choice(list(mix), size=n, p=_pesi(mix))
+    normale = tipo == 'NORMALE'
+    ora = rng.choice(ORE_ENTRATA, size=n)
+    durata = rng.choice(DURATE, size=n)
+    
+    # Nome file come i PDF reali: "ROTA 1 mod1_301224-050125 - PISA.pdf" (un nome per
+    # settimana; le date DDMMYY distinguono la stessa settimana di anni diversi)
+    nomi_file = [f'ROTA {s} mod1_{a}-{b} - {sede}.pdf' for s, a, b in
+                 zip(numeri, inizio_sett.strftime('%d%m%y'), (inizio_sett + pd.Timedelta(days=6)).strftime('%d%m%y'))]
+    
+    df = pd.DataFrame({
+        'file': np.repeat(np.asarray(nomi_file, dtype=object), 7 * n_staff),
+        'settimana': settimana,
+        'modifiche': 'mod1',
+        'data_inizio': inizio.strftime('%d%m%y').astype(int),
+        'data_fine': fine.strftime('%d%m%y').astype(int),
+        'data_rota': data.strftime('%d/%m/%Y'),
+        'staff': np.tile(staff, n_settimane * 7),
+        'tipo_turno': tipo,
+        'ore_lavoro': np.where(normale, durata.astype(float), np.nan),
+        'ora_entrata': np.where(normale, [f'{h:02d}:30' for h in ora], None),
+        'ora_uscita': np.where(normale, [f'{h:02d}:30' for h in ora + durata], None),
+    })
+    df['linea_completa'] = df['staff'] + ' ' + df['tipo_turno']
+    return df
+
+@fase()
+def genera_turni_sintetici(anni=1, n_staff=6, seed=0, sedi=('SINTETICO',), mix=None):
+    """DataFrame con lo schema di turni_completi_52_settimane.csv: un turno per staff per giorno.
+    
+    Le settimane sono quelle ISO a partire dal 2025 (lunedì 30/12/2024) e,
+    come nei PDF reali, ripartono da 1 ogni anno. Ogni sede ha gli stessi nomi staff (persone
+    diverse: le analisi si fanno per sede, ROTA_SEDI) e un proprio seed.
+    mix: dict tipo turno -> peso (default MIX_TURNI, anche non normalizzato).
+    """
+    import pandas as pd
+    
+    mix = MIX_TURNI if mix is None else mix
+    parti = [_turni_sede(sede, anni, n_staff, seed + i, mix) for i, sede in enumerate(sedi)]
+    return parti[0] if len(parti) == 1 else pd.concat(parti, ignore_index=True)
+
+# ============================================================
+# PDF
+# ============================================================
+
+def _escape_pdf(testo):
+    return testo.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+def scrivi_pdf_testo(path, pagine):
+    """Scrive un PDF minimale (Helvetica, una riga di testo per riga) senza dipendenze.
+    
+    pagine è una lista di pagine, ognuna una lista di righe di testo.
+    """
+    oggetti = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # /Pages, scritto dopo aver numerato le pagine
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for righe in pagine:
+        n_pagina = len(oggetti) + 1
+        kids.append(f"{n_pagina} 0 R")
+        contenuto = "BT /F1 7 Tf 9 TL 20 820 Td " + " ".join(
+            f"({_escape_pdf(r)}) '" for r in righe) + " ET"
+        stream = contenuto.encode('latin-1', errors='replace')
+        oggetti.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {n_pagina + 1} 0 R >>".encode()
+        )
+        oggetti.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    oggetti[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+    
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(oggetti, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(oggetti) + 1)
+    for off in offsets:
+        out += b"%010d 00000 n \n" % off
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(oggetti) + 1, xref)
+    Path(path).write_bytes(bytes(out))
+
+def genera_pdf_rota_sintetico(path, pagine=200, righe_per_pagina=60, seed=0):
+    """PDF in stile ROTA: intestazione con data e righe 'STAFF HH.MM-HH.MM X,Y HH:MM HH:MM'"""
+    rng = random.Random(seed)
+    contenuto = []
+    for p in range(pagine):
+        righe = [f"ROTA settimana {p % 52 + 1} - {1 + p % 28:02d}/01/25"]
+        for _ in range(righe_per_pagina):
+            if rng.random() < 0.2:
+                a, b = rng.sample(STAFF_SINTETICO, 2)
+                righe.append(f"{a} {rng.choice(['RIPO', 'FERIOR', 'RDOM', 'OFF'])} {b} RIPO")
+                continue
+            segmenti = []
+            for staff in rng.sample(STAFF_SINTETICO, 3):
+                h = rng.choice([4, 5, 7, 11, 13, 14])
+                durata = rng.choice([6, 7, 8])
+                segmenti.append(f"{staff} {h:02d}.30-{h + durata:02d}.30 {durata},0 "
+                                f"{h}:30 {h + durata}:30")
+            righe.append(' '.join(segmenti))
+        contenuto.append(righe)
+    scrivi_pdf_testo(path, contenuto)
+
+def _segmento(turno):
+    """Un turno nel formato delle righe ROTA: 'VISSANI 07.30-14.30 7,0 7:30 14:30' o 'VISSANI RIPO'"""
+    if turno.tipo_turno != 'NORMALE':
+        return f"{turno.staff} {turno.tipo_turno}"
+    entrata, uscita = turno.ora_entrata, turno.ora_uscita
+    return (f"{turno.staff} {entrata.replace(':', '.')}-{uscita.replace(':', '.')} "
+            f"{int(turno.ore_lavoro)},0 {int(entrata[:2])}{entrata[2:]} {int(uscita[:2])}{uscita[2:]}")
+
+def scrivi_pdf_rota(path, turni):
+    """PDF ROTA di una settimana dai suoi turni: una pagina per giorno, STAFF_PER_RIGA staff per riga.
+    
+    La prima riga porta la data DD/MM/YY del primo giorno (la data_rota
+    dell'estrazione). Solo i nomi che l'estrazione conosce (STAFF_SINTETICO)
+    vengono riletti come turni: gli altri sono scritti su righe a parte.
+    """
+    import pandas as pd
+    
+    pagine = []
+    for data, giorno in turni.groupby('data_rota', sort=False):
+        data = pd.to_datetime(data, dayfirst=True)
+        righe = [f"ROTA settimana {giorno['settimana'].iloc[0]} - {data:%d/%m/%y}"]
+        # Nomi noti e sconosciuti su righe separate: i turni di uno staff sconosciuto
+        # finirebbero nel segmento del nome noto che lo precede
+        noti = giorno['staff'].isin(STAFF_SINTETICO)
+        for gruppo in (giorno[noti], giorno[~noti]):
+            segmenti = [_segmento(t) for t in gruppo.itertuples(index=False)]
+            righe += [' '.join(segmenti[i:i + STAFF_PER_RIGA]) for i in range(0, len(segmenti), STAFF_PER_RIGA)]
+        pagine.append(righe)
+    scrivi_pdf_testo(path, pagine)
+
+@fase()
+def genera_pdf_settimane(df, cartella):
+    """Un PDF ROTA per ogni file del dataset sintetico (nome = colonna file); ritorna i percorsi"""
+    cartella = Path(cartella)
+    cartella.mkdir(parents=True, exist_ok=True)
+    percorsi = []
+    for nome, turni in df.groupby('file', sort=False):
+        percorso = cartella / nome
+        scrivi_pdf_rota(percorso, turni)
+        percorsi.append(percorso)
+    return percorsi
+
+# ============================================================
+# MAIN
+# ============================================================
+
+def _mix(voci):
+    """['NORMALE=0.8', 'RIPO=0.2'] -> {'NORMALE': 0.8, 'RIPO': 0.2}"""
+    mix = {}
+    for voce in voci:
+        tipo, _, peso = voce.partition('=')
+        mix[tipo.strip().upper()] = float(peso)
+    return mix
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Genera turni sintetici (CSV, partizioni, dati arricchiti, PDF ROTA)")
+    parser.add_argument('--output', type=Path, required=True,
+                        help="Cartella di uscita (da usare poi come ROTA_BASE_PATH)")
+    parser.add_argument('--staff', type=int, default=6, help="Staff per sede")
+    parser.add_argument('--anni', type=int, default=1)
+    parser.add_argument('--sedi', nargs='+', default=['PISA'])
+    parser.add_argument('--mix', nargs='+', default=None, metavar='TIPO=PESO',
+                        help="Mix tipi turno, es. NORMALE=0.7 RIPO=0.2 FERIOR=0.1")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--pdf', action='store_true', help="Scrive anche i PDF ROTA settimanali")
+    return parser.parse_args(argv)
+
+@esecuzione('genera_dati_sintetici')
+def main(argv=None):
+    from archivio_turni import salva_turni
+    from arricchimento import arricchisci_turni
+    from dataset_turni import salva_partizioni
+    
+    args = parse_args(argv)
+    
+    print("="*70)
+    print("🧪 GENERAZIONE DATI SINTETICI")
+    print("="*70)
+    
+    mix = _mix(args.mix) if args.mix else None
+    df = genera_turni_sintetici(anni=args.anni, n_staff=args.staff, seed=args.seed, sedi=args.sedi, mix=mix)
+    print(f"\n📊 {len(df):,} turni: {len(args.sedi)} sedi x {args.staff} staff x {args.anni} anni")
+    print(f"   Mix: {df['tipo_turno'].value_counts(normalize=True).round(3).to_dict()}")
+    
+    args.output.mkdir(parents=True, exist_ok=True)
+    output_csv = args.output / 'turni_completi_52_settimane.csv'
+    with fase('salva_csv', len(df)):
+        salva_turni(df, output_csv)
+        salva_partizioni(df, output_csv)
+    print(f"✅ CSV e partizioni salvati: {output_csv}")
+    
+    # Stesso dataset con le colonne dell'arricchimento, letto dall'analisi forense
+    output_arricchito = args.output / 'dati_arricchiti.csv'
+    df_arricchito = arricchisci_turni(df)
+    salva_turni(df_arricchito, output_arricchito)
+    salva_partizioni(df_arricchito, output_arricchito)
+    print(f"✅ Dati arricchiti salvati: {output_arricchito}")
+    
+    if args.pdf:
+        percorsi = genera_pdf_settimane(df, args.output)
+        print(f"✅ PDF ROTA scritti: {len(percorsi)}")
+        if args.staff > len(STAFF_SINTETICO):
+            print(f"   ⚠️  Nei PDF solo {', '.join(STAFF_SINTETICO)} sono riconosciuti dall'estrazione")
+    
+    print(f"\n💡 Analisi sui dati generati: ROTA_BASE_PATH='{args.output}' python3 analisi_hr_anno_completo.py")
+
+if __name__ == '__main__':
+    main()
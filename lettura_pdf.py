@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Lettura in streaming del testo dei PDF ROTA
+Pagine e righe vengono prodotte una alla volta: nessuno script deve più
+tenere in memoria l'intero testo del documento e la sua lista di righe
+"""
+
+import PyPDF2
+
+def iter_pagine_pdf(pdf_path):
+    """Genera il testo di ogni pagina del PDF, una pagina alla volta.
+    
+    Gli errori di lettura si propagano al chiamante: un flusso interrotto a
+    metà non deve sembrare un PDF finito (né finire troncato in cache).
+    """
+    with open(pdf_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        for page in reader.pages:
+            yield page.extract_text() or ''
+
+def iter_righe(pagine):
+    """Divide in righe il testo delle pagine come farebbe ''.join(pagine).split('\\n').
+    
+    Le pagine non sono separate da un a capo: l'ultima riga (incompleta) di una
+    pagina prosegue nella prima della pagina successiva, esattamente come nella
+    vecchia concatenazione text += page.extract_text().
+    """
+    resto = ''
+    for testo in pagine:
+        parti = (resto + testo).split('\n')
+        resto = parti.pop()
+        yield from parti
+    yield resto
+
+def iter_righe_pdf(pdf_path):
+    """Righe di testo del PDF, lette pagina per pagina"""
+    return iter_righe(iter_pagine_pdf(pdf_path))
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Motore unico delle metriche per staff
+Tutti i KPI per staff (turni, NORMALE, riposi, ferie, off, ore, weekend e
+festivi lavorati) escono da un solo groupby su chiavi categoriali invece di
+un filtro del DataFrame per ogni staff e per ogni tipo turno. Dashboard e
+script di analisi leggono lo stesso DataFrame (una riga per staff) e ne
+scelgono colonne ed etichette
+"""
+
+import pandas as pd
+
+TIPI_LAVORO = ['NORMALE']
+TIPI_RIPOSO = ['RIPO', 'RDOM']
+TIPI_FERIE = ['FERIOR']
+TIPI_OFF = ['OFF', 'CHIUSO']
+
+# Metrica di conteggio -> tipi turno che la compongono (gli altri tipi contano solo nel totale)
+CATEGORIE = {
+    'turni_normali': TIPI_LAVORO,
+    'riposi': TIPI_RIPOSO,
+    'ferie': TIPI_FERIE,
+    'off': TIPI_OFF,
+}
+
+COLONNE = ['turni_totali', 'turni_normali', 'riposi', 'ferie', 'off',
+           'weekend_lavorati', 'festivi_lavorati',
+           'ore_totali', 'turni_con_ore', 'ore_media',
+           'ore_normali', 'normali_con_ore', 'ore_media_normali']
+
+# Colonne additive (somme su sottoinsiemi di turni): le medie si ricavano da queste
+COLONNE_SOMMABILI = [c for c in COLONNE if c not in ('ore_media', 'ore_media_normali')]
+
+def _flag(df, colonna):
+    if colonna not in df.columns:
+        return pd.Series(False, index=df.index, name=colonna)
+    return df[colonna].fillna(False).astype(bool)
+
+def cubo_turni(df, per=(), staff_col='staff', tipo_col='tipo_turno', ore_col='ore_lavoro'):
+    """Conteggi e ore per staff x tipo_turno x weekend x festivo (+ le colonne in per).
+    
+    Un solo groupby con staff e tipo_turno categoriali. Ogni cella ha n
+    (turni), ore (somma ore_lavoro) e n_ore (turni con ore_lavoro valorizzato).
+    Le chiavi mancanti restano nel cubo (dropna=False), così i totali
+    coincidono con quelli sui dati grezzi.
+    """
+    ore = pd.to_numeric(df[ore_col], errors='coerce')
+    chiavi = [
+        df[staff_col].astype('category').rename('staff'),
+        df[tipo_col].astype('category').rename('tipo_turno'),
+        _flag(df, 'is_weekend').rename('is_weekend'),
+        _flag(df, 'is_festivo').rename('is_festivo'),
+    ]
+    chiavi += [df[col] for col in per]
+    valori = pd.DataFrame({
+        'n': 1,
+        'ore': ore.fillna(0),
+        'n_ore': ore.notna().astype(int)
+    }, index=df.index)
+    
+    return valori.groupby(chiavi, observed=True, dropna=False).sum()
+
+def metriche_da_cubo(cubo, staff=None, per=()):
+    """KPI per staff (indice staff, colonne COLONNE) da un cubo_turni.
+    
+    staff: elenco degli staff da riportare, nell'ordine voluto (zero per chi
+    non ha turni); di default quelli presenti, in ordine alfabetico.
+    per:   colonne extra del cubo da tenere nell'indice (es. ['settimana']);
+           in quel caso staff non si applica.
+    ore_media è la media sui turni con ore, ore_media_normali quella sui soli
+    turni NORMALE con ore (NaN se non ce ne sono).
+    """
+    celle = cubo.reset_index()
+    celle = celle[celle['staff'].notna()]
+    tipo = celle['tipo_turno'].astype(object)
+    n = celle['n']
+    normale = tipo.isin(TIPI_LAVORO)
+    
+    colonne = {'turni_totali': n}
+    for nome, tipi in CATEGORIE.items():
+        colonne[nome] = n.where(tipo.isin(tipi), 0)
+    colonne['weekend_lavorati'] = n.where(normale & celle['is_weekend'], 0)
+    colonne['festivi_lavorati'] = n.where(normale & celle['is_festivo'], 0)
+    colonne['ore_totali'] = celle['ore']
+    colonne['turni_con_ore'] = celle['n_ore']
+    colonne['ore_normali'] = celle['ore'].where(normale, 0)
+    colonne['normali_con_ore'] = celle['n_ore'].where(normale, 0)
+    
+    chiavi = [celle['staff'].astype(object).rename('staff')] + [celle[col] for col in per]
+    metriche = pd.DataFrame(colonne).groupby(chiavi, dropna=False).sum()
+    if staff is not None and not per:
+        metriche = metriche.reindex(pd.Index(list(staff), name='staff'), fill_value=0)
+    
+    return completa_medie(metriche)
+
+def completa_medie(metriche):
+    """Aggiunge ore_media e ore_media_normali alle colonne sommabili"""
+    metriche['ore_media'] = metriche['ore_totali'] / metriche['turni_con_ore'].where(metriche['turni_con_ore'] > 0)
+    metriche['ore_media_normali'] = (metriche['ore_normali'] /
+                                     metriche['normali_con_ore'].where(metriche['normali_con_ore'] > 0))
+    return metriche[COLONNE]
+
+def metriche_staff(df, staff=None):
+    """KPI per staff direttamente dai turni (cubo_turni + metriche_da_cubo)"""
+    return metriche_da_cubo(cubo_turni(df), staff)
+
+def tabella_metriche(metriche, etichette):
+    """Colonne del motore rinominate con le etichette di un report ({colonna: etichetta})"""
+    tabella = metriche[list(etichette)].rename(columns=etichette)
+    tabella.index.name = None
+    return tabella
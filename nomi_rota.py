@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Nomi dei file ROTA: settimana, revisione e date, e scelta delle revisioni
+Una sola tabella di pattern, compilati all'import, per tutti i formati dei
+nomi in archivio (prima c'erano tre copie divergenti negli script di
+estrazione); il risultato per nome resta in una cache LRU, così scansioni
+ripetute di cartelle con migliaia di file storici non rifanno le regex.
+Le revisioni modN della stessa settimana si ordinano: seleziona_revisioni
+tiene la più recente di ogni settimana e le altre non vengono nemmeno aperte.
+"""
+
+import os
+import re
+from functools import lru_cache
+
+# Formati dei nomi, nell'ordine in cui vanno provati: (esempio, pattern).
+# Gruppi opzionali: mod (revisione), inizio e fine (date del periodo)
+PATTERN_NOMI = [
+    ('ROTA 1 mod1_301224-050125',
+     re.compile(r'ROTA\s*(?P<settimana>\d+)\s*[_\s]*(?P<mod>mod\d+)?[_\s]*(?P<inizio>\d{6})-(?P<fine>\d{6})', re.IGNORECASE)),
+    ('ROTA 10 _03.03-09.03',
+     re.compile(r'ROTA\s*(?P<settimana>\d+)\s*[_\s]*(?P<mod>mod\d+)?_(?P<inizio>\d+)[-.](?P<fine>\d+)', re.IGNORECASE)),
+    ('ROTA 15 MOD1_07.04',
+     re.compile(r'ROTA\s*(?P<settimana>\d+)\s*(?P<mod>mod\d+)?_(?P<inizio>\d+)-(?P<fine>\d+)', re.IGNORECASE)),
+    ('ROTA 17_210425',
+     re.compile(r'ROTA\s*(?P<settimana>\d+)[_\s]+\d+', re.IGNORECASE)),
+    ('ROTA 18',
+     re.compile(r'ROTA\s*(?P<settimana>\d+)', re.IGNORECASE)),
+]
+
+# Revisione, spazi e trattini bassi: tolti dal nome restano settimana, date e sede
+PATTERN_REVISIONE = re.compile(r'mod\d+|[\s_]+', re.IGNORECASE)
+
+def _nome(percorso):
+    # Più leggero di Path(percorso).name, a ogni chiamata anche con la cache calda
+    return os.path.basename(os.fspath(percorso))
+
+@lru_cache(maxsize=65536)
+def _analizza(nome):
+    for _, pattern in PATTERN_NOMI:
+        m = pattern.search(nome)
+        if m:
+            gruppi = m.groupdict()
+            mod = (gruppi.get('mod') or '').lower()
+            return m.group('settimana'), mod, gruppi.get('inizio'), gruppi.get('fine')
+    return None, '', None, None
+
+def analizza_nome_file(filename):
+    """Settimana, revisione (modN) e date dal nome del file, in un dict nuovo a ogni chiamata.
+    
+    Chiavi: settimana (stringa, None se il nome non ha numero), modifiche
+    ('mod1'... in minuscolo, '' se manca), data_inizio e data_fine (None se
+    il formato non le ha).
+    """
+    settimana, modifiche, data_inizio, data_fine = _analizza(_nome(filename))
+    return {
+        'settimana': settimana,
+        'modifiche': modifiche,
+        'data_inizio': data_inizio,
+        'data_fine': data_fine
+    }
+
+def revisione(filename):
+    """Numero di revisione: N di modN, 0 per il file senza modifiche"""
+    modifiche = _analizza(_nome(filename))[1]
+    return int(modifiche[3:]) if modifiche else 0
+
+def _settimana(nome):
+    # Stessa settimana = stesso nome a meno della revisione (e di spazi, trattini
+    # bassi e maiuscole): le date nel nome separano gli anni, la sede le sedi
+    if _analizza(nome)[0] is None:
+        return None
+    return PATTERN_REVISIONE.sub('', nome).lower()
+
+def seleziona_revisioni(percorsi):
+    """Tiene solo la revisione più recente (modN più alto) di ogni settimana.
+    
+    Ritorna (scelti, superati), entrambi nell'ordine di percorsi. I file
+    senza numero di settimana sono sempre scelti; a parità di revisione
+    vince l'ultimo nome in ordine alfabetico.
+    """
+    nomi = [_nome(percorso) for percorso in percorsi]
+    chiavi = [_settimana(nome) for nome in nomi]
+    
+    migliore = {}
+    for nome, chiave in zip(nomi, chiavi):
+        if chiave is None:
+            continue
+        rango = (revisione(nome), nome)
+        if chiave not in migliore or rango > migliore[chiave]:
+            migliore[chiave] = rango
+    
+    scelti_nomi = {nome for _, nome in migliore.values()}
+    scelti, superati = [], []
+    for percorso, nome, chiave in zip(percorsi, nomi, chiavi):
+        if chiave is None or nome in scelti_nomi:
+            scelti.append(percorso)
+        else:
+            superati.append(percorso)
+    return scelti, superati
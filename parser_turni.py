@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Tokenizer a passata singola per le righe turni dei PDF ROTA
+Una sola regex compilata riconosce in un'unica scansione nomi staff, codici
+turno, fasce orarie HH.MM-HH.MM, orari singoli e ore lavorate; ogni staff
+riceve poi i token del proprio segmento di riga (fino al nome successivo)
+"""
+
+import re
+from functools import lru_cache
+
+def _alternativa(parole):
+    # Le parole più lunghe per prime: 'PACINI' deve vincere su un eventuale 'PAC'
+    return '|'.join(re.escape(p) for p in sorted(parole, key=len, reverse=True))
+
+@lru_cache(maxsize=None)
+def _compila(staff_names, turno_types):
+    return re.compile(
+        r'(?P<fascia>(?P<eh>\d{1,2})[:.,](?P<em>\d{2})\s*-\s*(?P<uh>\d{1,2})[:.,](?P<um>\d{2}))'
+        r'|(?P<ore>(?P<ore_i>\d+)[,.](?P<ore_d>\d+)(?=\s+\d{1,2}[:.]\d{2}))'
+        r'|(?P<orario>(?P<oh>\d{1,2})[:.,](?P<om>\d{2}))'
+        rf'|(?P<staff>{_alternativa(staff_names)})'
+        rf'|(?P<codice>{_alternativa(turno_types)})'
+    )
+
+# Intestazioni di giorno: 'lunedì 30 dicembre 2024' oppure una data DD/MM/YY(YY)
+INTESTAZIONE_GIORNO = re.compile(
+    r'(?P<esteso>(?:lunedì|martedì|mercoledì|giovedì|venerdì|sabato|domenica)\s+\d{1,2}\s+[a-z]+\s+\d{4})'
+    r'|(?<!\d)(?P<gg>\d{2})/(?P<mm>\d{2})/(?P<aa>\d{4}|\d{2})(?!\d)',
+    re.IGNORECASE
+)
+
+def intestazione_giorno(line):
+    """Prima intestazione di giorno della riga come (posizione, data_rota), None se non c'è.
+    
+    data_rota è il testo esteso così com'è oppure la data come DD/MM/YYYY. Una
+    riga con più intestazioni (griglia della settimana) vale per la prima.
+    """
+    m = INTESTAZIONE_GIORNO.search(line)
+    if m is None:
+        return None
+    if m.group('esteso'):
+        return m.start(), m.group('esteso')
+    anno = m.group('aa') if len(m.group('aa')) == 4 else f"20{m.group('aa')}"
+    return m.start(), f"{m.group('gg')}/{m.group('mm')}/{anno}"
+
+def compila_tokenizer(staff_names, turno_types):
+    """Regex unica (in cache) per una coppia lista staff / lista codici turno"""
+    return _compila(tuple(staff_names), tuple(turno_types))
+
+def _orario(ore, minuti):
+    return f"{ore.zfill(2)}:{minuti}"
+
+def analizza_riga(line, tokenizer, turno_types):
+    """Turni presenti in una riga, uno per staff (prima occorrenza), in ordine di apparizione.
+    
+    Ogni turno è un dict con staff, tipo_turno, ore_lavoro, ora_entrata, ora_uscita,
+    ricavati dal segmento di riga dello staff, e la posizione del nome nella riga:
+      - orari: prima fascia HH.MM-HH.MM del segmento, altrimenti i primi due orari singoli
+      - ore: primo valore X,Y seguito da un orario
+      - tipo: codice del segmento con priorità secondo l'ordine di turno_types;
+        i token prima del primo nome valgono come codice per tutti gli staff
+        senza codice né orari propri e come orari per il primo staff
+    """
+    prefisso = []
+    segmenti = []
+    for m in tokenizer.finditer(line):
+        if m.lastgroup == 'staff':
+            segmenti.append((m.group('staff'), m.start(), []))
+        elif segmenti:
+            segmenti[-1][2].append(m)
+        else:
+            prefisso.append(m)
+    
+    priorita = {t: i for i, t in enumerate(turno_types)}
+    codici_prefisso = [m.group('codice') for m in prefisso if m.lastgroup == 'codice']
+    
+    turni = []
+    visti = set()
+    for n, (staff, posizione, tokens) in enumerate(segmenti):
+        if staff in visti:
+            continue
+        visti.add(staff)
+        
+        if n == 0:
+            tokens = prefisso + tokens
+        
+        fasce = [m for m in tokens if m.lastgroup == 'fascia']
+        orari = [m for m in tokens if m.lastgroup == 'orario']
+        ore = [m for m in tokens if m.lastgroup == 'ore']
+        codici = [m.group('codice') for m in tokens if m.lastgroup == 'codice']
+        
+        entrata = uscita = None
+        if fasce:
+            entrata = _orario(fasce[0].group('eh'), fasce[0].group('em'))
+            uscita = _orario(fasce[0].group('uh'), fasce[0].group('um'))
+        elif len(orari) >= 2:
+            entrata = _orario(orari[0].group('oh'), orari[0].group('om'))
+            uscita = _orario(orari[1].group('oh'), orari[1].group('om'))
+        
+        ore_lavoro = None
+        if ore:
+            ore_lavoro = float(f"{ore[0].group('ore_i')}.{ore[0].group('ore_d')}")
+        
+        if not codici and not fasce and not orari:
+            codici = codici_prefisso
+        tipo_turno = min(codici, key=priorita.__getitem__) if codici else "NORMALE"
+        
+        turni.append({
+            'staff': staff,
+            'tipo_turno': tipo_turno,
+            'ore_lavoro': ore_lavoro,
+            'ora_entrata': entrata,
+            'ora_uscita': uscita,
+            'posizione': posizione
+        })
+    
+    return turni
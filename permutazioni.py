@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Test di permutazione (Monte Carlo) per la significatività del favoritismo
+I turni di ogni giorno vengono rimescolati tra gli staff presenti quel giorno
+(stessa settimana, stesso giorno: la copertura giornaliera non cambia) decine
+di migliaia di volte; i p-value sono empirici e non assumono la normalità
+degli score su pochi staff
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import permutations
+from math import factorial
+
+import numpy as np
+import pandas as pd
+
+ATTRIBUTI = ('normale', 'comodo', 'scomodo', 'riposo')
+
+# Permutazioni per blocco: ogni blocco ha il suo stream RNG (SeedSequence.spawn),
+# quindi i risultati con lo stesso seed non dipendono dal numero di worker
+BLOCCO = 2000
+
+# Fino a 7 staff (5040 permutazioni) conviene estrarre da una tabella invece di ordinare
+MAX_STAFF_TABELLA = 7
+
+def matrice_turni(df, attributi, strato=('settimana', 'data_rota'), ordine=('settimana', 'file')):
+    """Matrice giorno x staff degli attributi booleani dei turni.
+    
+    df:        turni (una riga per staff/giorno)
+    attributi: DataFrame booleano allineato a df con le colonne di ATTRIBUTI
+    strato:    colonne che identificano il giorno entro cui si permuta
+    ordine:    ordinamento cronologico dei giorni (stabile, come le sequenze riposi)
+    
+    Se lo strato contiene più righe dello stesso staff (es. data_rota è la data
+    del file, uguale per tutta la settimana) la n-esima riga di ogni staff
+    è il suo n-esimo giorno dello strato. Ritorna un dict con 'staff',
+    'presente' (G x S) e 'valori' (A x G x S).
+    """
+    ordine = list(ordine)
+    strato = list(strato)
+    righe = df.reset_index(drop=True).sort_values(ordine, kind='stable')
+    
+    giorni = righe[strato].astype(str)
+    giorni['_n'] = righe.groupby(strato + ['staff'], sort=False, dropna=False).cumcount()
+    chiave_giorno = pd.MultiIndex.from_frame(giorni)
+    giorno, _ = pd.factorize(chiave_giorno)
+    staff = sorted(righe['staff'].unique())
+    colonna = pd.Index(staff).get_indexer(righe['staff'])
+    
+    # Un turno per (giorno, staff)
+    cella = giorno * len(staff) + colonna
+    _, prima = np.unique(cella, return_index=True)
+    pos = righe.index.to_numpy()[prima]
+    
+    n_giorni = int(giorno.max()) + 1 if len(giorno) else 0
+    presente = np.zeros((n_giorni, len(staff)), dtype=bool)
+    presente[giorno[prima], colonna[prima]] = True
+    
+    valori = np.zeros((len(ATTRIBUTI), n_giorni, len(staff)), dtype=bool)
+    attributi = attributi.reset_index(drop=True)
+    for a, nome in enumerate(ATTRIBUTI):
+        valori[a, giorno[prima], colonna[prima]] = attributi[nome].to_numpy(dtype=bool)[pos]
+    
+    return {'staff': staff, 'presente': presente, 'valori': valori}
+
+def _indici_sequenze(presente):
+    """Per ogni staff i giorni in cui è presente, in ordine (S x L) + maschera validità.
+    
+    La presenza non cambia con le permutazioni: le sequenze di riposo di uno
+    staff scorrono solo sui suoi giorni, come nell'analisi pattern riposi.
+    """
+    n_giorni, n_staff = presente.shape
+    lunghezze = presente.sum(axis=0)
+    L = int(lunghezze.max()) if n_staff else 0
+    indici = np.zeros((n_staff, L), dtype=np.intp)
+    validi = np.arange(L) < lunghezze[:, None]
+    for s in range(n_staff):
+        indici[s, :lunghezze[s]] = np.flatnonzero(presente[:, s])
+    return indici, validi
+
+def _codifica_celle(valori):
+    """Attributi (A x G x S) impacchettati in un uint8 per cella, un bit per attributo"""
+    pesi = (1 << np.arange(len(ATTRIBUTI), dtype=np.uint8))[:, None, None]
+    return (valori * pesi).sum(axis=0).astype(np.uint8)
+
+def _tabella(funzione):
+    """Tabella di lookup codice cella -> valore, su tutte le combinazioni di bit"""
+    codici = np.arange(1 << len(ATTRIBUTI))
+    bit = {nome: (codici >> i) & 1 for i, nome in enumerate(ATTRIBUTI)}
+    return funzione(**bit).astype(np.int8)
+
+# Contributo di ogni turno allo score: comodo +2, scomodo -2
+PUNTI = _tabella(lambda normale, comodo, scomodo, riposo: 2 * comodo - 2 * scomodo)
+NORMALE = _tabella(lambda normale, comodo, scomodo, riposo: normale)
+RIPOSO = _tabella(lambda normale, comodo, scomodo, riposo: riposo).astype(bool)
+
+def statistiche(celle, indici, validi):
+    """Score favoritismo e sequenze riposo 3+ giorni per staff.
+    
+    celle: (B, G, S) codici cella per B assegnazioni; ritorna due array (B, S).
+    Score = (comodi x 2 + sequenze lunghe x 3 - scomodi x 2) / turni NORMALE x 100,
+    come in calcola_score_favoritismo.
+    """
+    n_turni = NORMALE[celle].sum(axis=1, dtype=np.int32)
+    punti = PUNTI[celle].sum(axis=1, dtype=np.int32)
+    
+    staff = np.arange(indici.shape[0])[:, None]
+    r = RIPOSO[celle[:, indici, staff]] & validi                # (B, S, L)
+    precedente = np.zeros_like(r)
+    precedente[..., 1:] = r[..., :-1]
+    seq_lunghe = (r[..., :-2] & r[..., 1:-1] & r[..., 2:] & ~precedente[..., :-2]).sum(axis=-1)
+    
+    grezzo = punti + seq_lunghe * 3
+    score = np.divide(grezzo * 100.0, n_turni, out=np.zeros(grezzo.shape), where=n_turni > 0)
+    return score, seq_lunghe
+
+def _permuta_giorni(presente, rng, n):
+    """n permutazioni casuali dei turni di ogni giorno tra gli staff presenti.
+    
+    Ritorna indici piatti (n x G x S) nella matrice giorno x staff: la cella
+    (g, s) riceve il turno della cella indicata. Gli assenti restano assenti.
+    """
+    n_giorni, n_staff = presente.shape
+    if presente.all() and n_staff <= MAX_STAFF_TABELLA:
+        # Tutti presenti: si estrae una permutazione dalla tabella di tutte le S!
+        perm = _permutazioni_staff(n_staff)[rng.integers(0, factorial(n_staff), (n, n_giorni))]
+    else:
+        chiavi = rng.random((n, n_giorni, n_staff), dtype=np.float32)
+        chiavi += ~presente                                     # assenti in coda
+        sorgente = np.argsort(chiavi, axis=-1)
+        # Slot presenti in ordine fisso: ricevono i turni del giorno in ordine casuale
+        destinazione = np.argsort(~presente, axis=-1, kind='stable')
+        perm = np.empty_like(sorgente)
+        np.put_along_axis(perm, np.broadcast_to(destinazione, sorgente.shape), sorgente, axis=-1)
+    perm += (np.arange(n_giorni) * n_staff)[:, None]
+    return perm
+
+@lru_cache(maxsize=None)
+def _permutazioni_staff(n_staff):
+    return np.array(list(permutations(range(n_staff))), dtype=np.intp)
+
+def _blocco_permutazioni(args):
+    """Esegue n permutazioni con il proprio seed e ritorna i conteggi per i p-value"""
+    presente, celle, n, seed, osservati = args
+    rng = np.random.default_rng(seed)
+    indici, validi = _indici_sequenze(presente)
+    score_oss, seq_oss = osservati
+    
+    score, seq = statistiche(celle.ravel()[_permuta_giorni(presente, rng, n)], indici, validi)
+    
+    tolleranza = 1e-9
+    return {
+        'score_ge': (score >= score_oss - tolleranza).sum(axis=0),
+        'score_somma': score.sum(axis=0),
+        'seq_ge': (seq >= seq_oss).sum(axis=0),
+        'seq_le': (seq <= seq_oss).sum(axis=0),
+        'seq_somma': seq.sum(axis=0),
+        'n': n
+    }
+
+def test_permutazioni(matrice, n_permutazioni=10000, seed=0, workers=None):
+    """p-value empirici per staff (score favoritismo e sequenze riposo lunghe).
+    
+    p_score:      P(score permutato >= osservato), coda alta (favoritismo)
+    p_seq_alto:   P(sequenze lunghe permutate >= osservate)
+    p_seq_basso:  P(sequenze lunghe permutate <= osservate)
+    Con la correzione (1 + conteggio) / (1 + permutazioni), mai p = 0.
+    """
+    presente, celle = matrice['presente'], _codifica_celle(matrice['valori'])
+    indici, validi = _indici_sequenze(presente)
+    score_oss, seq_oss = statistiche(celle[None], indici, validi)
+    osservati = (score_oss[0], seq_oss[0])
+    
+    n_blocchi = -(-n_permutazioni // BLOCCO)
+    semi = np.random.SeedSequence(seed).spawn(n_blocchi)
+    dimensioni = [min(BLOCCO, n_permutazioni - i * BLOCCO) for i in range(n_blocchi)]
+    lavori = [(presente, celle, n, s, osservati) for n, s in zip(dimensioni, semi)]
+    
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and n_blocchi > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, n_blocchi)) as executor:
+            parziali = list(executor.map(_blocco_permutazioni, lavori))
+    else:
+        parziali = [_blocco_permutazioni(lavoro) for lavoro in lavori]
+    
+    totale = {k: sum(p[k] for p in parziali) for k in parziali[0]} if parziali else {}
+    n = totale.get('n', 0)
+    
+    return pd.DataFrame({
+        'score_osservato': osservati[0].round(2),
+        'score_medio_perm': (totale['score_somma'] / n).round(2) if n else np.nan,
+        'p_score': (1 + totale['score_ge']) / (1 + n) if n else np.nan,
+        'seq_lunghe_osservate': osservati[1],
+        'seq_lunghe_medie_perm': (totale['seq_somma'] / n).round(2) if n else np.nan,
+        'p_seq_alto': (1 + totale['seq_ge']) / (1 + n) if n else np.nan,
+        'p_seq_basso': (1 + totale['seq_le']) / (1 + n) if n else np.nan
+    }, index=matrice['staff'])
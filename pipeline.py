@@ -0,0 +1,593 @@
+#!/usr/bin/env python3
+"""
+Pipeline a stadi: estrazione → arricchimento → analisi → report in un solo processo
+Sostituisce la catena di script dei .sh (ogni passo un processo che rilegge il
+CSV dal disco): gli stadi formano un grafo, si passano i DataFrame in memoria
+e i risultati intermedi restano in cache su disco, indicizzati per contenuto.
+
+Ogni stadio ha una chiave: hash di nome, versione, sorgenti dei moduli che usa
+e contenuto dei suoi ingressi (PDF, filtri o risultati di altri stadi).
+Se la chiave non cambia e i file prodotti sono ancora quelli scritti l'ultima
+volta, lo stadio non viene rieseguito. Un risultato identico al precedente
+(stesso hash) non invalida gli stadi a valle. Gli stadi indipendenti (es.
+analisi forense e report di equità) girano in parallelo.
+
+Cache in BASE_PATH/.pipeline:
+    artefatti/<sha256>.pkl   risultati degli stadi (pickle)
+    stato.json               stadio -> chiave, artefatto, hash dei file prodotti
+
+Uso:
+    python3 pipeline.py                          # tutti gli stadi
+    python3 pipeline.py --solo report_hr         # uno stadio e ciò che gli serve
+    python3 pipeline.py --forza estrazione       # riesegue anche se in cache
+    python3 pipeline.py --solo report_forense --permutazioni 10000 --seed 1   # con i p-value empirici
+    python3 pipeline.py --elenco                 # grafo degli stadi
+    python3 pipeline.py --profile --workers 1    # cProfile vede solo il thread principale
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import pickle
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+import pandas as pd
+
+import extract_turni_completo
+import extract_turni_avanzato
+import analisi_hr_anno_completo
+import analisi_statistica_manipolazione
+import analisi_avanzata
+import analisi_equita_hr
+import arricchimento
+import censura_nomi
+import censura_completa
+from cache_estrazione import CacheEstrazione, CACHE_DIR_NAME, hash_file, _scrivi_atomico
+from archivio_turni import BASE_PATH, come_caricato
+from dataset_turni import carica_dataset, filtri_ambiente, verifica_perimetro
+from nomi_rota import seleziona_revisioni
+from strumentazione import conta_righe, esecuzione, fase
+
+CARTELLA_PIPELINE = '.pipeline'
+
+# Cambia quando cambia il formato della cache (invalida tutti gli stadi)
+VERSIONE = 1
+
+# Moduli del repository: le loro sorgenti entrano nella chiave degli stadi che li usano
+CARTELLA_MODULI = Path(__file__).resolve().parent
+
+# Moduli che non cambiano i risultati (solo misure)
+MODULI_NEUTRI = {'strumentazione'}
+
+# ============================================================
+# STADI
+# ============================================================
+
+class Stadio:
+    """Uno stadio del grafo.
+    
+    funzione(opzioni, *ingressi) riceve i valori degli ingressi (sorgenti o
+    stadi, nell'ordine dichiarato) e ritorna il risultato da passare a valle.
+    file sono i file scritti in BASE_PATH (verificati prima di saltare lo
+    stadio); moduli quelli di cui la chiave segue le sorgenti.
+    """
+
+    def __init__(self, nome, funzione, ingressi=(), file=(), moduli=(), versione=1):
+        self.nome = nome
+        self.funzione = funzione
+        self.ingressi = list(ingressi)
+        self.file = list(file)
+        self.moduli = list(moduli)
+        self.versione = versione
+
+def _estrazione(opzioni, pdf_files):
+    modulo = extract_turni_completo
+    cache = None if opzioni.no_cache else CacheEstrazione(
+        BASE_PATH / CACHE_DIR_NAME, 'completo', modulo.PARSER_VERSION)
+    df = modulo.estrai_turni(pdf_files, 1, cache)
+    modulo.salva_turni_completi(df, BASE_PATH)
+    return come_caricato(df, df.columns)
+
+def _arricchimento(opzioni, df):
+    df = arricchimento.salva_turni_arricchiti(df, BASE_PATH)
+    return come_caricato(df, df.columns)
+
+def _turni(opzioni, df, filtri):
+    # Turni arricchiti: il calendario prende date e festività già calcolate.
+    # Con i filtri ROTA_SEDI / ROTA_ANNI si leggono solo le partizioni richieste;
+    # il report HR somma per staff e settimana: una sola sede e un solo anno
+    colonne = analisi_hr_anno_completo.COLONNE_USATE
+    if any(v is not None for v in filtri.values()):
+        return carica_dataset(BASE_PATH / 'dati_arricchiti.csv', colonne, unico=True, **filtri)
+    verifica_perimetro(df)
+    return df[[c for c in colonne if c in df.columns]]
+
+def _calendario(opzioni, df):
+    print(f"✅ Dati caricati: {len(df)} turni da {df['settimana'].nunique()} settimane")
+    return analisi_hr_anno_completo.genera_calendario_anno_completo(df)
+
+def _analisi_hr(opzioni, df_cal):
+    modulo = analisi_hr_anno_completo
+    festivi = modulo.analisi_festivi_anno_completo(df_cal)
+    riposi = modulo.analisi_riposi_anno_completo(df_cal)
+    df_metriche, cv_results = modulo.analisi_equita_anno_completo(df_cal)
+    confronti = modulo.confronti_dettagliati_anno(df_cal, df_metriche)
+    anomalie = modulo.identifica_anomalie_anno(df_cal, df_metriche, riposi)
+    return {
+        'festivi': festivi,
+        'riposi': riposi,
+        'metriche': df_metriche,
+        'cv': cv_results,
+        'confronti': confronti,
+        'anomalie': anomalie,
+    }
+
+def _report_hr(opzioni, df, df_cal, analisi):
+    return analisi_hr_anno_completo.genera_report_hr_completo(
+        df, df_cal, analisi['metriche'], analisi['festivi'], analisi['riposi'],
+        analisi['anomalie'], analisi['confronti'], analisi['cv'])
+
+def _forense(opzioni, df, permutazioni):
+    modulo = analisi_statistica_manipolazione
+    df = df[df['staff'].notna()].copy()
+    print(f"\n✅ Dati caricati: {len(df)} turni")
+    df_comfort = modulo.classifica_turni_comodita(df)
+    df_riposi = modulo.analisi_riposi_consecutivi_pattern(df)
+    test_chi = modulo.test_chi_quadrato_distribuzione(df)
+    df_perm = None
+    if permutazioni['n'] > 0:
+        df_perm = modulo.test_permutazioni_favoritismo(df, permutazioni['n'], permutazioni['seed'])
+    df_scores = modulo.calcola_score_favoritismo(df, df_comfort, df_riposi, df_perm)
+    modulo.analisi_probabilita_pattern(df_riposi, df_perm)
+    modulo.test_distribuzione_uniforme(df)
+    return {
+        'turni': df,
+        'comfort': df_comfort,
+        'riposi': df_riposi,
+        'chi': test_chi,
+        'scores': df_scores,
+        'permutazioni': df_perm,
+    }
+
+def _report_forense(opzioni, forense):
+    return analisi_statistica_manipolazione.genera_report_forense(
+        forense['turni'], forense['comfort'], forense['riposi'], forense['chi'], forense['scores'],
+        forense['permutazioni'])
+
+def _censura(opzioni, df):
+    # Le censure leggono e scrivono a blocchi dal disco: nessun DataFrame da passare a valle
+    censura_nomi.main()
+    censura_completa.main()
+
+def _estrazione_dettagliata(opzioni, pdf_files):
+    modulo = extract_turni_avanzato
+    cache = None if opzioni.no_cache else CacheEstrazione(
+        BASE_PATH / CACHE_DIR_NAME, 'avanzato', modulo.PARSER_VERSION)
+    df = modulo.estrai_turni(pdf_files, cache)
+    modulo.salva_turni_dettagliati(df, BASE_PATH)
+    return come_caricato(df, df.columns)
+
+def _analisi_avanzata(opzioni, df):
+    return analisi_avanzata.analizza(df)
+
+def _equita(opzioni, df):
+    colonne = analisi_equita_hr.COLONNE_USATE
+    return analisi_equita_hr.analizza(df[[c for c in colonne if c in df.columns]])
+
+STADI = [
+    Stadio('estrazione', _estrazione, ['pdf'],
+           file=['turni_completi_52_settimane.csv'], moduli=[extract_turni_completo]),
+    Stadio('arricchimento', _arricchimento, ['estrazione'],
+           file=['dati_arricchiti.csv'], moduli=[arricchimento]),
+    Stadio('turni', _turni, ['arricchimento', 'filtri'], moduli=[analisi_hr_anno_completo]),
+    Stadio('calendario', _calendario, ['turni'], moduli=[analisi_hr_anno_completo]),
+    Stadio('analisi_hr', _analisi_hr, ['calendario'], moduli=[analisi_hr_anno_completo]),
+    Stadio('report_hr', _report_hr, ['turni', 'calendario', 'analisi_hr'],
+           file=['REPORT_HR_ANNO_COMPLETO_2025.xlsx'], moduli=[analisi_hr_anno_completo]),
+    Stadio('forense', _forense, ['arricchimento', 'permutazioni'], moduli=[analisi_statistica_manipolazione]),
+    Stadio('report_forense', _report_forense, ['forense'],
+           file=['REPORT_FORENSE_MANIPOLAZIONE.xlsx'], moduli=[analisi_statistica_manipolazione]),
+    Stadio('censura', _censura, ['arricchimento'],
+           file=['dati_arricchiti_censurati.csv', 'dati_web.csv'], moduli=[censura_nomi, censura_completa]),
+    Stadio('estrazione_dettagliata', _estrazione_dettagliata, ['pdf'],
+           file=['turni_dettagliati.csv'], moduli=[extract_turni_avanzato]),
+    Stadio('analisi_avanzata', _analisi_avanzata, ['estrazione_dettagliata'],
+           file=['REPORT_FINALE_COMPLETO.xlsx'], moduli=[analisi_avanzata]),
+    Stadio('equita', _equita, ['estrazione_dettagliata'],
+           file=['REPORT_HR_EQUITA_COMPLIANCE.xlsx'], moduli=[analisi_equita_hr]),
+]
+
+# ============================================================
+# SORGENTI
+# ============================================================
+
+def _sorgente_pdf(indice, opzioni):
+    """PDF ROTA della cartella: lista ordinata dei percorsi, hash di nomi e contenuti.
+    
+    Le revisioni superate (modN più vecchi della stessa settimana) restano
+    fuori, salvo --tutte-le-revisioni: non vengono né lette né hashate.
+    """
+    pdf_files = sorted(BASE_PATH.glob('ROTA*.pdf'))
+    if not opzioni.tutte_le_revisioni:
+        pdf_files, _ = seleziona_revisioni(pdf_files)
+    if not pdf_files:
+        return None, None
+    h = hashlib.sha256()
+    for pdf in pdf_files:
+        h.update(f"{pdf.name}\0{indice.sha(pdf)}\n".encode())
+    return pdf_files, h.hexdigest()
+
+def _sorgente_filtri(indice, opzioni):
+    """Filtri sedi / anni dall'ambiente (entrano nella chiave degli stadi che li usano)"""
+    filtri = filtri_ambiente()
+    return filtri, hashlib.sha256(json.dumps(filtri, sort_keys=True).encode()).hexdigest()
+
+def _sorgente_permutazioni(indice, opzioni):
+    """Test di permutazione del report forense (--permutazioni, --seed).
+    
+    I processi usati non entrano nella chiave: ogni blocco di permutazioni ha
+    il suo seme, i p-value non dipendono da come i blocchi vengono distribuiti.
+    """
+    permutazioni = {'n': max(0, opzioni.permutazioni), 'seed': opzioni.seed}
+    return permutazioni, hashlib.sha256(json.dumps(permutazioni, sort_keys=True).encode()).hexdigest()
+
+SORGENTI = {
+    'pdf': _sorgente_pdf,
+    'filtri': _sorgente_filtri,
+    'permutazioni': _sorgente_permutazioni,
+}
+
+# ============================================================
+# CHIAVI
+# ============================================================
+
+def _moduli_locali(moduli):
+    """Moduli del repository raggiungibili dai moduli dati (import diretti e nomi importati)"""
+    visti = {}
+    da_visitare = list(moduli)
+    while da_visitare:
+        modulo = da_visitare.pop()
+        percorso = getattr(modulo, '__file__', None)
+        if modulo.__name__ in visti or modulo.__name__ in MODULI_NEUTRI or percorso is None:
+            continue
+        if Path(percorso).resolve().parent != CARTELLA_MODULI:
+            continue
+        visti[modulo.__name__] = Path(percorso)
+        for valore in vars(modulo).values():
+            nome = valore.__name__ if isinstance(valore, type(sys)) else getattr(valore, '__module__', None)
+            if isinstance(nome, str) and nome in sys.modules:
+                da_visitare.append(sys.modules[nome])
+    return visti
+
+def hash_moduli(moduli):
+    h = hashlib.sha256()
+    for nome, percorso in sorted(_moduli_locali(moduli).items()):
+        h.update(f"{nome}\0{hash_file(percorso)}\n".encode())
+    return h.hexdigest()
+
+def chiave_stadio(stadio, hash_ingressi):
+    dati = json.dumps([VERSIONE, stadio.nome, stadio.versione, hash_moduli(stadio.moduli), hash_ingressi])
+    return hashlib.sha256(dati.encode()).hexdigest()
+
+# ============================================================
+# CACHE
+# ============================================================
+
+class Archivio:
+    """Artefatti indicizzati per contenuto e stato dell'ultima esecuzione di ogni stadio"""
+
+    def __init__(self, cartella):
+        self.cartella = Path(cartella)
+        self.artefatti = self.cartella / 'artefatti'
+        self.stato_path = self.cartella / 'stato.json'
+        self.stato = {}
+        self._lock = threading.Lock()
+        
+        if self.stato_path.exists():
+            try:
+                self.stato = json.loads(self.stato_path.read_text(encoding='utf-8'))
+            except (OSError, ValueError):
+                self.stato = {}
+
+    def salva_artefatto(self, valore):
+        """Pickle del risultato; ritorna lo sha256 dei byte (None se non serializzabile)"""
+        try:
+            dati = pickle.dumps(valore, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return None
+        sha = hashlib.sha256(dati).hexdigest()
+        path = self.artefatti / f'{sha}.pkl'
+        if not path.exists():
+            _scrivi_atomico(path, dati)
+        return sha
+
+    def carica_artefatto(self, sha):
+        with open(self.artefatti / f'{sha}.pkl', 'rb') as f:
+            return pickle.load(f)
+
+    def valido(self, nome, chiave, stadio):
+        """Lo stadio può essere saltato: stessa chiave, artefatto presente, file prodotti invariati"""
+        voce = self.stato.get(nome)
+        if not voce or voce['chiave'] != chiave:
+            return False
+        if voce['artefatto'] and not (self.artefatti / f"{voce['artefatto']}.pkl").exists():
+            return False
+        for file, sha in voce['file'].items():
+            path = BASE_PATH / file
+            if not path.exists() or hash_file(path) != sha:
+                return False
+        return len(voce['file']) == len(stadio.file)
+
+    def registra(self, nome, chiave, artefatto, file):
+        with self._lock:
+            self.stato[nome] = {'chiave': chiave, 'artefatto': artefatto, 'file': file}
+
+    def salva(self):
+        dati = json.dumps(self.stato, indent=1, sort_keys=True).encode('utf-8')
+        _scrivi_atomico(self.stato_path, dati)
+        
+        # Artefatti non più referenziati da nessuno stadio
+        usati = {voce['artefatto'] for voce in self.stato.values()}
+        if self.artefatti.exists():
+            for path in self.artefatti.glob('*.pkl'):
+                if path.stem not in usati:
+                    path.unlink()
+
+# ============================================================
+# OUTPUT
+# ============================================================
+
+class UscitaPerThread(io.TextIOBase):
+    """stdout che, per i thread registrati, accumula l'output invece di stamparlo.
+    
+    Con più stadi in parallelo le stampe si mescolerebbero: ogni stadio
+    scrive nel suo buffer, stampato in blocco quando lo stadio finisce.
+    """
+
+    def __init__(self, originale):
+        self.originale = originale
+        self.buffer_thread = {}
+
+    def cattura(self):
+        self.buffer_thread[threading.get_ident()] = io.StringIO()
+
+    def rilascia(self):
+        return self.buffer_thread.pop(threading.get_ident()).getvalue()
+
+    def write(self, testo):
+        buffer = self.buffer_thread.get(threading.get_ident())
+        return (buffer or self.originale).write(testo)
+
+    def flush(self):
+        self.originale.flush()
+
+# ============================================================
+# ESECUZIONE
+# ============================================================
+
+def _copia(valore):
+    # Copia superficiale (copy-on-write): uno stadio non modifica i DataFrame degli altri
+    if isinstance(valore, (pd.DataFrame, pd.Series)):
+        return valore.copy(deep=False)
+    if isinstance(valore, dict):
+        return {k: _copia(v) for k, v in valore.items()}
+    if isinstance(valore, (list, tuple)):
+        return type(valore)(_copia(v) for v in valore)
+    return valore
+
+def seleziona_stadi(solo=None):
+    """Stadi da considerare: quelli richiesti e i loro ingressi, in ordine di grafo"""
+    per_nome = {s.nome: s for s in STADI}
+    if not solo:
+        return list(STADI)
+    richiesti = set()
+    da_visitare = list(solo)
+    while da_visitare:
+        nome = da_visitare.pop()
+        if nome in richiesti or nome not in per_nome:
+            continue
+        richiesti.add(nome)
+        da_visitare.extend(per_nome[nome].ingressi)
+    return [s for s in STADI if s.nome in richiesti]
+
+class Esecutore:
+    """Esegue gli stadi appena i loro ingressi sono pronti, saltando quelli in cache"""
+
+    def __init__(self, stadi, opzioni):
+        self.stadi = stadi
+        self.opzioni = opzioni
+        self.archivio = Archivio(BASE_PATH / CARTELLA_PIPELINE)
+        self.valori = {}
+        self.hash = {}
+        self.esiti = {}
+        self._lazy = {}
+        self._lock = threading.Lock()
+
+    def valore(self, nome):
+        """Valore di un ingresso; gli artefatti in cache si caricano solo quando servono"""
+        with self._lock:
+            if nome not in self.valori and nome in self._lazy:
+                self.valori[nome] = self.archivio.carica_artefatto(self._lazy.pop(nome))
+            return self.valori[nome]
+
+    def prepara_sorgenti(self):
+        indice = CacheEstrazione(BASE_PATH / CACHE_DIR_NAME, 'pipeline', VERSIONE)
+        for nome, sorgente in SORGENTI.items():
+            if any(nome in s.ingressi for s in self.stadi):
+                self.valori[nome], self.hash[nome] = sorgente(indice, self.opzioni)
+        indice.salva_indice()
+
+    def esegui_stadio(self, stadio, chiave):
+        with fase(stadio.nome) as f:
+            risultato = stadio.funzione(self.opzioni, *[_copia(self.valore(n)) for n in stadio.ingressi])
+            f.righe = conta_righe(risultato)
+        
+        file = {}
+        for nome in stadio.file:
+            path = BASE_PATH / nome
+            if not path.exists():
+                # File non prodotto (errore gestito dallo stadio): si riprova alla prossima esecuzione
+                return risultato, 'senza_file'
+            file[nome] = hash_file(path)
+        
+        artefatto = None if risultato is None else self.archivio.salva_artefatto(risultato)
+        if risultato is not None and artefatto is None:
+            return risultato, 'non_in_cache'
+        self.archivio.registra(stadio.nome, chiave, artefatto, file)
+        return risultato, 'eseguito'
+
+    def _lancia(self, stadio, uscita):
+        if uscita is not None:
+            uscita.cattura()
+        inizio = time.perf_counter()
+        try:
+            risultato, esito = self.esegui_stadio(stadio, self._chiavi[stadio.nome])
+            return risultato, esito, time.perf_counter() - inizio, None
+        except Exception as e:
+            return None, 'errore', time.perf_counter() - inizio, e
+        finally:
+            if uscita is not None:
+                testo = uscita.rilascia()
+                with self._lock:
+                    uscita.originale.write(f"\n{'─' * 70}\n▶ {stadio.nome}\n{'─' * 70}\n{testo}")
+
+    def esegui(self, workers=1):
+        self.prepara_sorgenti()
+        self._chiavi = {}
+        in_attesa = list(self.stadi)
+        in_corso = {}
+        uscita = UscitaPerThread(sys.stdout) if workers > 1 else None
+        
+        if uscita is not None:
+            sys.stdout = uscita
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                while in_attesa or in_corso:
+                    for stadio in list(in_attesa):
+                        if any(n not in self.hash for n in stadio.ingressi):
+                            continue
+                        in_attesa.remove(stadio)
+                        self._avvia(stadio, pool, in_corso, uscita)
+                    
+                    if not in_corso:
+                        # Ingressi mai pronti (sorgente mancante o stadio a monte fallito)
+                        for stadio in in_attesa:
+                            self.esiti[stadio.nome] = ('non_eseguibile', 0.0)
+                        break
+                    
+                    finiti, _ = wait(in_corso, return_when=FIRST_COMPLETED)
+                    for futuro in finiti:
+                        stadio = in_corso.pop(futuro)
+                        risultato, esito, durata, errore = futuro.result()
+                        self.esiti[stadio.nome] = (esito, durata)
+                        if errore is not None:
+                            print(f"❌ Stadio {stadio.nome}: {errore!r}")
+                            continue
+                        self._pubblica(stadio, risultato)
+        finally:
+            if uscita is not None:
+                sys.stdout = uscita.originale
+            self.archivio.salva()
+        return self.esiti
+
+    def _avvia(self, stadio, pool, in_corso, uscita):
+        hash_ingressi = [self.hash[n] for n in stadio.ingressi]
+        if any(h is None for h in hash_ingressi):
+            mancanti = [n for n in stadio.ingressi if self.hash[n] is None]
+            print(f"⏭️  {stadio.nome}: ingressi non disponibili ({', '.join(mancanti)})")
+            self.esiti[stadio.nome] = ('non_eseguibile', 0.0)
+            self.hash[stadio.nome] = None
+            return
+        
+        chiave = chiave_stadio(stadio, hash_ingressi)
+        self._chiavi[stadio.nome] = chiave
+        forza = self.opzioni.no_cache or stadio.nome in (self.opzioni.forza or [])
+        if not forza and self.archivio.valido(stadio.nome, chiave, stadio):
+            voce = self.archivio.stato[stadio.nome]
+            if voce['artefatto']:
+                self._lazy[stadio.nome] = voce['artefatto']
+            else:
+                self.valori[stadio.nome] = None
+            self.hash[stadio.nome] = voce['artefatto'] or chiave
+            self.esiti[stadio.nome] = ('in_cache', 0.0)
+            print(f"♻️  {stadio.nome}: invariato, dalla cache")
+            return
+        
+        print(f"🚀 {stadio.nome}: avvio")
+        in_corso[pool.submit(self._lancia, stadio, uscita)] = stadio
+
+    def _pubblica(self, stadio, risultato):
+        self.valori[stadio.nome] = risultato
+        voce = self.archivio.stato.get(stadio.nome)
+        if voce and voce['chiave'] == self._chiavi[stadio.nome] and voce['artefatto']:
+            # Hash del contenuto: un risultato identico lascia valide le chiavi a valle
+            self.hash[stadio.nome] = voce['artefatto']
+        else:
+            self.hash[stadio.nome] = self._chiavi[stadio.nome]
+
+# ============================================================
+# MAIN
+# ============================================================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Pipeline a stadi con cache: estrazione, analisi e report")
+    nomi = [s.nome for s in STADI]
+    parser.add_argument('--solo', nargs='+', choices=nomi, metavar='STADIO',
+                        help="Esegue solo questi stadi (e quelli da cui dipendono)")
+    parser.add_argument('--forza', nargs='+', choices=nomi, metavar='STADIO',
+                        help="Riesegue questi stadi anche se invariati")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Ignora ogni cache (stadi ed estrazione PDF) e riesegue tutto")
+    parser.add_argument('--workers', type=int, default=2,
+                        help="Stadi indipendenti eseguiti in parallelo (default: 2)")
+    parser.add_argument('--tutte-le-revisioni', action='store_true',
+                        help="Estrae anche le revisioni superate (modN più vecchi della stessa settimana)")
+    parser.add_argument('--permutazioni', type=int, default=0,
+                        help="Permutazioni Monte Carlo per i p-value empirici del report forense (0 = disattivato)")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="Seed delle permutazioni (risultati riproducibili)")
+    parser.add_argument('--elenco', action='store_true',
+                        help="Mostra gli stadi e i loro ingressi ed esce")
+    return parser.parse_args(argv)
+
+def stampa_elenco():
+    print("📋 STADI DELLA PIPELINE")
+    for stadio in STADI:
+        file = f" → {', '.join(stadio.file)}" if stadio.file else ''
+        print(f"   {stadio.nome:<24} ← {', '.join(stadio.ingressi)}{file}")
+    print(f"\n   Sorgenti: {', '.join(SORGENTI)}")
+
+@esecuzione('pipeline')
+def main(argv=None):
+    args = parse_args(argv)
+    
+    if args.elenco:
+        stampa_elenco()
+        return
+    
+    print("="*70)
+    print("🔗 PIPELINE TURNI ROTA")
+    print("="*70)
+    
+    stadi = seleziona_stadi(args.solo)
+    workers = max(1, args.workers)
+    print(f"\nStadi: {', '.join(s.nome for s in stadi)}")
+    print(f"⚙️  Worker: {workers} | Cache: {'disattivata' if args.no_cache else 'attiva'}\n")
+    
+    esiti = Esecutore(stadi, args).esegui(workers)
+    
+    print("\n" + "="*70)
+    print("📊 RIEPILOGO STADI")
+    print("="*70)
+    simboli = {'eseguito': '✅', 'in_cache': '♻️ ', 'errore': '❌', 'non_eseguibile': '⏭️ ',
+               'senza_file': '⚠️ ', 'non_in_cache': '⚠️ '}
+    for stadio in stadi:
+        esito, durata = esiti.get(stadio.nome, ('non_eseguibile', 0.0))
+        print(f"   {simboli[esito]} {stadio.nome:<24} {esito:<15} {durata:8.2f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Scrittura in streaming dei report Excel
+I fogli vengono scritti con openpyxl in modalità write-only: le righe vanno
+direttamente nell'XML del foglio a blocchi di RIGHE_BLOCCO, senza costruire
+in memoria una cella per ogni valore come fa pd.ExcelWriter. La memoria resta
+quella del blocco corrente anche con "Dati Completi" da centinaia di migliaia
+di righe. I fogli possono essere passati come funzioni: vengono calcolati
+solo quando servono (e con workers > 1 in parallelo, mentre si scrivono
+i fogli precedenti). Con lxml installato openpyxl serializza più in fretta
+"""
+
+import datetime
+import numbers
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+RIGHE_BLOCCO = 50000
+
+# Limite di righe di un foglio Excel: oltre si continua in "Nome (2)", "Nome (3)"...
+MAX_RIGHE_FOGLIO = 1048576
+
+MAX_NOME_FOGLIO = 31
+
+# Tipi che openpyxl scrive direttamente: gli altri (liste, set...) diventano testo come in pd.ExcelWriter
+TIPI_CELLA = (str, numbers.Number, np.generic, datetime.date, datetime.time, datetime.timedelta)
+
+def _valori_colonna(serie):
+    """Serie -> lista di valori Python per openpyxl (None al posto di NaN/NaT/NA)"""
+    if isinstance(serie.dtype, pd.DatetimeTZDtype):
+        serie = serie.dt.tz_localize(None)
+    valori = serie.astype(object).where(serie.notna(), None).tolist()
+    if serie.dtype == object:
+        valori = [v if v is None or isinstance(v, TIPI_CELLA) else str(v) for v in valori]
+    return valori
+
+def _intestazione(df, index):
+    colonne = [' '.join(str(c) for c in col) if isinstance(col, tuple) else col for col in df.columns]
+    if not index:
+        return colonne
+    return [nome if nome is not None else '' for nome in df.index.names] + colonne
+
+def _righe(df, index, righe_blocco):
+    """Righe del DataFrame (indice compreso) a blocchi: una lista per riga"""
+    for inizio in range(0, len(df), righe_blocco):
+        blocco = df.iloc[inizio:inizio + righe_blocco]
+        colonne = [_valori_colonna(blocco.iloc[:, i]) for i in range(blocco.shape[1])]
+        if index:
+            livelli = [_valori_colonna(blocco.index.get_level_values(i).to_series())
+                       for i in range(blocco.index.nlevels)]
+            colonne = livelli + colonne
+        yield from map(list, zip(*colonne))
+
+class ReportExcel:
+    """Report Excel scritto in streaming (openpyxl write-only).
+    
+    Si usa come pd.ExcelWriter:
+        
+        with ReportExcel(output_file) as report:
+            report.scrivi(summary, sheet_name='Summary', index=False)
+            report.scrivi(lambda: df.sort_values('staff'), sheet_name='Dati Completi', index=False)
+    
+    dati è un DataFrame o una funzione che lo ritorna (None = foglio saltato).
+    Le funzioni si calcolano al momento della scrittura; con workers > 1 in
+    un pool di thread, e i fogli restano comunque nell'ordine delle chiamate.
+    Il file viene salvato con un rename atomico solo se il blocco with
+    termina senza errori. L'intestazione è in grassetto; non ci sono celle
+    unite per MultiIndex (un livello per colonna).
+    """
+
+    def __init__(self, path, workers=1, righe_blocco=RIGHE_BLOCCO):
+        self.path = Path(path)
+        self.righe_blocco = righe_blocco
+        self.workbook = Workbook(write_only=True)
+        self.executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+        self.coda = []
+        self.grassetto = Font(bold=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, errore, traceback):
+        try:
+            if tipo is None:
+                self._svuota(attendi=True)
+                self.salva()
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown(wait=True, cancel_futures=True)
+        return False
+
+    def scrivi(self, dati, sheet_name, index=True):
+        """Accoda un foglio; viene scritto appena i fogli precedenti sono pronti"""
+        if callable(dati) and self.executor is not None:
+            dati = self.executor.submit(dati)
+        elif callable(dati):
+            dati = dati()
+        self.coda.append((dati, sheet_name, index))
+        self._svuota(attendi=False)
+
+    def _svuota(self, attendi):
+        while self.coda:
+            dati, nome, index = self.coda[0]
+            if hasattr(dati, 'result'):
+                if not attendi and not dati.done():
+                    return
+                dati = dati.result()
+            self.coda.pop(0)
+            if dati is not None:
+                self._scrivi_foglio(dati, nome, index)
+
+    def _nuovo_foglio(self, nome, intestazione):
+        foglio = self.workbook.create_sheet(title=nome)
+        celle = []
+        for valore in intestazione:
+            cella = WriteOnlyCell(foglio, value=valore)
+            cella.font = self.grassetto
+            celle.append(cella)
+        foglio.append(celle)
+        return foglio
+
+    def _scrivi_foglio(self, df, nome, index):
+        if isinstance(df, pd.Series):
+            df = df.to_frame()
+        intestazione = _intestazione(df, index)
+        foglio = self._nuovo_foglio(nome, intestazione)
+        righe_foglio, parte = 1, 1
+        
+        for riga in _righe(df, index, self.righe_blocco):
+            if righe_foglio == MAX_RIGHE_FOGLIO:
+                parte += 1
+                suffisso = f' ({parte})'
+                foglio = self._nuovo_foglio(nome[:MAX_NOME_FOGLIO - len(suffisso)] + suffisso, intestazione)
+                righe_foglio = 1
+            foglio.append(riga)
+            righe_foglio += 1
+
+    def salva(self):
+        tmp = self.path.with_name(f'.{self.path.name}.tmp')
+        try:
+            self.workbook.save(tmp)
+            os.replace(tmp, self.path)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+        return self.path
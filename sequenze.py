@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Motore run-length per le sequenze consecutive (riposi, lavoro) dei turni
+Tutte le sequenze di tutti gli staff vengono calcolate in un'unica passata
+vettoriale (ordinamento stabile + diff/cumsum per gruppo), al posto dei
+cicli iterrows() per staff
+"""
+
+import numpy as np
+import pandas as pd
+
+def codifica_sequenze(df, dentro, ordine, staff_col='staff', neutro=None):
+    """Sequenze consecutive di giorni 'dentro' per ogni staff, in un'unica passata.
+    
+    df:        DataFrame con una riga per staff/giorno
+    dentro:    maschera booleana dei giorni che fanno parte di una sequenza
+    ordine:    colonna (o lista di colonne) per l'ordinamento cronologico
+    neutro:    maschera opzionale dei giorni che non allungano né interrompono
+               la sequenza; tutti gli altri giorni non 'dentro' la interrompono
+    
+    Ritorna un DataFrame con una riga per sequenza: staff, inizio, fine
+    (valori della prima colonna di ordine) e lunghezza.
+    """
+    ordine = [ordine] if isinstance(ordine, str) else list(ordine)
+    dentro = np.asarray(dentro, dtype=bool)
+    
+    chiavi = df[[staff_col] + ordine].reset_index(drop=True)
+    # Ordinamento stabile: a parità di chiave vale l'ordine originale delle righe
+    pos = chiavi.sort_values([staff_col] + ordine, kind='stable').index.to_numpy()
+    
+    if neutro is not None:
+        neutro = np.asarray(neutro, dtype=bool)
+        pos = pos[dentro[pos] | ~neutro[pos]]
+    
+    staff = chiavi[staff_col].to_numpy()[pos]
+    quando = chiavi[ordine[0]].to_numpy()[pos]
+    attivo = dentro[pos]
+    
+    # Una sequenza parte dove 'dentro' inizia o dove cambia lo staff
+    nuovo_staff = np.ones(len(pos), dtype=bool)
+    nuovo_staff[1:] = staff[1:] != staff[:-1]
+    precedente = np.zeros(len(pos), dtype=bool)
+    precedente[1:] = attivo[:-1]
+    inizio = attivo & (nuovo_staff | ~precedente)
+    
+    id_seq = np.cumsum(inizio)[attivo] - 1
+    lunghezza = np.bincount(id_seq, minlength=int(inizio.sum()))
+    fine_pos = np.flatnonzero(attivo)[np.cumsum(lunghezza) - 1] if len(lunghezza) else np.array([], dtype=int)
+    
+    return pd.DataFrame({
+        'staff': staff[inizio],
+        'inizio': quando[inizio],
+        'fine': quando[fine_pos],
+        'lunghezza': lunghezza
+    })
+
+def riepilogo_sequenze(sequenze, staff=None, max_lunghezza=4):
+    """Istogramma e statistiche delle sequenze per staff.
+    
+    Colonne: 1 .. max_lunghezza-1, 'N+' (N = max_lunghezza), 'sequenze',
+    'giorni', 'media', 'max'. Gli staff senza sequenze compaiono con zeri.
+    """
+    if staff is None:
+        staff = sorted(sequenze['staff'].unique())
+    staff = pd.Index(staff)
+    
+    codici = staff.get_indexer(sequenze['staff'])
+    validi = codici >= 0
+    codici = codici[validi]
+    lunghezze = sequenze['lunghezza'].to_numpy()[validi]
+    
+    classi = np.minimum(lunghezze, max_lunghezza)
+    istogramma = np.bincount(codici * (max_lunghezza + 1) + classi,
+                             minlength=len(staff) * (max_lunghezza + 1))
+    istogramma = istogramma.reshape(len(staff), max_lunghezza + 1)[:, 1:]
+    
+    n = np.bincount(codici, minlength=len(staff))
+    giorni = np.bincount(codici, weights=lunghezze, minlength=len(staff)).astype(int)
+    massimo = np.zeros(len(staff), dtype=int)
+    np.maximum.at(massimo, codici, lunghezze)
+    
+    colonne = list(range(1, max_lunghezza)) + [f'{max_lunghezza}+']
+    df = pd.DataFrame(istogramma, index=staff, columns=colonne)
+    df['sequenze'] = n
+    df['giorni'] = giorni
+    df['media'] = np.divide(giorni, n, out=np.zeros(len(staff)), where=n > 0)
+    df['max'] = massimo
+    return df
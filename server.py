@@ -2,25 +2,302 @@
 """
 Server HTTP semplice per servire la dashboard HR
 Ottimizzato per Render.com
+
+Server multi-thread HTTP/1.1 (keep-alive): un client lento non blocca gli
+altri. CSV e dashboard vengono serviti da varianti gzip (e brotli, se il
+modulo è installato) precompresse una sola volta; ETag forti e Last-Modified
+permettono al browser di rivalidare con una risposta 304 senza riscaricare
+i dati. I file grandi passano da sendfile (zero-copy).
+
+/api/metriche restituisce gli aggregati della dashboard (per staff, per
+settimana, per festività) calcolati dal CSV all'avvio e ricalcolati solo
+quando il CSV cambia: il browser scarica pochi KB invece dell'intero CSV.
 """
 
+import argparse
+import csv
+import email.utils
+import gzip
+import hashlib
 import http.server
-import socketserver
+import io
+import json
 import os
+import socketserver
+import tempfile
+import threading
+import time
+from http import HTTPStatus
 from pathlib import Path
 
+try:
+    import brotli
+    BROTLI_DISPONIBILE = True
+except ImportError:
+    BROTLI_DISPONIBILE = False
+
 # Porta da Render (variabile ambiente) o default 8000
 PORT = int(os.environ.get('PORT', 8000))
 
+# File per cui si preparano le varianti compresse
+ESTENSIONI_COMPRIMIBILI = {'.html', '.csv', '.js', '.css', '.json', '.svg'}
+MIN_COMPRESSIONE = 1024          # sotto 1 KB la compressione non conviene
+MIN_SENDFILE = 64 * 1024         # da 64 KB in su il file va al socket con sendfile
+CACHE_DIR_NAME = '.compressi'
+
+# Dati della dashboard e URL degli aggregati precalcolati
+CSV_DASHBOARD = 'dati_web.csv'
+URL_METRICHE = '/api/metriche'
+
+TIPI_RIPOSO = ('RIPO', 'RDOM')
+TIPI_OFF = ('OFF', 'CHIUSO')
+GIORNI = ['Lunedì', 'Martedì', 'Mercoledì', 'Giovedì', 'Venerdì', 'Sabato', 'Domenica']
+CAMPI_METRICHE = ['turni_totali', 'turni_normali', 'riposi', 'ferie', 'off',
+                  'festivi_lavorati', 'weekend_lavorati', 'ore_totali', 'ore_media']
+CAMPI_SETTIMANALI = ['settimana', 'turni', 'turni_normali', 'riposi', 'ore']
+
+# Content-Encoding -> (estensione della variante, compressore); in ordine di preferenza
+CODIFICHE = {}
+if BROTLI_DISPONIBILE:
+    CODIFICHE['br'] = ('.br', lambda dati: brotli.compress(dati, quality=11))
+CODIFICHE['gzip'] = ('.gz', lambda dati: gzip.compress(dati, compresslevel=9, mtime=0))
+
+def _scrivi_atomico(path, dati, mtime_ns):
+    """Scrive la variante passando da un temporaneo + rename, con l'mtime dell'originale"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(dati)
+        os.utime(tmp, ns=(mtime_ns, mtime_ns))
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+def _hash_file(path, blocco=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(blocco), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _numero(valore):
+    """'6,5' / '6.5' / '7' -> float; None se vuoto o non numerico"""
+    try:
+        return float(valore.replace(',', '.'))
+    except (AttributeError, ValueError):
+        return None
+
+def _vero(valore):
+    return (valore or '').strip().lower() in ('true', '1')
+
+def _chiave_settimana(valore):
+    numero = _numero(valore)
+    if numero is None:
+        return None
+    return int(numero) if numero.is_integer() else numero
+
+def calcola_metriche(csv_path):
+    """Aggregati della dashboard in una sola passata sul CSV (solo standard library).
+    
+    Stesse metriche che dashboard_completa.html calcolava nel browser per
+    ogni staff (turni, riposi, ferie, off, festivi e weekend lavorati, ore
+    totali, ore per turno NORMALE), più turni NORMALE per giorno della
+    settimana, per settimana e per festività. Le ore '6,5' valgono 6.5.
+    """
+    metriche = {}
+    settimanali = {}
+    festivi = {}
+    giorni = dict.fromkeys(GIORNI, 0)
+    settimane = set()
+    turni = 0
+    ore_totali = 0.0
+    
+    with open(csv_path, newline='', encoding='utf-8-sig') as f:
+        for riga in csv.DictReader(f):
+            staff = (riga.get('staff') or '').strip()
+            if not staff or staff == 'staff':
+                continue
+            
+            tipo = riga.get('tipo_turno')
+            normale = tipo == 'NORMALE'
+            riposo = tipo in TIPI_RIPOSO
+            ore = _numero(riga.get('ore_lavoro')) or 0.0
+            settimana = _chiave_settimana(riga.get('settimana'))
+            
+            m = metriche.get(staff)
+            if m is None:
+                m = metriche[staff] = dict.fromkeys(CAMPI_METRICHE, 0)
+            m['turni_totali'] += 1
+            m['turni_normali'] += normale
+            m['riposi'] += riposo
+            m['ferie'] += tipo == 'FERIOR'
+            m['off'] += tipo in TIPI_OFF
+            m['ore_totali'] += ore
+            
+            turni += 1
+            ore_totali += ore
+            
+            if settimana is not None:
+                if settimana:
+                    settimane.add(settimana)
+                s = settimanali.setdefault(staff, {}).setdefault(settimana, [settimana, 0, 0, 0, 0.0])
+                s[1] += 1
+                s[2] += normale
+                s[3] += riposo
+                s[4] += ore
+            
+            if not normale:
+                continue
+            if _vero(riga.get('is_weekend')):
+                m['weekend_lavorati'] += 1
+            if _vero(riga.get('is_festivo')):
+                m['festivi_lavorati'] += 1
+                nome = riga.get('festivo') or riga.get('data_parsed') or 'Festivo'
+                per_staff = festivi.setdefault(nome, {})
+                per_staff[staff] = per_staff.get(staff, 0) + 1
+            if riga.get('giorno_settimana') in giorni:
+                giorni[riga['giorno_settimana']] += 1
+    
+    for m in metriche.values():
+        m['ore_media'] = round(m['ore_totali'] / m['turni_normali'], 4) if m['turni_normali'] else 0
+        m['ore_totali'] = round(m['ore_totali'], 2)
+    
+    staff_list = sorted(metriche)
+    return {
+        'sorgente': Path(csv_path).name,
+        'totali': {
+            'turni': turni,
+            'ore': round(ore_totali, 2),
+            'settimane': len(settimane),
+            'staff': len(staff_list)
+        },
+        'staff': staff_list,
+        'metriche': {staff: metriche[staff] for staff in staff_list},
+        'giorni': giorni,
+        'festivi': festivi,
+        'settimanali': {
+            'colonne': CAMPI_SETTIMANALI,
+            'staff': {
+                staff: [[s, t, n, r, round(o, 2)]
+                        for s, t, n, r, o in (v for _, v in sorted(settimanali.get(staff, {}).items()))]
+                for staff in staff_list
+            }
+        }
+    }
+
+class MetricheDashboard:
+    """JSON degli aggregati della dashboard, rigenerato solo quando il CSV cambia.
+    
+    Il file sta in .compressi/api/metriche.json e viene servito come un file
+    statico: varianti gzip/brotli, ETag e 304 come per il CSV.
+    """
+    
+    def __init__(self, web_dir, csv_name=CSV_DASHBOARD):
+        self.csv_path = Path(web_dir).resolve() / csv_name
+        self.json_path = self.csv_path.parent / CACHE_DIR_NAME / 'api' / 'metriche.json'
+        self._lock = threading.Lock()
+        self._firma = None
+    
+    def percorso(self):
+        """Percorso del JSON aggiornato (None se il CSV non esiste)"""
+        try:
+            st = self.csv_path.stat()
+        except OSError:
+            return None
+        firma = (st.st_size, st.st_mtime_ns)
+        if firma != self._firma:
+            with self._lock:
+                if firma != self._firma:
+                    dati = json.dumps(calcola_metriche(self.csv_path), ensure_ascii=False,
+                                      separators=(',', ':')).encode('utf-8')
+                    _scrivi_atomico(self.json_path, dati, time.time_ns())
+                    self._firma = firma
+        return str(self.json_path)
+
+class Varianti:
+    """ETag e varianti precompresse dei file serviti, in cache per (dimensione, mtime).
+    
+    Le varianti stanno in <web_dir>/.compressi/<percorso>.gz|.br con lo stesso
+    mtime dell'originale: se il file cambia vengono rigenerate (rename
+    atomico) alla prima richiesta, anche a server avviato.
+    """
+    
+    def __init__(self, web_dir):
+        self.web_dir = Path(web_dir).resolve()
+        self.cartella = self.web_dir / CACHE_DIR_NAME
+        self._lock = threading.Lock()
+        self._voci = {}
+    
+    def voce(self, path, st):
+        """(etag, {codifica: percorso variante}) per il file path con stat st"""
+        firma = (st.st_size, st.st_mtime_ns)
+        voce = self._voci.get(path)
+        if voce is None or voce[0] != firma:
+            with self._lock:
+                voce = self._voci.get(path)
+                if voce is None or voce[0] != firma:
+                    voce = (firma, *self._prepara(Path(path), firma))
+                    self._voci[path] = voce
+        return voce[1], voce[2]
+    
+    def _prepara(self, path, firma):
+        size, mtime_ns = firma
+        etag = _hash_file(path)[:32]
+        varianti = {}
+        
+        if path.suffix.lower() not in ESTENSIONI_COMPRIMIBILI or size < MIN_COMPRESSIONE:
+            return etag, varianti
+        
+        try:
+            relativo = path.resolve().relative_to(self.web_dir)
+        except ValueError:
+            return etag, varianti
+        
+        dati = None
+        for codifica, (estensione, comprimi) in CODIFICHE.items():
+            variante = self.cartella / f'{relativo}{estensione}'
+            if not (variante.exists() and variante.stat().st_mtime_ns == mtime_ns):
+                dati = path.read_bytes() if dati is None else dati
+                compresso = comprimi(dati)
+                if len(compresso) >= len(dati):
+                    continue
+                _scrivi_atomico(variante, compresso, mtime_ns)
+            varianti[codifica] = str(variante)
+        return etag, varianti
+    
+    def prepara_tutto(self):
+        """Precomprime all'avvio i file comprimibili della cartella web"""
+        preparati = []
+        for path in sorted(self.web_dir.iterdir()):
+            if path.is_file() and path.suffix.lower() in ESTENSIONI_COMPRIMIBILI:
+                _, varianti = self.voce(str(path), path.stat())
+                if varianti:
+                    preparati.append((path, varianti))
+        return preparati
+
 class MyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
-    """Handler personalizzato con CORS abilitato"""
+    """Handler personalizzato con CORS abilitato, varianti compresse e rivalidazione"""
+    
+    protocol_version = 'HTTP/1.1'
+    # Il browser può tenere i file ma deve rivalidarli (ETag -> 304) a ogni uso
+    cache_control = 'no-cache'
+    # Connessioni keep-alive inattive chiuse dopo 60 secondi
+    timeout = 60
+    # Intestazioni e corpo partono in scritture separate: senza TCP_NODELAY il
+    # delayed ACK del client aggiunge ~40 ms a ogni risposta keep-alive
+    disable_nagle_algorithm = True
+    varianti = None
+    metriche = None
     
     def end_headers(self):
         # Abilita CORS
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.send_header('Cache-Control', 'no-store, no-cache, must-revalidate')
+        self.send_header('Cache-Control', self.cache_control)
         super().end_headers()
     
     def do_GET(self):
@@ -28,27 +305,171 @@ class MyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
         if self.path == '/':
             self.path = '/dashboard_completa.html'
         return super().do_GET()
+    
+    def send_head(self):
+        percorso_url = self.path.split('?', 1)[0]
+        if self.metriche is not None and percorso_url == URL_METRICHE:
+            path = self.metriche.percorso()
+            if path is None:
+                self.send_error(HTTPStatus.NOT_FOUND, f"{CSV_DASHBOARD} non trovato")
+                return None
+            return self._invia_file(path)
+        
+        path = self.translate_path(self.path)
+        # Cartelle, percorsi con '/' finale e file mancanti: comportamento standard
+        if self.varianti is None or percorso_url.endswith('/') or not os.path.isfile(path):
+            return super().send_head()
+        return self._invia_file(path)
+    
+    def _invia_file(self, path):
+        """Intestazioni per path (variante compressa se accettata) o 304; ritorna il file aperto"""
+        st = os.stat(path)
+        etag_base, varianti = self.varianti.voce(path, st)
+        codifica = self._codifica_accettata(varianti)
+        etag = f'"{etag_base}-{codifica}"' if codifica else f'"{etag_base}"'
+        
+        if self._non_modificato(etag, st.st_mtime):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self._header_validatori(etag, st.st_mtime, varianti)
+            self.end_headers()
+            return None
+        
+        f = open(varianti[codifica] if codifica else path, 'rb')
+        try:
+            self.send_response(HTTPStatus.OK)
+            self.send_header('Content-Type', self.guess_type(path))
+            if codifica:
+                self.send_header('Content-Encoding', codifica)
+            self.send_header('Content-Length', str(os.fstat(f.fileno()).st_size))
+            self._header_validatori(etag, st.st_mtime, varianti)
+            self.end_headers()
+            return f
+        except BaseException:
+            f.close()
+            raise
+    
+    def _header_validatori(self, etag, mtime, varianti):
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', self.date_time_string(mtime))
+        if varianti:
+            self.send_header('Vary', 'Accept-Encoding')
+    
+    def _codifica_accettata(self, varianti):
+        """Prima codifica disponibile (br, gzip) accettata dal client con q > 0"""
+        accettate = {}
+        for parte in self.headers.get('Accept-Encoding', '').split(','):
+            nome, *parametri = [p.strip() for p in parte.split(';')]
+            q = 1.0
+            for parametro in parametri:
+                if parametro.startswith('q='):
+                    try:
+                        q = float(parametro[2:])
+                    except ValueError:
+                        q = 0.0
+            if nome:
+                accettate[nome.lower()] = q
+        for codifica in CODIFICHE:
+            if codifica in varianti and accettate.get(codifica, accettate.get('*', 0)) > 0:
+                return codifica
+        return None
+    
+    def _non_modificato(self, etag, mtime):
+        """If-None-Match (prevale) o If-Modified-Since soddisfatti -> 304"""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            tag = [t.strip().removeprefix('W/') for t in if_none_match.split(',')]
+            return '*' in tag or etag in tag
+        
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                data = email.utils.parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError, IndexError, OverflowError):
+                return False
+            return data is not None and int(mtime) <= data.timestamp()
+        return False
+    
+    def copyfile(self, source, outputfile):
+        # File grandi: dal disco al socket senza passare da Python (sendfile)
+        try:
+            grande = os.fstat(source.fileno()).st_size >= MIN_SENDFILE
+        except (AttributeError, io.UnsupportedOperation):
+            grande = False
+        if grande:
+            self.connection.sendfile(source)
+        else:
+            super().copyfile(source, outputfile)
+
+class HandlerOriginale(MyHTTPRequestHandler):
+    """Comportamento originale (HTTP/1.0, no-store, nessuna compressione), per confronto"""
+    
+    protocol_version = 'HTTP/1.0'
+    cache_control = 'no-store, no-cache, must-revalidate'
+    timeout = None
+    varianti = None
+    metriche = None
+
+class ServerOriginale(socketserver.TCPServer):
+    allow_reuse_address = True
+
+class ServerDashboard(http.server.ThreadingHTTPServer):
+    """Un thread per connessione: le connessioni keep-alive non si bloccano a vicenda"""
+    
+    allow_reuse_address = True
+    request_queue_size = 128
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Server HTTP dashboard HR")
+    parser.add_argument('--porta', type=int, default=PORT)
+    parser.add_argument('--directory', type=Path, default=Path(__file__).parent)
+    parser.add_argument('--originale', action='store_true',
+                        help="Server originale a thread singolo senza cache (per confronto)")
+    return parser.parse_args(argv)
 
-def main():
+def main(argv=None):
+    args = parse_args(argv)
+    
     # Cambia directory alla cartella corrente
-    web_dir = Path(__file__).parent
+    web_dir = args.directory.resolve()
     os.chdir(web_dir)
     
     print("=" * 70)
     print("🌐 SERVER HR DASHBOARD")
     print("=" * 70)
-    print(f"\n✅ Server attivo su porta {PORT}")
+    
+    if args.originale:
+        handler = HandlerOriginale
+        server = ServerOriginale
+        print("\n⚙️  Modalità originale: thread singolo, HTTP/1.0, nessuna cache")
+    else:
+        MyHTTPRequestHandler.varianti = Varianti(web_dir)
+        MyHTTPRequestHandler.metriche = MetricheDashboard(web_dir)
+        handler = MyHTTPRequestHandler
+        server = ServerDashboard
+        print(f"\n📦 Varianti precompresse ({', '.join(CODIFICHE)}):")
+        for path, varianti in MyHTTPRequestHandler.varianti.prepara_tutto():
+            dimensioni = ', '.join(f"{c} {os.path.getsize(v) / 1024:.0f} KB" for c, v in varianti.items())
+            print(f"   {path.name}: {path.stat().st_size / 1024:.0f} KB -> {dimensioni}")
+        if not BROTLI_DISPONIBILE:
+            print("   (brotli non installato: solo gzip)")
+        
+        metriche_json = MyHTTPRequestHandler.metriche.percorso()
+        if metriche_json:
+            print(f"\n📊 Aggregati dashboard da {CSV_DASHBOARD}: {URL_METRICHE}"
+                  f" ({os.path.getsize(metriche_json) / 1024:.1f} KB)")
+    
+    print(f"\n✅ Server attivo su porta {args.porta}")
     print(f"📁 Directory: {web_dir}")
     print(f"\n🌐 Accedi alla dashboard:")
-    print(f"   http://localhost:{PORT}/")
-    print(f"   http://localhost:{PORT}/dashboard_completa.html")
+    print(f"   http://localhost:{args.porta}/")
+    print(f"   http://localhost:{args.porta}/dashboard_completa.html")
     print("\n🔒 Dati censurati: Solo prime 3 lettere dei nomi")
     print("\n⏹  Premi CTRL+C per fermare il server")
     print("=" * 70)
-    print()
+    print(flush=True)
     
     # Avvia server
-    with socketserver.TCPServer(("", PORT), MyHTTPRequestHandler) as httpd:
+    with server(("", args.porta), handler) as httpd:
         try:
             httpd.serve_forever()
         except KeyboardInterrupt:
@@ -57,4 +478,3 @@ def main():
 
 if __name__ == '__main__':
     main()
-
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Strumentazione delle pipeline: tempi, righe e memoria di picco per fase
+Il main() di ogni script è avvolto da @esecuzione: a fine esecuzione scrive
+un report JSON con durata, righe in ingresso / uscita e RSS di picco di ogni
+fase, più un riepilogo a video. Le fasi sono le funzioni decorate con
+@fase() (load_data, calendario, analisi, report...) o i blocchi
+"with fase('nome'):"; fuori da un'esecuzione strumentata non misurano nulla.
+
+Opzioni (riconosciute da ogni script strumentato):
+    --profile / ROTA_PROFILE=1   profilo cProfile (.prof, per snakeviz o pstats)
+                                 e stack campionati (.folded, per flamegraph.pl
+                                 o speedscope)
+    ROTA_TEMPI_DIR=<cartella>    dove scrivere i report (default BASE_PATH/tempi)
+
+Uso:
+    python3 analisi_hr_anno_completo.py --profile
+    flamegraph.pl tempi/analisi_hr_anno_completo_20250101_120000.folded > flame.svg
+"""
+
+import argparse
+import cProfile
+import functools
+import inspect
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+# Intervallo di campionamento degli stack per il flamegraph (secondi)
+INTERVALLO_CAMPIONI = 0.005
+
+# Esecuzione strumentata in corso (una per processo)
+_corrente = None
+
+# ============================================================
+# MEMORIA
+# ============================================================
+
+def _leggi_status(chiave):
+    try:
+        with open('/proc/self/status') as f:
+            for riga in f:
+                if riga.startswith(chiave):
+                    return int(riga.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+def rss_mb():
+    """Resident set size attuale del processo, in MB (None se non disponibile)"""
+    return _leggi_status('VmRSS:')
+
+def rss_picco_mb():
+    """Resident set size di picco del processo corrente, in MB"""
+    # Linux: VmHWM riparte da zero a ogni exec, mentre ru_maxrss eredita il
+    # picco del processo padre (che può tenere in memoria i dati generati)
+    picco = _leggi_status('VmHWM:')
+    if picco is not None:
+        return picco
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux riporta KB, macOS byte
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+def _arrotonda(mb):
+    return None if mb is None else round(mb, 1)
+
+def _azzera_picco():
+    """Riporta VmHWM all'RSS attuale (Linux); False se il picco non è azzerabile"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+# ============================================================
+# FASI
+# ============================================================
+
+def conta_righe(valore):
+    """Righe di un risultato: len() di DataFrame/Series/array, della prima tabella di una tupla"""
+    if isinstance(valore, tuple):
+        return next((n for n in map(conta_righe, valore) if n is not None), None)
+    if hasattr(valore, 'shape') and getattr(valore, 'ndim', 0) >= 1:
+        return int(valore.shape[0])
+    return None
+
+class fase:
+    """Una fase misurata: context manager (with fase('nome') as f: ... f.righe = n) o decoratore (@fase()).
+    
+    Come decoratore le righe in ingresso sono quelle del primo argomento
+    tabellare, quelle in uscita del risultato. Le fasi si possono annidare.
+    """
+
+    def __init__(self, nome=None, righe_in=None):
+        self.nome = nome
+        self.righe_in = righe_in
+        self.righe = None
+
+    def __enter__(self):
+        if _corrente is not None:
+            self._record = _corrente.apri(self.nome, self.righe_in)
+        return self
+
+    def __exit__(self, tipo, errore, traceback):
+        if _corrente is not None and hasattr(self, '_record'):
+            _corrente.chiudi(self._record, self.righe, errore)
+        return False
+
+    def __call__(self, funzione):
+        nome = self.nome or funzione.__name__
+
+        @functools.wraps(funzione)
+        def misurata(*args, **kwargs):
+            if _corrente is None:
+                return funzione(*args, **kwargs)
+            righe_in = next((n for n in map(conta_righe, args) if n is not None), None)
+            with fase(nome, righe_in) as f:
+                risultato = funzione(*args, **kwargs)
+                f.righe = conta_righe(risultato)
+            return risultato
+        return misurata
+
+# ============================================================
+# PROFILO
+# ============================================================
+
+def _etichetta(frame):
+    codice = frame.f_code
+    return f"{codice.co_name} ({Path(codice.co_filename).name}:{codice.co_firstlineno})"
+
+class CampionatoreStack(threading.Thread):
+    """Campiona lo stack del thread principale a intervalli fissi: stack collassati per flamegraph"""
+
+    def __init__(self, intervallo=INTERVALLO_CAMPIONI):
+        super().__init__(daemon=True)
+        self.intervallo = intervallo
+        self.id_principale = threading.main_thread().ident
+        self.campioni = Counter()
+        self._fine = threading.Event()
+
+    def run(self):
+        while not self._fine.wait(self.intervallo):
+            frame = sys._current_frames().get(self.id_principale)
+            stack = []
+            while frame is not None:
+                stack.append(_etichetta(frame))
+                frame = frame.f_back
+            if stack:
+                self.campioni[';'.join(reversed(stack))] += 1
+
+    def ferma(self):
+        self._fine.set()
+        self.join()
+
+    def scrivi(self, percorso):
+        """Formato "stack;collassato conteggio", una riga per stack"""
+        with open(percorso, 'w', encoding='utf-8') as f:
+            for stack, n in self.campioni.most_common():
+                f.write(f"{stack} {n}\n")
+
+# ============================================================
+# ESECUZIONE
+# ============================================================
+
+def cartella_tempi():
+    cartella = os.environ.get('ROTA_TEMPI_DIR')
+    if cartella:
+        return Path(cartella)
+    from archivio_turni import BASE_PATH
+    return BASE_PATH / 'tempi'
+
+class Esecuzione:
+    """Raccoglie le fasi di un main() e ne scrive il report JSON (e il profilo, se richiesto)"""
+
+    def __init__(self, script, profilo=False, argv=()):
+        self.script = script
+        self.profilo = profilo
+        self.argv = list(argv)
+        self.fasi = []
+        # Fasi aperte per thread: stadi concorrenti (pipeline.py) hanno ognuno il proprio annidamento
+        self._aperte = {}
+        self._lock = threading.RLock()
+        self.picco_totale = 0
+        self.picco_azzerabile = False
+
+    def _aggiorna_picchi(self):
+        # Il picco delle fasi aperte si aggiorna prima di ogni azzeramento di VmHWM
+        picco = rss_picco_mb()
+        self.picco_totale = max(self.picco_totale, picco)
+        for record in (r for aperte in self._aperte.values() for r in aperte):
+            record['rss_picco_mb'] = max(record['rss_picco_mb'] or 0, picco)
+        self.picco_azzerabile = _azzera_picco()
+
+    def apri(self, nome, righe_in=None):
+        with self._lock:
+            return self._apri(nome, righe_in)
+
+    def _apri(self, nome, righe_in):
+        self._aggiorna_picchi()
+        aperte = self._aperte.setdefault(threading.get_ident(), [])
+        record = {
+            'id': len(self.fasi),
+            'padre': aperte[-1]['id'] if aperte else None,
+            'fase': nome,
+            'livello': len(aperte),
+            'inizio_s': round(time.perf_counter() - self._inizio, 4),
+            'durata_s': None,
+            'righe_in': righe_in,
+            'righe_out': None,
+            'rss_inizio_mb': _arrotonda(rss_mb()),
+            'rss_picco_mb': None,
+            '_t0': time.perf_counter(),
+        }
+        self.fasi.append(record)
+        aperte.append(record)
+        return record
+
+    def chiudi(self, record, righe=None, errore=None):
+        with self._lock:
+            self._chiudi(record, righe, errore)
+
+    def _chiudi(self, record, righe, errore):
+        record['durata_s'] = round(time.perf_counter() - record.pop('_t0'), 4)
+        record['righe_out'] = righe
+        self._aggiorna_picchi()
+        record['rss_picco_mb'] = _arrotonda(record['rss_picco_mb'])
+        if errore is not None:
+            record['errore'] = repr(errore)
+        for aperte in self._aperte.values():
+            if record in aperte:
+                aperte.remove(record)
+
+    def __enter__(self):
+        global _corrente
+        _corrente = self
+        self.data = datetime.now()
+        self._inizio = time.perf_counter()
+        self._aggiorna_picchi()
+        self._profiler = self._campionatore = None
+        if self.profilo:
+            self._campionatore = CampionatoreStack()
+            self._campionatore.start()
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        return self
+
+    def __exit__(self, tipo, errore, traceback):
+        global _corrente
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._campionatore.ferma()
+        durata = time.perf_counter() - self._inizio
+        for aperte in self._aperte.values():
+            while aperte:
+                self.chiudi(aperte[-1], errore=errore)
+        self._aggiorna_picchi()
+        _corrente = None
+        if isinstance(errore, SystemExit):
+            # --help o errori negli argomenti: nessuna esecuzione da riportare
+            return False
+        
+        report = {
+            'script': self.script,
+            'data': self.data.isoformat(timespec='seconds'),
+            'argv': self.argv,
+            'host': platform.node(),
+            'python': platform.python_version(),
+            'durata_s': round(durata, 4),
+            # Senza azzeramento di VmHWM il picco di una fase è quello del processo fino a lì
+            'picco_per_fase': self.picco_azzerabile,
+            'rss_picco_mb': round(self.picco_totale, 1),
+            'errore': repr(errore) if errore is not None else None,
+            'fasi': self.fasi,
+        }
+        try:
+            self.scrivi(report)
+        except OSError as e:
+            print(f"⚠️  Report tempi non salvato: {e}")
+        return False
+
+    def scrivi(self, report):
+        cartella = cartella_tempi()
+        cartella.mkdir(exist_ok=True)
+        radice = cartella / f"{self.script}_{self.data:%Y%m%d_%H%M%S}"
+        
+        if self._profiler is not None:
+            self._profiler.dump_stats(radice.with_suffix('.prof'))
+            self._campionatore.scrivi(radice.with_suffix('.folded'))
+            report['profilo'] = str(radice.with_suffix('.prof'))
+            report['flamegraph'] = str(radice.with_suffix('.folded'))
+        
+        percorso = radice.with_suffix('.json')
+        percorso.write_text(json.dumps(report, indent=1, ensure_ascii=False), encoding='utf-8')
+        
+        print(f"\n⏱️  TEMPI PER FASE ({report['durata_s']:.2f}s, picco {report['rss_picco_mb']:.0f} MB)")
+        for f in _in_albero(report['fasi']):
+            righe = '' if f['righe_out'] is None else f" | {f['righe_out']:,} righe"
+            print(f"   {'  ' * f['livello']}{f['fase']:<{40 - 2 * f['livello']}} {f['durata_s']:8.3f}s"
+                  f" | picco {f['rss_picco_mb']:.0f} MB{righe}")
+        print(f"   📄 {percorso}")
+        if self._profiler is not None:
+            print(f"   🔥 Profilo: {report['profilo']} | stack per flamegraph: {report['flamegraph']}")
+
+def _in_albero(fasi):
+    """Fasi in ordine di albero: ogni fase seguita dalle sue sottofasi (anche con fasi in thread paralleli)"""
+    figli = {}
+    for f in fasi:
+        figli.setdefault(f['padre'], []).append(f)
+    ordine = []
+    da_visitare = list(reversed(figli.get(None, [])))
+    while da_visitare:
+        f = da_visitare.pop()
+        ordine.append(f)
+        da_visitare.extend(reversed(figli.get(f['id'], [])))
+    return ordine
+
+def _opzioni():
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--profile', action='store_true')
+    return parser
+
+def esecuzione(script):
+    """Decoratore del main(): esecuzione strumentata con report JSON e --profile.
+    
+    --profile viene tolto dagli argomenti prima di passarli al main (se ne
+    accetta); i main senza argomenti vengono chiamati senza. Dentro
+    un'esecuzione già strumentata (un main chiamato da pipeline.py) il main
+    diventa una fase di quella.
+    """
+    def decoratore(main):
+        accetta_argv = bool(inspect.signature(main).parameters)
+
+        @functools.wraps(main)
+        def strumentato(argv=None):
+            argv = sys.argv[1:] if argv is None else list(argv)
+            if _corrente is not None:
+                with fase(script):
+                    return main(argv) if accetta_argv else main()
+            opzioni, resto = _opzioni().parse_known_args(argv)
+            profilo = opzioni.profile or os.environ.get('ROTA_PROFILE') == '1'
+            with Esecuzione(script, profilo, argv):
+                return main(resto) if accetta_argv else main()
+        return strumentato
+    return decoratore